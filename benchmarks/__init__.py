@@ -0,0 +1,13 @@
+"""
+RouteZero Benchmarks.
+
+Micro- and endpoint benchmarks with JSON results and a baseline regression
+check. Run with `python -m benchmarks.run`; see that module for options.
+
+Modules:
+    harness: Registry, autoranged timing, results metadata and baseline comparison.
+    fixtures: Seeded synthetic fleets and telemetry logs.
+    bench_transforms: CO₂ model helpers, haversine and corridor deviation checks.
+    bench_readers: `_read_jsonl` and FleetStateReader at growing log sizes.
+    bench_api: REST endpoints via an in-process ASGI client with 10, 1k and 50k vehicles.
+"""
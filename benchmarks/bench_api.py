@@ -0,0 +1,110 @@
+"""
+API endpoint latency through an in-process ASGI client at several fleet sizes.
+
+Each fleet size runs in its own interpreter, because rag.api_server reads
+TMP_DIR and builds its state at import. The child writes one telemetry
+record per vehicle, loads it through the app, then times each endpoint end to
+end (routing, handler, JSON encoding) with admission control disabled.
+
+Usage (normally driven by benchmarks.run):
+    python -m benchmarks.bench_api --fleet-size 1000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.fixtures import workdir, write_fleet_log
+from benchmarks.harness import DEFAULT_MIN_TIME_SEC, DEFAULT_ROUNDS, measure
+
+FLEET_SIZES: tuple[int, ...] = (10, 1_000, 50_000)
+
+ENDPOINTS: tuple[tuple[str, str], ...] = (
+    ("health", "/health"),
+    ("fleet", "/api/fleet"),
+    ("fleet_bbox", "/api/fleet?min_lat=22&min_lon=76&max_lat=27&max_lon=79"),
+    ("fleet_nearest", "/api/fleet?lat=23.26&lon=77.41&k=5"),
+    ("fleet_intel", "/api/fleet-intel"),
+    ("vehicle", "/api/vehicle/TRK-BM-00000"),
+    ("alerts", "/api/alerts"),
+    ("fleet_rankings", "/api/fleet-rankings"),
+    ("route_summary", "/api/route-summary"),
+    ("carbon_report", "/api/carbon-report"),
+    ("co2_trend", "/api/co2-trend"),
+    ("pathway_status", "/api/pathway-status"),
+)
+
+NOT_MODIFIED: tuple[tuple[str, str], ...] = (
+    ("fleet_not_modified", "/api/fleet"),
+    ("fleet_intel_not_modified", "/api/fleet-intel"),
+)
+"""Dashboard polls revalidating with If-None-Match while the data is unchanged."""
+
+
+def bench_fleet(fleet_size: int, min_time: float, rounds: int) -> dict[str, dict]:
+    """Time every endpoint against a fleet of `fleet_size` vehicles (this process only)."""
+    tmp = workdir() / f"api_{fleet_size}"
+    write_fleet_log(tmp / "fleet_summary.jsonl", fleet_size)
+    os.environ.update(TMP_DIR=str(tmp), ADMISSION_CONTROL="0")
+
+    from fastapi.testclient import TestClient
+
+    from rag.api_server import app
+
+    results = {}
+    with TestClient(app) as client:
+        for name, url in ENDPOINTS:
+            def call(url: str = url) -> None:
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+            results[f"api/{name}[{fleet_size}]"] = measure(call, min_time=min_time, rounds=rounds)
+        for name, url in NOT_MODIFIED:
+            headers = {"If-None-Match": client.get(url).headers["etag"]}
+
+            def revalidate(url: str = url, headers: dict = headers) -> None:
+                response = client.get(url, headers=headers)
+                if response.status_code != 304:
+                    raise RuntimeError(f"GET {url} returned {response.status_code}, expected 304")
+
+            results[f"api/{name}[{fleet_size}]"] = measure(revalidate, min_time=min_time, rounds=rounds)
+    return results
+
+
+def run(fleet_sizes: tuple[int, ...] = FLEET_SIZES, min_time: float = DEFAULT_MIN_TIME_SEC,
+        rounds: int = DEFAULT_ROUNDS, log: Callable[[str], None] | None = None) -> dict[str, dict]:
+    """Run `bench_fleet` in a fresh interpreter per fleet size and merge the results."""
+    results = {}
+    root = Path(__file__).resolve().parent.parent
+    for size in fleet_sizes:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_api", "--fleet-size", str(size),
+             "--min-time", str(min_time), "--rounds", str(rounds)],
+            cwd=root, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"API benchmark for {size} vehicles failed:\n{proc.stderr[-2000:]}")
+        fleet_results = json.loads(proc.stdout.strip().splitlines()[-1])
+        for key, result in fleet_results.items():
+            if log is not None:
+                log(f"{key:<50} {result['median_us']:>14,.1f} µs")
+        results.update(fleet_results)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints for one fleet size.")
+    parser.add_argument("--fleet-size", type=int, required=True)
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME_SEC)
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    args = parser.parse_args()
+    print(json.dumps(bench_fleet(args.fleet_size, args.min_time, args.rounds)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+JSONL reader costs at growing log sizes.
+
+`_read_jsonl` re-reads the whole file to return its last lines, so its cost
+grows with the log; FleetStateReader's cold load is the one-off price of the
+incremental reader, and its steady-state refresh only reads what was appended.
+"""
+
+from benchmarks.fixtures import workdir, write_fleet_log
+from benchmarks.harness import benchmark
+
+LOG_SIZES: tuple[int, ...] = (1_000, 10_000, 100_000)
+
+
+def _log(lines: int):
+    path = workdir() / f"fleet_{lines}.jsonl"
+    if not path.exists():
+        write_fleet_log(path, n_vehicles=100, records_per_vehicle=lines // 100)
+    return path
+
+
+@benchmark("readers", params=LOG_SIZES)
+def read_jsonl_last_50(lines: int):
+    from rag.api_server import _read_jsonl
+
+    path = _log(lines)
+    return lambda: _read_jsonl(path, last_n=50)
+
+
+@benchmark("readers", params=LOG_SIZES)
+def fleet_reader_cold_load(lines: int):
+    from rag.fleet_reader import FleetStateReader
+
+    path = _log(lines)
+    return lambda: FleetStateReader(path).refresh()
+
+
+@benchmark("readers", params=LOG_SIZES)
+def fleet_reader_refresh_10_appended(lines: int):
+    from rag.fleet_reader import FleetStateReader
+
+    path = workdir() / f"fleet_append_{lines}.jsonl"
+    path.write_bytes(_log(lines).read_bytes())
+    reader = FleetStateReader(path)
+    reader.refresh()
+    with open(path, encoding="utf-8") as f:
+        tail = [f.readline() for _ in range(10)]
+    batch = "".join(tail)
+
+    def append_and_refresh():
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(batch)
+        reader.refresh()
+
+    return append_and_refresh
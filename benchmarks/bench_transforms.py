@@ -0,0 +1,53 @@
+"""
+Per-event transform costs: CO₂ model helpers and corridor deviation checks.
+
+The Pathway UDFs are timed through their plain Python functions in
+`co2_model` / `route_geometry`, i.e. the work done per row, without the
+dataflow engine around them.
+"""
+
+import logging
+
+from benchmarks.harness import benchmark
+
+
+@benchmark("transforms", params=("unladen", "laden_overspeed_cold"))
+def calculate_co2_kg(case: str):
+    from transforms.co2_model import calculate_co2_kg
+
+    args = (1.2, 0.0, 25000.0, 65.0, False) if case == "unladen" else (1.2, 24000.0, 25000.0, 95.0, True)
+    return lambda: calculate_co2_kg(*args)
+
+
+@benchmark("transforms")
+def compute_load_multiplier():
+    from transforms.co2_model import compute_load_multiplier
+
+    return lambda: compute_load_multiplier(0.8)
+
+
+@benchmark("transforms")
+def compute_speed_efficiency_factor():
+    from transforms.co2_model import compute_speed_efficiency_factor
+
+    return lambda: compute_speed_efficiency_factor(92.0)
+
+
+@benchmark("transforms")
+def haversine_km():
+    from transforms.route_geometry import haversine_km
+
+    return lambda: haversine_km(28.6139, 77.2090, 19.0760, 72.8777)
+
+
+@benchmark("transforms", params=("on_corridor", "deviated"))
+def check_deviation(case: str):
+    from transforms.route_geometry import ROUTE_CORRIDORS, check_deviation
+
+    # Deviations log a warning per call; time the check, not the log handler.
+    logging.getLogger("transforms.route_geometry").setLevel(logging.ERROR)
+    route_id = next(iter(ROUTE_CORRIDORS))
+    lat, lon = ROUTE_CORRIDORS[route_id][0]
+    if case == "deviated":
+        lat += 0.5
+    return lambda: check_deviation(lat, lon, route_id)
@@ -0,0 +1,50 @@
+"""Synthetic fleets and log files for benchmarks, seeded for reproducibility."""
+
+import atexit
+import json
+import random
+import shutil
+import tempfile
+from pathlib import Path
+
+from simulate_pipeline import VEHICLES, generate_record
+
+_workdir: Path | None = None
+
+
+def workdir() -> Path:
+    """Scratch directory for this benchmark process, removed at exit."""
+    global _workdir
+    if _workdir is None:
+        _workdir = Path(tempfile.mkdtemp(prefix="routezero-bench-"))
+        atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+    return _workdir
+
+
+def fleet_vehicles(n: int) -> list[dict]:
+    """`n` vehicles spread over the simulator's corridors, positions and cargo."""
+    return [
+        {**VEHICLES[i % len(VEHICLES)], "vehicle_id": f"TRK-BM-{i:05d}"}
+        for i in range(n)
+    ]
+
+
+def write_fleet_log(path: Path, n_vehicles: int, records_per_vehicle: int = 1, seed: int = 42) -> int:
+    """
+    Write `records_per_vehicle` telemetry rounds for `n_vehicles` to a JSONL log.
+
+    Returns:
+        int: Records written.
+    """
+    random.seed(seed)
+    vehicles = fleet_vehicles(n_vehicles)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for round_no in range(records_per_vehicle):
+            for v in vehicles:
+                record = generate_record(v)
+                record["timestamp"] -= (records_per_vehicle - round_no) * 2.0
+                f.write(json.dumps(record) + "\n")
+                written += 1
+    return written
@@ -0,0 +1,144 @@
+"""
+Minimal benchmark harness: registry, timing, JSON results and baseline comparison.
+
+A benchmark is a setup function registered with `@benchmark`; it receives one
+parameter value and returns the zero-argument callable to time. Timing follows
+`timeit.Timer.autorange`: the loop count is grown until one round takes at
+least `min_time / rounds`, then `rounds` rounds are recorded and summarised
+per call. Keys are `<group>/<name>[<param>]`.
+"""
+
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_MIN_TIME_SEC: float = 0.5
+DEFAULT_ROUNDS: int = 5
+DEFAULT_TOLERANCE: float = 0.25
+"""Allowed slowdown of a median before it counts as a regression (0.25 = 25%)."""
+
+
+@dataclass
+class Benchmark:
+    """A registered benchmark: `setup(param)` returns the callable to time."""
+
+    group: str
+    name: str
+    setup: Callable
+    params: tuple = (None,)
+
+    def key(self, param) -> str:
+        return f"{self.group}/{self.name}" + ("" if param is None else f"[{param}]")
+
+
+REGISTRY: list[Benchmark] = []
+
+
+def benchmark(group: str, params: tuple | list = (None,), name: str | None = None):
+    """Register the decorated setup function under `group`, once per param."""
+    def register(setup: Callable) -> Callable:
+        REGISTRY.append(Benchmark(group, name or setup.__name__, setup, tuple(params)))
+        return setup
+    return register
+
+
+def measure(fn: Callable[[], object], min_time: float = DEFAULT_MIN_TIME_SEC, rounds: int = DEFAULT_ROUNDS) -> dict:
+    """
+    Time `fn` and summarise seconds per call.
+
+    Returns:
+        dict: `median_us`, `mean_us`, `min_us`, `stdev_us`, `ops_per_sec`, `loops`, `rounds`.
+    """
+    fn()  # warm caches and lazy imports
+    per_round = min_time / rounds
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= per_round or loops >= 1 << 24:
+            break
+        loops = max(loops * 2, int(loops * per_round / max(elapsed, 1e-9)))
+    samples = [elapsed / loops]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops)
+    median = statistics.median(samples)
+    return {
+        "median_us": round(median * 1e6, 3),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 3),
+        "min_us": round(min(samples) * 1e6, 3),
+        "stdev_us": round(statistics.stdev(samples) * 1e6, 3) if len(samples) > 1 else 0.0,
+        "ops_per_sec": round(1 / median, 1) if median > 0 else None,
+        "loops": loops,
+        "rounds": rounds,
+    }
+
+
+def run(groups: list[str] | None = None, min_time: float = DEFAULT_MIN_TIME_SEC,
+        rounds: int = DEFAULT_ROUNDS, log: Callable[[str], None] | None = None) -> dict[str, dict]:
+    """Run registered benchmarks (optionally only some groups) and return results by key."""
+    results = {}
+    for bench in REGISTRY:
+        if groups and bench.group not in groups:
+            continue
+        for param in bench.params:
+            key = bench.key(param)
+            results[key] = measure(bench.setup(param) if param is not None else bench.setup(),
+                                   min_time=min_time, rounds=rounds)
+            if log is not None:
+                log(f"{key:<50} {results[key]['median_us']:>14,.1f} µs")
+    return results
+
+
+def metadata() -> dict:
+    """Where and when the results were produced."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """
+    Benchmarks whose median got slower than the baseline by more than `tolerance`.
+
+    Keys missing from either side are ignored, so adding or removing a
+    benchmark never fails the check.
+
+    Returns:
+        list[dict]: `key`, `baseline_us`, `current_us` and `ratio`, worst first.
+    """
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None or not base.get("median_us"):
+            continue
+        ratio = current["median_us"] / base["median_us"]
+        if ratio > 1 + tolerance:
+            regressions.append({
+                "key": key,
+                "baseline_us": base["median_us"],
+                "current_us": current["median_us"],
+                "ratio": round(ratio, 3),
+            })
+    return sorted(regressions, key=lambda r: r["ratio"], reverse=True)
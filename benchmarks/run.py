@@ -0,0 +1,82 @@
+"""
+Run the benchmark suite, write JSON results and check them against a baseline.
+
+Usage:
+    python -m benchmarks.run                                   # everything
+    python -m benchmarks.run --suite transforms readers --quick
+    python -m benchmarks.run --fleet-sizes 10 1000             # skip the 50k fleet
+    python -m benchmarks.run --save-baseline                   # record a new baseline
+    python -m benchmarks.run --tolerance 0.5                   # allow 50% slowdowns
+
+Exits with status 1 when any median is slower than the baseline by more than
+the tolerance. Baselines are machine-specific: record one on the machine that
+runs the check.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from benchmarks import bench_api
+from benchmarks.fixtures import workdir
+from benchmarks.harness import DEFAULT_MIN_TIME_SEC, DEFAULT_ROUNDS, DEFAULT_TOLERANCE, compare, metadata, run
+
+SUITES: tuple[str, ...] = ("transforms", "readers", "api")
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results.json"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="RouteZero benchmark suite.")
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--fleet-sizes", nargs="+", type=int, default=list(bench_api.FLEET_SIZES))
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME_SEC, help="Seconds per benchmark")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--quick", action="store_true", help="Short runs for smoke checks (noisy)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed median slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to --baseline instead of comparing")
+    args = parser.parse_args()
+    if args.quick:
+        args.min_time, args.rounds = 0.05, 3
+
+    # rag.api_server builds its state under TMP_DIR at import; keep it out of ./tmp.
+    os.environ.setdefault("TMP_DIR", str(workdir() / "api"))
+    os.environ["ADMISSION_CONTROL"] = "0"
+    from benchmarks import bench_transforms, bench_readers  # noqa: F401,I001  (register benchmarks, in report order)
+
+    results: dict[str, dict] = {}
+    in_process = [s for s in args.suite if s != "api"]
+    if in_process:
+        results.update(run(in_process, args.min_time, args.rounds, log=print))
+    if "api" in args.suite:
+        results.update(bench_api.run(tuple(args.fleet_sizes), args.min_time, args.rounds, log=print))
+
+    report = {"meta": {**metadata(), "min_time": args.min_time, "rounds": args.rounds}, "results": results}
+    target = args.baseline if args.save_baseline else args.output
+    target.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\nWrote {len(results)} results to {target}")
+    if args.save_baseline:
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline.get("results", {}), args.tolerance)
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline.name} ({baseline['meta'].get('commit')})")
+        return 0
+    print(f"\n{len(regressions)} regressions beyond {args.tolerance:.0%}:")
+    for r in regressions:
+        print(f"  {r['key']:<50} {r['baseline_us']:>12,.1f} → {r['current_us']:>12,.1f} µs  ({r['ratio']:.2f}×)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
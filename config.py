@@ -43,6 +43,11 @@ ROUTE_DEVIATION_THRESHOLD_KM: float = 2.0
 # ── Output paths ──────────────────────────────────────────────────────────────
 FLEET_SUMMARY_PATH: Path = TMP_DIR / "fleet_summary.jsonl"
 ETA_SUMMARY_PATH: Path = TMP_DIR / "eta_summary.jsonl"
+TELEMETRY_LOG_PATH: Path = TMP_DIR / "telemetry.jsonl"   # Raw records from /api/ingest/telemetry
+TRACKS_DIR: Path = TMP_DIR / "tracks"                     # Compressed GPS tracks, one segment per UTC day
+HISTORY_DIR: Path = TMP_DIR / "history"                   # Sealed raw telemetry segments
+ROLLUPS_DIR: Path = TMP_DIR / "rollups"                   # Minute/hour rollups of compacted segments
+ALERTS_PATH: Path = TMP_DIR / "alerts.jsonl"              # Append-only alert history
 
 # ── Policy document paths ──────────────────────────────────────────────────────
 NLP_2022_PATH: Path = DATA_DIR / "nlp_2022_summary.txt"
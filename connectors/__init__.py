@@ -6,11 +6,27 @@ real-time GPS telemetry and order streams from Indian freight corridors.
 
 Modules:
     gps_fuel_stream: GPS + OBD-II telemetry connector for 10-truck fleet.
+    telemetry_schema: Raw telemetry columns and fast record validator.
     telemetry_source: Pathway streaming source for vehicle telemetry.
     order_source: Order management stream connector.
+
+The Pathway-backed names are imported on first access, so the API can use
+`connectors.telemetry_schema` without loading the Pathway runtime.
 """
 
-from connectors.gps_fuel_stream import TruckTelemetrySource, build_telemetry_table
+from connectors.telemetry_schema import TELEMETRY_COLUMNS, TRACE_COLUMNS, validate_telemetry_record
 
-__all__ = ["TruckTelemetrySource", "build_telemetry_table"]
+__all__ = [
+    "TruckTelemetrySource", "build_telemetry_table", "TELEMETRY_COLUMNS", "TRACE_COLUMNS", "validate_telemetry_record",
+]
 __version__ = "2.0.0"
+
+_LAZY = {"TruckTelemetrySource", "build_telemetry_table"}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        from connectors import gps_fuel_stream
+
+        return getattr(gps_fuel_stream, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
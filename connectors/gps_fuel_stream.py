@@ -10,9 +10,12 @@ Author: S-Eshwar-fut-dev
 
 import logging
 import time
+from pathlib import Path
 
 import pathway as pw
 
+from connectors.telemetry_schema import TELEMETRY_COLUMNS, TRACE_COLUMNS
+
 logger = logging.getLogger(__name__)
 
 class TruckTelemetrySource(pw.io.python.ConnectorSubject):
@@ -45,28 +48,33 @@ class TruckTelemetrySource(pw.io.python.ConnectorSubject):
                     "speed_kmph": 65.4,
                     "route_id": "delhi_mumbai",
                 }
+                payload["ingested_at"] = time.time()
                 self.next_json(payload)
                 time.sleep(self.interval_sec)
             except Exception as e:
                 logger.error(f"Stream interrupted: {e}")
                 break
 
-def build_telemetry_table() -> pw.Table:
+def build_telemetry_table(log_path: Path | None = None) -> pw.Table:
     """
     Instantiate the telemetry source and map it to a typed Pathway Table.
 
+    Args:
+        log_path (Path | None): Optional JSONL telemetry log written by the
+            API ingestion endpoint. When given, the table tails that file
+            instead of running the synthetic connector.
+
     Returns:
         pw.Table: Typed stream of vehicle telemetry.
     """
-    schema = pw.schema_builder(
-        columns={
-            "vehicle_id": pw.column_definition(dtype=str),
-            "timestamp": pw.column_definition(dtype=float),
-            "latitude": pw.column_definition(dtype=float),
-            "longitude": pw.column_definition(dtype=float),
-            "fuel_consumed_liters": pw.column_definition(dtype=float),
-            "speed_kmph": pw.column_definition(dtype=float),
-            "route_id": pw.column_definition(dtype=str),
-        }
-    )
+    columns = {name: pw.column_definition(dtype=dtype) for name, dtype in TELEMETRY_COLUMNS.items()}
+    # Trace columns are optional so logs written before they existed still parse;
+    # downstream selects should carry `ingested_at` into fleet_summary.jsonl.
+    columns.update({
+        name: pw.column_definition(dtype=dtype | None, default_value=None)
+        for name, dtype in TRACE_COLUMNS.items()
+    })
+    schema = pw.schema_builder(columns=columns)
+    if log_path is not None:
+        return pw.io.jsonlines.read(str(log_path), schema=schema, mode="streaming")
     return pw.io.python.read(TruckTelemetrySource(), schema=schema)
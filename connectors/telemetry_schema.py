@@ -0,0 +1,71 @@
+"""
+Telemetry Record Schema.
+
+Single source of truth for the raw telemetry columns emitted by
+`TruckTelemetrySource` and accepted by the ingestion endpoint, the
+optional trace columns stamped at ingest, plus a fast validator used on
+the API hot path.
+
+Author: S-Eshwar-fut-dev
+"""
+
+import math
+
+TELEMETRY_COLUMNS: dict[str, type] = {
+    "vehicle_id": str,
+    "timestamp": float,
+    "latitude": float,
+    "longitude": float,
+    "fuel_consumed_liters": float,
+    "speed_kmph": float,
+    "route_id": str,
+}
+"""Column name → Python dtype, mirrored by the Pathway schema in `build_telemetry_table`."""
+
+TRACE_COLUMNS: dict[str, type] = {
+    "ingested_at": float,
+}
+"""Optional columns stamped at ingest (not by devices) for end-to-end latency tracing."""
+
+_STR_FIELDS: tuple[str, ...] = tuple(k for k, t in TELEMETRY_COLUMNS.items() if t is str)
+_FLOAT_FIELDS: tuple[str, ...] = tuple(k for k, t in TELEMETRY_COLUMNS.items() if t is float)
+
+
+def validate_telemetry_record(record: object) -> str | None:
+    """
+    Validate one telemetry record against `TELEMETRY_COLUMNS`.
+
+    Integer values in float columns are coerced to float in place so the
+    written log always matches the Pathway schema. Extra keys pass through
+    unless they hold a non-finite float.
+
+    Args:
+        record: Decoded JSON value for a single telemetry event.
+
+    Returns:
+        str | None: Error description, or None if the record is valid.
+    """
+    if type(record) is not dict:
+        return "record must be a JSON object"
+    for name in _STR_FIELDS:
+        value = record.get(name)
+        if type(value) is not str or not value:
+            return f"{name} must be a non-empty string"
+    for name in _FLOAT_FIELDS:
+        value = record.get(name)
+        kind = type(value)
+        if kind is int:
+            record[name] = value = float(value)
+        elif kind is not float:
+            return f"{name} must be a number"
+        if not math.isfinite(value):
+            return f"{name} must be a finite number"
+    if not -90.0 <= record["latitude"] <= 90.0:
+        return "latitude out of range"
+    if not -180.0 <= record["longitude"] <= 180.0:
+        return "longitude out of range"
+    for name, value in record.items():
+        # NaN/Infinity would be written as bare tokens that strict JSON readers reject.
+        if type(value) is float and not math.isfinite(value):
+            return f"{name} must be a finite number"
+    return None
@@ -15,7 +15,7 @@ interface Ranking {
     route: string;
     co2_kg: number;
     co2_per_km: number;
-    score: number;
+    score: number | null;   // null until the vehicle has distance on record
     status: string;
 }
 export default function OverviewPage() {
@@ -265,7 +265,11 @@ export default function OverviewPage() {
                                             <span style={{ color: i < 3 ? "#00ff87" : "#f59e0b", fontSize: "0.85rem", fontWeight: 700, width: 24 }}>#{i + 1}</span>
                                             <Link href={`/vehicle/${r.vehicle_id}`} style={{ color: "#f0f6fc", textDecoration: "none", fontSize: "0.82rem", fontWeight: 600, flex: 1 }}>{r.vehicle_id}</Link>
                                             <span style={{ color: "#8b949e", fontSize: "0.72rem", marginRight: 12 }}>{r.co2_kg} kg</span>
-                                            <span style={{ color: r.score >= 4 ? "#00ff87" : r.score >= 3 ? "#f59e0b" : "#ef4444", fontSize: "0.72rem", fontWeight: 700 }}>{'★'.repeat(r.score)}{'☆'.repeat(5 - r.score)}</span>
+                                            {r.score === null ? (
+                                                <span style={{ color: "#4b5563", fontSize: "0.72rem", fontWeight: 700 }}>Unrated</span>
+                                            ) : (
+                                                <span style={{ color: r.score >= 4 ? "#00ff87" : r.score >= 3 ? "#f59e0b" : "#ef4444", fontSize: "0.72rem", fontWeight: 700 }}>{'★'.repeat(r.score)}{'☆'.repeat(5 - r.score)}</span>
+                                            )}
                                         </div>
                                     ))}
                                 </div>
@@ -10,6 +10,22 @@ Modules:
     gemini_client: Google Gemini 1.5 Pro LLM integration.
     fleet_reader: JSONL fleet state reader from Pathway output.
     green_ai: High-level RAG orchestration for fleet risk queries.
+    telemetry_ingest: Validated, group-committed telemetry ingestion (HTTP + UDP).
+    spatial_index: Uniform grid index over live vehicle positions.
+    carbon_export: Streaming CSV/Parquet MRV exports.
+    track_store: Compressed GPS track history.
+    retention: Log rotation and background compaction into rollups.
+    shared_fleet: Shared-memory latest-state table for local readers.
+    fleet_feed: Filtered WebSocket fan-out of live vehicle updates.
+    notifications: Coalescing, batched driver-alert delivery.
+    alert_store: Append-only, indexed alert history.
+    admission: Concurrency and rate limits for heavy endpoints.
+    tracing: Per-stage latency histograms from emission to delivery.
+    metrics: Prometheus text exposition and request metrics middleware.
+    profiling: Opt-in sampled request profiles and UDF timing switch.
+    http_cache: ETag / 304 responses and per-version serialized bodies.
+    bookings: Time-ordered booking ids, Idempotency-Key replay, group-committed log.
+    invoices: Cached invoice rendering and streamed bulk (text / ZIP) invoice runs.
 """
 
 __version__ = "2.0.0"
@@ -0,0 +1,303 @@
+"""
+RouteZero Admission Control — concurrency limits and rate limits for heavy endpoints.
+
+Chat, carbon reports and booking writes share one process with cheap reads
+(/api/fleet) and long-lived SSE streams. Without a bound, a burst of heavy
+requests fills the event loop and the worker threadpool and every endpoint's
+latency degrades together. AdmissionMiddleware gives each heavy endpoint
+class a rule:
+
+    1. token buckets, per client and global   → 429 + Retry-After when empty
+    2. at most `max_concurrency` in flight     → excess requests wait in a FIFO
+    3. waiters give up after `queue_budget_sec` or when the queue is full
+                                               → 503 + Retry-After
+
+so overload is shed early and cheaply at the heavy endpoints while requests
+that match no rule pass straight through. A request holds its slot until the
+response body has been sent, so streaming endpoints are bounded too.
+"""
+
+import asyncio
+import json
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+MAX_TRACKED_CLIENTS: int = 10_000
+"""Per-client buckets kept (least recently seen evicted first)."""
+
+
+class TokenBucket:
+    """
+    Classic token bucket.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        burst (float): Bucket capacity.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float | None = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, now: float | None = None) -> float:
+        """
+        Take one token.
+
+        Returns:
+            float: 0.0 if admitted, else seconds until a token will be available.
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+
+class ConcurrencyLimiter:
+    """
+    Bounded in-flight count with a FIFO wait queue and a queue-time budget.
+
+    Single event loop only (no locks). A released slot is handed directly to
+    the oldest waiter, so waiters are served in arrival order.
+    """
+
+    def __init__(self, max_concurrency: int, queue_budget_sec: float, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.queue_budget_sec = queue_budget_sec
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        """Requests currently waiting for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self) -> str | None:
+        """
+        Wait for a slot within the queue budget.
+
+        Returns:
+            str | None: None once a slot is held, otherwise why the request was
+            shed: "queue_full" or "queue_timeout".
+        """
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.max_queue or self.queue_budget_sec <= 0:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_budget_sec)
+            return None
+        except TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return None  # Handed a slot right at the deadline.
+            return "queue_timeout"
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        """Free a slot, handing it to the oldest live waiter if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+@dataclass
+class AdmissionRule:
+    """
+    Limits for one class of endpoints.
+
+    Attributes:
+        name (str): Metrics label.
+        pattern (str): Regex matched against the full request path.
+        methods (frozenset[str]): HTTP methods the rule applies to.
+        max_concurrency (int): Requests of this class in flight at once.
+        queue_budget_sec (float): Longest a request may wait for a slot.
+        max_queue (int): Waiters beyond this are shed immediately.
+        client_rate (float): Per-client tokens per second (0 disables).
+        client_burst (float): Per-client bucket size.
+        global_rate (float): Tokens per second across all clients (0 disables).
+        global_burst (float): Global bucket size.
+    """
+
+    name: str
+    pattern: str
+    methods: frozenset[str]
+    max_concurrency: int
+    queue_budget_sec: float = 1.0
+    max_queue: int = 32
+    client_rate: float = 0.0
+    client_burst: float = 1.0
+    global_rate: float = 0.0
+    global_burst: float = 1.0
+    _regex: re.Pattern = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._regex = re.compile(self.pattern)
+
+    def matches(self, method: str, path: str) -> bool:
+        """True if this rule governs `method path`."""
+        return method in self.methods and self._regex.fullmatch(path) is not None
+
+
+class _RuleState:
+    """Limiter, buckets and counters for one rule."""
+
+    def __init__(self, rule: AdmissionRule):
+        self.rule = rule
+        self.limiter = ConcurrencyLimiter(rule.max_concurrency, rule.queue_budget_sec, rule.max_queue)
+        self.global_bucket = TokenBucket(rule.global_rate, rule.global_burst) if rule.global_rate > 0 else None
+        self.client_buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.stats = {
+            "admitted": 0,
+            "shed_client_rate": 0,
+            "shed_global_rate": 0,
+            "shed_queue_full": 0,
+            "shed_queue_timeout": 0,
+            "queued_total": 0,
+            "max_queued": 0,
+        }
+        self.queue_wait_sec = 0.0
+        self.max_queue_wait_sec = 0.0
+
+    def check_rate(self, client: str) -> tuple[str, float] | None:
+        """(reason, retry_after) if a token bucket refuses the request."""
+        rule = self.rule
+        if rule.client_rate > 0:
+            bucket = self.client_buckets.get(client)
+            if bucket is None:
+                bucket = self.client_buckets[client] = TokenBucket(rule.client_rate, rule.client_burst)
+                if len(self.client_buckets) > MAX_TRACKED_CLIENTS:
+                    self.client_buckets.popitem(last=False)
+            else:
+                self.client_buckets.move_to_end(client)
+            wait = bucket.take()
+            if wait:
+                return "client_rate", wait
+        if self.global_bucket is not None:
+            wait = self.global_bucket.take()
+            if wait:
+                return "global_rate", wait
+        return None
+
+    def metrics(self) -> dict:
+        admitted = self.stats["admitted"]
+        return {
+            "max_concurrency": self.rule.max_concurrency,
+            "in_flight": self.limiter.in_flight,
+            "queued": self.limiter.queued,
+            **self.stats,
+            "shed_total": sum(v for k, v in self.stats.items() if k.startswith("shed_")),
+            "avg_queue_wait_ms": round(1000 * self.queue_wait_sec / admitted, 2) if admitted else 0.0,
+            "max_queue_wait_ms": round(1000 * self.max_queue_wait_sec, 2),
+            "tracked_clients": len(self.client_buckets),
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the first matching AdmissionRule to each HTTP request.
+
+    Install with `app.add_middleware(AdmissionMiddleware, controller=controller)`
+    so the app can read `controller.metrics()`.
+    """
+
+    def __init__(self, app, controller: "AdmissionController"):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        state = self.controller.match(scope["method"], scope["path"])
+        if state is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        refused = state.check_rate(client)
+        if refused is not None:
+            reason, retry_after = refused
+            state.stats[f"shed_{reason}"] += 1
+            await _reject(send, 429, f"Rate limit exceeded ({reason.replace('_', ' ')})", retry_after)
+            return
+
+        queued = state.limiter.in_flight >= state.rule.max_concurrency or state.limiter.queued > 0
+        if queued:
+            state.stats["queued_total"] += 1
+            state.stats["max_queued"] = max(state.stats["max_queued"], state.limiter.queued + 1)
+        started = time.perf_counter()
+        shed = await state.limiter.acquire()
+        if shed is not None:
+            state.stats[f"shed_{shed}"] += 1
+            await _reject(send, 503, f"{state.rule.name} is overloaded, retry shortly", state.rule.queue_budget_sec)
+            return
+        waited = time.perf_counter() - started
+        state.stats["admitted"] += 1
+        state.queue_wait_sec += waited
+        state.max_queue_wait_sec = max(state.max_queue_wait_sec, waited)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            state.limiter.release()
+
+
+class AdmissionController:
+    """
+    Rule set plus per-rule state shared with the middleware.
+
+    Attributes:
+        enabled (bool): False passes every request through untouched.
+    """
+
+    def __init__(self, rules: list[AdmissionRule], enabled: bool = True):
+        self.enabled = enabled
+        self._states = [_RuleState(rule) for rule in rules]
+
+    def match(self, method: str, path: str) -> _RuleState | None:
+        """State of the first rule governing `method path`, if any."""
+        for state in self._states:
+            if state.rule.matches(method, path):
+                return state
+        return None
+
+    def metrics(self) -> dict:
+        """Per-rule in-flight, queue depth, admitted and shed counts, and queue waits."""
+        return {"enabled": self.enabled, "rules": {s.rule.name: s.metrics() for s in self._states}}
+
+
+async def _reject(send, status: int, message: str, retry_after: float) -> None:
+    body = json.dumps({"error": message}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
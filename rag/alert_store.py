@@ -0,0 +1,384 @@
+"""
+RouteZero Alert Store — append-only alert history with time-ordered indexes.
+
+A FleetStateReader consumer that turns telemetry into alert events on the
+rising edge of each condition (HIGH_EMISSION_ALERT status, any non-OK route
+deviation status, cold-chain breach) and appends them to `alerts.jsonl`. An
+alert is OPEN while its condition is still active for that vehicle and
+RESOLVED otherwise, computed at read time.
+
+Only (timestamp, file offset) pairs live in memory, as compact `array`s
+sorted by time, under four keys: all alerts, vehicle, alert type, and
+(vehicle, alert type). Any filter combination maps to exactly one index, so a
+time-range or last-N query is two bisects plus k seeks: O(log n + k), with
+about 16 bytes of RAM per alert per index. Out-of-order arrivals are appended
+and the overlapping tail is re-sorted once at the next query. Indexes are
+rebuilt by one sequential read of the file at startup.
+
+Alerts older than ALERT_RETENTION_DAYS (open ones excepted) are dropped by
+`expire`, which rewrites the log via tmp file + os.replace once the oldest
+alert is EXPIRY_SLACK_SEC past the window, so the rewrite runs about once a
+day rather than on every pass. The copy runs without the store lock, so
+`update` keeps appending meanwhile; only that tail is copied under the lock.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from collections.abc import Callable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ALERT_RETENTION_DAYS: float = float(os.environ.get("ALERT_RETENTION_DAYS", "90"))
+"""Age after which resolved alerts are dropped from the log; 0 keeps them forever."""
+EXPIRY_SLACK_SEC: float = 86400.0
+
+
+def _deviated(record: dict) -> bool:
+    """Route deviation status is anything but OK (`ROUTE_DEVIATION_ALERT|deviation_km=…`, `DEVIATED`)."""
+    return not str(record.get("deviation_status", "OK")).startswith("OK")
+
+
+def _deviation_km(record: dict) -> float | None:
+    km = record.get("deviation_km")
+    if isinstance(km, (int, float)):
+        return km
+    for part in str(record.get("deviation_status", "")).split("|")[1:]:
+        key, _, value = part.partition("=")
+        if key == "deviation_km":
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+ALERT_RULES: dict[str, Callable[[dict], bool]] = {
+    "HIGH_EMISSION_ALERT": lambda r: r.get("status") == "HIGH_EMISSION_ALERT",
+    "ROUTE_DEVIATION": _deviated,
+    "TEMPERATURE_BREACH": lambda r: bool(r.get("temperature_breach")),
+}
+"""Alert type → condition on a telemetry record. An alert is raised when it turns true."""
+
+
+def alert_detail(alert_type: str, record: dict) -> str:
+    """Short human-readable value for an alert, as shown in the dashboard."""
+    if alert_type == "HIGH_EMISSION_ALERT":
+        return f"CO₂: {float(record.get('co2_kg') or 0):.2f} kg"
+    if alert_type == "ROUTE_DEVIATION":
+        km = _deviation_km(record)
+        return f"{km:.1f} km off {record.get('route_id', 'corridor')}" if km is not None else f"Off {record.get('route_id', 'corridor')}"
+    if alert_type == "TEMPERATURE_BREACH":
+        return f"{record.get('temperature_c')}°C"
+    return ""
+
+
+class _TimeIndex:
+    """Parallel (timestamp, offset) arrays, sorted by timestamp whenever read."""
+
+    __slots__ = ("ts", "offsets", "_unsorted_from")
+
+    def __init__(self):
+        self.ts = array("d")
+        self.offsets = array("q")
+        self._unsorted_from: int | None = None
+
+    def add(self, ts: float, offset: int) -> None:
+        if self._unsorted_from is None and self.ts and ts < self.ts[-1]:
+            self._unsorted_from = len(self.ts)
+        self.ts.append(ts)
+        self.offsets.append(offset)
+
+    def settle(self) -> None:
+        """
+        Restore order after out-of-order appends.
+
+        Those arrive across vehicles and land close to the end, so only the
+        suffix from the earliest of them onwards is re-sorted. Ties keep log
+        (offset) order.
+        """
+        k = self._unsorted_from
+        if k is None:
+            return
+        lo = bisect.bisect_right(self.ts, min(self.ts[k:]), 0, k)
+        pairs = sorted(zip(self.ts[lo:], self.offsets[lo:]))
+        self.ts[lo:] = array("d", [ts for ts, _ in pairs])
+        self.offsets[lo:] = array("q", [offset for _, offset in pairs])
+        self._unsorted_from = None
+
+    def range(self, start: float | None, end: float | None) -> tuple[int, int]:
+        self.settle()
+        lo = 0 if start is None else bisect.bisect_left(self.ts, start)
+        hi = len(self.ts) if end is None else bisect.bisect_left(self.ts, end)
+        return lo, hi
+
+
+class _Indexes:
+    """The four time indexes over one log file, plus each (vehicle, type)'s latest alert."""
+
+    __slots__ = ("all", "by_vehicle", "by_type", "by_vehicle_type", "latest")
+
+    def __init__(self):
+        self.all = _TimeIndex()
+        self.by_vehicle: dict[str, _TimeIndex] = {}
+        self.by_type: dict[str, _TimeIndex] = {}
+        self.by_vehicle_type: dict[tuple[str, str], _TimeIndex] = {}
+        self.latest: dict[tuple[str, str], tuple[float, int]] = {}
+
+    def add(self, alert: dict, offset: int) -> None:
+        ts, vid, kind = alert["timestamp"], alert["vehicle_id"], alert["type"]
+        self.all.add(ts, offset)
+        self.by_vehicle.setdefault(vid, _TimeIndex()).add(ts, offset)
+        self.by_type.setdefault(kind, _TimeIndex()).add(ts, offset)
+        self.by_vehicle_type.setdefault((vid, kind), _TimeIndex()).add(ts, offset)
+        if ts >= self.latest.get((vid, kind), (float("-inf"), 0))[0]:
+            self.latest[(vid, kind)] = (ts, alert["alert_id"])
+
+
+class AlertStore:
+    """
+    Append-only alert log plus in-memory time indexes.
+
+    Attributes:
+        path (Path): JSONL alert log.
+        active (dict[str, dict[str, int]]): vehicle_id → alert type → id of the open alert.
+        on_alert (Callable | None): Called with each new alert (e.g. driver notifications).
+        retention_sec (float): Age after which resolved alerts are expired; 0 disables.
+    """
+
+    name = "alerts"
+
+    def __init__(
+        self,
+        path: Path,
+        on_alert: Callable[[dict], None] | None = None,
+        retention_sec: float = ALERT_RETENTION_DAYS * 86400,
+    ):
+        self.path = path
+        self.on_alert = on_alert
+        self.retention_sec = retention_sec
+        self.active: dict[str, dict[str, int]] = {}
+        self._last_ts: dict[str, float] = {}
+        self._idx = _Indexes()
+        self._next_id = 1
+        self._size = 0
+        self._writer = None
+        self._lock = threading.Lock()
+        self._expire_lock = threading.Lock()
+        self.stats = {"expired": 0, "rewrites": 0}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._idx.all.ts)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    try:
+                        alert = json.loads(line)
+                        self._idx.add(alert, offset)
+                        self._next_id = max(self._next_id, alert["alert_id"] + 1)
+                    except (json.JSONDecodeError, KeyError):
+                        pass
+                    offset += len(line)
+        self._size = offset  # A torn final line is overwritten by the next append.
+        # Until told otherwise, each vehicle's latest alert of a type is presumed still
+        # open and nothing at or before it is re-evaluated, so replays don't re-raise.
+        for (vid, kind), (ts, alert_id) in self._idx.latest.items():
+            self.active.setdefault(vid, {})[kind] = alert_id
+            self._last_ts[vid] = max(self._last_ts.get(vid, ts), ts)
+        logger.info(f"Alert store loaded: {len(self)} alerts from {self.path}")
+
+    # ── Writer (RecordConsumer) ──
+
+    def update(self, record: dict) -> bool:
+        """Raise alerts for conditions that just became true on this record."""
+        vid, ts = record.get("vehicle_id"), record.get("timestamp")
+        if not vid or not isinstance(ts, (int, float)):
+            return False
+        with self._lock:
+            if ts <= self._last_ts.get(vid, float("-inf")):
+                return False
+            self._last_ts[vid] = ts
+            open_alerts = self.active.setdefault(vid, {})
+            raised = []
+            for kind, condition in ALERT_RULES.items():
+                if not condition(record):
+                    open_alerts.pop(kind, None)
+                elif kind not in open_alerts:
+                    alert = {
+                        "alert_id": self._next_id,
+                        "vehicle_id": vid,
+                        "type": kind,
+                        "detail": alert_detail(kind, record),
+                        "route_id": record.get("route_id", ""),
+                        "timestamp": ts,
+                    }
+                    self._next_id += 1
+                    self._append(alert)
+                    open_alerts[kind] = alert["alert_id"]
+                    raised.append(alert)
+        if self.on_alert is not None:
+            for alert in raised:
+                self.on_alert(alert)
+        return True
+
+    def _append(self, alert: dict) -> None:
+        line = (json.dumps(alert) + "\n").encode("utf-8")
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = open(self.path, "r+b" if self.path.exists() else "wb")
+            self._writer.seek(self._size)
+            self._writer.truncate()
+        self._writer.write(line)
+        self._idx.add(alert, self._size)
+        self._size += len(line)
+
+    # ── Queries ──
+
+    def _read(self, offsets) -> list[dict]:
+        if self._writer is not None:
+            self._writer.flush()
+        alerts = []
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                alert = json.loads(f.readline())
+                open_id = self.active.get(alert["vehicle_id"], {}).get(alert["type"])
+                alert["status"] = "OPEN" if open_id == alert["alert_id"] else "RESOLVED"
+                alerts.append(alert)
+        return alerts
+
+    def query(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        vehicle_id: str | None = None,
+        alert_type: str | None = None,
+        limit: int = 50,
+    ) -> list[dict]:
+        """
+        Alerts in [start, end) matching the filters, newest first, at most `limit`.
+
+        Served from the single index that covers the filter combination: O(log n + limit).
+        """
+        with self._lock:
+            if vehicle_id is not None and alert_type is not None:
+                index = self._idx.by_vehicle_type.get((vehicle_id, alert_type))
+            elif vehicle_id is not None:
+                index = self._idx.by_vehicle.get(vehicle_id)
+            elif alert_type is not None:
+                index = self._idx.by_type.get(alert_type)
+            else:
+                index = self._idx.all
+            if index is None:
+                return []
+            lo, hi = index.range(start, end)
+            offsets = index.offsets[max(lo, hi - limit):hi][::-1]
+            return self._read(offsets)
+
+    def last_n(self, vehicle_id: str, n: int = 10) -> list[dict]:
+        """The vehicle's `n` most recent alerts, newest first."""
+        return self.query(vehicle_id=vehicle_id, limit=n)
+
+    # ── Retention ──
+
+    def expire(self, now: float | None = None) -> int:
+        """
+        Drop resolved alerts older than `retention_sec` by rewriting the log.
+
+        Does nothing until the oldest alert is EXPIRY_SLACK_SEC past the window.
+        Open alerts are kept whatever their age; open/resolved state, per-vehicle
+        high-water marks and the id counter are untouched.
+
+        The log up to its current size is copied and re-indexed without the
+        store lock, since `update` runs on the ingest path; the lock is held
+        only to copy alerts appended in the meantime and swap the files.
+
+        Returns:
+            int: Bytes reclaimed.
+        """
+        if not self.retention_sec:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.retention_sec
+        with self._expire_lock:
+            with self._lock:
+                self._idx.all.settle()
+                if not self._idx.all.ts or self._idx.all.ts[0] > cutoff - EXPIRY_SLACK_SEC:
+                    return 0
+                if self._writer is not None:
+                    self._writer.flush()
+                open_ids = {alert_id for kinds in self.active.values() for alert_id in kinds.values()}
+                copied = self._size
+
+            tmp = self.path.with_suffix(".tmp")
+            indexes, offset, read = _Indexes(), 0, 0
+            with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                for line in src:
+                    read += len(line)
+                    if read > copied or not line.endswith(b"\n"):
+                        break
+                    try:
+                        alert = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if alert.get("timestamp", 0) >= cutoff or alert.get("alert_id") in open_ids:
+                        dst.write(line)
+                        indexes.add(alert, offset)
+                        offset += len(line)
+
+            with self._lock:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+                with open(self.path, "rb") as src, open(tmp, "ab") as dst:
+                    src.seek(copied)
+                    for line in src.read(self._size - copied).splitlines(keepends=True):
+                        dst.write(line)
+                        indexes.add(json.loads(line), offset)
+                        offset += len(line)
+                os.replace(tmp, self.path)
+                expired, reclaimed = len(self) - len(indexes.all.ts), self._size - offset
+                self._idx, self._size = indexes, offset
+                self.stats["expired"] += expired
+                self.stats["rewrites"] += 1
+            logger.info(f"Expired {expired} alerts older than {self.retention_sec / 86400:g} days")
+            return max(0, reclaimed)
+
+    def close(self) -> None:
+        """Flush and close the append handle."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def to_dict(self) -> dict:
+        """Open alerts and per-vehicle high-water marks; the log itself is durable."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+            return {"active": self.active, "last_ts": self._last_ts}
+
+    def load_dict(self, state: dict) -> None:
+        """
+        Restore from a `to_dict` snapshot.
+
+        Alerts logged after the snapshot stay open; older ones follow the snapshot.
+        """
+        saved_active = state.get("active", {})
+        saved_last = state.get("last_ts", {})
+        with self._lock:
+            for (vid, kind), (ts, _) in self._idx.latest.items():
+                if ts <= saved_last.get(vid, float("-inf")) and kind not in saved_active.get(vid, {}):
+                    self.active.get(vid, {}).pop(kind, None)
+            for vid, ts in saved_last.items():
+                self._last_ts[vid] = max(self._last_ts.get(vid, ts), ts)
@@ -6,29 +6,137 @@ pathway health monitoring, carbon reports, and fleet rankings.
 """
 
 import asyncio
+import hmac
 import json
 import logging
 import os
 import re
+import threading
 import time
-from datetime import datetime
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from rag.admission import AdmissionController, AdmissionMiddleware, AdmissionRule
+from rag.alert_store import ALERT_RULES, AlertStore
+from rag.bookings import (
+    BookingIdGenerator,
+    BookingStore,
+    IdempotencyCache,
+    booking_receipt,
+    build_booking,
+    import_receipt,
+    request_fingerprint,
+    validate_booking,
+)
+from rag.carbon_export import CarbonExport, iter_history, parse_time, summarize_carbon
+from rag.file_lock import lock_file
+from rag.fleet_feed import FEED_INTERVAL_SEC, FleetFeed, Subscription, matches, parse_filters
+from rag.fleet_reader import FleetStateReader
+from rag.green_ai import stream_fleet_answer
+from rag.http_cache import ResponseCache
+from rag.invoices import DATE_FIELDS, InvoiceCache, iter_invoice_text, iter_invoice_zip, select_bookings
+from rag.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from rag.metrics import MetricsMiddleware, Registry
+from rag.notifications import FileSink, LocalWebhookSink, NotificationQueue, WebhookSink
+from rag.profiling import Profiler, ProfilingMiddleware
+from rag.retention import SEGMENT_MAX_BYTES, Compactor, iter_rollups, sealed_segments
+from rag.telemetry_ingest import (
+    INGEST_MAX_PENDING,
+    INGEST_UDP_PORT,
+    MAX_REPORTED_ERRORS,
+    TelemetryDatagramProtocol,
+    TelemetryIngestor,
+    validate_batch,
+)
+from rag.tracing import LatencyTracer
+from rag.track_store import TRACK_TOLERANCE_M, TrackStore
+from transforms.accumulators import FleetAccumulators, efficiency_score
+from transforms.cold_chain import ColdChainMonitor
+from transforms.dispatch import booking_weight_kg, recommend_dispatch
+from transforms.fuel_anomaly import FuelAnomalyDetector, scan_fuel_anomalies
+from transforms.routing import get_road_graph, make_profile, suggest_corridor_reroutes
 
 logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="%(asctime)s - %(levelname)s - %(message)s"
+)
 
-app = FastAPI(title="RouteZero API", version="3.0.0")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+_api_lock = None
+
+
+def _claim_api_lock() -> None:
+    """
+    Make this the only API process serving TMP_DIR.
+
+    Ingestion, bookings, alerts, tracks, compaction and the fleet checkpoint
+    each write from this process's own offsets and in-memory state, so a second
+    process (e.g. `uvicorn --workers 2`) would duplicate or corrupt their files.
+    The lock is held until shutdown, and released by the OS if the process dies.
+
+    Raises:
+        RuntimeError: If another API process already holds it.
+    """
+    global _api_lock
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    f = open(API_LOCK_FILE, "a+")
+    if not lock_file(f, blocking=False):
+        f.close()
+        raise RuntimeError(
+            f"Another RouteZero API process already serves {TMP_DIR}; run a single worker "
+            "(see 'Worker model' in the README)"
+        ) from None
+    f.seek(0)
+    f.truncate()
+    f.write(f"{os.getpid()}\n")
+    f.flush()
+    _api_lock = f
+
+
+def _release_api_lock() -> None:
+    """Release the lock after the writers have been flushed and closed."""
+    global _api_lock
+    if _api_lock is not None:
+        _api_lock.close()
+        _api_lock = None
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """Claim the single-writer lock, start optional background listeners and flush writers on shutdown."""
+    _claim_api_lock()
+    udp_transport = None
+    if INGEST_UDP_PORT:
+        loop = asyncio.get_running_loop()
+        udp_transport, _ = await loop.create_datagram_endpoint(
+            lambda: udp_protocol, local_addr=("0.0.0.0", INGEST_UDP_PORT)
+        )
+        logger.info(f"UDP telemetry listener on :{INGEST_UDP_PORT}")
+    compactor.start(COMPACTION_INTERVAL_SEC)
+    feed_task = asyncio.create_task(_fleet_feed_loop())
+    yield
+    feed_task.cancel()
+    compactor.stop()
+    if udp_transport is not None:
+        udp_transport.close()
+    telemetry_ingestor.close()
+    booking_store.close()
+    notification_queue.close()
+    fleet_state.checkpoint()
+    alert_store.close()
+    _release_api_lock()
+
+
+app = FastAPI(title="RouteZero API", version="3.0.0", lifespan=_lifespan)
 
 # ── Path helpers ──
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -38,6 +146,172 @@ FLEET_FILE = TMP_DIR / "fleet_summary.jsonl"
 ETA_FILE = TMP_DIR / "eta_summary.jsonl"
 BOOKINGS_FILE = DATA_DIR / "bookings.jsonl"
 NOTIFICATIONS_FILE = DATA_DIR / "notifications.jsonl"
+TELEMETRY_FILE = TMP_DIR / "telemetry.jsonl"
+EXPORTS_DIR = TMP_DIR / "exports"
+TRACKS_DIR = TMP_DIR / "tracks"
+ALERTS_FILE = TMP_DIR / "alerts.jsonl"
+HISTORY_DIR = TMP_DIR / "history"
+ROLLUPS_DIR = TMP_DIR / "rollups"
+API_LOCK_FILE = TMP_DIR / "api.lock"
+
+# ── Profiling (opt-in; innermost, so profiles cover the handler, not queueing) ──
+PROFILES_DIR = TMP_DIR / "profiles"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_SEC = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+profiler = Profiler(PROFILES_DIR, sample_rate=PROFILE_SAMPLE_RATE, interval_sec=PROFILE_INTERVAL_SEC)
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+# ── Admission control (heavy endpoints only; cheap reads and streams pass through) ──
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_QUEUE_BUDGET_SEC = float(os.environ.get("ADMISSION_QUEUE_BUDGET_MS", "1000")) / 1000
+admission = AdmissionController(
+    [
+        AdmissionRule(
+            "chat", r"/api/chat(/stream)?", frozenset({"POST"}),
+            max_concurrency=int(os.environ.get("CHAT_MAX_CONCURRENCY", "4")),
+            queue_budget_sec=ADMISSION_QUEUE_BUDGET_SEC, max_queue=16,
+            client_rate=0.2, client_burst=5, global_rate=2.0, global_burst=10,
+        ),
+        AdmissionRule(
+            "carbon_report", r"/api/carbon-report(/export)?", frozenset({"GET"}),
+            max_concurrency=int(os.environ.get("REPORT_MAX_CONCURRENCY", "2")),
+            queue_budget_sec=ADMISSION_QUEUE_BUDGET_SEC, max_queue=8,
+            client_rate=1.0, client_burst=5,
+        ),
+        AdmissionRule(
+            "fuel_scan", r"/api/fuel-anomalies/scan", frozenset({"GET"}),
+            max_concurrency=int(os.environ.get("REPORT_MAX_CONCURRENCY", "2")),
+            queue_budget_sec=ADMISSION_QUEUE_BUDGET_SEC, max_queue=8,
+            client_rate=1.0, client_burst=5,
+        ),
+        AdmissionRule(
+            "invoices", r"/api/invoices", frozenset({"GET"}),
+            max_concurrency=int(os.environ.get("REPORT_MAX_CONCURRENCY", "2")),
+            queue_budget_sec=ADMISSION_QUEUE_BUDGET_SEC, max_queue=8,
+            client_rate=1.0, client_burst=5,
+        ),
+        AdmissionRule(
+            "booking_writes",
+            r"/api/booking(/[^/]+/(dispatch|update-docs))?|/api/bookings/import|/api/dispatch/recommend",
+            frozenset({"POST"}),
+            max_concurrency=int(os.environ.get("BOOKING_MAX_CONCURRENCY", "8")),
+            queue_budget_sec=ADMISSION_QUEUE_BUDGET_SEC, max_queue=32,
+            client_rate=5.0, client_burst=20, global_rate=100.0, global_burst=200,
+        ),
+    ],
+    enabled=ADMISSION_CONTROL,
+)
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# ── Metrics (outermost, so shed and CORS-preflight requests are counted too) ──
+metrics = Registry()
+http_requests = metrics.counter(
+    "routezero_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+http_latency = metrics.histogram(
+    "routezero_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+app.add_middleware(MetricsMiddleware, requests=http_requests, latency=http_latency)
+_sse_stats = {"clients": 0, "frames": 0, "parse_errors": 0}
+_ingest_http_stats = {"invalid_json": 0, "invalid_records": 0}
+
+# ── Retention (sealed segments → minute/hour rollups) ──
+RAW_RETENTION_SEC = float(os.environ.get("TELEMETRY_RETENTION_HOURS", "24")) * 3600
+MINUTE_ROLLUP_RETENTION_SEC = float(os.environ.get("MINUTE_ROLLUP_RETENTION_DAYS", "7")) * 86400
+COMPACTION_INTERVAL_SEC = float(os.environ.get("COMPACTION_INTERVAL_SEC", "60"))
+compactor = Compactor(HISTORY_DIR, ROLLUPS_DIR, RAW_RETENTION_SEC, MINUTE_ROLLUP_RETENTION_SEC, stem=FLEET_FILE.stem)
+
+# ── Driver notifications (coalesced, batched delivery) ──
+NOTIFY_WEBHOOK_URL = os.environ.get("NOTIFY_WEBHOOK_URL", "")   # "local" = in-process stand-in
+NOTIFY_COALESCE_WINDOW_SEC = float(os.environ.get("NOTIFY_COALESCE_WINDOW_SEC", "60"))
+_notification_sinks = [FileSink(NOTIFICATIONS_FILE)]
+if NOTIFY_WEBHOOK_URL == "local":
+    _notification_sinks.append(LocalWebhookSink())
+elif NOTIFY_WEBHOOK_URL:
+    _notification_sinks.append(WebhookSink(NOTIFY_WEBHOOK_URL))
+notification_queue = NotificationQueue(_notification_sinks, window_sec=NOTIFY_COALESCE_WINDOW_SEC)
+
+# ── Telemetry ingestion ──
+telemetry_ingestor = TelemetryIngestor(
+    TELEMETRY_FILE, max_pending=INGEST_MAX_PENDING, history_dir=HISTORY_DIR, segment_max_bytes=SEGMENT_MAX_BYTES
+)
+udp_protocol = TelemetryDatagramProtocol(telemetry_ingestor)
+
+# ── Bookings (time-ordered ids, Idempotency-Key replay, group-committed log) ──
+BOOKING_NODE_ID = int(os.environ.get("BOOKING_NODE_ID", "0"))
+BOOKING_FSYNC = os.environ.get("BOOKING_FSYNC", "1") == "1"
+IDEMPOTENCY_TTL_SEC = float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24")) * 3600
+BOOKING_IMPORT_MAX = int(os.environ.get("BOOKING_IMPORT_MAX", "5000"))
+booking_store = BookingStore(
+    BOOKINGS_FILE,
+    ids=BookingIdGenerator(BOOKING_NODE_ID),
+    idempotency=IdempotencyCache(ttl_sec=IDEMPOTENCY_TTL_SEC),
+    fsync=BOOKING_FSYNC,
+)
+invoice_cache = InvoiceCache(max_entries=int(os.environ.get("INVOICE_CACHE_SIZE", "100000")))
+
+# ── Live fleet state (incremental tail + spatial index + cumulative totals) ──
+FLEET_CHECKPOINT_FILE = TMP_DIR / "fleet_state.checkpoint.json"
+fleet_totals = FleetAccumulators()
+cold_chain = ColdChainMonitor()
+fuel_monitor = FuelAnomalyDetector(z_threshold=float(os.environ.get("FUEL_ANOMALY_Z", "3.5")))
+FUEL_SCAN_DEFAULT_HOURS = float(os.environ.get("FUEL_SCAN_DEFAULT_HOURS", "1"))   # window when `start` is omitted
+FUEL_SCAN_MAX_HOURS = float(os.environ.get("FUEL_SCAN_MAX_HOURS", "6"))
+FUEL_SCAN_MAX_RECORDS = int(os.environ.get("FUEL_SCAN_MAX_RECORDS", "5000000"))
+tracks = TrackStore(TRACKS_DIR)
+fleet_feed = FleetFeed()
+NOTIFY_ON_ALERTS = os.environ.get("NOTIFY_ON_ALERTS", "0") == "1"   # push new alerts to drivers
+
+
+def _notify_alert(alert: dict) -> None:
+    """Forward a newly raised alert to the driver notification queue."""
+    notification_queue.notify({
+        "vehicle_id": alert["vehicle_id"],
+        "alert_type": alert["type"],
+        "message": f"{alert['type'].replace('_', ' ').title()}: {alert['detail']}",
+        "timestamp": datetime.fromtimestamp(alert["timestamp"]).isoformat(),
+        "alert_id": alert["alert_id"],
+    })
+
+
+alert_store = AlertStore(ALERTS_FILE, on_alert=_notify_alert if NOTIFY_ON_ALERTS else None)
+compactor.expirers.append(alert_store.expire)
+latency_tracer = LatencyTracer()
+fleet_state = FleetStateReader(
+    FLEET_FILE,
+    consumers=[latency_tracer, fleet_totals, cold_chain, fuel_monitor, tracks, fleet_feed, alert_store],
+    checkpoint_path=FLEET_CHECKPOINT_FILE,
+)
+
+# ── Dashboard polling (ETag / 304 + one serialized body per data version) ──
+dashboard_cache = ResponseCache()
+
+
+def _data_version(*paths: Path) -> str:
+    """
+    Version of the data behind the dashboard endpoints, for ETags and the body cache.
+
+    The fleet log position after a refresh, and the identity and size of any
+    other log the endpoint reads (`paths`), so it is stable across restarts.
+    """
+    fleet_state.refresh()
+    parts = [fleet_state.version]
+    for path in paths:
+        try:
+            st = path.stat()
+            parts.append(f"{st.st_ino:x}.{st.st_size:x}.{st.st_mtime_ns:x}")
+        except FileNotFoundError:
+            parts.append("0")
+    return "-".join(parts)
 
 
 def _ensure_dirs() -> None:
@@ -66,16 +340,6 @@ def _read_jsonl(path: Path, last_n: int = 50) -> list[dict]:
         return []
 
 
-def _append_jsonl(path: Path, record: dict) -> None:
-    """Append a single JSON record to a JSONL file."""
-    _ensure_dirs()
-    try:
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record) + "\n")
-    except Exception as e:
-        logger.error(f"Error writing to {path}: {e}")
-
-
 # ────────────────────────────────────────────────────────────────────
 # HEALTH
 # ────────────────────────────────────────────────────────────────────
@@ -86,29 +350,192 @@ def health_check():
     return {"status": "ok", "service": "routezero-api", "version": "3.0.0"}
 
 
+@app.get("/api/admission/stats")
+def admission_stats():
+    """In-flight requests, queue depth, queue waits and shed counts per admission rule."""
+    return admission.metrics()
+
+
 # ────────────────────────────────────────────────────────────────────
-# FLEET DATA (reads from Pathway JSONL output)
+# ADMIN: PROFILING
 # ────────────────────────────────────────────────────────────────────
 
-@app.get("/api/fleet")
-def get_fleet():
-    """Return current state of all vehicles from fleet_summary.jsonl."""
-    records = _read_jsonl(FLEET_FILE, last_n=100)
-    if not records:
-        return []
-    # Deduplicate: keep latest record per vehicle
-    vehicles: dict[str, dict] = {}
-    for r in records:
-        vid = r.get("vehicle_id")
-        if vid:
-            vehicles[vid] = r
-    return list(vehicles.values())
+def _admin_denied(request: Request) -> JSONResponse | None:
+    """403 unless the X-Admin-Token header matches ADMIN_TOKEN; with no token configured the admin API is off."""
+    if not ADMIN_TOKEN:
+        return JSONResponse({"error": "Admin endpoints are disabled; set ADMIN_TOKEN to enable them"}, status_code=403)
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        return JSONResponse({"error": "Admin token required"}, status_code=403)
+    return None
 
 
-@app.get("/api/fleet-intel")
-def get_fleet_intel():
+@app.get("/api/admin/profiling")
+def profiling_state(request: Request):
+    """Sampling settings, recent request profiles and aggregated UDF timings."""
+    if denied := _admin_denied(request):
+        return denied
+    return profiler.state()
+
+
+@app.post("/api/admin/profiling")
+async def configure_profiling(request: Request):
+    """
+    Change profiling at runtime.
+
+    Body fields (all optional): `sample_rate` (0–1, fraction of requests
+    profiled), `interval_ms` (stack sampling interval), and `udf_timing`
+    (bool, also switches the pipeline process).
+    """
+    if denied := _admin_denied(request):
+        return denied
+    try:
+        body = await request.json()
+    except Exception:
+        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "Expected a JSON object"}, status_code=400)
+    try:
+        interval_ms = body.get("interval_ms")
+        profiler.configure(
+            sample_rate=None if body.get("sample_rate") is None else float(body["sample_rate"]),
+            interval_sec=None if interval_ms is None else float(interval_ms) / 1000,
+            udf_timing=None if body.get("udf_timing") is None else bool(body["udf_timing"]),
+        )
+    except (TypeError, ValueError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return profiler.state()
+
+
+@app.get("/api/admin/profiles/{name}")
+def download_profile(name: str, request: Request):
+    """One request profile as collapsed stacks (feed to flamegraph.pl or speedscope)."""
+    if denied := _admin_denied(request):
+        return denied
+    text = profiler.read(name)
+    if text is None:
+        return JSONResponse({"error": "Profile not found"}, status_code=404)
+    return PlainTextResponse(text, headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+
+# ────────────────────────────────────────────────────────────────────
+# METRICS (Prometheus text format)
+# ────────────────────────────────────────────────────────────────────
+
+@metrics.collector
+def _pipeline_metrics():
+    """Scrape-time view of counters the components already keep."""
+    ingest = telemetry_ingestor.stats
+    yield ("routezero_ingest_records_total", "counter", "Telemetry records by ingest outcome.", [
+        ({"outcome": "accepted"}, ingest["accepted"]),
+        ({"outcome": "committed"}, ingest["committed"]),
+        ({"outcome": "rejected_backpressure"}, ingest["rejected_backpressure"]),
+        ({"outcome": "invalid"}, _ingest_http_stats["invalid_records"] + udp_protocol.stats["invalid"]),
+        ({"outcome": "dropped_udp"}, udp_protocol.stats["dropped"]),
+    ])
+    yield ("routezero_ingest_write_errors_total", "counter", "Telemetry log write failures.",
+           [({}, ingest["write_errors"])])
+    yield ("routezero_fleet_records_parsed_total", "counter", "Fleet log records applied by the API tail.",
+           [({}, fleet_state.records_read)])
+    yield ("routezero_fleet_records_dropped_total", "counter", "Fleet log records skipped by the API tail.",
+           [({"reason": "no_vehicle_id"}, fleet_state.stats["dropped_no_vehicle"])])
+    yield ("routezero_json_parse_errors_total", "counter", "Undecodable JSON by source.", [
+        ({"source": "fleet_log"}, fleet_state.stats["parse_errors"]),
+        ({"source": "sse"}, _sse_stats["parse_errors"]),
+        ({"source": "ingest_http"}, _ingest_http_stats["invalid_json"]),
+    ])
+    yield ("routezero_fleet_tail_lag_bytes", "gauge", "Bytes in the fleet log not yet applied by the API tail.",
+           [({}, fleet_state.lag_bytes)])
+    yield ("routezero_fleet_vehicles", "gauge", "Vehicles with a known latest state.", [({}, len(fleet_state.latest))])
+    yield ("routezero_sse_clients", "gauge", "Connected SSE clients.", [({}, _sse_stats["clients"])])
+    yield ("routezero_sse_frames_total", "counter", "SSE frames sent.", [({}, _sse_stats["frames"])])
+    yield ("routezero_ws_subscribers", "gauge", "Connected WebSocket feed subscribers.", [({}, len(fleet_feed.index))])
+    ws_backlog = sum(sub.queue.qsize() for sub in list(fleet_feed.index.subs.values()))
+    yield ("routezero_queue_depth", "gauge", "Items waiting in in-process queues.", [
+        ({"queue": "ingest"}, telemetry_ingestor.pending),
+        ({"queue": "bookings"}, booking_store.pending),
+        ({"queue": "notifications"}, notification_queue.pending),
+        ({"queue": "ws_outbound"}, ws_backlog),
+    ])
+    yield ("routezero_booking_writes_total", "counter", "Bookings by group-commit outcome.", [
+        ({"outcome": k}, booking_store.stats[k])
+        for k in ("accepted", "committed", "rejected_backpressure", "write_errors", "updates")
+    ])
+    yield ("routezero_idempotency_total", "counter", "Idempotency-Key lookups that short-circuited a write.", [
+        ({"outcome": k}, v) for k, v in booking_store.idempotency.stats.items()
+    ])
+    yield ("routezero_notifications_total", "counter", "Driver notifications by outcome.", [
+        ({"outcome": k}, notification_queue.stats[k]) for k in ("submitted", "coalesced", "delivered", "failed", "rejected_full")
+    ])
+    rules = admission.metrics()["rules"]
+    yield ("routezero_admission_in_flight", "gauge", "Admitted requests in flight per rule.",
+           [({"rule": r}, m["in_flight"]) for r, m in rules.items()])
+    yield ("routezero_admission_queued", "gauge", "Requests waiting for a slot per rule.",
+           [({"rule": r}, m["queued"]) for r, m in rules.items()])
+    yield ("routezero_admission_shed_total", "counter", "Requests shed with 429/503 per rule and reason.", [
+        ({"rule": r, "reason": k.removeprefix("shed_")}, v)
+        for r, m in rules.items() for k, v in m.items() if k.startswith("shed_") and k != "shed_total"
+    ])
+    yield ("routezero_http_cache_total", "counter", "Conditional dashboard responses by outcome.", [
+        ({"outcome": k}, v) for k, v in dashboard_cache.stats.items()
+    ])
+    yield ("routezero_fuel_anomalies_total", "counter", "Telemetry events flagged for unexplained fuel use.",
+           [({}, sum(st["anomaly_count"] for st in list(fuel_monitor.vehicles.values())))])
+    yield ("routezero_invoice_cache_total", "counter", "Invoice renders and cache hits.", [
+        ({"outcome": k}, v) for k, v in invoice_cache.stats.items()
+    ])
+    yield ("routezero_stage_latency_seconds", "histogram", "Telemetry staleness per pipeline stage.",
+           [({"stage": name}, h) for name, h in sorted(latency_tracer.stages.items())])
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint: request latency per route plus pipeline counters and gauges."""
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+# ────────────────────────────────────────────────────────────────────
+# FLEET DATA (reads from Pathway JSONL output)
+# ────────────────────────────────────────────────────────────────────
+
+@app.get("/api/fleet")
+def get_fleet(
+    request: Request,
+    min_lat: float | None = None,
+    min_lon: float | None = None,
+    max_lat: float | None = None,
+    max_lon: float | None = None,
+    lat: float | None = None,
+    lon: float | None = None,
+    radius_km: float | None = None,
+    k: int | None = None,
+):
+    """
+    Return current state of all vehicles from fleet_summary.jsonl.
+
+    Optional spatial filters, served from the live grid index:
+      - `min_lat`, `min_lon`, `max_lat`, `max_lon`: vehicles inside the bounding box.
+      - `lat`, `lon`, `radius_km`: vehicles within the radius, nearest first.
+      - `lat`, `lon`, `k`: the k nearest vehicles.
+    Radius and nearest-k results include `distance_km`. The unfiltered fleet is
+    served conditionally (ETag / If-None-Match → 304) with gzip or MessagePack.
+    """
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    if any(b is not None for b in bbox):
+        if any(b is None for b in bbox):
+            return JSONResponse({"error": "min_lat, min_lon, max_lat and max_lon are all required"}, status_code=400)
+        return fleet_state.within_bbox(min_lat, min_lon, max_lat, max_lon)
+    if radius_km is not None or k is not None:
+        if lat is None or lon is None:
+            return JSONResponse({"error": "lat and lon are required for radius_km / k queries"}, status_code=400)
+        if radius_km is not None:
+            return fleet_state.within_radius(lat, lon, radius_km)
+        return fleet_state.nearest(lat, lon, k)
+    return dashboard_cache.respond(request, "fleet", _data_version(), fleet_state.snapshot)
+
+
+def _render_fleet_intel():
     """Fleet + ETA + aggregations combined endpoint."""
-    fleet = get_fleet()
+    fleet = fleet_state.snapshot()
     eta_records = _read_jsonl(ETA_FILE, last_n=50)
     # Deduplicate ETA
     eta_vehicles: dict[str, dict] = {}
@@ -129,40 +556,255 @@ def get_fleet_intel():
     }
 
 
+@app.get("/api/fleet-intel")
+def get_fleet_intel(request: Request):
+    """Fleet + ETA + aggregations combined endpoint. Conditional on the fleet data version."""
+    return dashboard_cache.respond(request, "fleet-intel", _data_version(ETA_FILE), _render_fleet_intel)
+
+
+_ALERT_LABELS = {
+    "HIGH_EMISSION_ALERT": "High Emission",
+    "ROUTE_DEVIATION": "Route Deviation",
+    "TEMPERATURE_BREACH": "Temperature Warning",
+}
+
+
 @app.get("/api/vehicle/{vehicle_id}")
 def get_vehicle(vehicle_id: str):
     """Full vehicle detail + last 10 alerts."""
-    fleet = get_fleet()
+    fleet = fleet_state.snapshot()
     vehicle = next((v for v in fleet if v.get("vehicle_id") == vehicle_id), None)
     if not vehicle:
         return JSONResponse({"error": "Vehicle not found"}, status_code=404)
 
-    # Fake alert history for demo
     alerts = [
-        {"time": "14:32", "alert_type": "High Emission", "value": "9.2 kg/h", "status": "RESOLVED"},
-        {"time": "14:18", "alert_type": "Speed Violation", "value": "95 km/h", "status": "RESOLVED"},
-        {"time": "13:55", "alert_type": "Route Deviation", "value": "3.2 km", "status": "OPEN"},
-        {"time": "13:22", "alert_type": "Temperature Warning", "value": "27°C", "status": "RESOLVED"},
-        {"time": "12:45", "alert_type": "Overload Risk", "value": "+8%", "status": "RESOLVED"},
+        {
+            "time": datetime.fromtimestamp(a["timestamp"]).strftime("%H:%M"),
+            "alert_type": _ALERT_LABELS.get(a["type"], a["type"]),
+            "value": a["detail"],
+            "status": a["status"],
+            "timestamp": a["timestamp"],
+        }
+        for a in alert_store.last_n(vehicle_id, 10)
     ]
 
     return {**vehicle, "alerts": alerts}
 
 
 @app.get("/api/alerts")
-def get_alerts():
-    """Alert history (last 50 events)."""
-    fleet = get_fleet()
-    alerts = []
-    for v in fleet:
-        if v.get("status") == "HIGH_EMISSION_ALERT":
-            alerts.append({
-                "vehicle_id": v["vehicle_id"],
-                "type": "HIGH_EMISSION_ALERT",
-                "detail": f"CO₂: {v.get('co2_kg', 0):.2f} kg",
-                "timestamp": v.get("timestamp", time.time()),
-            })
-    return alerts[:50]
+def get_alerts(
+    start: str | None = None,
+    end: str | None = None,
+    vehicle_id: str | None = None,
+    type: str | None = None,
+    limit: int = 50,
+):
+    """
+    Alert history, newest first.
+
+    Filters: `start`/`end` (unix seconds or ISO-8601, end exclusive), `vehicle_id`,
+    `type` (HIGH_EMISSION_ALERT, ROUTE_DEVIATION, TEMPERATURE_BREACH) and `limit`
+    (max 1000). Each query is served from one time-ordered index in O(log n + limit).
+    """
+    if type is not None and type not in ALERT_RULES:
+        return JSONResponse({"error": f"type must be one of {sorted(ALERT_RULES)}"}, status_code=400)
+    try:
+        start_ts, end_ts = parse_time(start), parse_time(end)
+    except ValueError:
+        return JSONResponse({"error": "start/end must be unix seconds or ISO-8601"}, status_code=400)
+    fleet_state.refresh()
+    return alert_store.query(start_ts, end_ts, vehicle_id, type, max(1, min(limit, 1000)))
+
+
+# ────────────────────────────────────────────────────────────────────
+# TELEMETRY INGESTION
+# ────────────────────────────────────────────────────────────────────
+
+@app.post("/api/ingest/telemetry")
+async def ingest_telemetry(request: Request, sync: bool = False):
+    """
+    Accept a batch of raw telemetry records for the telemetry log.
+
+    Body is a JSON array of records (or `{"records": [...]}`). Valid records are
+    queued for the next group commit; invalid ones are reported by index.
+    Returns 429 when the ingest queue is full. With `?sync=true` the response
+    waits until the batch has been written, and is 503 if the write failed or
+    did not finish in time.
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        _ingest_http_stats["invalid_json"] += 1
+        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+
+    records = body.get("records") if isinstance(body, dict) else body
+    if not isinstance(records, list):
+        return JSONResponse({"error": "Expected a JSON array of telemetry records"}, status_code=400)
+
+    valid, errors = validate_batch(records)
+    _ingest_http_stats["invalid_records"] += len(errors)
+    if valid:
+        seq = telemetry_ingestor.submit(valid)
+        if seq is None:
+            return JSONResponse(
+                {"error": "Ingest queue full", "pending": telemetry_ingestor.pending},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        if sync and not await asyncio.to_thread(telemetry_ingestor.wait_committed, seq):
+            return JSONResponse(
+                {"error": "Telemetry could not be written", "accepted": 0, "rejected": len(errors)},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+
+    return JSONResponse(
+        {"accepted": len(valid), "rejected": len(errors), "errors": errors[:MAX_REPORTED_ERRORS]},
+        status_code=202 if valid else 422,
+    )
+
+
+@app.get("/api/ingest/stats")
+def ingest_stats():
+    """Ingestion queue depth and group-commit counters."""
+    return {
+        **telemetry_ingestor.stats,
+        "pending": telemetry_ingestor.pending,
+        "max_pending": telemetry_ingestor.max_pending,
+        "udp": {"enabled": bool(INGEST_UDP_PORT), **udp_protocol.stats},
+    }
+
+
+# ────────────────────────────────────────────────────────────────────
+# COLD CHAIN EXCURSIONS
+# ────────────────────────────────────────────────────────────────────
+
+@app.get("/api/cold-chain")
+def get_cold_chain():
+    """Breach state, time above SLA and degree-minutes for every refrigerated vehicle."""
+    with fleet_state.view():
+        statuses = [cold_chain.status(vid) for vid in cold_chain.vehicles]
+    for st in statuses:
+        del st["excursions"]
+    statuses.sort(key=lambda st: (st["state"] != "BREACH", -st["degree_minutes"]))
+    return {
+        "sla_c": cold_chain.sla_c,
+        "vehicles": statuses,
+        "active_breaches": sum(1 for st in statuses if st["state"] == "BREACH"),
+    }
+
+
+@app.get("/api/cold-chain/{vehicle_id}")
+def get_cold_chain_vehicle(vehicle_id: str):
+    """Cold-chain state machine for one vehicle, including recent closed excursions."""
+    with fleet_state.view():
+        status = cold_chain.status(vehicle_id)
+    if status is None:
+        return JSONResponse({"error": "No cold-chain readings for vehicle"}, status_code=404)
+    return status
+
+
+# ────────────────────────────────────────────────────────────────────
+# FUEL ANOMALIES (fuel vs movement residuals)
+# ────────────────────────────────────────────────────────────────────
+
+@app.get("/api/fuel-anomalies")
+def get_fuel_anomalies():
+    """Vehicles with fuel use unexplained by distance, speed and load, most anomalies first."""
+    with fleet_state.view():
+        statuses = [fuel_monitor.status(vid) for vid in fuel_monitor.vehicles]
+    flagged = [st for st in statuses if st["anomaly_count"]]
+    flagged.sort(key=lambda st: -st["anomaly_count"])
+    return {
+        "z_threshold": fuel_monitor.z_threshold,
+        "vehicles_monitored": len(statuses),
+        "vehicles_flagged": len(flagged),
+        "vehicles": flagged,
+    }
+
+
+@app.get("/api/fuel-anomalies/scan")
+async def scan_fuel_history(
+    start: str | None = None,
+    end: str | None = None,
+    vehicle_id: str | None = None,
+    limit: int = 1000,
+):
+    """
+    Batch fuel anomaly scan over retained telemetry history (backfill).
+
+    `start`/`end` accept unix seconds or ISO dates (end exclusive). `end`
+    defaults to now and `start` to FUEL_SCAN_DEFAULT_HOURS before it; ranges
+    longer than FUEL_SCAN_MAX_HOURS are rejected, and the scan stops after
+    FUEL_SCAN_MAX_RECORDS records (`truncated`), since it holds every record in
+    range in memory. Returns the most recent `limit` anomalies, oldest first,
+    plus per-vehicle counts. Once history has been compacted, `start` must fall
+    after it (400 otherwise).
+    """
+    try:
+        start_ts, end_ts = parse_time(start), parse_time(end)
+    except ValueError:
+        return JSONResponse({"error": "start/end must be unix seconds or ISO-8601"}, status_code=400)
+    end_ts = time.time() if end_ts is None else end_ts
+    start_ts = end_ts - FUEL_SCAN_DEFAULT_HOURS * 3600 if start_ts is None else start_ts
+    if end_ts - start_ts > FUEL_SCAN_MAX_HOURS * 3600:
+        return JSONResponse(
+            {"error": f"Scan at most {FUEL_SCAN_MAX_HOURS:g} hours at a time; narrow start/end"}, status_code=400
+        )
+    if error := _compacted_range_error(start_ts):
+        return error
+    started = time.perf_counter()
+    result = await asyncio.to_thread(
+        scan_fuel_anomalies,
+        iter_history(_history_paths(), start_ts, end_ts, vehicle_id),
+        z_threshold=fuel_monitor.z_threshold,
+        max_records=FUEL_SCAN_MAX_RECORDS,
+    )
+    result["anomaly_count"] = len(result["anomalies"])
+    result["anomalies"] = result["anomalies"][-max(1, min(limit, 10000)):]
+    result["scan_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+@app.get("/api/fuel-anomalies/{vehicle_id}")
+def get_fuel_anomalies_vehicle(vehicle_id: str):
+    """Streaming fuel check state for one vehicle, including recent anomalies."""
+    with fleet_state.view():
+        status = fuel_monitor.status(vehicle_id)
+    if status is None:
+        return JSONResponse({"error": "No fuel readings for vehicle"}, status_code=404)
+    return status
+
+
+# ────────────────────────────────────────────────────────────────────
+# TRACK HISTORY (compressed GPS paths)
+# ────────────────────────────────────────────────────────────────────
+
+@app.get("/api/track/{vehicle_id}")
+def get_track(vehicle_id: str, start: str | None = None, end: str | None = None):
+    """
+    Vehicle path for a time range from the compressed track store.
+
+    `start`/`end` accept unix seconds or ISO dates (end exclusive). Points are
+    simplified online with a synchronized-distance bound of TRACK_TOLERANCE_M, so
+    linear interpolation between consecutive points is within that many metres
+    of every raw fix. The last point may be `pending` (the live position).
+    """
+    try:
+        start_ts, end_ts = parse_time(start), parse_time(end)
+    except ValueError:
+        return JSONResponse({"error": "start/end must be unix seconds or ISO-8601"}, status_code=400)
+    fleet_state.refresh()
+    points = tracks.query(vehicle_id, start_ts, end_ts)
+    if not points:
+        return JSONResponse({"error": "No track points for vehicle in range"}, status_code=404)
+    return {"vehicle_id": vehicle_id, "points": points, "tolerance_m": TRACK_TOLERANCE_M}
+
+
+@app.get("/api/track-stats")
+def track_stats():
+    """Raw vs stored point counts and on-disk bytes for the compressed track store (kept alongside the raw log)."""
+    return tracks.stats
 
 
 # ────────────────────────────────────────────────────────────────────
@@ -178,29 +820,36 @@ async def stream_fleet_data():
     """
     async def event_generator():
         last_position = 0
-        while True:
-            if FLEET_FILE.exists():
-                try:
-                    with open(FLEET_FILE, encoding="utf-8") as f:
-                        f.seek(last_position)
-                        new_lines = f.readlines()
-                        last_position = f.tell()
-                    if new_lines:
-                        vehicles: dict[str, dict] = {}
-                        for line in new_lines:
-                            line = line.strip()
-                            if line:
-                                try:
-                                    record = json.loads(line)
-                                    vehicles[record.get("vehicle_id", "")] = record
-                                except json.JSONDecodeError:
-                                    pass
-                        if vehicles:
-                            data = json.dumps(list(vehicles.values()))
-                            yield f"data: {data}\n\n"
-                except Exception as e:
-                    logger.error(f"SSE read error: {e}")
-            await asyncio.sleep(2)
+        _sse_stats["clients"] += 1
+        try:
+            while True:
+                if FLEET_FILE.exists():
+                    try:
+                        with open(FLEET_FILE, encoding="utf-8") as f:
+                            f.seek(last_position)
+                            new_lines = f.readlines()
+                            last_position = f.tell()
+                        read_at = time.time()
+                        if new_lines:
+                            vehicles: dict[str, dict] = {}
+                            for line in new_lines:
+                                line = line.strip()
+                                if line:
+                                    try:
+                                        record = json.loads(line)
+                                        vehicles[record.get("vehicle_id", "")] = record
+                                    except json.JSONDecodeError:
+                                        _sse_stats["parse_errors"] += 1
+                            if vehicles:
+                                data = json.dumps(list(vehicles.values()))
+                                latency_tracer.observe_send(list(vehicles.values()), "sse", read_at)
+                                _sse_stats["frames"] += 1
+                                yield f"data: {data}\n\n"
+                    except Exception as e:
+                        logger.error(f"SSE read error: {e}")
+                await asyncio.sleep(2)
+        finally:
+            _sse_stats["clients"] -= 1
 
     return StreamingResponse(
         event_generator(),
@@ -213,56 +862,255 @@ async def stream_fleet_data():
     )
 
 
+# ────────────────────────────────────────────────────────────────────
+# WEBSOCKET FLEET FEED (filtered subscriptions)
+# ────────────────────────────────────────────────────────────────────
+
+async def _fleet_feed_loop() -> None:
+    """Tail the fleet log and route coalesced updates to WebSocket subscribers."""
+    while True:
+        if len(fleet_feed.index):
+            try:
+                await asyncio.to_thread(fleet_state.refresh)
+                fleet_feed.tick()
+            except Exception as e:
+                logger.error(f"Fleet feed tick failed: {e}")
+        await asyncio.sleep(FEED_INTERVAL_SEC)
+
+
+async def _ws_receive_json(websocket: WebSocket, binary: bool) -> dict:
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        if binary:
+            import msgpack
+
+            return msgpack.unpackb(message["bytes"], raw=False)
+        return json.loads(message["bytes"])
+    return json.loads(message.get("text") or "null")
+
+
+@app.websocket("/api/ws/fleet")
+async def fleet_feed_ws(websocket: WebSocket, format: str = "json"):
+    """
+    Live fleet updates filtered per subscription.
+
+    Send `{"type": "subscribe", "routes": [...], "vehicle_ids": [...],
+    "statuses": [...], "bbox": [min_lat, min_lon, max_lat, max_lon]}` (all
+    optional, AND across keys) at any time to set or replace the filter. The
+    server answers with a `snapshot` of matching vehicles, then pushes `update`
+    batches containing only matching vehicles. `?format=msgpack` switches
+    frames to MessagePack binary (requires the `msgpack` package).
+    """
+    await websocket.accept()
+    binary = format == "msgpack"
+    if binary:
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            await websocket.send_text(json.dumps({"type": "error", "error": "msgpack is not installed; using JSON"}))
+            binary = False
+    sub = Subscription(binary=binary)
+
+    async def send(message: dict) -> None:
+        frame = sub.encode(message)
+        if binary:
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
+
+    async def sender() -> None:
+        while True:
+            message = await sub.queue.get()
+            await send(message)
+            latency_tracer.observe_send(message["vehicles"], "ws")
+
+    sender_task = asyncio.create_task(sender())
+    try:
+        while True:
+            try:
+                filters = parse_filters(await _ws_receive_json(websocket, binary))
+            except (ValueError, TypeError) as e:
+                await send({"type": "error", "error": str(e)})
+                continue
+            fleet_feed.subscribe(sub, filters)
+            fleet = await asyncio.to_thread(fleet_state.snapshot)
+            await send({"type": "snapshot", "vehicles": [v for v in fleet if matches(filters, v)]})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        fleet_feed.unsubscribe(sub)
+        sender_task.cancel()
+
+
+@app.get("/api/ws/stats")
+def fleet_feed_stats():
+    """Subscriber count and fan-out counters for the WebSocket feed."""
+    return {"subscribers": len(fleet_feed.index), **fleet_feed.stats}
+
+
+@app.get("/api/latency")
+def latency_stats():
+    """
+    Telemetry staleness per stage: p50/p95/p99 from emission through ingest,
+    API read and SSE/WebSocket delivery, since this process started.
+    """
+    fleet_state.refresh()
+    return latency_tracer.summary()
+
+
 # ────────────────────────────────────────────────────────────────────
 # BOOKING MODULE (Task 1B)
 # ────────────────────────────────────────────────────────────────────
 
+def _idempotent_start(request: Request, body) -> tuple[str | None, JSONResponse | None]:
+    """Claim the request's Idempotency-Key; a response is returned when it must not be processed."""
+    key = request.headers.get("idempotency-key")
+    if not key:
+        return None, None
+    if len(key) > 255:
+        return None, JSONResponse({"error": "Idempotency-Key must be at most 255 characters"}, status_code=400)
+    state, stored = booking_store.idempotency.begin(key, request_fingerprint(body))
+    if state == "replay":
+        return None, JSONResponse(stored, headers={"Idempotent-Replayed": "true"})
+    if state == "in_flight":
+        return None, JSONResponse(
+            {"error": "A request with this Idempotency-Key is still in progress"},
+            status_code=409,
+            headers={"Retry-After": "1"},
+        )
+    if state == "mismatch":
+        return None, JSONResponse(
+            {"error": "Idempotency-Key was already used with a different request body"}, status_code=422
+        )
+    return key, None
+
+
+def _settle_key_on_commit(seq: int, key: str, bookings: list[dict], respond: Callable[[list[dict]], dict]) -> None:
+    """Hand an in-flight Idempotency-Key to the writer: completed if `seq` commits, released if it fails."""
+    def settle(ok: bool) -> None:
+        if ok:
+            booking_store.idempotency.complete(key, respond(bookings))
+        else:
+            booking_store.idempotency.abort(key)
+
+    booking_store.when_committed(seq, settle)
+
+
+async def _create_bookings(
+    request: Request, body, make: Callable[[str | None], list[dict]], respond: Callable[[list[dict]], dict]
+):
+    """
+    Build, group-commit and confirm bookings, honouring the request's Idempotency-Key.
+
+    The body must already have passed `validate_booking`. Until the bookings
+    are queued, any failure releases the key. Once they are queued, a request
+    that stops waiting (timeout, disconnect) leaves the key in flight and the
+    writer settles it: a retry gets 409 until then, and afterwards either the
+    stored confirmation or, if the write failed, a fresh attempt.
+    """
+    key, early = _idempotent_start(request, body)
+    if early is not None:
+        return early
+    seq = None
+
+    def release() -> None:
+        if not key:
+            return
+        if seq is None:
+            booking_store.idempotency.abort(key)
+        else:
+            _settle_key_on_commit(seq, key, bookings, respond)
+
+    try:
+        bookings = make(key)
+        seq = booking_store.submit(bookings)
+        if seq is None:
+            failed = JSONResponse(
+                {"error": "Booking queue full", "pending": booking_store.pending},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        elif not await asyncio.to_thread(booking_store.wait_committed, seq):
+            failed = JSONResponse(
+                {"error": "Booking not confirmed; retry with the same Idempotency-Key for its outcome"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+        else:
+            failed = None
+    except BaseException:
+        release()
+        raise
+    if failed is not None:
+        release()
+        return failed
+
+    result = respond(bookings)
+    if key:
+        booking_store.idempotency.complete(key, result)
+    return result
+
+
 @app.post("/api/booking")
 async def create_booking(request: Request):
     """
     Create a new logistics booking.
     Appends to data/bookings.jsonl.
+
+    Send an `Idempotency-Key` header to make retries safe: a repeat with the
+    same key and body returns the original confirmation instead of booking twice.
     """
     try:
         body = await request.json()
     except Exception:
         return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "Expected a JSON object"}, status_code=400)
+    try:
+        validate_booking(body)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=422)
+
+    return await _create_bookings(
+        request, body,
+        lambda key: [build_booking(body, booking_store.ids.next(), idempotency_key=key)],
+        lambda bookings: booking_receipt(bookings[0]),
+    )
 
-    commodities = body.get("commodities", [])
-    total_weight = sum(c.get("weight_kg", 0) for c in commodities)
-    rate_per_kg = body.get("rate_per_kg", 20)
-    service_tax_pct = body.get("service_tax_pct", 12.5)
-    freight = total_weight * rate_per_kg * (1 + service_tax_pct / 100)
-
-    booking_id = f"BK-{str(int(time.time()))[-8:]}"
-    booking = {
-        "booking_id": booking_id,
-        "customer_type": body.get("customer_type", "Walk-in Customer"),
-        "customer_name": body.get("customer_name", "Unknown"),
-        "sender_email": body.get("sender_email", ""),
-        "origin": body.get("origin", ""),
-        "destination": body.get("destination", ""),
-        "commodities": commodities,
-        "total_weight": total_weight,
-        "rate_per_kg": rate_per_kg,
-        "service_tax_pct": service_tax_pct,
-        "freight": round(freight, 2),
-        "expected_delivery": body.get("expected_delivery", ""),
-        "receiver_name": body.get("receiver_name", ""),
-        "receiver_email": body.get("receiver_email", ""),
-        "status": "pending",
-        "vehicle_id": None,
-        "created_at": datetime.now().isoformat(),
-    }
 
-    _append_jsonl(BOOKINGS_FILE, booking)
+@app.post("/api/bookings/import")
+async def import_bookings(request: Request):
+    """
+    Create many bookings in one request (ERP bulk import).
 
-    return {
-        "booking_id": booking_id,
-        "freight": round(freight, 2),
-        "status": "confirmed",
-        "created_at": booking["created_at"],
-    }
+    Body is a JSON array of booking objects (or `{"bookings": [...]}`). All
+    bookings are written in one group commit and confirmed in input order.
+    An `Idempotency-Key` header covers the whole batch.
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+    items = body.get("bookings") if isinstance(body, dict) else body
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return JSONResponse({"error": "Expected a JSON array of booking objects"}, status_code=400)
+    if not items:
+        return JSONResponse({"error": "No bookings to import"}, status_code=400)
+    if len(items) > BOOKING_IMPORT_MAX:
+        return JSONResponse({"error": f"At most {BOOKING_IMPORT_MAX} bookings per import"}, status_code=413)
+    for i, item in enumerate(items):
+        try:
+            validate_booking(item)
+        except ValueError as e:
+            return JSONResponse({"error": f"bookings[{i}]: {e}"}, status_code=422)
+
+    return await _create_bookings(
+        request, items,
+        lambda key: [build_booking(item, booking_store.ids.next(), import_key=key) for item in items],
+        import_receipt,
+    )
 
 
 @app.get("/api/bookings")
@@ -284,24 +1132,58 @@ async def dispatch_booking(booking_id: str, request: Request):
     if not vehicle_id:
         return JSONResponse({"error": "vehicle_id required"}, status_code=400)
 
-    bookings = _read_jsonl(BOOKINGS_FILE, last_n=1000)
-    updated = False
-    for b in bookings:
-        if b.get("booking_id") == booking_id:
-            b["status"] = "dispatched"
-            b["vehicle_id"] = vehicle_id
-            updated = True
-            break
-
-    if updated:
-        with open(BOOKINGS_FILE, "w", encoding="utf-8") as f:
-            for b in bookings:
-                f.write(json.dumps(b) + "\n")
+    changes = {"status": "dispatched", "vehicle_id": vehicle_id, "dispatched_at": datetime.now().isoformat()}
+    if await asyncio.to_thread(booking_store.update, booking_id, changes):
         return {"status": "dispatched", "booking_id": booking_id, "vehicle_id": vehicle_id}
 
     return JSONResponse({"error": "Booking not found"}, status_code=404)
 
 
+@app.post("/api/dispatch/recommend")
+async def recommend_dispatch_endpoint(request: Request):
+    """
+    Recommend a vehicle for each pending booking via min-cost assignment.
+
+    Optional body: `{"booking_ids": [...]}` to restrict to specific pending bookings.
+    Cost combines deadhead distance and estimated CO₂, scaled by each truck's
+    cumulative CO₂ per km; capacity and cold-chain constraints are hard. Every
+    pending booking in the store is considered; one with an invalid
+    `total_weight` is listed as unassigned. Recommendations only — dispatch
+    with /api/booking/{id}/dispatch.
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+    requested = body.get("booking_ids") if isinstance(body, dict) else None
+    if requested is not None and (
+        not isinstance(requested, list) or not all(isinstance(b, str) for b in requested)
+    ):
+        return JSONResponse({"error": "booking_ids must be a list of booking id strings"}, status_code=422)
+    wanted = set(requested or [])
+
+    bookings = [b for b, _ in booking_store.versioned()]
+    pending = [b for b in bookings if b.get("status") == "pending" and (not wanted or b.get("booking_id") in wanted)]
+    committed_kg: dict[str, float] = {}
+    for b in bookings:
+        if b.get("vehicle_id") and b.get("status") in ("dispatched", "in-transit"):
+            try:
+                weight = booking_weight_kg(b)
+            except ValueError:
+                continue
+            committed_kg[b["vehicle_id"]] = committed_kg.get(b["vehicle_id"], 0.0) + weight
+    with fleet_state.view():
+        intensity = {
+            vid: acc["co2_kg"] / acc["distance_km"]
+            for vid, acc in fleet_totals.vehicles.items() if acc.get("distance_km", 0) > 0
+        }
+
+    started = time.perf_counter()
+    result = await asyncio.to_thread(recommend_dispatch, pending, fleet_state.snapshot(), committed_kg, intensity)
+    result["solve_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
 @app.post("/api/booking/{booking_id}/update-docs")
 async def update_booking_docs(booking_id: str, request: Request):
     """Update AWB number and port number for a booking."""
@@ -310,82 +1192,83 @@ async def update_booking_docs(booking_id: str, request: Request):
     except Exception:
         return JSONResponse({"error": "Invalid JSON"}, status_code=400)
 
-    bookings = _read_jsonl(BOOKINGS_FILE, last_n=1000)
-    updated = False
-    for b in bookings:
-        if b.get("booking_id") == booking_id:
-            if "awb_number" in body:
-                b["awb_number"] = body["awb_number"]
-            if "port_number" in body:
-                b["port_number"] = body["port_number"]
-            updated = True
-            break
-
-    if updated:
-        with open(BOOKINGS_FILE, "w", encoding="utf-8") as f:
-            for b in bookings:
-                f.write(json.dumps(b) + "\n")
+    changes = {k: body[k] for k in ("awb_number", "port_number") if k in body}
+    if await asyncio.to_thread(booking_store.update, booking_id, changes):
         return {"status": "updated", "booking_id": booking_id}
 
     return JSONResponse({"error": "Booking not found"}, status_code=404)
 
 
+def _invoice_text(booking_id: str) -> str | None:
+    """Rendered invoice for a booking (cached until the booking changes), or None if unknown."""
+    entry = booking_store.get_versioned(booking_id)
+    return invoice_cache.render(*entry) if entry else None
+
+
 @app.get("/api/invoice/{booking_id}")
 def get_invoice(booking_id: str):
     """Return plain text invoice for a booking."""
-    bookings = _read_jsonl(BOOKINGS_FILE, last_n=1000)
-    booking = next((b for b in bookings if b.get("booking_id") == booking_id), None)
-    if not booking:
+    text = _invoice_text(booking_id)
+    if text is None:
         return JSONResponse({"error": "Booking not found"}, status_code=404)
+    return {"invoice": text, "booking_id": booking_id}
+
+
+@app.get("/api/invoices")
+def bulk_invoices(
+    format: str = "text",
+    booking_ids: str | None = None,
+    status: str | None = None,
+    vehicle_id: str | None = None,
+    customer_name: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    date_field: str = "created_at",
+):
+    """
+    Invoices for every booking matching the filters, streamed as text or a ZIP.
 
-    invoice_text = f"""
-╔══════════════════════════════════════════════╗
-║           ROUTEZERO LOGISTICS                ║
-║           FREIGHT INVOICE                    ║
-╠══════════════════════════════════════════════╣
-  Invoice ID:    INV-{booking_id}
-  Booking ID:    {booking_id}
-  Date:          {booking.get('created_at', 'N/A')}
-
-  Customer:      {booking.get('customer_name', 'N/A')}
-  Sender Email:  {booking.get('sender_email', 'N/A')}
-
-  Origin:        {booking.get('origin', 'N/A')}
-  Destination:   {booking.get('destination', 'N/A')}
-
-  Receiver:      {booking.get('receiver_name', 'N/A')}
-  Receiver Email:{booking.get('receiver_email', 'N/A')}
-
-  ── Commodities ──────────────────────────────
-  {_format_commodities(booking.get('commodities', []))}
-
-  Total Weight:  {booking.get('total_weight', 0)} KG
-  Rate/KG:       ₹{booking.get('rate_per_kg', 0)}
-  Service Tax:   {booking.get('service_tax_pct', 0)}%
-  ─────────────────────────────────────────────
-  FREIGHT TOTAL: ₹{booking.get('freight', 0):.2f}
-
-  Status:        {booking.get('status', 'N/A').upper()}
-  Vehicle:       {booking.get('vehicle_id', 'Unassigned')}
-  Expected Del:  {booking.get('expected_delivery', 'N/A')}
-╚══════════════════════════════════════════════╝
-"""
-    return {"invoice": invoice_text.strip(), "booking_id": booking_id}
-
+    `booking_ids` is a comma-separated list; `start`/`end` accept unix seconds or
+    ISO dates (end exclusive) and apply to `date_field` (`created_at` or
+    `dispatched_at`). E.g. a day's dispatches:
+    `?status=dispatched&date_field=dispatched_at&start=2026-03-01&end=2026-03-02&format=zip`.
+    """
+    if format not in ("text", "zip") or date_field not in DATE_FIELDS:
+        return JSONResponse(
+            {"error": f"format must be text|zip and date_field one of {list(DATE_FIELDS)}"}, status_code=400
+        )
+    try:
+        start_ts, end_ts = parse_time(start), parse_time(end)
+    except ValueError:
+        return JSONResponse({"error": "start/end must be unix seconds or ISO-8601"}, status_code=400)
 
-def _format_commodities(commodities: list[dict]) -> str:
-    """Format commodity list for invoice."""
-    if not commodities:
-        return "  No commodities listed"
-    lines = []
-    for c in commodities:
-        lines.append(f"  {c.get('name', 'Unknown')}: {c.get('weight_kg', 0)} KG")
-    return "\n".join(lines)
+    wanted = {b.strip() for b in booking_ids.split(",") if b.strip()} if booking_ids else None
+    selected = select_bookings(
+        booking_store.versioned(), wanted, status, vehicle_id, customer_name, start_ts, end_ts, date_field
+    )
+    filename = f"invoices_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    headers = {"X-Invoice-Count": str(len(selected))}
+    if format == "zip":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.zip"'
+        return StreamingResponse(
+            iter_invoice_zip(selected, invoice_cache), media_type="application/zip", headers=headers
+        )
+    headers["Content-Disposition"] = f'inline; filename="{filename}.txt"'
+    return StreamingResponse(
+        iter_invoice_text(selected, invoice_cache), media_type="text/plain; charset=utf-8", headers=headers
+    )
 
 
 @app.post("/api/notify-driver")
 async def notify_driver(request: Request):
-    """Send notification to driver. Appends to notifications.jsonl."""
+    """
+    Send notification to driver.
+
+    Queued for the delivery worker; repeats of the same (vehicle_id, alert_type)
+    within NOTIFY_COALESCE_WINDOW_SEC are merged into one trailing notification.
+    Manual messages (the default `alert_type`) are never merged, so every text
+    a dispatcher sends is delivered.
+    """
     try:
         body = await request.json()
     except Exception:
@@ -399,19 +1282,26 @@ async def notify_driver(request: Request):
         "notified": True,
     }
 
-    _append_jsonl(NOTIFICATIONS_FILE, notification)
+    outcome = notification_queue.notify(notification, coalesce=notification["alert_type"] != "manual")
+    if outcome is None:
+        return JSONResponse({"error": "Notification queue full, retry shortly"}, status_code=503)
 
-    return {"notified": True, "timestamp": notification["timestamp"]}
+    return {"notified": True, "delivery": outcome, "timestamp": notification["timestamp"]}
+
+
+@app.get("/api/notifications/stats")
+def notification_stats():
+    """Notification queue depth, coalescing, delivery throughput and write amplification."""
+    return {"sinks": [sink.name for sink in notification_queue.sinks], **notification_queue.metrics()}
 
 
 # ────────────────────────────────────────────────────────────────────
 # KPI ENDPOINTS (Task 3)
 # ────────────────────────────────────────────────────────────────────
 
-@app.get("/api/co2-trend")
-def co2_trend():
+def _render_co2_trend():
     """CO₂ per hour for last 24 hours, grouped by route."""
-    fleet = get_fleet()
+    fleet = fleet_state.snapshot()
     data = []
     for hour in range(8, 21):
         for route_id in ["delhi_mumbai", "chennai_bangalore", "kolkata_patna"]:
@@ -427,10 +1317,15 @@ def co2_trend():
     return {"data": data}
 
 
-@app.get("/api/eta-breakdown")
-def eta_breakdown():
+@app.get("/api/co2-trend")
+def co2_trend(request: Request):
+    """CO₂ per hour for last 24 hours, grouped by route. Conditional on the fleet data version."""
+    return dashboard_cache.respond(request, "co2-trend", _data_version(), _render_co2_trend)
+
+
+def _render_eta_breakdown():
     """Per-vehicle ETA status breakdown."""
-    fleet = get_fleet()
+    fleet = fleet_state.snapshot()
     data = []
     for v in fleet:
         data.append({
@@ -443,6 +1338,12 @@ def eta_breakdown():
     return {"data": data}
 
 
+@app.get("/api/eta-breakdown")
+def eta_breakdown(request: Request):
+    """Per-vehicle ETA status breakdown. Conditional on the fleet data version."""
+    return dashboard_cache.respond(request, "eta-breakdown", _data_version(), _render_eta_breakdown)
+
+
 # ────────────────────────────────────────────────────────────────────
 # AI CHAT (Task 7)
 # ────────────────────────────────────────────────────────────────────
@@ -467,8 +1368,14 @@ def _find_booking_by_vehicle(vehicle_id: str) -> dict | None:
 
 def _find_booking(booking_id: str) -> dict | None:
     """Find booking by ID."""
-    bookings = _read_jsonl(BOOKINGS_FILE, last_n=100)
-    return next((b for b in bookings if b.get("booking_id") == booking_id), None)
+    return booking_store.get(booking_id)
+
+
+def _cold_chain_excursions(vehicle_ids: list[str]) -> dict[str, dict | None]:
+    """Open excursion per vehicle from the cold-chain state machines, read under one refresh."""
+    with fleet_state.view():
+        statuses = {vid: cold_chain.status(vid) for vid in vehicle_ids}
+    return {vid: st["current_excursion"] if st else None for vid, st in statuses.items()}
 
 
 def _handle_structured_query(query: str) -> str | None:
@@ -482,35 +1389,41 @@ def _handle_structured_query(query: str) -> str | None:
         if vehicle_id:
             booking = _find_booking_by_vehicle(vehicle_id)
             if booking:
-                inv = get_invoice(booking["booking_id"])
-                if isinstance(inv, dict) and "invoice" in inv:
-                    return f"**Invoice for {vehicle_id}:**\n```\n{inv['invoice']}\n```\n\n(Source: Live Pathway Data, {ts})"
+                invoice = _invoice_text(booking["booking_id"])
+                if invoice is not None:
+                    return f"**Invoice for {vehicle_id}:**\n```\n{invoice}\n```\n\n(Source: Live Pathway Data, {ts})"
             # Try finding any booking
             bookings = _read_jsonl(BOOKINGS_FILE, last_n=50)
             if bookings:
-                b = bookings[0]
-                inv = get_invoice(b["booking_id"])
-                if isinstance(inv, dict) and "invoice" in inv:
-                    return f"**Invoice found (latest booking):**\n```\n{inv['invoice']}\n```\n\n(Source: Live Pathway Data, {ts})"
+                invoice = _invoice_text(bookings[0]["booking_id"])
+                if invoice is not None:
+                    return f"**Invoice found (latest booking):**\n```\n{invoice}\n```\n\n(Source: Live Pathway Data, {ts})"
         return f"No invoice found for the specified vehicle. Please check the vehicle ID.\n\n(Source: Live Pathway Data, {ts})"
 
     # Temperature compliance
     if "temperature" in q or "compliance" in q or "cold chain" in q:
-        fleet = get_fleet()
-        cold_chain = [v for v in fleet if v.get("temperature_c") is not None]
-        breaches = [v for v in cold_chain if v.get("temperature_breach")]
+        fleet = fleet_state.snapshot()
+        reefers = [v for v in fleet if v.get("temperature_c") is not None]
+        excursions = _cold_chain_excursions([v["vehicle_id"] for v in reefers])
+        breaches = [v for v in reefers if v.get("temperature_breach") or excursions[v["vehicle_id"]]]
         report = "**Temperature Compliance Report**\n\n"
-        report += f"- Cold chain vehicles: **{len(cold_chain)}**\n"
+        report += f"- Cold chain vehicles: **{len(reefers)}**\n"
         report += f"- Active breaches: **{len(breaches)}**\n\n"
-        for v in cold_chain:
-            status = "⚠️ BREACH" if v.get("temperature_breach") else "✅ OK"
+        for v in reefers:
+            excursion = excursions[v["vehicle_id"]]
+            status = "⚠️ BREACH" if v in breaches else "✅ OK"
+            if excursion:
+                status += (
+                    f" (breach open {excursion['duration_sec'] / 60:.1f} min, "
+                    f"{excursion['seconds_above_sla'] / 60:.1f} min above SLA, peak {excursion['peak_c']}°C)"
+                )
             report += f"- {v['vehicle_id']}: {v.get('temperature_c', 'N/A')}°C {status}\n"
         report += f"\n(Source: Live Pathway Data, {ts})"
         return report
 
     # CO2 audit
     if "worst" in q or "highest emission" in q or "co2" in q:
-        fleet = get_fleet()
+        fleet = fleet_state.snapshot()
         if fleet:
             sorted_fleet = sorted(fleet, key=lambda v: v.get("co2_kg", 0), reverse=True)
             report = "**CO₂ Emission Audit**\n\n"
@@ -551,84 +1464,321 @@ async def chat(request: Request):
     if structured:
         return {"response": structured, "sources": ["bookings.jsonl", "fleet_summary.jsonl"], "live_data_used": True}
 
-    # Fallback response
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M")
-    fleet = get_fleet()
-    total_co2 = sum(v.get("co2_kg", 0) for v in fleet)
-    active = len(fleet)
-
     return {
-        "response": f"**RouteZero AI Analysis**\n\nBased on live fleet data:\n- Active vehicles: **{active}**\n- Total CO₂: **{total_co2:.1f} kg**\n- Query: \"{query}\"\n\nI can help with invoice lookups, temperature compliance, CO₂ audits, and booking status. Try asking:\n- \"Show invoice for TRK-DL-004\"\n- \"Temperature compliance Kolkata\"\n- \"Which route has worst CO₂?\"\n\n(Source: Live Pathway Data, {ts})",
+        "response": _fallback_answer(query, fleet_state.snapshot()),
         "sources": ["fleet_summary.jsonl"],
         "live_data_used": True,
     }
 
 
+def _fallback_answer(query: str, fleet: list[dict]) -> str:
+    """Canned fleet summary used when no structured handler or LLM answers."""
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M")
+    total_co2 = sum(v.get("co2_kg", 0) for v in fleet)
+    active = len(fleet)
+    return f"**RouteZero AI Analysis**\n\nBased on live fleet data:\n- Active vehicles: **{active}**\n- Total CO₂: **{total_co2:.1f} kg**\n- Query: \"{query}\"\n\nI can help with invoice lookups, temperature compliance, CO₂ audits, and booking status. Try asking:\n- \"Show invoice for TRK-DL-004\"\n- \"Temperature compliance Kolkata\"\n- \"Which route has worst CO₂?\"\n\n(Source: Live Pathway Data, {ts})"
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one named Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: Request):
+    """
+    Streaming variant of /api/chat over SSE.
+
+    Always emits a `sources` event first (empty for an empty query), then the
+    answer: structured-query answers as a single `answer` event, Gemini answers
+    as incremental `token` events. A final `done` event carries the
+    time-to-first-token and total latency in ms.
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+
+    query = body.get("query", "")
+
+    async def event_generator():
+        started = time.perf_counter()
+        first_token_ms = None
+
+        if not query:
+            yield _sse_event("sources", {"sources": [], "live_data_used": False})
+            yield _sse_event("answer", {"text": "Please provide a query."})
+            yield _sse_event("done", {"first_token_ms": 0.0, "total_ms": 0.0})
+            return
+
+        structured = _handle_structured_query(query)
+        if structured:
+            yield _sse_event("sources", {"sources": ["bookings.jsonl", "fleet_summary.jsonl"], "live_data_used": True})
+            yield _sse_event("answer", {"text": structured})
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield _sse_event("done", {"first_token_ms": elapsed_ms, "total_ms": elapsed_ms})
+            return
+
+        fleet = fleet_state.snapshot()
+        yield _sse_event("sources", {"sources": ["fleet_summary.jsonl"], "live_data_used": True})
+
+        # The Gemini SDK streams synchronously; pull each chunk off a worker thread
+        # so the SSE fleet feed sharing this event loop is not blocked.
+        chunks = iter(stream_fleet_answer(query, fleet))
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield _sse_event("token", {"text": chunk})
+
+        if first_token_ms is None:
+            yield _sse_event("answer", {"text": _fallback_answer(query, fleet)})
+            first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield _sse_event("done", {"first_token_ms": first_token_ms, "total_ms": total_ms})
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 # ────────────────────────────────────────────────────────────────────
 # FLEET RANKINGS (Task 8)
 # ────────────────────────────────────────────────────────────────────
 
-@app.get("/api/fleet-rankings")
-def fleet_rankings():
-    """Fleet sorted by CO₂ efficiency (best to worst), with score."""
-    fleet = get_fleet()
+def _render_fleet_rankings():
+    """Fleet sorted by cumulative CO₂ per km travelled (best to worst), with score."""
+    with fleet_state.view():
+        fleet = list(fleet_state.latest.values())
+        totals = {vid: dict(acc) for vid, acc in fleet_totals.vehicles.items()}
+
     rankings = []
     for v in fleet:
-        co2 = v.get("co2_kg", 0)
-        # Estimate distance from remaining_km or use a default
-        distance = v.get("remaining_km", 100) or 100
-        co2_per_km = co2 / max(distance, 1)
-        score = max(1, min(5, 5 - int((co2_per_km - 0.02) / 0.015)))
+        acc = totals.get(v.get("vehicle_id"), {})
+        co2 = acc.get("co2_kg", 0.0)
+        distance = acc.get("distance_km", 0.0)
+        co2_per_km = co2 / distance if distance > 0 else 0.0
         rankings.append({
             "vehicle_id": v.get("vehicle_id"),
             "route": v.get("route_id", ""),
             "co2_kg": round(co2, 2),
+            "distance_km": round(distance, 2),
             "co2_per_km": round(co2_per_km, 4),
-            "score": score,
+            "score": efficiency_score(co2, distance, acc.get("is_cold_chain", False)),
             "status": v.get("status", "NORMAL"),
         })
-    rankings.sort(key=lambda x: x["co2_per_km"])
+    # Unrated vehicles (no distance yet, score None) sort after every rated one.
+    rankings.sort(key=lambda x: (x["score"] is None, x["co2_per_km"]))
     return {"data": rankings}
 
 
+@app.get("/api/fleet-rankings")
+def fleet_rankings(request: Request):
+    """Fleet sorted by cumulative CO₂ per km travelled (best to worst), with score. Conditional on the fleet data version."""
+    return dashboard_cache.respond(request, "fleet-rankings", _data_version(), _render_fleet_rankings)
+
+
 # ────────────────────────────────────────────────────────────────────
 # CARBON REPORT (Task 9)
 # ────────────────────────────────────────────────────────────────────
 
+def _render_carbon_report():
+    """Structured carbon credit export report from cumulative per-vehicle totals."""
+    with fleet_state.view():
+        totals = {vid: dict(acc) for vid, acc in fleet_totals.vehicles.items()}
+    return summarize_carbon(totals)
+
+
 @app.get("/api/carbon-report")
-def carbon_report():
-    """Structured carbon credit export report."""
-    fleet = get_fleet()
-    total_co2_kg = sum(v.get("co2_kg", 0) for v in fleet)
-    total_co2_tonnes = total_co2_kg / 1000
-    baseline_co2_tonnes = total_co2_tonnes * 1.26  # IPCC AR6 baseline
-    reduction_tonnes = max(0, baseline_co2_tonnes - total_co2_tonnes)
-
-    vehicles_report = []
-    for v in fleet:
-        co2_t = v.get("co2_kg", 0) / 1000
-        vehicles_report.append({
-            "vehicle_id": v.get("vehicle_id"),
-            "route": v.get("route_id", ""),
-            "co2_tonnes": round(co2_t, 4),
-            "credits": round(max(0, co2_t * 0.26), 4),
-        })
+def carbon_report(request: Request):
+    """Structured carbon credit export report from cumulative per-vehicle totals. Conditional on the fleet data version."""
+    return dashboard_cache.respond(request, "carbon-report", _data_version(), _render_carbon_report)
+
+
+# Single-pass summaries of finished exports, fetched after the CSV download completes.
+# Written from threadpool workers (CSV generator, Parquet writer), hence the lock.
+_export_summaries: OrderedDict[str, dict] = OrderedDict()
+_export_summaries_lock = threading.Lock()
+_MAX_EXPORT_SUMMARIES = 100
+
+
+def _remember_export(export_id: str, summary: dict) -> None:
+    with _export_summaries_lock:
+        _export_summaries[export_id] = summary
+        while len(_export_summaries) > _MAX_EXPORT_SUMMARIES:
+            _export_summaries.popitem(last=False)
+
+
+def _history_paths() -> list[Path]:
+    """Raw fleet history still inside the retention window, oldest first."""
+    return sealed_segments(HISTORY_DIR, FLEET_FILE.stem) + [FLEET_FILE]
+
 
+def _compacted_range_error(start_ts: float | None) -> JSONResponse | None:
+    """
+    400 for a raw-history range that starts in already compacted history.
+
+    Raw segments are rolled up and deleted after TELEMETRY_RETENTION_HOURS, so
+    a range reaching back past the newest compacted record (or with no start
+    at all) would silently cover only what is left.
+    """
+    through = compactor.compacted_through
+    if through is None or (start_ts is not None and start_ts > through):
+        return None
+    return JSONResponse(
+        {
+            "error": f"Raw history up to {datetime.fromtimestamp(through, tz=UTC).isoformat()} has been "
+                     "compacted; pass a start after it, or use /api/rollups for older ranges",
+            "raw_history_after": through,
+        },
+        status_code=400,
+    )
+
+
+@app.get("/api/carbon-report/export")
+async def carbon_report_export(
+    format: str = "csv",
+    granularity: str = "event",
+    start: str | None = None,
+    end: str | None = None,
+    vehicle_id: str | None = None,
+):
+    """
+    Bulk MRV export of telemetry history, per event or per vehicle-day.
+
+    `start`/`end` accept unix seconds or ISO dates (end exclusive). CSV streams as a
+    chunked response; its carbon-report summary is available from
+    /api/carbon-report/export/{X-Export-Id}/summary once the download finishes.
+    Parquet is written in row groups to a scratch file that is deleted once sent,
+    with the summary in its key-value metadata. Times and days are UTC; records
+    that arrive out of order are counted under the summary's `export.dropped`.
+    Memory stays bounded by fleet size for any period. Only raw history is
+    exported: once it has been compacted, `start` must fall after it (400
+    otherwise; /api/rollups serves older ranges).
+    """
+    if format not in ("csv", "parquet") or granularity not in ("event", "day"):
+        return JSONResponse({"error": "format must be csv|parquet and granularity event|day"}, status_code=400)
+    try:
+        start_ts, end_ts = parse_time(start), parse_time(end)
+    except ValueError:
+        return JSONResponse({"error": "start/end must be unix seconds or ISO-8601"}, status_code=400)
+    if error := _compacted_range_error(start_ts):
+        return error
+
+    export_id = uuid.uuid4().hex[:12]
+    export = CarbonExport(iter_history(_history_paths(), start_ts, end_ts, vehicle_id), granularity)
+    filename = f"carbon_{granularity}_{export_id}"
+
+    if format == "parquet":
+        path = EXPORTS_DIR / f"{filename}.parquet"
+        try:
+            summary = await asyncio.to_thread(export.write_parquet, path)
+        except ImportError:
+            return JSONResponse({"error": "Parquet export requires pyarrow"}, status_code=501)
+        _remember_export(export_id, summary)
+        return FileResponse(
+            path,
+            media_type="application/vnd.apache.parquet",
+            filename=f"{filename}.parquet",
+            headers={"X-Export-Id": export_id},
+            background=BackgroundTask(path.unlink, missing_ok=True),
+        )
+
+    def stream_csv():
+        yield from export.iter_csv()
+        _remember_export(export_id, export.summary)
+
+    return StreamingResponse(
+        stream_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.csv"', "X-Export-Id": export_id},
+    )
+
+
+@app.get("/api/carbon-report/export/{export_id}/summary")
+def carbon_report_export_summary(export_id: str):
+    """Carbon-report summary computed during a finished export."""
+    with _export_summaries_lock:
+        summary = _export_summaries.get(export_id)
+    if summary is None:
+        return JSONResponse({"error": "Export not found or still running"}, status_code=404)
+    return summary
+
+
+# ────────────────────────────────────────────────────────────────────
+# RETENTION & ROLLUPS
+# ────────────────────────────────────────────────────────────────────
+
+@app.get("/api/retention")
+def retention_status():
+    """Retention windows, sealed raw segments awaiting compaction and compactor totals."""
+    segments = sealed_segments(HISTORY_DIR)
     return {
-        "report_date": datetime.now().strftime("%Y-%m-%d"),
-        "reporting_period": "last_30_days",
-        "total_co2_kg": round(total_co2_kg, 1),
-        "total_co2_tonnes": round(total_co2_tonnes, 3),
-        "baseline_co2_tonnes": round(baseline_co2_tonnes, 3),
-        "reduction_tonnes": round(reduction_tonnes, 3),
-        "carbon_credits_generated": round(reduction_tonnes, 3),
-        "credit_value_inr": round(reduction_tonnes * 430, 0),
-        "methodology": "IPCC AR6 WGIII Table 10.1 + BEE-ICM 2024 MRV",
-        "vehicles": vehicles_report,
-        "compliance": {
-            "nlp_2022_target_pct": 20,
-            "achieved_pct": round(min(100, (reduction_tonnes / max(baseline_co2_tonnes, 0.001)) * 100), 1),
-            "status": "COMPLIANT" if reduction_tonnes > 0 else "NON-COMPLIANT",
+        "raw_retention_hours": RAW_RETENTION_SEC / 3600,
+        "minute_rollup_retention_days": MINUTE_ROLLUP_RETENTION_SEC / 86400,
+        "segment_max_bytes": SEGMENT_MAX_BYTES,
+        "sealed_segments": len(segments),
+        "sealed_bytes": sum(p.stat().st_size for p in segments if p.exists()),
+        "compactor": compactor.stats,
+    }
+
+
+@app.get("/api/rollups")
+def get_rollups(
+    granularity: str = "hour",
+    start: str | None = None,
+    end: str | None = None,
+    vehicle_id: str | None = None,
+):
+    """Per-vehicle minute or hour rollups of telemetry older than the raw retention window."""
+    if granularity not in ("minute", "hour"):
+        return JSONResponse({"error": "granularity must be minute or hour"}, status_code=400)
+    try:
+        start_ts, end_ts = parse_time(start), parse_time(end)
+    except ValueError:
+        return JSONResponse({"error": "start/end must be unix seconds or ISO-8601"}, status_code=400)
+    return list(iter_rollups(ROLLUPS_DIR, granularity, start_ts, end_ts, vehicle_id, stem=FLEET_FILE.stem))
+
+
+# ────────────────────────────────────────────────────────────────────
+# ROUTING (emission-weighted road graph)
+# ────────────────────────────────────────────────────────────────────
+
+@app.get("/api/route/path")
+def route_path(origin: str, destination: str, load_fraction: float = 1.0, cold_chain: bool = False):
+    """Lowest distance + CO₂ cost path between two hubs on the road graph."""
+    graph = get_road_graph()
+    path = graph.shortest_path(origin.strip().lower(), destination.strip().lower(), make_profile(load_fraction, cold_chain))
+    if path is None:
+        return JSONResponse({"error": "Unknown hub or no path"}, status_code=404)
+    return path
+
+
+@app.get("/api/route/reroute")
+def route_reroute(route_id: str):
+    """Reroute suggestions toward the corridor destination for every truck on a corridor."""
+    vehicles = [v for v in fleet_state.snapshot() if v.get("route_id") == route_id]
+    graph = get_road_graph()
+    started = time.perf_counter()
+    suggestions = suggest_corridor_reroutes(graph, route_id, vehicles)
+    return {
+        "route_id": route_id,
+        "suggestions": suggestions,
+        "compute_ms": round((time.perf_counter() - started) * 1000, 1),
+        "cache": {
+            "paths": len(graph.path_cache),
+            "trees": len(graph.tree_cache),
+            "tree_hits": graph.tree_cache.hits,
+            "tree_misses": graph.tree_cache.misses,
         },
     }
 
@@ -647,8 +1797,15 @@ def pathway_status():
         age_seconds = time.time() - FLEET_FILE.stat().st_mtime
 
         if age_seconds < 10:
-            records = len(_read_jsonl(FLEET_FILE, last_n=1000))
-            return {"status": "LIVE", "age_seconds": round(age_seconds, 1), "records": records}
+            # Incremental tail: counts records without re-reading the file.
+            fleet_state.refresh()
+            return {
+                "status": "LIVE",
+                "age_seconds": round(age_seconds, 1),
+                "records": fleet_state.records_read,
+                "vehicles": len(fleet_state.latest),
+                "tail_lag_bytes": fleet_state.lag_bytes,
+            }
         elif age_seconds < 60:
             return {"status": "DELAYED", "age_seconds": round(age_seconds, 1)}
         else:
@@ -665,19 +1822,36 @@ def pathway_status():
 # ROUTE SUMMARY (existing endpoint — preserve)
 # ────────────────────────────────────────────────────────────────────
 
-@app.get("/api/route-summary")
-def route_summary():
-    """Per-route CO₂ totals + compliance %."""
-    fleet = get_fleet()
-    routes: dict[str, dict] = {}
+def _render_route_summary():
+    """Per-route cumulative CO₂, fuel and distance totals + active vehicle count."""
+    with fleet_state.view():
+        fleet = list(fleet_state.latest.values())
+        route_totals = {rid: dict(acc) for rid, acc in fleet_totals.routes.items()}
+
+    counts: dict[str, int] = {}
     for v in fleet:
         rid = v.get("route_id", "unknown")
-        if rid not in routes:
-            routes[rid] = {"route_id": rid, "total_co2_kg": 0, "vehicle_count": 0, "total_fuel_liters": 0}
-        routes[rid]["total_co2_kg"] += v.get("co2_kg", 0)
-        routes[rid]["vehicle_count"] += 1
-        routes[rid]["total_fuel_liters"] += v.get("fuel_consumed_liters", 0)
-    return list(routes.values())
+        counts[rid] = counts.get(rid, 0) + 1
+
+    routes = []
+    for rid in sorted(set(counts) | set(route_totals)):
+        acc = route_totals.get(rid, {})
+        distance = acc.get("distance_km", 0.0)
+        routes.append({
+            "route_id": rid,
+            "total_co2_kg": round(acc.get("co2_kg", 0.0), 2),
+            "vehicle_count": counts.get(rid, 0),
+            "total_fuel_liters": round(acc.get("fuel_liters", 0.0), 2),
+            "total_distance_km": round(distance, 2),
+            "co2_per_km": round(acc.get("co2_kg", 0.0) / distance, 4) if distance > 0 else 0.0,
+        })
+    return routes
+
+
+@app.get("/api/route-summary")
+def route_summary(request: Request):
+    """Per-route cumulative CO₂, fuel and distance totals + active vehicle count. Conditional on the fleet data version."""
+    return dashboard_cache.respond(request, "route-summary", _data_version(), _render_route_summary)
 
 
 # ────────────────────────────────────────────────────────────────────
@@ -0,0 +1,517 @@
+"""
+RouteZero Bookings — collision-free ids, idempotent creates and group-committed writes.
+
+Booking ids are time-ordered: `BK-<unix ms:13><node:2><seq:3>`. Within a
+millisecond the sequence increments; if it overflows, the timestamp borrows
+the next millisecond. Ids are therefore strictly increasing per node, never
+collide within a node, and still match the `BK-\\d+` pattern used by chat
+lookups. The generator is seeded from the log on startup, so a restart (or a
+clock step backwards) never reissues an id. Each API worker that appends to
+the same log needs its own `BOOKING_NODE_ID`.
+
+Creates carrying an `Idempotency-Key` are remembered for `ttl_sec`: a retry
+with the same key and body replays the stored response, the same key with a
+different body is refused, and a retry racing the original is told to retry.
+Keys are persisted on the booking record, so replays survive a restart. A key
+whose write outlives the request's wait stays in flight and is completed (or
+released, if the write fails) by `when_committed` once the writer gets to it.
+
+Appends go through a single writer thread that commits everything queued
+since its last write in one `write()` (+ `fsync`), so a burst of ERP imports
+costs one disk flush per group rather than one per booking. In-place updates
+(dispatch, document numbers) rewrite the log atomically under the same lock.
+
+Reads go through an in-memory index that tails the log (re-reading it only
+when it is replaced), so lookups by id are O(1). Each booking carries a
+version — a hash of its log line — that changes whenever the booking does,
+for caches of anything derived from it (e.g. rendered invoices).
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SEQ_PER_MS: int = 1000
+MAX_NODE_ID: int = 99
+
+
+class BookingIdGenerator:
+    """
+    Strictly increasing, time-ordered booking ids for one node.
+
+    Attributes:
+        node_id (int): 0–99, distinguishes writers that share a booking log.
+    """
+
+    def __init__(self, node_id: int = 0, clock=time.time):
+        if not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"node_id must be in 0..{MAX_NODE_ID}, got {node_id}")
+        self.node_id = node_id
+        self._clock = clock
+        self._last = 0  # ms * SEQ_PER_MS + seq of the last id issued or observed
+        self._lock = threading.Lock()
+
+    def observe(self, booking_id: str) -> None:
+        """Advance past an existing id so it is never reissued (legacy ids are ignored)."""
+        digits = booking_id.removeprefix("BK-")
+        if len(digits) != 18 or not digits.isdigit() or int(digits[13:15]) != self.node_id:
+            return
+        value = int(digits[:13]) * SEQ_PER_MS + int(digits[15:])
+        with self._lock:
+            self._last = max(self._last, value)
+
+    def next(self) -> str:
+        with self._lock:
+            self._last = max(int(self._clock() * 1000) * SEQ_PER_MS, self._last + 1)
+            ms, seq = divmod(self._last, SEQ_PER_MS)
+        return f"BK-{ms:013d}{self.node_id:02d}{seq:03d}"
+
+
+def request_fingerprint(body) -> str:
+    """Stable hash of a decoded request body, for detecting key reuse with a different payload."""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyCache:
+    """
+    Idempotency-Key → stored response, expiring after `ttl_sec`.
+
+    `begin` returns one of:
+        ("new", None)          first use — process, then `complete` or `abort`
+        ("replay", response)   already completed with the same body
+        ("in_flight", None)    the original request is still being processed
+        ("mismatch", None)     key reused with a different body
+
+    Attributes:
+        ttl_sec (float): How long a completed key is remembered.
+        max_entries (int): Oldest keys are evicted beyond this many.
+        stats (dict): replays, in_flight, mismatches, evicted.
+    """
+
+    def __init__(self, ttl_sec: float = 86400.0, max_entries: int = 100_000, clock=time.time):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._clock = clock
+        # key → [expires_at, fingerprint | None, response | None]; response None = in flight
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"replays": 0, "in_flight": 0, "mismatches": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def begin(self, key: str, fingerprint: str | None) -> tuple[str, dict | None]:
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [now + self.ttl_sec, fingerprint, None]
+                self._evict()
+                return "new", None
+            if entry[1] is not None and fingerprint is not None and entry[1] != fingerprint:
+                self.stats["mismatches"] += 1
+                return "mismatch", None
+            if entry[2] is None:
+                self.stats["in_flight"] += 1
+                return "in_flight", None
+            self.stats["replays"] += 1
+            return "replay", entry[2]
+
+    def complete(self, key: str, response: dict) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[0] = self._clock() + self.ttl_sec
+                entry[2] = response
+                self._entries.move_to_end(key)
+
+    def abort(self, key: str) -> None:
+        """Forget an in-flight key so the client's retry is processed afresh."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is None:
+                del self._entries[key]
+
+    def seed(self, key: str, response: dict, stored_at: float) -> None:
+        """Remember a completed key recovered from the log (no fingerprint is kept there)."""
+        expires_at = stored_at + self.ttl_sec
+        if expires_at <= self._clock():
+            return
+        with self._lock:
+            self._entries[key] = [expires_at, None, response]
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _expire(self, now: float) -> None:
+        # Insertion order is expiry order (completion moves a key to the end), so stop at the first live one.
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[0] > now:
+                return
+            del self._entries[key]
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+
+def _number(value, field: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError(f"{field} must be a non-negative number")
+    return value
+
+
+def validate_booking(body: dict) -> None:
+    """
+    Check the fields `build_booking` computes with.
+
+    Raises:
+        ValueError: If `commodities` is not a list of objects with numeric
+            `weight_kg`, or `rate_per_kg` / `service_tax_pct` are not numbers.
+    """
+    commodities = body.get("commodities", [])
+    if not isinstance(commodities, list) or not all(isinstance(c, dict) for c in commodities):
+        raise ValueError("commodities must be a list of objects")
+    for i, commodity in enumerate(commodities):
+        _number(commodity.get("weight_kg", 0), f"commodities[{i}].weight_kg")
+    for field in ("rate_per_kg", "service_tax_pct"):
+        if field in body:
+            _number(body[field], field)
+
+
+def build_booking(
+    body: dict, booking_id: str, idempotency_key: str | None = None, import_key: str | None = None
+) -> dict:
+    """
+    Booking record for a create request, with freight computed from its commodities.
+
+    `idempotency_key` (single create) or `import_key` (every booking of a bulk
+    import) is stored on the record so the key can be replayed after a restart.
+
+    Raises:
+        ValueError: If the body fails `validate_booking`.
+    """
+    validate_booking(body)
+    commodities = body.get("commodities", [])
+    total_weight = sum(c.get("weight_kg", 0) for c in commodities)
+    rate_per_kg = body.get("rate_per_kg", 20)
+    service_tax_pct = body.get("service_tax_pct", 12.5)
+    freight = total_weight * rate_per_kg * (1 + service_tax_pct / 100)
+
+    booking = {
+        "booking_id": booking_id,
+        "customer_type": body.get("customer_type", "Walk-in Customer"),
+        "customer_name": body.get("customer_name", "Unknown"),
+        "sender_email": body.get("sender_email", ""),
+        "origin": body.get("origin", ""),
+        "destination": body.get("destination", ""),
+        "commodities": commodities,
+        "total_weight": total_weight,
+        "rate_per_kg": rate_per_kg,
+        "service_tax_pct": service_tax_pct,
+        "freight": round(freight, 2),
+        "expected_delivery": body.get("expected_delivery", ""),
+        "receiver_name": body.get("receiver_name", ""),
+        "receiver_email": body.get("receiver_email", ""),
+        "status": "pending",
+        "vehicle_id": None,
+        "created_at": datetime.now().isoformat(),
+    }
+    if idempotency_key:
+        booking["idempotency_key"] = idempotency_key
+    if import_key:
+        booking["import_key"] = import_key
+    return booking
+
+
+def booking_receipt(booking: dict) -> dict:
+    """The create response for a booking (also what an idempotent replay returns)."""
+    return {
+        "booking_id": booking["booking_id"],
+        "freight": booking["freight"],
+        "status": "confirmed",
+        "created_at": booking["created_at"],
+    }
+
+
+def import_receipt(bookings: list[dict]) -> dict:
+    """The bulk import response: one receipt per booking, in input order."""
+    return {"count": len(bookings), "bookings": [booking_receipt(b) for b in bookings], "status": "confirmed"}
+
+
+def _created_ts(booking: dict) -> float | None:
+    try:
+        return datetime.fromisoformat(booking["created_at"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class BookingStore:
+    """
+    Booking log with group-committed appends and serialized in-place updates.
+
+    Attributes:
+        path (Path): JSONL booking log.
+        ids (BookingIdGenerator): Seeded past every id already in the log.
+        idempotency (IdempotencyCache): Seeded with keys still inside their TTL.
+        max_pending (int): Queue capacity in bookings; submits beyond it are refused.
+        fsync (bool): Whether each group is fsynced before it counts as committed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ids: BookingIdGenerator | None = None,
+        idempotency: IdempotencyCache | None = None,
+        max_pending: int = 50_000,
+        fsync: bool = True,
+    ):
+        self.path = path
+        self.ids = ids or BookingIdGenerator()
+        self.idempotency = idempotency or IdempotencyCache()
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self._pending: list[dict] = []
+        self._cond = threading.Condition()
+        self._file_lock = threading.Lock()
+        self._submitted = 0
+        self._committed = 0
+        self._failed: deque[tuple[int, int]] = deque(maxlen=64)  # (first, last) seq of failed groups
+        self._waiters: list[tuple[int, Callable[[bool], None]]] = []  # (seq, callback) for when_committed
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self._index: dict[str, tuple[dict, str]] = {}  # booking_id → (booking, version), in log order
+        self._index_lock = threading.Lock()
+        self._inode: int | None = None
+        self._offset = 0
+        self.stats = {
+            "accepted": 0,
+            "rejected_backpressure": 0,
+            "committed": 0,
+            "groups": 0,
+            "write_errors": 0,
+            "updates": 0,
+        }
+        self._load()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _load(self) -> None:
+        imports: dict[str, list[dict]] = {}
+        self.refresh()
+        for booking, _ in self._index.values():
+            self.ids.observe(str(booking.get("booking_id", "")))
+            key = booking.get("idempotency_key")
+            if key and (stored_at := _created_ts(booking)) is not None:
+                self.idempotency.seed(key, booking_receipt(booking), stored_at)
+            if booking.get("import_key"):
+                imports.setdefault(booking["import_key"], []).append(booking)
+        for key, bookings in imports.items():
+            if (stored_at := _created_ts(bookings[0])) is not None:
+                self.idempotency.seed(key, import_receipt(bookings), stored_at)
+
+    def refresh(self) -> None:
+        """Apply bookings appended since the last call; re-index if the log was replaced."""
+        with self._index_lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._index, self._inode, self._offset = {}, None, 0
+                return
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self._index, self._inode, self._offset = {}, st.st_ino, 0
+            if st.st_size == self._offset:
+                return
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(st.st_size - self._offset)
+            end = chunk.rfind(b"\n") + 1  # a partially written last line waits for the next refresh
+            for line in chunk[:end].splitlines():
+                self._index_line(line)
+            self._offset += end
+
+    def _index_line(self, line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+        try:
+            booking = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        if isinstance(booking, dict) and booking.get("booking_id"):
+            self._index[booking["booking_id"]] = (booking, hashlib.blake2b(line, digest_size=8).hexdigest())
+
+    def get(self, booking_id: str) -> dict | None:
+        entry = self.get_versioned(booking_id)
+        return entry[0] if entry else None
+
+    def get_versioned(self, booking_id: str) -> tuple[dict, str] | None:
+        """(booking, version) for one id, or None."""
+        self.refresh()
+        return self._index.get(booking_id)
+
+    def versioned(self) -> list[tuple[dict, str]]:
+        """Every booking with its version, in log order (a snapshot; safe to iterate while writes continue)."""
+        self.refresh()
+        with self._index_lock:
+            return list(self._index.values())
+
+    def _read_all(self) -> list[dict]:
+        if not self.path.exists():
+            return []
+        bookings = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        bookings.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        pass
+        return bookings
+
+    def submit(self, bookings: list[dict]) -> int | None:
+        """
+        Enqueue bookings for the next group commit.
+
+        Returns:
+            int | None: Sequence number to pass to `wait_committed`, or None
+            if the queue is full and the caller should back off.
+        """
+        with self._cond:
+            if len(self._pending) + len(bookings) > self.max_pending:
+                self.stats["rejected_backpressure"] += len(bookings)
+                return None
+            self._pending.extend(bookings)
+            self._submitted += len(bookings)
+            self.stats["accepted"] += len(bookings)
+            if self._thread is None:
+                self._start_writer()
+            self._cond.notify_all()
+            return self._submitted
+
+    def wait_committed(self, seq: int, timeout: float = 5.0) -> bool:
+        """Block until booking `seq` is durably written; False on timeout or if its group failed."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._committed >= seq, timeout=timeout):
+                return False
+            return not self._seq_failed(seq)
+
+    def when_committed(self, seq: int, callback: Callable[[bool], None]) -> None:
+        """
+        Call `callback(ok)` once booking `seq`'s group has been written (ok) or has failed.
+
+        Runs at once if that already happened, otherwise on the writer thread
+        right after the commit. For requests that stopped waiting but whose
+        write is still queued.
+        """
+        with self._cond:
+            if self._committed < seq:
+                self._waiters.append((seq, callback))
+                return
+            ok = not self._seq_failed(seq)
+        callback(ok)
+
+    def _seq_failed(self, seq: int) -> bool:
+        return any(first <= seq <= last for first, last in self._failed)
+
+    def update(self, booking_id: str, changes: dict, timeout: float = 5.0) -> dict | None:
+        """
+        Apply `changes` to one booking and rewrite the log atomically.
+
+        Waits for queued appends first, so a booking created moments ago can
+        be updated. Returns the updated booking, or None if it does not exist.
+        """
+        with self._cond:
+            seq = self._submitted
+        self.wait_committed(seq, timeout)
+        with self._file_lock:
+            bookings = self._read_all()
+            booking = next((b for b in bookings if b.get("booking_id") == booking_id), None)
+            if booking is None:
+                return None
+            booking.update(changes)
+            payload = "".join(json.dumps(b) + "\n" for b in bookings).encode("utf-8")
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(payload)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            # Re-index from the bytes just written rather than re-reading the new file.
+            with self._index_lock:
+                self._index, self._inode, self._offset = {}, os.stat(self.path).st_ino, len(payload)
+                for line in payload.splitlines():
+                    self._index_line(line)
+            self.stats["updates"] += 1
+        return booking
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush the remaining queue and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+    def _start_writer(self) -> None:
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="booking-group-commit", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    self._thread = None
+                    return
+                group, self._pending = self._pending, []
+
+            payload = "".join(json.dumps(b) + "\n" for b in group)
+            failed = False
+            try:
+                with self._file_lock, open(self.path, "a", encoding="utf-8") as f:
+                    f.write(payload)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+            except OSError as e:
+                logger.error(f"Booking group commit failed ({len(group)} bookings): {e}")
+                self.stats["write_errors"] += len(group)
+                failed = True
+
+            with self._cond:
+                if failed:
+                    self._failed.append((self._committed + 1, self._committed + len(group)))
+                else:
+                    self.stats["committed"] += len(group)
+                self._committed += len(group)
+                self.stats["groups"] += 1
+                self._cond.notify_all()
+                due = [(seq, cb) for seq, cb in self._waiters if seq <= self._committed]
+                if due:
+                    self._waiters = [(seq, cb) for seq, cb in self._waiters if seq > self._committed]
+            for seq, callback in due:
+                try:
+                    callback(not failed)
+                except Exception as e:
+                    logger.error(f"Booking commit callback for #{seq} failed: {e}")
@@ -0,0 +1,265 @@
+"""
+RouteZero Carbon Export — streaming MRV exports from telemetry history.
+
+Reads the telemetry history line by line, emits per-event or per-vehicle-day
+rows as CSV chunks or Parquet row groups, and folds every record into a fresh
+FleetAccumulators so the carbon-report summary comes out of the same pass.
+Memory is bounded by the fleet size (one open day per vehicle, one row group),
+not by the length of the export period. Timestamps and day boundaries are UTC.
+
+Records at or before a vehicle's previous timestamp cannot be folded into the
+running totals; they are left out of the rows and counted in the summary's
+`export` block instead of disappearing silently.
+"""
+
+import csv
+import io
+import json
+import logging
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+
+from transforms.accumulators import FleetAccumulators, baseline_co2_kg
+
+logger = logging.getLogger(__name__)
+
+CSV_CHUNK_ROWS: int = 1000
+PARQUET_ROW_GROUP_ROWS: int = 50_000
+CREDIT_VALUE_INR_PER_TONNE: float = 430.0
+
+EVENT_COLUMNS: tuple[str, ...] = (
+    "timestamp", "vehicle_id", "route_id", "latitude", "longitude",
+    "speed_kmph", "fuel_consumed_liters", "co2_kg", "distance_km", "status",
+)
+DAY_COLUMNS: tuple[str, ...] = (
+    "date", "vehicle_id", "route_id", "events", "distance_km",
+    "fuel_liters", "co2_kg", "baseline_co2_kg", "credits_kg",
+)
+
+
+def parse_time(value: str | None) -> float | None:
+    """Accept unix seconds or an ISO-8601 date/datetime (UTC unless it has an offset); None passes through."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=UTC)
+        return moment.timestamp()
+
+
+def _utc(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=UTC)
+
+
+def summarize_carbon(vehicle_totals: dict[str, dict]) -> dict:
+    """
+    Carbon credit summary from cumulative per-vehicle totals.
+
+    Credits are the IPCC AR6 laden baseline for the distance travelled minus
+    actual CO₂, floored at zero per vehicle.
+    """
+    total_co2_kg = 0.0
+    baseline_co2_kg_sum = 0.0
+    vehicles_report = []
+    for vid, acc in vehicle_totals.items():
+        co2_kg = acc["co2_kg"]
+        baseline_kg = baseline_co2_kg(acc["distance_km"], acc.get("is_cold_chain", False))
+        total_co2_kg += co2_kg
+        baseline_co2_kg_sum += baseline_kg
+        vehicles_report.append({
+            "vehicle_id": vid,
+            "route": acc.get("route_id", ""),
+            "distance_km": round(acc["distance_km"], 2),
+            "co2_tonnes": round(co2_kg / 1000, 4),
+            "credits": round(max(0.0, baseline_kg - co2_kg) / 1000, 4),
+        })
+
+    total_co2_tonnes = total_co2_kg / 1000
+    baseline_co2_tonnes = baseline_co2_kg_sum / 1000
+    reduction_tonnes = max(0, baseline_co2_tonnes - total_co2_tonnes)
+    first_ts = min((acc["first_ts"] for acc in vehicle_totals.values()), default=None)
+    last_ts = max((acc["last_ts"] for acc in vehicle_totals.values()), default=None)
+
+    return {
+        "report_date": datetime.now().strftime("%Y-%m-%d"),
+        "reporting_period": "cumulative",
+        "period_start": _utc(first_ts).isoformat() if first_ts else None,
+        "period_end": _utc(last_ts).isoformat() if last_ts else None,
+        "total_co2_kg": round(total_co2_kg, 1),
+        "total_co2_tonnes": round(total_co2_tonnes, 3),
+        "baseline_co2_tonnes": round(baseline_co2_tonnes, 3),
+        "reduction_tonnes": round(reduction_tonnes, 3),
+        "carbon_credits_generated": round(reduction_tonnes, 3),
+        "credit_value_inr": round(reduction_tonnes * CREDIT_VALUE_INR_PER_TONNE, 0),
+        "methodology": "IPCC AR6 WGIII Table 10.1 + BEE-ICM 2024 MRV",
+        "vehicles": vehicles_report,
+        "compliance": {
+            "nlp_2022_target_pct": 20,
+            "achieved_pct": round(min(100, (reduction_tonnes / max(baseline_co2_tonnes, 0.001)) * 100), 1),
+            "status": "COMPLIANT" if reduction_tonnes > 0 else "NON-COMPLIANT",
+        },
+    }
+
+
+def iter_history(paths: list[Path], start: float | None = None, end: float | None = None,
+                 vehicle_id: str | None = None) -> Iterator[dict]:
+    """Yield telemetry records from JSONL files in order, filtered by time range and vehicle."""
+    for path in paths:
+        try:
+            f = open(path, encoding="utf-8")
+        except FileNotFoundError:
+            continue  # Compacted away after the segment list was taken.
+        with f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                ts = record.get("timestamp")
+                if not isinstance(ts, (int, float)):
+                    continue
+                if (start is not None and ts < start) or (end is not None and ts >= end):
+                    continue
+                if vehicle_id is not None and record.get("vehicle_id") != vehicle_id:
+                    continue
+                yield record
+
+
+class CarbonExport:
+    """
+    One export run: iterate rows for a granularity while accumulating the summary.
+
+    Attributes:
+        granularity (str): "event" or "day".
+        totals (FleetAccumulators): Filled as rows are produced.
+        summary (dict | None): Set once `rows()` is exhausted.
+        dropped (dict): Records left out of the rows: `out_of_order` (not newer
+            than the vehicle's previous record) and `invalid` (no id or timestamp).
+    """
+
+    def __init__(self, records: Iterator[dict], granularity: str = "event"):
+        if granularity not in ("event", "day"):
+            raise ValueError(f"granularity must be 'event' or 'day', got {granularity}")
+        self.granularity = granularity
+        self.columns = EVENT_COLUMNS if granularity == "event" else DAY_COLUMNS
+        self.totals = FleetAccumulators()
+        self.summary: dict | None = None
+        self.rows_written = 0
+        self.dropped = {"out_of_order": 0, "invalid": 0}
+        self._records = records
+
+    def rows(self) -> Iterator[tuple]:
+        """Yield export rows; the summary is available after the last row."""
+        open_days: dict[str, list] = {}
+        for record in self._records:
+            vid = record.get("vehicle_id")
+            before = self.totals.vehicles.get(vid, {}).get("distance_km", 0.0)
+            if not self.totals.update(record):
+                valid = vid and isinstance(record.get("timestamp"), (int, float))
+                self.dropped["out_of_order" if valid else "invalid"] += 1
+                continue
+            acc = self.totals.vehicles[vid]
+            distance = acc["distance_km"] - before
+
+            if self.granularity == "event":
+                self.rows_written += 1
+                yield (
+                    _utc(record["timestamp"]).isoformat(),
+                    vid,
+                    record.get("route_id", ""),
+                    record.get("latitude"),
+                    record.get("longitude"),
+                    record.get("speed_kmph"),
+                    record.get("fuel_consumed_liters"),
+                    record.get("co2_kg"),
+                    round(distance, 4),
+                    record.get("status", ""),
+                )
+                continue
+
+            day = _utc(record["timestamp"]).date().isoformat()
+            group = open_days.get(vid)
+            if group is not None and group[0] != day:
+                self.rows_written += 1
+                yield self._day_row(vid, group)
+                group = None
+            if group is None:
+                # [date, route_id, events, distance_km, fuel_liters, co2_kg, is_cold_chain]
+                group = open_days[vid] = [day, acc.get("route_id", ""), 0, 0.0, 0.0, 0.0, False]
+            group[2] += 1
+            group[3] += distance
+            group[4] += float(record.get("fuel_consumed_liters") or 0.0)
+            group[5] += float(record.get("co2_kg") or 0.0)
+            group[6] = acc.get("is_cold_chain", False)
+
+        for vid, group in open_days.items():
+            self.rows_written += 1
+            yield self._day_row(vid, group)
+        self.summary = summarize_carbon(self.totals.vehicles)
+        self.summary["export"] = {"rows": self.rows_written, "dropped": dict(self.dropped)}
+        if self.dropped["out_of_order"]:
+            logger.warning(f"Carbon export dropped {self.dropped['out_of_order']} out-of-order records")
+
+    @staticmethod
+    def _day_row(vid: str, group: list) -> tuple:
+        day, route_id, events, distance, fuel, co2, is_cold = group
+        baseline = baseline_co2_kg(distance, is_cold)
+        return (day, vid, route_id, events, round(distance, 3), round(fuel, 3), round(co2, 3),
+                round(baseline, 3), round(max(0.0, baseline - co2), 3))
+
+    def iter_csv(self) -> Iterator[str]:
+        """CSV text in chunks of CSV_CHUNK_ROWS rows, header first."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        pending = 0
+        for row in self.rows():
+            writer.writerow(row)
+            pending += 1
+            if pending >= CSV_CHUNK_ROWS:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        yield buffer.getvalue()
+
+    def write_parquet(self, path: Path) -> dict:
+        """
+        Write rows to a Parquet file one row group at a time.
+
+        The summary is stored in the file's key-value metadata under `routezero.carbon_report`.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {"events": pa.int64()}
+        types.update({name: pa.string() for name in ("timestamp", "date", "vehicle_id", "route_id", "status")})
+        schema = pa.schema([(name, types.get(name, pa.float64())) for name in self.columns])
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".parquet.tmp")
+        batch: list[tuple] = []
+        try:
+            with pq.ParquetWriter(str(tmp), schema) as writer:
+                for row in self.rows():
+                    batch.append(row)
+                    if len(batch) >= PARQUET_ROW_GROUP_ROWS:
+                        writer.write_table(pa.Table.from_pylist([dict(zip(self.columns, r)) for r in batch], schema=schema))
+                        batch.clear()
+                if batch:
+                    writer.write_table(pa.Table.from_pylist([dict(zip(self.columns, r)) for r in batch], schema=schema))
+                writer.add_key_value_metadata({"routezero.carbon_report": json.dumps(self.summary)})
+            tmp.replace(path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return self.summary
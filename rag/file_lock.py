@@ -0,0 +1,62 @@
+"""
+RouteZero File Locks — portable advisory locks on an open file.
+
+POSIX uses `fcntl.flock`. Windows has no fcntl, so `msvcrt.locking` locks a
+single byte at LOCK_OFFSET instead; the byte lies past any real content, so
+the holder can still rewrite the start of the file (e.g. a pid). Both kinds
+are released by the OS when the holding process dies.
+"""
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_OFFSET: int = 1 << 30
+"""Byte locked by the msvcrt fallback; locking past end-of-file is allowed on Windows."""
+
+
+def lock_file(f, blocking: bool = True) -> bool:
+    """
+    Take an exclusive lock on the open file `f`.
+
+    Args:
+        f: File object opened by this process.
+        blocking: Wait for the lock instead of failing when another holder has it.
+
+    Returns:
+        bool: True once held; False if `blocking` is off and the lock is taken.
+    """
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    pos = f.tell()  # pragma: no cover - Windows
+    f.seek(LOCK_OFFSET)
+    try:
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                # LK_LOCK gives up after ~10 s of retries; keep waiting like flock would.
+                if not blocking:
+                    return False
+    finally:
+        f.seek(pos)
+
+
+def unlock_file(f) -> None:
+    """Release a lock taken with `lock_file` (closing `f` releases it too)."""
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        return
+    pos = f.tell()  # pragma: no cover - Windows
+    f.seek(LOCK_OFFSET)
+    try:
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        f.seek(pos)
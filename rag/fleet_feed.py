@@ -0,0 +1,271 @@
+"""
+RouteZero Fleet Feed — filtered WebSocket fan-out of live vehicle updates.
+
+Clients subscribe with any combination of route ids, vehicle ids, statuses and
+a bounding box (AND across dimensions, OR within one). Each subscription is
+indexed under its most selective dimension:
+
+    vehicle_ids → by vehicle   routes → by route   bbox → by 1° grid cell
+    statuses → by status       no filter → "all"
+
+so routing an update only visits the subscriptions registered under that
+vehicle, its route, its cell, its status, or "all", then checks the remaining
+predicates. Fan-out cost tracks matching subscribers, not clients × vehicles.
+
+The feed is a FleetStateReader consumer: updates are coalesced per vehicle
+between broadcast ticks, and each connection has a bounded queue so one slow
+client drops its own batches instead of stalling everyone else. Frames are
+JSON text by default, or MessagePack binary when the optional `msgpack`
+package is installed and the client asks for it.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+FEED_INTERVAL_SEC: float = 0.5
+SUBSCRIBER_QUEUE_BATCHES: int = 32
+BBOX_CELL_DEG: float = 1.0
+MAX_BBOX_CELLS: int = 400
+"""Boxes spanning more cells than this are indexed under "all" and checked per update."""
+
+FILTER_KEYS: tuple[str, ...] = ("routes", "vehicle_ids", "statuses", "bbox")
+
+
+def parse_filters(message: dict) -> dict:
+    """
+    Validate a subscribe message into normalized filters.
+
+    Raises:
+        ValueError: On unknown keys or malformed values.
+    """
+    if not isinstance(message, dict):
+        raise ValueError("subscribe message must be a JSON object")
+    unknown = set(message) - set(FILTER_KEYS) - {"type"}
+    if unknown:
+        raise ValueError(f"unknown filter keys: {sorted(unknown)}")
+    filters: dict = {}
+    for key in ("routes", "vehicle_ids", "statuses"):
+        values = message.get(key)
+        if values is None:
+            continue
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"{key} must be a list of strings")
+        if values:
+            filters[key] = frozenset(values)
+    bbox = message.get("bbox")
+    if bbox is not None:
+        if (
+            not isinstance(bbox, list) or len(bbox) != 4
+            or not all(isinstance(x, (int, float)) for x in bbox)
+            or bbox[0] > bbox[2] or bbox[1] > bbox[3]
+        ):
+            raise ValueError("bbox must be [min_lat, min_lon, max_lat, max_lon]")
+        filters["bbox"] = tuple(float(x) for x in bbox)
+    return filters
+
+
+def _cell(lat: float, lon: float) -> tuple[int, int]:
+    return (math.floor(lat / BBOX_CELL_DEG), math.floor(lon / BBOX_CELL_DEG))
+
+
+def matches(filters: dict, record: dict) -> bool:
+    """True if `record` satisfies every filter dimension present."""
+    if "vehicle_ids" in filters and record.get("vehicle_id") not in filters["vehicle_ids"]:
+        return False
+    if "routes" in filters and record.get("route_id") not in filters["routes"]:
+        return False
+    if "statuses" in filters and record.get("status") not in filters["statuses"]:
+        return False
+    if "bbox" in filters:
+        lat, lon = record.get("latitude"), record.get("longitude")
+        if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+            return False
+        min_lat, min_lon, max_lat, max_lon = filters["bbox"]
+        if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            return False
+    return True
+
+
+class Subscription:
+    """
+    One connection's filters and outbound queue.
+
+    Attributes:
+        id (int): Process-unique subscription id.
+        filters (dict): Output of `parse_filters`.
+        binary (bool): Encode frames as MessagePack.
+        queue (asyncio.Queue): Pending outbound batches.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, binary: bool = False):
+        self.id = next(self._ids)
+        self.filters: dict = {}
+        self.binary = binary
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_BATCHES)
+        self.dropped = 0
+
+    def offer(self, message: dict) -> bool:
+        """Queue a message without blocking; False (and counted) if the client is behind."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def encode(self, message: dict) -> bytes | str:
+        """Frame payload in the subscription's format."""
+        if self.binary:
+            import msgpack
+
+            return msgpack.packb(message, use_bin_type=True)
+        return json.dumps(message)
+
+
+class SubscriptionIndex:
+    """Subscriptions keyed by their most selective filter dimension."""
+
+    def __init__(self):
+        self.by_vehicle: dict[str, set[int]] = {}
+        self.by_route: dict[str, set[int]] = {}
+        self.by_cell: dict[tuple[int, int], set[int]] = {}
+        self.by_status: dict[str, set[int]] = {}
+        self.unkeyed: set[int] = set()
+        self.subs: dict[int, Subscription] = {}
+        self._keys: dict[int, list[tuple[dict, object]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.subs)
+
+    def add(self, sub: Subscription) -> None:
+        """Index `sub` under its current filters (re-indexes if already present)."""
+        self.remove(sub)
+        filters = sub.filters
+        keys: list[tuple[dict, object]] = []
+        if "vehicle_ids" in filters:
+            keys = [(self.by_vehicle, v) for v in filters["vehicle_ids"]]
+        elif "routes" in filters:
+            keys = [(self.by_route, r) for r in filters["routes"]]
+        elif "bbox" in filters:
+            (lo_lat, lo_lon), (hi_lat, hi_lon) = _cell(*filters["bbox"][:2]), _cell(*filters["bbox"][2:])
+            if (hi_lat - lo_lat + 1) * (hi_lon - lo_lon + 1) <= MAX_BBOX_CELLS:
+                keys = [
+                    (self.by_cell, (i, j))
+                    for i in range(lo_lat, hi_lat + 1)
+                    for j in range(lo_lon, hi_lon + 1)
+                ]
+        elif "statuses" in filters:
+            keys = [(self.by_status, s) for s in filters["statuses"]]
+        if keys:
+            for table, key in keys:
+                table.setdefault(key, set()).add(sub.id)
+        else:
+            self.unkeyed.add(sub.id)
+        self.subs[sub.id] = sub
+        self._keys[sub.id] = keys
+
+    def remove(self, sub: Subscription) -> None:
+        """Drop `sub` from every index it is registered in."""
+        if self.subs.pop(sub.id, None) is None:
+            return
+        self.unkeyed.discard(sub.id)
+        for table, key in self._keys.pop(sub.id, []):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.discard(sub.id)
+                if not bucket:
+                    del table[key]
+
+    def candidates(self, record: dict) -> set[int]:
+        """Subscription ids that may match `record` (a superset of the true matches)."""
+        found = set(self.unkeyed)
+        found |= self.by_vehicle.get(record.get("vehicle_id"), set())
+        found |= self.by_route.get(record.get("route_id"), set())
+        found |= self.by_status.get(record.get("status"), set())
+        lat, lon = record.get("latitude"), record.get("longitude")
+        if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+            found |= self.by_cell.get(_cell(lat, lon), set())
+        return found
+
+    def match(self, record: dict) -> list[Subscription]:
+        """Subscriptions whose filters `record` satisfies."""
+        return [self.subs[i] for i in self.candidates(record) if matches(self.subs[i].filters, record)]
+
+
+class FleetFeed:
+    """
+    Coalescing update buffer + subscription index (FleetStateReader consumer).
+
+    Attributes:
+        index (SubscriptionIndex): Live subscriptions.
+        stats (dict): Updates seen, candidate checks, deliveries and drops.
+    """
+
+    name = "feed"
+
+    def __init__(self):
+        self.index = SubscriptionIndex()
+        self._pending: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.stats = {"updates": 0, "candidates_checked": 0, "deliveries": 0, "dropped_slow": 0, "ticks": 0}
+
+    def update(self, record: dict) -> bool:
+        """Buffer the newest record per vehicle until the next tick (no-op without subscribers)."""
+        vid = record.get("vehicle_id")
+        if not vid or not len(self.index):
+            return False
+        with self._lock:
+            self._pending[vid] = record
+        return True
+
+    def subscribe(self, sub: Subscription, filters: dict) -> None:
+        """Register or replace `sub`'s filters."""
+        sub.filters = filters
+        with self._lock:
+            self.index.add(sub)
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        """Stop routing updates to `sub`."""
+        with self._lock:
+            self.index.remove(sub)
+
+    def tick(self) -> int:
+        """
+        Route buffered updates to matching subscriptions, one batch message each.
+
+        Returns:
+            int: Number of subscriptions that received a batch.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            batches: dict[int, list[dict]] = {}
+            for record in pending.values():
+                candidates = self.index.candidates(record)
+                self.stats["candidates_checked"] += len(candidates)
+                for sid in candidates:
+                    if matches(self.index.subs[sid].filters, record):
+                        batches.setdefault(sid, []).append(record)
+            subs = {sid: self.index.subs[sid] for sid in batches}
+        self.stats["updates"] += len(pending)
+        self.stats["ticks"] += 1
+        for sid, records in batches.items():
+            if subs[sid].offer({"type": "update", "vehicles": records}):
+                self.stats["deliveries"] += 1
+            else:
+                self.stats["dropped_slow"] += 1
+        return len(batches)
+
+    def to_dict(self) -> dict:
+        """Subscriptions are per-connection; nothing to checkpoint."""
+        return {}
+
+    def load_dict(self, state: dict) -> None:
+        """No-op."""
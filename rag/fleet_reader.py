@@ -0,0 +1,260 @@
+"""
+RouteZero Fleet Reader — incremental tail of Pathway's fleet_summary.jsonl.
+
+Keeps the latest record per vehicle by reading only the bytes appended since
+the previous refresh, and feeds every new record to the live spatial index and
+to any registered consumers (accumulators, state machines). Handles the
+simulator's truncate-and-rewrite, log rotation (the rest of a rotated file is
+drained through the still-open handle) and partially written lines, and checkpoints
+its file offset plus consumer state so restarts resume without rescanning.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Protocol
+
+from rag.spatial_index import GridIndex
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_INTERVAL_SEC: float = 30.0
+
+
+class RecordConsumer(Protocol):
+    """Incremental per-record state fed by FleetStateReader."""
+
+    name: str
+
+    def update(self, record: dict) -> bool: ...
+
+    def to_dict(self) -> dict: ...
+
+    def load_dict(self, state: dict) -> None: ...
+
+
+class FleetStateReader:
+    """
+    Latest-state-per-vehicle view over an append-only JSONL file.
+
+    Attributes:
+        path (Path): JSONL file written by Pathway or simulate_pipeline.py.
+        latest (dict[str, dict]): vehicle_id → most recent record.
+        index (GridIndex): Spatial index over each vehicle's latest position.
+        consumers (list[RecordConsumer]): Incremental state updated per record.
+        checkpoint_path (Path | None): Where offset and consumer state are persisted.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        index: GridIndex | None = None,
+        consumers: list[RecordConsumer] | None = None,
+        checkpoint_path: Path | None = None,
+    ):
+        self.path = path
+        self.index = index if index is not None else GridIndex()
+        self.consumers = consumers or []
+        self.checkpoint_path = checkpoint_path
+        self.latest: dict[str, dict] = {}
+        self.records_read = 0
+        self.stats = {"parse_errors": 0, "dropped_no_vehicle": 0}
+        self._offset = 0
+        self._inode: int | None = None
+        self._truncations = 0
+        self._file = None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_checkpoint = time.monotonic()
+        if checkpoint_path is not None:
+            self._load_checkpoint()
+
+    def refresh(self) -> int:
+        """
+        Apply any records appended since the last call.
+
+        Returns:
+            int: Number of new records applied.
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return 0
+            applied = 0
+            if st.st_ino != self._inode:
+                # Rotated or replaced: finish the old file through the handle still
+                # open on it, then start from the top of the new one.
+                if self._file is not None:
+                    applied += self._consume(self._file, os.fstat(self._file.fileno()).st_size)
+                    self._file.close()
+                    self._file = None
+                    self._offset = 0
+                try:
+                    self._file = open(self.path, "rb")
+                except OSError as e:
+                    logger.error(f"Error opening {self.path}: {e}")
+                    return applied
+                inode = os.fstat(self._file.fileno()).st_ino
+                if inode != self._inode:
+                    self._inode = inode
+                    self._offset = 0
+                st = os.fstat(self._file.fileno())
+            if st.st_size < self._offset:
+                self._offset = 0  # Truncated in place.
+                self._truncations += 1
+            if self._file is None:
+                self._file = open(self.path, "rb")
+            applied += self._consume(self._file, st.st_size)
+            if applied:
+                self.records_read += applied
+                self._dirty = True
+            if self._dirty and self.checkpoint_path is not None and time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL_SEC:
+                self._save_checkpoint()
+            return applied
+
+    def _consume(self, f, size: int) -> int:
+        """Apply complete lines between the current offset and `size`."""
+        if size <= self._offset:
+            return 0
+        try:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        except OSError as e:
+            logger.error(f"Error reading {self.path}: {e}")
+            return 0
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return 0  # Writer is mid-line; pick it up next time.
+        self._offset += end + 1
+        applied = 0
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                self.stats["parse_errors"] += 1
+                continue
+            self._apply(record)
+            applied += 1
+        return applied
+
+    def _apply(self, record: dict) -> None:
+        vid = record.get("vehicle_id")
+        if not vid:
+            self.stats["dropped_no_vehicle"] += 1
+            return
+        self._place(vid, record)
+        for consumer in self.consumers:
+            consumer.update(record)
+
+    def _place(self, vid: str, record: dict) -> None:
+        self.latest[vid] = record
+        lat, lon = record.get("latitude"), record.get("longitude")
+        if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+            self.index.upsert(vid, lat, lon)
+        else:
+            self.index.remove(vid)
+
+    @property
+    def version(self) -> str:
+        """
+        Applied log position (inode, truncations, offset), without refreshing.
+
+        Changes whenever new records are applied, and is the same in every
+        process tailing the same file, so it can key HTTP caches and ETags.
+        """
+        return f"{self._inode or 0:x}.{self._truncations:x}.{self._offset:x}"
+
+    @property
+    def lag_bytes(self) -> int:
+        """Bytes written to the log but not yet applied (without refreshing)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        return st.st_size - self._offset if st.st_ino == self._inode else st.st_size
+
+    @contextmanager
+    def view(self):
+        """Refresh, then hold the state lock while the caller reads `latest` and consumers."""
+        self.refresh()
+        with self._lock:
+            yield self
+
+    def snapshot(self) -> list[dict]:
+        """Refresh, then return the latest record for every known vehicle."""
+        self.refresh()
+        with self._lock:
+            return list(self.latest.values())
+
+    def within_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list[dict]:
+        """Latest records of vehicles inside the bounding box."""
+        self.refresh()
+        with self._lock:
+            return [self.latest[vid] for vid in self.index.query_bbox(min_lat, min_lon, max_lat, max_lon)]
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> list[dict]:
+        """Latest records within `radius_km` of the point, nearest first, with `distance_km`."""
+        self.refresh()
+        with self._lock:
+            hits = self.index.query_radius(lat, lon, radius_km)
+            return [{**self.latest[vid], "distance_km": round(d, 3)} for vid, d in hits]
+
+    def nearest(self, lat: float, lon: float, k: int) -> list[dict]:
+        """Latest records of the `k` vehicles nearest the point, with `distance_km`."""
+        self.refresh()
+        with self._lock:
+            hits = self.index.nearest(lat, lon, k)
+            return [{**self.latest[vid], "distance_km": round(d, 3)} for vid, d in hits]
+
+    def checkpoint(self) -> None:
+        """Persist offset, latest records and consumer state now (e.g. on shutdown)."""
+        if self.checkpoint_path is None:
+            return
+        with self._lock:
+            if self._dirty:
+                self._save_checkpoint()
+
+    def _save_checkpoint(self) -> None:
+        state = {
+            "path": str(self.path),
+            "offset": self._offset,
+            "inode": self._inode,
+            "latest": self.latest,
+            "consumers": {c.name: c.to_dict() for c in self.consumers},
+        }
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        try:
+            self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp, self.checkpoint_path)
+            self._dirty = False
+        except OSError as e:
+            logger.error(f"Fleet checkpoint failed: {e}")
+        self._last_checkpoint = time.monotonic()
+
+    def _load_checkpoint(self) -> None:
+        try:
+            state = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Ignoring unreadable fleet checkpoint {self.checkpoint_path}: {e}")
+            return
+        if state.get("path") != str(self.path):
+            return
+        self._offset = state.get("offset", 0)
+        self._inode = state.get("inode")
+        for vid, record in state.get("latest", {}).items():
+            self._place(vid, record)
+        saved = state.get("consumers", {})
+        for consumer in self.consumers:
+            if consumer.name in saved:
+                consumer.load_dict(saved[consumer.name])
+        logger.info(f"Fleet state restored: {len(self.latest)} vehicles, offset {self._offset}")
@@ -6,9 +6,16 @@ and India's National Logistics Policy (NLP 2022) to resolve supply-chain bottlen
 """
 
 import logging
+import os
+from collections.abc import Iterator
+
+from transforms.routing import get_road_graph, suggest_corridor_reroutes
 
 logger = logging.getLogger(__name__)
 
+GEMINI_MODEL: str = "gemini-1.5-pro"
+"""Gemini model used for free-form fleet questions."""
+
 def evaluate_risk(vehicle_id: str, payload_data: dict) -> str | None:
     """
     Evaluate real-time risk of a specific vehicle using LLM retrieval.
@@ -21,9 +28,67 @@ def evaluate_risk(vehicle_id: str, payload_data: dict) -> str | None:
         str | None: LLM-generated resolution text or None if evaluation fails.
     """
     try:
-        # Placeholder for actual Gemini LLM integration logic
         logger.info(f"Evaluating LLM risk for vehicle: {vehicle_id}")
-        return "Reroute via Highway 48 to minimize 14% ETA delay."
+        route_id = payload_data.get("route_id", "")
+        suggestions = suggest_corridor_reroutes(get_road_graph(), route_id, [{**payload_data, "vehicle_id": vehicle_id}])
+        if not suggestions or "via" not in suggestions[0]:
+            return None
+        best = suggestions[0]
+        return (
+            f"Reroute via {' → '.join(best['via'])} to {best['destination'].title()}: "
+            f"{best['distance_km']:.0f} km, est. {best['co2_kg']:.0f} kg CO₂."
+        )
     except Exception as e:
         logger.error(f"RouteZero AI inference rejected: {e}")
         return None
+
+
+def _build_fleet_prompt(query: str, fleet: list[dict]) -> str:
+    """Compose a compact grounding prompt from the live fleet snapshot."""
+    lines = [
+        "You are RouteZero AI, a carbon intelligence assistant for Indian freight fleets.",
+        "Answer using the live fleet data below and cite IPCC AR6 WGIII or NLP 2022 where relevant.",
+        "",
+        "Live fleet:",
+    ]
+    for v in fleet:
+        lines.append(
+            f"- {v.get('vehicle_id')} route={v.get('route_id')} co2_kg={v.get('co2_kg', 0)} "
+            f"status={v.get('status', 'NORMAL')} eta={v.get('eta_status', 'UNKNOWN')}"
+        )
+    lines += ["", f"Question: {query}"]
+    return "\n".join(lines)
+
+
+def stream_fleet_answer(query: str, fleet: list[dict]) -> Iterator[str]:
+    """
+    Stream a Gemini answer for a free-form fleet question, chunk by chunk.
+
+    Yields nothing when GEMINI_API_KEY is unset, the SDK is not installed, or the
+    request fails before the first chunk, so callers can fall back to a canned answer.
+
+    Args:
+        query (str): The operator's natural-language question.
+        fleet (list[dict]): Latest record per vehicle, used as grounding context.
+
+    Yields:
+        str: Text chunks in generation order.
+    """
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        return
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        logger.warning("google-generativeai not installed — streaming chat uses fallback answers.")
+        return
+
+    try:
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(GEMINI_MODEL)
+        for chunk in model.generate_content(_build_fleet_prompt(query, fleet), stream=True):
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+    except Exception as e:
+        logger.error(f"RouteZero AI streaming rejected: {e}")
@@ -0,0 +1,136 @@
+"""
+RouteZero HTTP Cache — conditional GETs and pre-serialized bodies for polled endpoints.
+
+Dashboard endpoints are pure functions of the fleet data version (the fleet
+log position, plus the ETA log where it is read), so each is rendered at most
+once per version and every poll in between is answered from memory:
+
+    If-None-Match matches   304, no render and no body (the common poll)
+    cached version          the stored body, re-encoded at most once per encoding
+    new version             render, serialize once (orjson when installed), store
+
+Bodies are negotiated per request: MessagePack for `Accept: application/msgpack`
+(with the optional `msgpack` extra installed, JSON otherwise) and gzip for
+`Accept-Encoding: gzip` above GZIP_MIN_BYTES. ETags are weak, since every
+encoding of a version carries the same data.
+"""
+
+import gzip
+import json
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+GZIP_MIN_BYTES: int = 1024
+GZIP_LEVEL: int = 5
+MSGPACK_TYPES: tuple[str, ...] = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+try:
+    import orjson
+
+    def dumps(payload: Any) -> bytes:
+        """Compact JSON bytes (orjson)."""
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:  # pragma: no cover - depends on the optional extra
+    def dumps(payload: Any) -> bytes:
+        """Compact JSON bytes (stdlib fallback)."""
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def etag_for(version: str) -> str:
+    return f'W/"{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class CachedBody:
+    """One rendered payload with its encodings built on first request."""
+
+    __slots__ = ("version", "payload", "_encodings")
+
+    def __init__(self, version: str, payload: Any):
+        self.version = version
+        self.payload = payload
+        self._encodings: dict[tuple[str, bool], bytes] = {}
+
+    def encoded(self, media_type: str, gzipped: bool) -> bytes:
+        key = (media_type, gzipped)
+        body = self._encodings.get(key)
+        if body is None:
+            if gzipped:
+                body = gzip.compress(self.encoded(media_type, False), compresslevel=GZIP_LEVEL)
+            elif media_type == "application/json":
+                body = dumps(self.payload)
+            else:
+                import msgpack
+
+                body = msgpack.packb(self.payload, use_bin_type=True)
+            self._encodings[key] = body
+        return body
+
+
+def _wants_msgpack(accept: str) -> bool:
+    if not any(t in accept for t in MSGPACK_TYPES):
+        return False
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ResponseCache:
+    """
+    Latest rendered body per endpoint key, answered conditionally.
+
+    Attributes:
+        stats (dict): not_modified (304s), hits (served from memory), renders.
+    """
+
+    def __init__(self):
+        self._bodies: dict[str, CachedBody] = {}
+        self._lock = threading.Lock()
+        self.stats = {"not_modified": 0, "hits": 0, "renders": 0}
+
+    def body(self, key: str, version: str, render: Callable[[], Any]) -> CachedBody:
+        """The body for `key` at `version`, rendering it if this version is new."""
+        cached = self._bodies.get(key)
+        if cached is not None and cached.version == version:
+            self.stats["hits"] += 1
+            return cached
+        cached = CachedBody(version, render())
+        with self._lock:
+            self._bodies[key] = cached
+            self.stats["renders"] += 1
+        return cached
+
+    def respond(self, request: Request, key: str, version: str, render: Callable[[], Any]) -> Response:
+        """304 if the client already holds `version`, else the (cached) body in the negotiated encoding."""
+        etag = etag_for(version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        cached = self.body(key, version, render)
+        media_type = "application/msgpack" if _wants_msgpack(request.headers.get("accept", "")) else "application/json"
+        gzipped = "gzip" in request.headers.get("accept-encoding", "")
+        if gzipped and len(cached.encoded(media_type, False)) < GZIP_MIN_BYTES:
+            gzipped = False
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+        return Response(cached.encoded(media_type, gzipped), media_type=media_type, headers=headers)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bodies.clear()
@@ -0,0 +1,234 @@
+"""
+RouteZero Invoices — freight invoice rendering, caching and bulk export.
+
+The box-drawn invoice is a module-level template filled with `str.format_map`
+from fields extracted once per booking, instead of an f-string rebuilt inside
+the request handler. Rendered text is cached per booking and keyed on the
+booking's version (see `BookingStore.versioned`), so a dispatch or document
+update re-renders only that invoice.
+
+Bulk runs stream either one text document (invoices separated by form feeds,
+so each prints on its own page) or a ZIP with one `INV-<booking_id>.txt` per
+booking, built incrementally so memory stays flat however many invoices are
+selected.
+"""
+
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+
+from rag.carbon_export import parse_time
+
+INVOICE_TEMPLATE = """
+╔══════════════════════════════════════════════╗
+║           ROUTEZERO LOGISTICS                ║
+║           FREIGHT INVOICE                    ║
+╠══════════════════════════════════════════════╣
+  Invoice ID:    INV-{booking_id}
+  Booking ID:    {booking_id}
+  Date:          {created_at}
+
+  Customer:      {customer_name}
+  Sender Email:  {sender_email}
+
+  Origin:        {origin}
+  Destination:   {destination}
+
+  Receiver:      {receiver_name}
+  Receiver Email:{receiver_email}
+
+  ── Commodities ──────────────────────────────
+  {commodities}
+
+  Total Weight:  {total_weight} KG
+  Rate/KG:       ₹{rate_per_kg}
+  Service Tax:   {service_tax_pct}%
+  ─────────────────────────────────────────────
+  FREIGHT TOTAL: ₹{freight:.2f}
+
+  Status:        {status}
+  Vehicle:       {vehicle_id}
+  Expected Del:  {expected_delivery}
+╚══════════════════════════════════════════════╝
+"""
+
+PAGE_BREAK = "\n\f\n"
+ZIP_COMPRESS_LEVEL = 6
+DATE_FIELDS = ("created_at", "dispatched_at")
+
+
+def format_commodities(commodities: list[dict]) -> str:
+    """Format commodity list for invoice."""
+    if not commodities:
+        return "  No commodities listed"
+    lines = []
+    for c in commodities:
+        lines.append(f"  {c.get('name', 'Unknown')}: {c.get('weight_kg', 0)} KG")
+    return "\n".join(lines)
+
+
+def render_invoice(booking: dict) -> str:
+    """Plain text invoice for one booking."""
+    return INVOICE_TEMPLATE.format_map({
+        "booking_id": booking.get("booking_id"),
+        "created_at": booking.get("created_at", "N/A"),
+        "customer_name": booking.get("customer_name", "N/A"),
+        "sender_email": booking.get("sender_email", "N/A"),
+        "origin": booking.get("origin", "N/A"),
+        "destination": booking.get("destination", "N/A"),
+        "receiver_name": booking.get("receiver_name", "N/A"),
+        "receiver_email": booking.get("receiver_email", "N/A"),
+        "commodities": format_commodities(booking.get("commodities", [])),
+        "total_weight": booking.get("total_weight", 0),
+        "rate_per_kg": booking.get("rate_per_kg", 0),
+        "service_tax_pct": booking.get("service_tax_pct", 0),
+        "freight": booking.get("freight", 0),
+        "status": booking.get("status", "N/A").upper(),
+        "vehicle_id": booking.get("vehicle_id", "Unassigned"),
+        "expected_delivery": booking.get("expected_delivery", "N/A"),
+    }).strip()
+
+
+class InvoiceCache:
+    """
+    Rendered invoices keyed on booking id, valid while the booking version is unchanged.
+
+    Attributes:
+        max_entries (int): Least recently used invoices are dropped beyond this many.
+        stats (dict): hits, renders, evicted.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "renders": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def render(self, booking: dict, version: str) -> str:
+        booking_id = booking.get("booking_id")
+        with self._lock:
+            cached = self._entries.get(booking_id)
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(booking_id)
+                self.stats["hits"] += 1
+                return cached[1]
+        text = render_invoice(booking)
+        with self._lock:
+            self._entries[booking_id] = (version, text)
+            self._entries.move_to_end(booking_id)
+            self.stats["renders"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+        return text
+
+
+def _booking_ts(booking: dict, field: str) -> float | None:
+    value = booking.get(field)
+    if not value:
+        return None
+    try:
+        return parse_time(str(value))
+    except ValueError:
+        return None
+
+
+def select_bookings(
+    versioned: Iterable[tuple[dict, str]],
+    booking_ids: set[str] | None = None,
+    status: str | None = None,
+    vehicle_id: str | None = None,
+    customer_name: str | None = None,
+    start: float | None = None,
+    end: float | None = None,
+    date_field: str = "created_at",
+) -> list[tuple[dict, str]]:
+    """
+    Bookings matching every given filter, in log order.
+
+    `start`/`end` (unix seconds, end exclusive) apply to `date_field`;
+    bookings without that field are excluded when either bound is set.
+    """
+    selected = []
+    for booking, version in versioned:
+        if booking_ids is not None and booking.get("booking_id") not in booking_ids:
+            continue
+        if status and booking.get("status") != status:
+            continue
+        if vehicle_id and booking.get("vehicle_id") != vehicle_id:
+            continue
+        if customer_name and booking.get("customer_name") != customer_name:
+            continue
+        if start is not None or end is not None:
+            ts = _booking_ts(booking, date_field)
+            if ts is None or (start is not None and ts < start) or (end is not None and ts >= end):
+                continue
+        selected.append((booking, version))
+    return selected
+
+
+def iter_invoice_text(
+    selected: Iterable[tuple[dict, str]], cache: InvoiceCache, batch_bytes: int = 256 * 1024
+) -> Iterator[bytes]:
+    """All invoices as one UTF-8 document, one page per invoice, streamed in ~`batch_bytes` chunks."""
+    pages: list[str] = []
+    size = 0
+    for booking, version in selected:
+        text = cache.render(booking, version)
+        pages.append(text)
+        size += len(text)
+        if size >= batch_bytes:
+            yield (PAGE_BREAK.join(pages) + PAGE_BREAK).encode("utf-8")
+            pages, size = [], 0
+    if pages:
+        yield (PAGE_BREAK.join(pages) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands ZIP bytes to the response as they are produced."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_invoice_zip(
+    selected: Iterable[tuple[dict, str]], cache: InvoiceCache, batch_bytes: int = 256 * 1024
+) -> Iterator[bytes]:
+    """A ZIP archive with one `INV-<booking_id>.txt` per booking, streamed in ~`batch_bytes` chunks."""
+    sink = _ChunkSink()
+    # An unseekable sink makes zipfile write data descriptors, so nothing is ever rewritten.
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESS_LEVEL) as zf:
+        pending = 0
+        for booking, version in selected:
+            data = cache.render(booking, version).encode("utf-8")
+            info = zipfile.ZipInfo(f"INV-{booking.get('booking_id')}.txt", _zip_date(booking))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, data, compresslevel=ZIP_COMPRESS_LEVEL)
+            pending += len(data)
+            if pending >= batch_bytes:
+                yield sink.drain()
+                pending = 0
+    yield sink.drain()
+
+
+def _zip_date(booking: dict) -> tuple[int, int, int, int, int, int]:
+    ts = _booking_ts(booking, "created_at")
+    moment = datetime.fromtimestamp(ts) if ts is not None else datetime(1980, 1, 1)
+    return max(moment, datetime(1980, 1, 1)).timetuple()[:6]
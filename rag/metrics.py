@@ -0,0 +1,169 @@
+"""
+RouteZero Metrics — Prometheus text exposition from cheap in-process counters.
+
+Two kinds of sources feed `/metrics`:
+
+    instruments   Counter / Histogram objects updated on the hot path
+                  (one dict lookup and a locked add per update)
+    collectors    callables run only at scrape time that read the stats
+                  components already keep (ingestor, reader, queues, ...)
+
+so most series cost nothing between scrapes. Request latency uses the same
+log-linear LatencyHistogram as the staleness tracer and is folded into fixed
+Prometheus `le` buckets at scrape time.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+from rag.tracing import LatencyHistogram
+
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = tuple[dict[str, str], float]
+Family = tuple[str, str, str, list[Sample]]
+"""(name, type, help, samples); histogram families use LatencyHistogram values."""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> Family:
+        with self._lock:
+            items = list(self._values.items())
+        return self.name, "counter", self.help, [(dict(zip(self.labelnames, k)), v) for k, v in items]
+
+
+class Histogram:
+    """Labelled latency histogram exposed with LATENCY_BUCKETS."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._histograms: dict[tuple, LatencyHistogram] = {}
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            histogram = self._histograms.setdefault(labels, LatencyHistogram())
+        histogram.record(seconds)
+
+    def collect(self) -> Family:
+        items = list(self._histograms.items())
+        return self.name, "histogram", self.help, [(dict(zip(self.labelnames, k)), h) for k, h in items]
+
+
+class Registry:
+    """Instruments plus scrape-time collectors, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._instruments: list[Counter | Histogram] = []
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        counter = Counter(name, help, labelnames)
+        self._instruments.append(counter)
+        return counter
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Histogram:
+        histogram = Histogram(name, help, labelnames)
+        self._instruments.append(histogram)
+        return histogram
+
+    def collector(self, fn: Callable[[], Iterable[Family]]) -> Callable[[], Iterable[Family]]:
+        """Register a scrape-time collector (usable as a decorator)."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        """All families in Prometheus text exposition format 0.0.4."""
+        families = [i.collect() for i in self._instruments]
+        for fn in self._collectors:
+            families.extend(fn())
+        lines = []
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind != "histogram":
+                lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+                continue
+            for labels, histogram in samples:
+                counts = histogram.cumulative(LATENCY_BUCKETS)
+                for bound, n in zip(LATENCY_BUCKETS, counts):
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {n}")
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(round(histogram.total, 6))}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per route template.
+
+    Routes are labelled by their template (`/api/vehicle/{vehicle_id}`), never
+    the raw path, so label cardinality stays bounded. Event streams are
+    counted but not timed, since their duration is the client's session.
+    """
+
+    def __init__(self, app, requests: Counter, latency: Histogram):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(k == b"content-type" and v.startswith(b"text/event-stream")
+                                for k, v in message.get("headers", []))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            self.requests.inc(scope["method"], route, str(status))
+            if not streaming:
+                self.latency.observe(time.perf_counter() - started, scope["method"], route)
@@ -0,0 +1,313 @@
+"""
+RouteZero Notifications — coalescing, batched driver-alert delivery.
+
+`notify` only enqueues; a single worker thread delivers. Repeats of the same
+(vehicle_id, alert_type) inside COALESCE_WINDOW_SEC are merged instead of sent:
+
+    t=0    first alert        → delivered on the next flush (leading edge)
+    t<W    repeats            → folded into one trailing notification (`coalesced` = n)
+    t=W    window closes      → trailing notification delivered, if any
+
+so a HIGH_EMISSION_ALERT flapping every 2 s costs two deliveries per window,
+not thirty. Messages that must each arrive (a dispatcher's manual text) are
+submitted with `coalesce=False` and always queued as they are. Each flush hands one batch to every sink (one file append, one
+webhook POST), and the stats track throughput and write amplification
+(sink writes per submitted notification).
+
+A sink that raises keeps the batch and retries it with exponential backoff
+(RETRY_BASE_SEC doubling up to RETRY_MAX_SEC) for up to MAX_ATTEMPTS
+deliveries. A batch counts as `delivered` once every sink has taken it, and
+as `failed` if any sink gave up on it.
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.request
+from collections import deque
+from pathlib import Path
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW_SEC: float = 60.0
+MAX_PENDING: int = 10_000
+BATCH_MAX: int = 500
+FLUSH_INTERVAL_SEC: float = 0.5
+RETRY_BASE_SEC: float = 1.0
+RETRY_MAX_SEC: float = 60.0
+MAX_ATTEMPTS: int = 5
+"""Deliveries of one batch to one sink before it is dropped for that sink."""
+
+
+class NotificationSink(Protocol):
+    """Destination for notification batches."""
+
+    name: str
+
+    def deliver(self, batch: list[dict]) -> None: ...
+
+
+class FileSink:
+    """Appends each batch to a JSONL file in a single write."""
+
+    name = "file"
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def deliver(self, batch: list[dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(n) + "\n" for n in batch))
+
+
+class WebhookSink:
+    """POSTs each batch as a JSON array to a driver-app webhook."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, batch: list[dict]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(batch).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class LocalWebhookSink:
+    """
+    In-process stand-in for the driver-app webhook.
+
+    Keeps the most recent deliveries in a bounded buffer and can simulate
+    per-request latency, so batching effects are measurable without a server.
+    """
+
+    name = "local_webhook"
+
+    def __init__(self, latency_sec: float = 0.0, keep: int = 1000):
+        self.latency_sec = latency_sec
+        self.received: deque[dict] = deque(maxlen=keep)
+        self.requests = 0
+
+    def deliver(self, batch: list[dict]) -> None:
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        self.requests += 1
+        self.received.extend(batch)
+
+
+class NotificationQueue:
+    """
+    Bounded queue + coalescing windows + single delivery worker.
+
+    Attributes:
+        sinks (list[NotificationSink]): Every batch is delivered to each sink.
+        window_sec (float): Coalescing window per (vehicle_id, alert_type).
+        max_pending (int): Capacity; `notify` refuses beyond it.
+        start_worker (bool): False to drive `flush` by hand (tests, benchmarks).
+    """
+
+    def __init__(
+        self,
+        sinks: list[NotificationSink],
+        window_sec: float = COALESCE_WINDOW_SEC,
+        max_pending: int = MAX_PENDING,
+        flush_interval_sec: float = FLUSH_INTERVAL_SEC,
+        start_worker: bool = True,
+    ):
+        self.sinks = sinks
+        self.window_sec = window_sec
+        self.max_pending = max_pending
+        self.flush_interval_sec = flush_interval_sec
+        self.start_worker = start_worker
+        self._ready: deque[dict] = deque()
+        self._retries: list[dict] = []
+        self._windows: dict[tuple[str, str], dict] = {}
+        self._trailing = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self._busy_sec = 0.0
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "rejected_full": 0,
+            "delivered": 0,
+            "failed": 0,
+            "batches": 0,
+            "sink_writes": 0,
+            "sink_errors": 0,
+            "retries": 0,
+        }
+
+    @property
+    def pending(self) -> int:
+        """Notifications waiting for delivery, including open trailing ones."""
+        return len(self._ready) + self._trailing
+
+    def notify(self, notification: dict, now: float | None = None, coalesce: bool = True) -> str | None:
+        """
+        Submit a notification.
+
+        Args:
+            notification: Payload; `vehicle_id` and `alert_type` key its coalescing window.
+            coalesce: False to queue it on its own, outside any window.
+
+        Returns:
+            str | None: "queued" (leading edge), "coalesced" (merged into the
+            window's trailing notification) or None if the queue is full.
+        """
+        now = time.time() if now is None else now
+        key = (notification.get("vehicle_id", ""), notification.get("alert_type", ""))
+        with self._cond:
+            window = self._windows.get(key) if coalesce else None
+            if window is not None and now < window["end"]:
+                trailing = window["trailing"]
+                if trailing is None:
+                    if self.pending >= self.max_pending:
+                        self.stats["rejected_full"] += 1
+                        return None
+                    window["trailing"] = {**notification, "coalesced": 1}
+                    self._trailing += 1
+                else:
+                    trailing.update(notification, coalesced=trailing["coalesced"] + 1)
+                self.stats["submitted"] += 1
+                self.stats["coalesced"] += 1
+                return "coalesced"
+
+            if self.pending >= self.max_pending:
+                self.stats["rejected_full"] += 1
+                return None
+            if window is not None and window["trailing"] is not None:
+                # Window closed but not flushed yet: its summary goes out first.
+                self._ready.append(window["trailing"])
+                self._trailing -= 1
+            if coalesce:
+                self._windows[key] = {"end": now + self.window_sec, "trailing": None}
+            self._ready.append(notification)
+            self.stats["submitted"] += 1
+            if self._thread is None and self.start_worker:
+                self._start_worker()
+            self._cond.notify_all()
+            return "queued"
+
+    @property
+    def retrying(self) -> int:
+        """Notifications held for a sink retry."""
+        return sum(len(r["batch"]) for r in self._retries)
+
+    def flush(self, now: float | None = None) -> int:
+        """
+        Deliver everything ready now: queued leading edges, closed windows' trailing
+        notifications, and sink retries whose backoff has elapsed.
+
+        Returns:
+            int: Notifications taken off the queue in this flush (retries not included).
+        """
+        now = time.time() if now is None else now
+        with self._cond:
+            batch = [self._ready.popleft() for _ in range(min(len(self._ready), BATCH_MAX))]
+            for key, window in list(self._windows.items()):
+                if now >= window["end"]:
+                    if window["trailing"] is not None and len(batch) < BATCH_MAX:
+                        batch.append(window["trailing"])
+                        window["trailing"] = None
+                        self._trailing -= 1
+                    if window["trailing"] is None:
+                        del self._windows[key]
+            due = [r for r in self._retries if r["due"] <= now]
+            if due:
+                self._retries = [r for r in self._retries if r["due"] > now]
+        if not batch and not due:
+            return 0
+        started = time.perf_counter()
+        if batch:
+            delivery = {"outstanding": len(self.sinks), "failed": False}
+            for sink in self.sinks:
+                self._attempt(sink, batch, delivery, 1, now)
+            self.stats["batches"] += 1
+        for retry in due:
+            self.stats["retries"] += 1
+            self._attempt(retry["sink"], retry["batch"], retry["delivery"], retry["attempts"] + 1, now)
+        self._busy_sec += time.perf_counter() - started
+        return len(batch)
+
+    def _attempt(self, sink: NotificationSink, batch: list[dict], delivery: dict, attempts: int, now: float) -> None:
+        """Deliver a batch to one sink; on failure schedule a retry or give up, then settle the batch."""
+        try:
+            sink.deliver(batch)
+            self.stats["sink_writes"] += 1
+        except Exception as e:
+            self.stats["sink_errors"] += 1
+            if attempts < MAX_ATTEMPTS:
+                delay = min(RETRY_BASE_SEC * 2 ** (attempts - 1), RETRY_MAX_SEC)
+                logger.warning(
+                    f"Notification sink {sink.name} failed ({len(batch)} notifications, attempt {attempts}), "
+                    f"retrying in {delay:.0f}s: {e}"
+                )
+                with self._cond:
+                    self._retries.append(
+                        {"sink": sink, "batch": batch, "delivery": delivery, "attempts": attempts, "due": now + delay}
+                    )
+                return
+            logger.error(f"Notification sink {sink.name} gave up on {len(batch)} notifications after {attempts} attempts: {e}")
+            delivery["failed"] = True
+        delivery["outstanding"] -= 1
+        if delivery["outstanding"] == 0:
+            self.stats["failed" if delivery["failed"] else "delivered"] += len(batch)
+
+    def metrics(self) -> dict:
+        """Counters plus delivery throughput and write amplification."""
+        submitted = self.stats["submitted"]
+        return {
+            **self.stats,
+            "pending": self.pending,
+            "retrying": self.retrying,
+            "avg_batch_size": round((self.stats["delivered"] + self.stats["failed"]) / self.stats["batches"], 2) if self.stats["batches"] else 0.0,
+            "delivered_per_busy_sec": round(self.stats["delivered"] / self._busy_sec, 1) if self._busy_sec else None,
+            "write_amplification": round(self.stats["sink_writes"] / submitted, 4) if submitted else 0.0,
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Deliver queued notifications (trailing ones included) and stop the worker.
+
+        Pending retries get one last attempt; batches that still fail are counted as failed.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+        while self.flush(now=float("inf")):
+            pass
+        for retry in self._retries:
+            retry["attempts"] = MAX_ATTEMPTS - 1
+        self.flush(now=float("inf"))
+
+    def _start_worker(self) -> None:
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="notification-delivery", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._ready) >= BATCH_MAX, timeout=self.flush_interval_sec)
+                if self._closed:
+                    self._thread = None
+                    return
+                if not self._ready and not self._windows and not self._retries:
+                    self._thread = None
+                    return
+            self.flush()
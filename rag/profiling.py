@@ -0,0 +1,317 @@
+"""
+RouteZero Profiling — opt-in sampled request profiles and UDF timing.
+
+Two surfaces, both off by default and switchable at runtime:
+
+    request profiles   ProfilingMiddleware picks a fraction of requests and
+                       runs a StackSampler for their duration; each profile is
+                       written as collapsed stacks (`frame;frame;frame count`),
+                       the input format of flamegraph.pl, speedscope and inferno
+    UDF timing         transforms.timing aggregates per-call cost of the Pathway
+                       UDFs; the Profiler flips it through a control file the
+                       pipeline process watches and merges the dumps it writes;
+                       dumps a process stopped refreshing (it exited or was
+                       restarted under a new pid) are deleted, not merged
+
+The sampler reads `sys._current_frames()` from a background thread, so it needs
+no dependencies and costs nothing for requests that are not sampled. It sees
+every thread in the process, not just the sampled request's, and idle stacks
+(event-loop selects, pool workers waiting for work) are dropped. At most one
+profile runs at a time, so overlapping samples never stack sampler threads;
+the slot frees when the sampler stops, which is at the latest after
+`max_duration_sec`, even if the request is still running. Streaming responses
+(`text/event-stream`) are not profiled: their sample is discarded as soon as
+the response starts. Stopping the sampler and writing the profile run off the
+event loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Callable
+from pathlib import Path
+
+from transforms import timing
+
+logger = logging.getLogger(__name__)
+
+IDLE_FRAMES: frozenset[tuple[str, str]] = frozenset({
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+})
+"""(file, function) leaf frames of threads that are blocked waiting, not working."""
+
+_NAME = re.compile(r"[\w.-]+\.folded")
+
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({path.parent.name}/{path.name}:{code.co_firstlineno})".replace(";", ",")
+
+
+class StackSampler:
+    """
+    Samples every other thread's Python stack at a fixed interval.
+
+    Args:
+        interval_sec: Time between samples.
+        max_duration_sec: The sampler stops itself after this long (long polls, streams).
+        on_stop: Called once from the sampler thread when sampling ends, for any reason.
+    """
+
+    def __init__(self, interval_sec: float = 0.005, max_duration_sec: float = 30.0,
+                 on_stop: Callable[[], None] | None = None):
+        self.interval_sec = interval_sec
+        self.max_duration_sec = max_duration_sec
+        self.on_stop = on_stop
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            leaf = frame.f_code
+            if (Path(leaf.co_filename).name, leaf.co_name) in IDLE_FRAMES:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_duration_sec
+        try:
+            while not self._stop.wait(self.interval_sec) and time.monotonic() < deadline:
+                self._sample()
+        finally:
+            if self.on_stop is not None:
+                self.on_stop()
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter[str]:
+        """Stop sampling and return stack → sample count."""
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed (folded) format, heaviest first."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    Sampling policy, profile storage and the UDF timing switch.
+
+    Args:
+        directory: Where profiles, the UDF control file and UDF dumps live.
+        sample_rate: Fraction of requests to profile (0 disables).
+        interval_sec: Stack sampling interval.
+        max_profiles: Oldest profile files beyond this are deleted.
+        max_duration_sec: Longest a single profile may run.
+        stale_dump_sec: UDF dumps not rewritten for this long belong to a gone process and are deleted.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        sample_rate: float = 0.0,
+        interval_sec: float = 0.005,
+        max_profiles: int = 100,
+        max_duration_sec: float = 30.0,
+        stale_dump_sec: float = 5 * timing.DUMP_INTERVAL_SEC,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.interval_sec = interval_sec
+        self.max_profiles = max_profiles
+        self.max_duration_sec = max_duration_sec
+        self.stale_dump_sec = stale_dump_sec
+        self.control_path = directory / "udf_control.json"
+        self.recent: deque[dict] = deque(maxlen=max_profiles)
+        self.stats = {"profiled": 0, "skipped_busy": 0, "skipped_streaming": 0, "write_errors": 0}
+        self._active = False
+        self._lock = threading.Lock()
+        timing.set_enabled(timing.read_control(self.control_path))
+
+    # ── Request profiles ──
+
+    def begin(self) -> StackSampler | None:
+        """Start a sampler if this request is picked and none is running."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        with self._lock:
+            if self._active:
+                self.stats["skipped_busy"] += 1
+                return None
+            self._active = True
+        return StackSampler(self.interval_sec, self.max_duration_sec, on_stop=self._release).start()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active = False
+
+    def discard(self, sampler: StackSampler) -> None:
+        """Stop a sampler without storing its profile (streaming responses)."""
+        sampler.stop()
+        self.stats["skipped_streaming"] += 1
+
+    def finish(self, sampler: StackSampler, method: str, route: str, status: int, duration_sec: float) -> dict | None:
+        """Stop the sampler and store its profile; returns the profile's metadata. Blocking: call off the event loop."""
+        sampler.stop()
+        slug = re.sub(r"[^\w-]+", "_", route).strip("_") or "root"
+        name = f"{int(time.time() * 1000)}-{method}-{slug}-{status}.folded"
+        meta = {
+            "name": name,
+            "method": method,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration_sec * 1000, 1),
+            "samples": sampler.samples,
+            "created_at": time.time(),
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / name).write_text(sampler.collapsed(), encoding="utf-8")
+            self._prune()
+        except OSError as e:
+            self.stats["write_errors"] += 1
+            logger.error(f"Profile write failed: {e}")
+            return None
+        self.stats["profiled"] += 1
+        self.recent.append(meta)
+        return meta
+
+    def _prune(self) -> None:
+        files = sorted(self.directory.glob("*.folded"))
+        for path in files[: max(0, len(files) - self.max_profiles)]:
+            path.unlink(missing_ok=True)
+
+    def read(self, name: str) -> str | None:
+        """Collapsed stacks of a stored profile (None for unknown or malformed names)."""
+        if not _NAME.fullmatch(name):
+            return None
+        try:
+            return (self.directory / name).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    # ── UDF timing ──
+
+    def set_udf_timing(self, enabled: bool) -> None:
+        """Switch UDF timing here and, through the control file, in the pipeline process."""
+        timing.set_enabled(enabled)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.control_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"udf_timing": enabled}), encoding="utf-8")
+        os.replace(tmp, self.control_path)
+
+    def udf_stats(self, now: float | None = None) -> dict[str, dict]:
+        """This process's UDF aggregates merged with every live pipeline process's dump."""
+        now = time.time() if now is None else now
+        snapshots = [timing.snapshot()]
+        for path in self.directory.glob("udf_timings.*.json"):
+            try:
+                dump = json.loads(path.read_text(encoding="utf-8"))
+                if now - dump["updated"] > self.stale_dump_sec:
+                    path.unlink(missing_ok=True)
+                    continue
+                snapshots.append(dump["udfs"])
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        return timing.merge(snapshots)
+
+    # ── Runtime configuration ──
+
+    def configure(
+        self,
+        sample_rate: float | None = None,
+        interval_sec: float | None = None,
+        udf_timing: bool | None = None,
+    ) -> None:
+        """Update the settings that were given; raises ValueError on out-of-range values."""
+        if sample_rate is not None and not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        if interval_sec is not None and not 0.001 <= interval_sec <= 1.0:
+            raise ValueError("interval_ms must be between 1 and 1000")
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if interval_sec is not None:
+            self.interval_sec = interval_sec
+        if udf_timing is not None:
+            self.set_udf_timing(udf_timing)
+
+    def state(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "interval_ms": round(self.interval_sec * 1000, 3),
+            "udf_timing": timing.is_enabled(),
+            "active": self._active,
+            **self.stats,
+            "profiles": list(reversed(self.recent)),
+            "udfs": self.udf_stats(),
+        }
+
+
+def _is_event_stream(message: dict) -> bool:
+    for key, value in message.get("headers", ()):
+        if key.lower() == b"content-type":
+            return value.split(b";", 1)[0].strip().lower() == b"text/event-stream"
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests the Profiler picks; others pass straight through."""
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sampler = self.profiler.begin()
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if _is_event_stream(message):
+                    streaming = True
+                    await asyncio.to_thread(self.profiler.discard, sampler)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not streaming:
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                await asyncio.to_thread(
+                    self.profiler.finish, sampler, scope["method"], route, status, time.perf_counter() - started
+                )
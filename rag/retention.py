@@ -0,0 +1,502 @@
+"""
+RouteZero Retention — log rotation and background compaction into rollups.
+
+Active telemetry logs are sealed by atomic rename into `history/` once they
+reach a size limit (`<stem>.<sealed_ms>.jsonl`). A background Compactor keeps
+sealed segments for the raw retention window, measured from the newest record
+in the segment (falling back to seal time when no record carries a timestamp),
+then folds each expired segment into per-vehicle minute and hour rollups and
+unlinks it:
+
+    1. stream the segment once, bucketing records per (vehicle, minute/hour)
+    2. write `rollups/<level>/<segment>.jsonl` via tmp file + os.replace
+    3. record each vehicle's last fix in `rollups/compactor_state.json`
+    4. unlink the segment
+
+Only segments of one log (`stem`, the fleet summary in the API) are rolled
+up; other sealed logs are deleted once past the raw window. The last fix per
+vehicle carries distance across segment boundaries, and a bucket split over
+two segments is merged back into one row by `iter_rollups`.
+
+Every step is idempotent, so a crash anywhere just redoes the segment on the
+next pass (or, after step 3, only its unlink). Nothing here touches the active log or holds a lock shared with
+readers: a reader that already has a segment open keeps reading it after the
+unlink, and one that lists segments before the unlink skips the missing file.
+Minute rollups expire after their own window; hour rollups are kept.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAX_BYTES: int = int(os.environ.get("SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+"""Active log size at which it is sealed into history."""
+RAW_RETENTION_SEC: float = 24 * 3600.0
+MINUTE_ROLLUP_RETENTION_SEC: float = 7 * 24 * 3600.0
+COMPACTION_INTERVAL_SEC: float = 60.0
+MAX_SEGMENTS_PER_PASS: int = 4
+"""Upper bound on segments compacted per pass, so each pass stays short."""
+
+ROLLUP_LEVELS: tuple[tuple[str, int], ...] = (("minute", 60), ("hour", 3600))
+
+
+def rotate_segment(path: Path, history_dir: Path) -> Path | None:
+    """
+    Seal the active log into `history_dir` by atomic rename.
+
+    Writers reopen `path` on their next append; tailing readers drain the rest
+    of the sealed file through their open handle.
+
+    Returns:
+        Path | None: The sealed segment, or None if there was nothing to seal.
+    """
+    try:
+        if path.stat().st_size == 0:
+            return None
+    except FileNotFoundError:
+        return None
+    history_dir.mkdir(parents=True, exist_ok=True)
+    target = history_dir / f"{path.stem}.{int(time.time() * 1000)}.jsonl"
+    os.replace(path, target)
+    logger.info(f"Sealed {path.name} → {target.name}")
+    return target
+
+
+def sealed_at(segment: Path) -> float | None:
+    """Seal time (unix seconds) encoded in a segment or rollup file name."""
+    try:
+        return int(segment.stem.rsplit(".", 1)[1]) / 1000
+    except (IndexError, ValueError):
+        return None
+
+
+def newest_record_at(segment: Path, tail_bytes: int = 64 * 1024) -> float | None:
+    """
+    Timestamp of the newest record in a sealed segment, read from its tail.
+
+    Scans complete lines in the last `tail_bytes` bytes, newest first, for a
+    numeric `timestamp`.
+
+    Returns:
+        float | None: Newest timestamp found, or None if the tail holds none.
+    """
+    with open(segment, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - tail_bytes))
+        lines = f.read().splitlines()
+    if size > tail_bytes and lines:
+        lines = lines[1:]  # First line of the tail may be cut mid-record.
+    newest = None
+    for line in reversed(lines):
+        try:
+            ts = json.loads(line).get("timestamp")
+        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+            continue
+        if isinstance(ts, (int, float)) and (newest is None or ts > newest):
+            newest = float(ts)
+    return newest
+
+
+def sealed_segments(history_dir: Path, stem: str | None = None) -> list[Path]:
+    """Sealed segments oldest first, optionally only those rotated from `<stem>.jsonl`."""
+    if not history_dir.exists():
+        return []
+    pattern = f"{stem}.*.jsonl" if stem else "*.jsonl"
+    segments = [p for p in history_dir.glob(pattern) if sealed_at(p) is not None]
+    return sorted(segments, key=sealed_at)
+
+
+def rollup_records(records: Iterator[dict], last_fix: dict[str, list[float]] | None = None) -> dict[str, list[dict]]:
+    """
+    Fold records into per-vehicle buckets for every ROLLUP_LEVELS granularity.
+
+    Distance per record comes from a FleetAccumulators, so it follows the same
+    gap rules as rankings and the carbon report.
+
+    Args:
+        records: Records of one segment.
+        last_fix: vehicle_id → [timestamp, speed_kmph] of its newest fix in
+            earlier segments. A vehicle's first record here measures distance
+            from that fix; the dict is updated in place with this segment's fixes.
+
+    Returns:
+        dict[str, list[dict]]: level name → rollup rows sorted by (bucket_start, vehicle_id).
+    """
+    # Imported here so the simulator can use rotate_segment without Pathway installed.
+    from transforms.accumulators import FleetAccumulators
+
+    totals = FleetAccumulators()
+    buckets: dict[str, dict[tuple[str, int], dict]] = {level: {} for level, _ in ROLLUP_LEVELS}
+    for record in records:
+        vid = record.get("vehicle_id")
+        if last_fix and vid in last_fix and vid not in totals.vehicles:
+            fix_ts, fix_speed = last_fix[vid]
+            ts = record.get("timestamp")
+            if isinstance(ts, (int, float)) and ts > fix_ts:
+                # Seed with the previous fix (not bucketed) so the boundary interval is counted.
+                totals.update({"vehicle_id": vid, "timestamp": fix_ts, "speed_kmph": fix_speed})
+        before = totals.vehicles.get(vid, {}).get("distance_km", 0.0)
+        if not totals.update(record):
+            continue
+        distance = totals.vehicles[vid]["distance_km"] - before
+        ts = record["timestamp"]
+        speed = float(record.get("speed_kmph") or 0.0)
+        for level, width in ROLLUP_LEVELS:
+            start = int(ts // width * width)
+            row = buckets[level].get((vid, start))
+            if row is None:
+                row = buckets[level][(vid, start)] = {
+                    "vehicle_id": vid, "bucket_start": start, "granularity": level,
+                    "route_id": record.get("route_id", ""), "events": 0, "co2_kg": 0.0,
+                    "fuel_liters": 0.0, "distance_km": 0.0, "speed_sum": 0.0, "max_speed_kmph": 0.0,
+                }
+            row["events"] += 1
+            row["co2_kg"] += float(record.get("co2_kg") or 0.0)
+            row["fuel_liters"] += float(record.get("fuel_consumed_liters") or 0.0)
+            row["distance_km"] += distance
+            row["speed_sum"] += speed
+            row["max_speed_kmph"] = max(row["max_speed_kmph"], speed)
+            row["latitude"], row["longitude"] = record.get("latitude"), record.get("longitude")
+
+    if last_fix is not None:
+        for vid, acc in totals.vehicles.items():
+            if vid not in last_fix or acc["last_ts"] > last_fix[vid][0]:
+                last_fix[vid] = [acc["last_ts"], acc["last_speed_kmph"]]
+
+    result = {}
+    for level, rows in buckets.items():
+        out = []
+        for row in rows.values():
+            row["avg_speed_kmph"] = round(row.pop("speed_sum") / row["events"], 1)
+            for field in ("co2_kg", "fuel_liters", "distance_km"):
+                row[field] = round(row[field], 4)
+            out.append(row)
+        result[level] = sorted(out, key=lambda r: (r["bucket_start"], r["vehicle_id"]))
+    return result
+
+
+def _merge_row(into: dict, row: dict) -> None:
+    """Add a later part of the same (vehicle, bucket) into `into`."""
+    events = into["events"] + row["events"]
+    into["avg_speed_kmph"] = round(
+        (into["avg_speed_kmph"] * into["events"] + row["avg_speed_kmph"] * row["events"]) / events, 1
+    )
+    into["events"] = events
+    for field in ("co2_kg", "fuel_liters", "distance_km"):
+        into[field] = round(into[field] + row[field], 4)
+    into["max_speed_kmph"] = max(into["max_speed_kmph"], row["max_speed_kmph"])
+    into["route_id"] = row.get("route_id") or into.get("route_id", "")
+    into["latitude"], into["longitude"] = row.get("latitude"), row.get("longitude")
+
+
+def _read_rollup_file(path: Path, start: float | None, end: float | None, vehicle_id: str | None) -> list[dict]:
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return []  # Expired by a concurrent compaction pass.
+    rows = []
+    with f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            ts = row["bucket_start"]
+            if (start is not None and ts < start) or (end is not None and ts >= end):
+                continue
+            if vehicle_id is not None and row.get("vehicle_id") != vehicle_id:
+                continue
+            rows.append(row)
+    return rows
+
+
+def iter_rollups(rollup_dir: Path, level: str, start: float | None = None, end: float | None = None,
+                 vehicle_id: str | None = None, stem: str | None = None) -> Iterator[dict]:
+    """
+    Yield rollup rows of one granularity, filtered by bucket start and vehicle.
+
+    Files are read in segment order. A (vehicle, bucket) split across segments
+    comes back as one merged row, so rows of the newest file are held until
+    the next file shows their buckets are closed; memory stays at one file's rows.
+
+    Args:
+        stem: Only rollups of segments rotated from `<stem>.jsonl`.
+    """
+    level_dir = rollup_dir / level
+    if not level_dir.exists():
+        return
+    pattern = f"{stem}.*.jsonl" if stem else "*.jsonl"
+    held: dict[tuple[str, int], dict] = {}
+    for path in sorted(level_dir.glob(pattern), key=lambda p: sealed_at(p) or 0):
+        rows = _read_rollup_file(path, start, end, vehicle_id)
+        if not rows:
+            continue
+        first = min(row["bucket_start"] for row in rows)
+        for key in [key for key in held if key[1] < first]:
+            yield held.pop(key)
+        for row in rows:
+            key = (row["vehicle_id"], row["bucket_start"])
+            if key in held:
+                _merge_row(held[key], row)
+            else:
+                held[key] = row
+    yield from held.values()
+
+
+def _write_atomic(path: Path, rows: list[dict]) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    payload = "".join(json.dumps(row) + "\n" for row in rows)
+    tmp.write_text(payload, encoding="utf-8")
+    os.replace(tmp, path)
+    return len(payload.encode("utf-8"))
+
+
+def _write_json_atomic(path: Path, payload: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _iter_segment(path: Path) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class Compactor:
+    """
+    Incremental compaction of sealed history segments into rollups.
+
+    Attributes:
+        history_dir (Path): Sealed raw segments.
+        rollup_dir (Path): Holds `minute/` and `hour/` rollup files, one per compacted segment,
+            and the compactor's state file.
+        stem (str | None): Log whose segments are rolled up; segments of other logs are
+            deleted past the raw window without rollups. None rolls up every segment.
+        raw_retention_sec (float): Age after which a sealed segment is compacted.
+        minute_retention_sec (float): Age after which minute rollups are deleted.
+        expirers (list[Callable[[float], int]]): Retention for other logs (e.g.
+            `AlertStore.expire`), called with `now` on every pass; each returns bytes reclaimed.
+    """
+
+    def __init__(
+        self,
+        history_dir: Path,
+        rollup_dir: Path,
+        raw_retention_sec: float = RAW_RETENTION_SEC,
+        minute_retention_sec: float = MINUTE_ROLLUP_RETENTION_SEC,
+        expirers: list[Callable[[float], int]] | None = None,
+        stem: str | None = None,
+    ):
+        self.history_dir = history_dir
+        self.rollup_dir = rollup_dir
+        self.stem = stem
+        self.raw_retention_sec = raw_retention_sec
+        self.minute_retention_sec = minute_retention_sec
+        self.expirers = expirers or []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._newest: dict[Path, float] = {}
+        self._state: dict | None = None
+        self.stats = {
+            "passes": 0,
+            "segments_compacted": 0,
+            "segments_expired": 0,
+            "records_compacted": 0,
+            "rollup_rows": 0,
+            "rollups_expired": 0,
+            "bytes_reclaimed": 0,
+            "errors": 0,
+            "last_pass": None,
+        }
+
+    def run_once(self, now: float | None = None, max_segments: int = MAX_SEGMENTS_PER_PASS) -> dict:
+        """
+        Compact up to `max_segments` expired segments and drop expired minute rollups.
+
+        Returns:
+            dict: This pass's `segments`, `records`, `rollup_rows` and `bytes_reclaimed`.
+        """
+        now = time.time() if now is None else now
+        report = {"segments": 0, "records": 0, "rollup_rows": 0, "bytes_reclaimed": 0}
+        for segment in sealed_segments(self.history_dir):
+            if report["segments"] >= max_segments:
+                break
+            try:
+                if self.segment_age_ref(segment) > now - self.raw_retention_sec:
+                    continue
+                if self.stem is not None and not segment.name.startswith(f"{self.stem}."):
+                    report["bytes_reclaimed"] += self.expire_segment(segment)
+                    continue
+                records, rows, reclaimed = self.compact_segment(segment)
+            except FileNotFoundError:
+                self._newest.pop(segment, None)
+                continue
+            except OSError as e:
+                logger.error(f"Compaction of {segment.name} failed: {e}")
+                self.stats["errors"] += 1
+                continue
+            report["segments"] += 1
+            report["records"] += records
+            report["rollup_rows"] += rows
+            report["bytes_reclaimed"] += reclaimed
+
+        minute_dir = self.rollup_dir / "minute"
+        if minute_dir.exists():
+            for path in minute_dir.glob("*.jsonl"):
+                sealed = sealed_at(path)
+                if sealed is not None and sealed <= now - self.minute_retention_sec:
+                    size = path.stat().st_size
+                    path.unlink(missing_ok=True)
+                    report["bytes_reclaimed"] += size
+                    self.stats["rollups_expired"] += 1
+
+        for expire in self.expirers:
+            try:
+                report["bytes_reclaimed"] += expire(now)
+            except OSError as e:
+                logger.error(f"Log expiry failed: {e}")
+                self.stats["errors"] += 1
+
+        self.stats["passes"] += 1
+        self.stats["segments_compacted"] += report["segments"]
+        self.stats["records_compacted"] += report["records"]
+        self.stats["rollup_rows"] += report["rollup_rows"]
+        self.stats["bytes_reclaimed"] += report["bytes_reclaimed"]
+        self.stats["last_pass"] = now
+        if report["segments"]:
+            logger.info(
+                f"Compacted {report['segments']} segments ({report['records']} records) into "
+                f"{report['rollup_rows']} rollup rows, reclaimed {report['bytes_reclaimed']} bytes"
+            )
+        return report
+
+    def segment_age_ref(self, segment: Path) -> float:
+        """
+        Time from which a segment's raw retention is measured.
+
+        The newest record's timestamp, so a segment sealed late (or holding a
+        replay of old data) expires with its data rather than with the seal.
+        Sealed segments never change, so the value is cached per path.
+        """
+        ref = self._newest.get(segment)
+        if ref is None:
+            ref = newest_record_at(segment)
+            if ref is None:
+                ref = sealed_at(segment)
+            self._newest[segment] = ref
+        return ref
+
+    @property
+    def state_path(self) -> Path:
+        return self.rollup_dir / "compactor_state.json"
+
+    @property
+    def state(self) -> dict:
+        """
+        Persistent compaction state.
+
+        `segment` (last segment rolled up), `compacted_through` (newest record
+        timestamp in any rolled-up segment: raw history at or before it may be
+        gone) and `last_fix` (vehicle_id → [timestamp, speed_kmph]).
+        """
+        if self._state is None:
+            try:
+                self._state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._state = {"segment": None, "compacted_through": None, "last_fix": {}}
+        return self._state
+
+    @property
+    def compacted_through(self) -> float | None:
+        """Newest record time already folded into rollups, or None before the first compaction."""
+        return self.state["compacted_through"]
+
+    def expire_segment(self, segment: Path) -> int:
+        """Delete a sealed segment that is not rolled up; returns bytes reclaimed."""
+        size = segment.stat().st_size
+        segment.unlink(missing_ok=True)
+        self._newest.pop(segment, None)
+        self.stats["segments_expired"] += 1
+        return size
+
+    def compact_segment(self, segment: Path) -> tuple[int, int, int]:
+        """
+        Roll one sealed segment up and delete it.
+
+        Segments must be compacted oldest first for distance to carry across
+        them; a segment of older records compacted later is still counted, it
+        just starts without a previous fix.
+
+        Returns:
+            tuple[int, int, int]: (records read, rollup rows written, bytes reclaimed).
+        """
+        size = segment.stat().st_size
+        state = self.state
+        if state["segment"] == segment.name:
+            # Rolled up and recorded before a crash; only the unlink is left.
+            segment.unlink(missing_ok=True)
+            self._newest.pop(segment, None)
+            return 0, 0, size
+        records = 0
+        newest = state["compacted_through"]
+
+        def counted() -> Iterator[dict]:
+            nonlocal records, newest
+            for record in _iter_segment(segment):
+                records += 1
+                ts = record.get("timestamp")
+                if isinstance(ts, (int, float)) and (newest is None or ts > newest):
+                    newest = float(ts)
+                yield record
+
+        last_fix = dict(state["last_fix"])
+        rollups = rollup_records(counted(), last_fix)
+        written = 0
+        rows = 0
+        for level, level_rows in rollups.items():
+            written += _write_atomic(self.rollup_dir / level / segment.name, level_rows)
+            rows += len(level_rows)
+        state = {"segment": segment.name, "compacted_through": newest, "last_fix": last_fix}
+        _write_json_atomic(self.state_path, state)
+        self._state = state
+        segment.unlink(missing_ok=True)
+        self._newest.pop(segment, None)
+        return records, rows, max(0, size - written)
+
+    def start(self, interval_sec: float = COMPACTION_INTERVAL_SEC) -> None:
+        """Run `run_once` every `interval_sec` on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval_sec,), name="telemetry-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background thread after its current pass."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _loop(self, interval_sec: float) -> None:
+        while not self._stop.wait(interval_sec):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Compaction pass failed: {e}")
+                self.stats["errors"] += 1
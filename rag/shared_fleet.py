@@ -0,0 +1,318 @@
+"""
+RouteZero Shared Fleet Table — latest vehicle state in shared memory.
+
+One writer process tails fleet_summary.jsonl and publishes each vehicle's
+latest record into a fixed-width slot array in a named shared-memory region;
+any number of local processes (dashboards, exporters, benchmarks) attach
+read-only and read latest state without tailing the file themselves. The API
+is not one of them: it runs as a single process that owns the append-only
+writers and already tails the log for its own consumers.
+
+Layout (little-endian):
+
+    header  64 B   magic "RZFLEET1", capacity, slot size, slots used, generation, closed
+    slot i  1 KiB  seq u32 | vehicle_id 24s | timestamp, lat, lon f64 | len u16 | JSON payload
+
+Each slot is guarded by a seqlock: the writer bumps `seq` to odd, writes the
+slot, then bumps it to even. Readers copy the slot and retry if `seq` was odd
+or changed underneath them, so they never block the writer or each other.
+Vehicles keep their slot for the life of the region, and readers cache decoded
+records by `seq`, so a snapshot only decodes slots that changed. The header
+`generation` increases on every publish and serves as a cheap data version.
+
+A writer that exits cleanly sets `closed` before unlinking the region. Readers
+check it on every read and re-attach to the region a restarted writer creates
+under the same name, so they never keep serving the dead writer's last state.
+
+Usage:
+    python -m rag.shared_fleet                      # writer (one per host)
+    SharedFleetTable.attach("routezero_fleet").snapshot()   # any local reader
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHM_NAME: str = "routezero_fleet"
+DEFAULT_CAPACITY: int = 4096
+MAGIC: bytes = b"RZFLEET1"
+
+_HEADER = struct.Struct("<8sIIIQI")
+HEADER_BYTES: int = 64
+_SLOT_HEAD = struct.Struct("<I24sdddH")
+SLOT_BYTES: int = 1024
+PAYLOAD_BYTES: int = SLOT_BYTES - _SLOT_HEAD.size
+_SEQ = struct.Struct("<I")
+_GENERATION_OFFSET: int = 20
+_COUNT_OFFSET: int = 16
+_CLOSED_OFFSET: int = 28
+
+MAX_READ_RETRIES: int = 100
+
+CORE_FIELDS: tuple[str, ...] = (
+    "vehicle_id", "timestamp", "latitude", "longitude", "route_id", "speed_kmph",
+    "co2_kg", "fuel_consumed_liters", "status", "deviation_status", "eta_status",
+    "temperature_c", "temperature_breach",
+)
+"""Fields kept when a full record does not fit in a slot's payload; if even
+those do not fit, the record is rejected rather than cut into invalid JSON."""
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach without registering the region for cleanup at this process's exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no `track`; unregister by hand.
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _encode_payload(record: dict) -> bytes | None:
+    """Compact JSON for a slot: the full record, else its CORE_FIELDS, else None if neither fits."""
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    if len(payload) <= PAYLOAD_BYTES:
+        return payload
+    core = {k: record[k] for k in CORE_FIELDS if k in record}
+    payload = json.dumps(core, separators=(",", ":")).encode("utf-8")
+    return payload if len(payload) <= PAYLOAD_BYTES else None
+
+
+class SharedFleetTable:
+    """
+    Fixed-width latest-state table over a shared-memory region.
+
+    Use `create` in the single writer and `attach` in readers.
+
+    Attributes:
+        shm_name (str): Shared-memory region name.
+        capacity (int): Number of vehicle slots.
+    """
+
+    name = "shared_fleet"
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self._shm = shm
+        self._buf = shm.buf
+        self._owner = owner
+        magic, capacity, slot_bytes, _, _, _ = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or slot_bytes != SLOT_BYTES:
+            raise ValueError(f"Shared memory {shm.name} is not a RouteZero fleet table")
+        self.shm_name = shm.name
+        self.capacity = capacity
+        self._slots: dict[str, int] = {}
+        self._cache: dict[int, tuple[int, dict]] = {}
+        self.stats = {"published": 0, "dropped_full": 0, "dropped_oversized": 0, "read_retries": 0, "reattached": 0}
+
+    @classmethod
+    def create(cls, name: str = DEFAULT_SHM_NAME, capacity: int = DEFAULT_CAPACITY) -> "SharedFleetTable":
+        """
+        Create the region, or take over an existing one left by a previous writer.
+
+        Raises:
+            ValueError: If an existing region has a different layout.
+        """
+        size = HEADER_BYTES + capacity * SLOT_BYTES
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _HEADER.pack_into(shm.buf, 0, MAGIC, capacity, SLOT_BYTES, 0, 0, 0)
+            return cls(shm, owner=True)
+        except FileExistsError:
+            table = cls(_attach(name), owner=True)
+            _SEQ.pack_into(table._buf, _CLOSED_OFFSET, 0)
+            for slot, record in enumerate(table._read_all()):
+                if record is not None:
+                    table._slots[record["vehicle_id"]] = slot
+            logger.info(f"Resumed shared fleet table {name} with {len(table._slots)} vehicles")
+            return table
+
+    @classmethod
+    def attach(cls, name: str = DEFAULT_SHM_NAME) -> "SharedFleetTable":
+        """
+        Attach to a region created by the writer.
+
+        Raises:
+            FileNotFoundError: If the writer has not created it yet.
+        """
+        return cls(_attach(name))
+
+    @property
+    def count(self) -> int:
+        """Slots in use."""
+        return _SEQ.unpack_from(self._buf, _COUNT_OFFSET)[0]
+
+    @property
+    def generation(self) -> int:
+        """Publish counter; changes whenever any slot changes."""
+        self._follow()
+        return struct.unpack_from("<Q", self._buf, _GENERATION_OFFSET)[0]
+
+    @property
+    def closed(self) -> bool:
+        """True once the writer of this mapping has shut down."""
+        return _SEQ.unpack_from(self._buf, _CLOSED_OFFSET)[0] != 0
+
+    def _follow(self) -> None:
+        """In a reader, switch to the region of a restarted writer once the current one is closed."""
+        if self._owner or not self.closed:
+            return
+        try:
+            shm = _attach(self.shm_name)
+        except FileNotFoundError:
+            return  # Not restarted yet; keep the last published state.
+        if _SEQ.unpack_from(shm.buf, _CLOSED_OFFSET)[0]:
+            shm.close()  # Still the closing region, not yet unlinked.
+            return
+        self._buf = None
+        self._shm.close()
+        self._shm, self._buf = shm, shm.buf
+        self.capacity = _HEADER.unpack_from(self._buf, 0)[1]
+        self._slots.clear()
+        self._cache.clear()
+        self.stats["reattached"] += 1
+        logger.info(f"Re-attached to shared fleet table {self.shm_name} after a writer restart")
+
+    # ── Writer ──
+
+    def update(self, record: dict) -> bool:
+        """Publish one record into its vehicle's slot (RecordConsumer interface)."""
+        vid = record.get("vehicle_id")
+        if not vid:
+            return False
+        payload = _encode_payload(record)
+        if payload is None:
+            self.stats["dropped_oversized"] += 1
+            logger.warning(f"Record for {vid} does not fit a {SLOT_BYTES}-byte slot; not published")
+            return False
+        slot = self._slots.get(vid)
+        if slot is None:
+            count = self.count
+            if count >= self.capacity:
+                self.stats["dropped_full"] += 1
+                return False
+            slot = self._slots[vid] = count
+        self._write_slot(slot, vid, record, payload)
+        if slot == self.count:
+            _SEQ.pack_into(self._buf, _COUNT_OFFSET, slot + 1)
+        struct.pack_into("<Q", self._buf, _GENERATION_OFFSET, self.generation + 1)
+        self.stats["published"] += 1
+        return True
+
+    def _write_slot(self, slot: int, vid: str, record: dict, payload: bytes) -> None:
+        base = HEADER_BYTES + slot * SLOT_BYTES
+        seq = _SEQ.unpack_from(self._buf, base)[0]
+        _SEQ.pack_into(self._buf, base, seq + 1)  # odd: write in progress
+        _SLOT_HEAD.pack_into(
+            self._buf, base, seq + 1, vid.encode("utf-8")[:24],
+            float(record.get("timestamp") or 0.0),
+            float(record.get("latitude") or 0.0),
+            float(record.get("longitude") or 0.0),
+            len(payload),
+        )
+        self._buf[base + _SLOT_HEAD.size: base + _SLOT_HEAD.size + len(payload)] = payload
+        _SEQ.pack_into(self._buf, base, seq + 2)  # even: stable
+
+    def to_dict(self) -> dict:
+        """The region itself is the state; nothing extra to checkpoint."""
+        return {}
+
+    def load_dict(self, state: dict) -> None:
+        """No-op; `create` resumes from the region."""
+
+    # ── Readers ──
+
+    def _read_slot(self, slot: int) -> dict | None:
+        base = HEADER_BYTES + slot * SLOT_BYTES
+        for _ in range(MAX_READ_RETRIES):
+            seq = _SEQ.unpack_from(self._buf, base)[0]
+            if seq & 1:
+                self.stats["read_retries"] += 1
+                continue
+            cached = self._cache.get(slot)
+            if cached is not None and cached[0] == seq:
+                return cached[1]
+            _, _, _, _, _, length = _SLOT_HEAD.unpack_from(self._buf, base)
+            payload = bytes(self._buf[base + _SLOT_HEAD.size: base + _SLOT_HEAD.size + min(length, PAYLOAD_BYTES)])
+            if _SEQ.unpack_from(self._buf, base)[0] != seq:
+                self.stats["read_retries"] += 1
+                continue
+            if seq == 0:
+                return None
+            record = json.loads(payload)
+            self._cache[slot] = (seq, record)
+            return record
+        logger.warning(f"Shared fleet slot {slot} kept changing; skipped")
+        return None
+
+    def _read_all(self) -> list[dict | None]:
+        return [self._read_slot(slot) for slot in range(self.count)]
+
+    def snapshot(self) -> list[dict]:
+        """Latest record for every published vehicle, in slot order."""
+        self._follow()
+        return [r for r in self._read_all() if r is not None]
+
+    def get(self, vid: str) -> dict | None:
+        """Latest record for one vehicle, or None."""
+        self._follow()
+        slot = self._slots.get(vid)
+        if slot is None:
+            for slot, record in enumerate(self._read_all()):
+                if record is not None:
+                    self._slots[record["vehicle_id"]] = slot
+            slot = self._slots.get(vid)
+        return self._read_slot(slot) if slot is not None else None
+
+    def close(self) -> None:
+        """Detach; the writer also marks the region closed for readers and removes it."""
+        if self._owner:
+            _SEQ.pack_into(self._buf, _CLOSED_OFFSET, 1)
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def main() -> None:
+    """Single writer: tail the fleet log and publish latest records to shared memory."""
+    from rag.fleet_reader import FleetStateReader
+
+    parser = argparse.ArgumentParser(description="Publish latest fleet state to shared memory.")
+    parser.add_argument("--name", default=os.environ.get("FLEET_SHM_NAME", DEFAULT_SHM_NAME))
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    parser.add_argument("--interval", type=float, default=0.25, help="Poll interval in seconds")
+    tmp_dir = Path(os.environ.get("TMP_DIR", str(Path(__file__).resolve().parent.parent / "tmp")))
+    parser.add_argument("--fleet-file", type=Path, default=tmp_dir / "fleet_summary.jsonl")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    table = SharedFleetTable.create(args.name, args.capacity)
+    reader = FleetStateReader(args.fleet_file, consumers=[table])
+    logger.info(f"Publishing {args.fleet_file} to shared memory '{args.name}' ({args.capacity} slots)")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # unlink the region on `kill` too
+    try:
+        while True:
+            reader.refresh()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
+
+
+if __name__ == "__main__":
+    main()
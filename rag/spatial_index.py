@@ -0,0 +1,144 @@
+"""
+RouteZero Spatial Index — uniform lat/lon grid over live vehicle positions.
+
+Each vehicle lives in exactly one grid cell keyed by its latest fix, so an
+update is a dict move (O(1)) and queries only touch the cells overlapping the
+search area. Used by /api/fleet for bounding-box, radius and nearest-k lookups.
+"""
+
+import heapq
+import math
+
+from transforms.route_geometry import haversine_km
+
+KM_PER_DEG_LAT: float = 111.32
+"""Approximate length of one degree of latitude (km)."""
+
+DEFAULT_CELL_DEG: float = 0.25
+"""Default grid cell size (~28 km), a few trucks per cell on busy corridors."""
+
+
+class GridIndex:
+    """
+    Uniform-grid spatial index mapping keys (vehicle ids) to their latest position.
+
+    Attributes:
+        cell_deg (float): Cell edge length in degrees for both axes.
+    """
+
+    def __init__(self, cell_deg: float = DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: dict[tuple[int, int], dict[str, tuple[float, float]]] = {}
+        self._where: dict[str, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def upsert(self, key: str, lat: float, lon: float) -> None:
+        """Insert or move `key` to (lat, lon)."""
+        cell = self._cell(lat, lon)
+        old = self._where.get(key)
+        if old is not None and old != cell:
+            bucket = self._cells[old]
+            del bucket[key]
+            if not bucket:
+                del self._cells[old]
+        self._cells.setdefault(cell, {})[key] = (lat, lon)
+        self._where[key] = cell
+
+    def remove(self, key: str) -> None:
+        """Drop `key` from the index if present."""
+        cell = self._where.pop(key, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self._cells[cell]
+
+    def _scan(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+        """Yield (key, lat, lon) for every entry in cells overlapping the box."""
+        lo_r, lo_c = self._cell(min_lat, min_lon)
+        hi_r, hi_c = self._cell(max_lat, max_lon)
+        # Sparse grids: walking the occupied cells beats walking a huge empty box.
+        if (hi_r - lo_r + 1) * (hi_c - lo_c + 1) > len(self._cells):
+            cells = [c for c in self._cells if lo_r <= c[0] <= hi_r and lo_c <= c[1] <= hi_c]
+        else:
+            cells = [(r, c) for r in range(lo_r, hi_r + 1) for c in range(lo_c, hi_c + 1) if (r, c) in self._cells]
+        for cell in cells:
+            for key, (lat, lon) in self._cells[cell].items():
+                yield key, lat, lon
+
+    def query_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list[str]:
+        """Keys whose position lies inside the inclusive bounding box."""
+        return [
+            key
+            for key, lat, lon in self._scan(min_lat, min_lon, max_lat, max_lon)
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+        ]
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> list[tuple[str, float]]:
+        """(key, distance_km) pairs within `radius_km` of the point, nearest first."""
+        d_lat = radius_km / KM_PER_DEG_LAT
+        d_lon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(min(abs(lat) + d_lat, 89.0))), 1e-6))
+        hits = []
+        for key, k_lat, k_lon in self._scan(lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon):
+            dist = haversine_km(lat, lon, k_lat, k_lon)
+            if dist <= radius_km:
+                hits.append((key, dist))
+        hits.sort(key=lambda h: h[1])
+        return hits
+
+    def nearest(self, lat: float, lon: float, k: int) -> list[tuple[str, float]]:
+        """The `k` keys closest to the point as (key, distance_km), nearest first."""
+        if k <= 0 or not self._where:
+            return []
+        k = min(k, len(self._where))
+        row, col = self._cell(lat, lon)
+        rows = [c[0] for c in self._cells]
+        cols = [c[1] for c in self._cells]
+        max_ring = max(abs(row - min(rows)), abs(row - max(rows)), abs(col - min(cols)), abs(col - max(cols)))
+
+        # Sparse fleets spread far apart: ranking every entry is cheaper than ring walking.
+        if (2 * max_ring + 1) ** 2 > 4 * len(self._cells):
+            return heapq.nsmallest(
+                k,
+                ((key, haversine_km(lat, lon, k_lat, k_lon)) for key, k_lat, k_lon in self._entries()),
+                key=lambda h: h[1],
+            )
+
+        best: list[tuple[str, float]] = []
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(row, col, ring):
+                for key, (k_lat, k_lon) in self._cells.get(cell, {}).items():
+                    best.append((key, haversine_km(lat, lon, k_lat, k_lon)))
+            if len(best) >= k:
+                best.sort(key=lambda h: h[1])
+                del best[k:]
+                # Anything outside the scanned rings is at least `ring` full cells away.
+                edge_lat = min(abs(lat) + (ring + 1) * self.cell_deg, 89.0)
+                lower_bound = ring * self.cell_deg * KM_PER_DEG_LAT * math.cos(math.radians(edge_lat))
+                if best[-1][1] <= lower_bound:
+                    break
+        best.sort(key=lambda h: h[1])
+        return best[:k]
+
+    def _entries(self):
+        for bucket in self._cells.values():
+            for key, (lat, lon) in bucket.items():
+                yield key, lat, lon
+
+    @staticmethod
+    def _ring_cells(row: int, col: int, ring: int):
+        """Cells at exactly Chebyshev distance `ring` from (row, col)."""
+        if ring == 0:
+            yield (row, col)
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield (row - ring, c)
+            yield (row + ring, c)
+        for r in range(row - ring + 1, row + ring):
+            yield (r, col - ring)
+            yield (r, col + ring)
@@ -0,0 +1,203 @@
+"""
+RouteZero Telemetry Ingestion — validated, group-committed telemetry log writes.
+
+Gateway devices POST batches of raw telemetry (or send JSON lines over UDP).
+Records are validated against the `build_telemetry_table` schema, queued in a
+bounded in-memory buffer, and flushed by a single writer thread that commits
+everything queued since its last write in one `write()` call. Callers get
+backpressure (a `None` sequence number → HTTP 429) instead of unbounded memory.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from connectors.telemetry_schema import validate_telemetry_record
+from rag.retention import rotate_segment
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS: int = 20
+"""Per-batch cap on validation errors echoed back to the client."""
+
+INGEST_MAX_PENDING: int = int(os.environ.get("INGEST_MAX_PENDING", "200000"))
+"""Ingest queue capacity in records; submits beyond it get HTTP 429."""
+
+INGEST_UDP_PORT: int = int(os.environ.get("INGEST_UDP_PORT", "0"))
+"""UDP port for datagram telemetry; 0 disables the listener."""
+
+
+def validate_batch(records: list) -> tuple[list[dict], list[dict]]:
+    """
+    Split a decoded batch into valid records and per-index validation errors.
+
+    Args:
+        records: Decoded JSON array from the request body or datagram.
+
+    Returns:
+        tuple[list[dict], list[dict]]: (valid records, `{"index", "error"}` entries).
+    """
+    valid: list[dict] = []
+    errors: list[dict] = []
+    for i, record in enumerate(records):
+        error = validate_telemetry_record(record)
+        if error is None:
+            valid.append(record)
+        else:
+            errors.append({"index": i, "error": error})
+    return valid, errors
+
+
+class TelemetryIngestor:
+    """
+    Bounded queue + single writer thread with group commit to a JSONL log.
+
+    Attributes:
+        path (Path): Telemetry log the writer appends to.
+        max_pending (int): Queue capacity in records; submits beyond it are refused.
+        fsync (bool): Whether each group is fsynced before it counts as committed.
+        history_dir (Path | None): Where the log is sealed once it reaches `segment_max_bytes`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_pending: int = INGEST_MAX_PENDING,
+        fsync: bool = False,
+        history_dir: Path | None = None,
+        segment_max_bytes: int | None = None,
+    ):
+        self.path = path
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self.history_dir = history_dir
+        self.segment_max_bytes = segment_max_bytes
+        self._pending: list[dict] = []
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._committed = 0
+        self._failed: deque[tuple[int, int]] = deque(maxlen=64)  # (first, last) seq of failed groups
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self.stats = {
+            "accepted": 0,
+            "rejected_backpressure": 0,
+            "committed": 0,
+            "groups": 0,
+            "write_errors": 0,
+            "segments_sealed": 0,
+        }
+
+    @property
+    def pending(self) -> int:
+        """Records queued but not yet handed to the writer."""
+        return len(self._pending)
+
+    def submit(self, records: list[dict]) -> int | None:
+        """
+        Enqueue validated records for the next group commit, stamping `ingested_at`.
+
+        Returns:
+            int | None: Sequence number to pass to `wait_committed`, or None
+            if the queue is full and the caller should back off.
+        """
+        with self._cond:
+            if len(self._pending) + len(records) > self.max_pending:
+                self.stats["rejected_backpressure"] += len(records)
+                return None
+            now = time.time()
+            for record in records:
+                record["ingested_at"] = now
+            self._pending.extend(records)
+            self._submitted += len(records)
+            self.stats["accepted"] += len(records)
+            if self._thread is None:
+                self._start_writer()
+            self._cond.notify_all()
+            return self._submitted
+
+    def wait_committed(self, seq: int, timeout: float = 5.0) -> bool:
+        """Block until record `seq` has been written; False on timeout or if its group failed."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._committed >= seq, timeout=timeout):
+                return False
+            return not any(first <= seq <= last for first, last in self._failed)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush the remaining queue and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+    def _start_writer(self) -> None:
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="telemetry-group-commit", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    self._thread = None
+                    return
+                group, self._pending = self._pending, []
+
+            payload = "\n".join(map(json.dumps, group)) + "\n"
+            failed = False
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(payload)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                    size = f.tell()
+                # Seal between groups so no append ever straddles two segments.
+                if self.history_dir is not None and self.segment_max_bytes and size >= self.segment_max_bytes:
+                    if rotate_segment(self.path, self.history_dir) is not None:
+                        self.stats["segments_sealed"] += 1
+            except OSError as e:
+                logger.error(f"Telemetry group commit failed ({len(group)} records): {e}")
+                self.stats["write_errors"] += len(group)
+                failed = True
+
+            with self._cond:
+                if failed:
+                    self._failed.append((self._committed + 1, self._committed + len(group)))
+                else:
+                    self.stats["committed"] += len(group)
+                self._committed += len(group)
+                self.stats["groups"] += 1
+                self._cond.notify_all()
+
+
+class TelemetryDatagramProtocol(asyncio.DatagramProtocol):
+    """UDP listener: each datagram carries one or more newline-separated JSON records."""
+
+    def __init__(self, ingestor: TelemetryIngestor):
+        self.ingestor = ingestor
+        self.stats = {"datagrams": 0, "invalid": 0, "dropped": 0}
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        self.stats["datagrams"] += 1
+        records = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                self.stats["invalid"] += 1
+        valid, errors = validate_batch(records)
+        self.stats["invalid"] += len(errors)
+        if valid and self.ingestor.submit(valid) is None:
+            self.stats["dropped"] += len(valid)
@@ -0,0 +1,166 @@
+"""
+RouteZero Track Store — compressed GPS history in daily JSONL segments.
+
+Registered as a FleetStateReader consumer: every fleet record passes through a
+TrajectoryCompressor, and only the points it keeps are written, to
+`<dir>/<YYYY-MM-DD>.jsonl` (UTC day of the point). Writes are batched; the
+buffer is flushed before every checkpoint so the reader's saved offset never
+runs ahead of what is on disk. Track queries open only the segments that
+overlap the requested range and append the vehicle's pending newest fix, so
+paths always end at the live position.
+
+The store is written in addition to the raw fleet log, not instead of it: raw
+fixes stay on disk for the raw retention window (TELEMETRY_RETENTION_HOURS),
+after which compaction keeps only per-minute/hour rollups. The simplified
+tracks are what remains as full-resolution path history past that window;
+`stats` reports both the point ratio and the bytes actually stored.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import UTC, datetime
+from pathlib import Path
+
+from transforms.trajectory import DEFAULT_TOLERANCE_M, TrajectoryCompressor, track_point
+
+logger = logging.getLogger(__name__)
+
+FLUSH_POINTS: int = 500
+"""Kept points buffered in memory before a batched append."""
+
+TRACK_TOLERANCE_M: float = float(os.environ.get("TRACK_TOLERANCE_M", str(DEFAULT_TOLERANCE_M)))
+"""Maximum synchronized distance (m) between a raw fix and the stored track."""
+
+
+def segment_day(ts: float) -> str:
+    """UTC date (YYYY-MM-DD) naming the segment a point belongs to."""
+    return datetime.fromtimestamp(ts, tz=UTC).date().isoformat()
+
+
+class TrackStore:
+    """
+    Compressed per-vehicle track history.
+
+    Attributes:
+        directory (Path): Folder holding one JSONL segment per UTC day.
+        compressor (TrajectoryCompressor): Online simplifier shared by all vehicles.
+    """
+
+    name = "tracks"
+
+    def __init__(self, directory: Path, tolerance_m: float = TRACK_TOLERANCE_M):
+        self.directory = directory
+        self.compressor = TrajectoryCompressor(tolerance_m)
+        self._unflushed: list[dict] = []
+        self._lock = threading.Lock()
+
+    def update(self, record: dict) -> bool:
+        """Compress one fleet record; kept points are queued for the next flush."""
+        vid = record.get("vehicle_id")
+        point = track_point(record)
+        if not vid or point is None:
+            return False
+        with self._lock:
+            kept = self.compressor.update(vid, point)
+            self._unflushed.extend({"vehicle_id": vid, **p} for p in kept)
+            if len(self._unflushed) >= FLUSH_POINTS:
+                self._flush_locked()
+        return True
+
+    def flush(self) -> None:
+        """Append buffered points to their day segments."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._unflushed:
+            return
+        by_day: dict[str, list[str]] = {}
+        for p in self._unflushed:
+            by_day.setdefault(segment_day(p["timestamp"]), []).append(json.dumps(p))
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for day, lines in by_day.items():
+                with open(self.directory / f"{day}.jsonl", "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.error(f"Track flush failed ({len(self._unflushed)} points): {e}")
+            return
+        self._unflushed = []
+
+    def segments(self, start: float | None = None, end: float | None = None) -> list[Path]:
+        """Day segments overlapping [start, end), oldest first."""
+        if not self.directory.exists():
+            return []
+        first = segment_day(start) if start is not None else None
+        last = segment_day(end - 1e-6) if end is not None else None
+        paths = []
+        for path in sorted(self.directory.glob("????-??-??.jsonl")):
+            day = path.stem
+            if (first is None or day >= first) and (last is None or day <= last):
+                paths.append(path)
+        return paths
+
+    def query(self, vid: str, start: float | None = None, end: float | None = None) -> list[dict]:
+        """
+        Stored track for one vehicle in [start, end), oldest first.
+
+        Includes the pending newest fix when it falls inside the range.
+        """
+        self.flush()
+        points = []
+        for path in self.segments(start, end):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if f'"vehicle_id": "{vid}"' not in line:
+                            continue
+                        try:
+                            p = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        ts = p["timestamp"]
+                        if p.get("vehicle_id") == vid and (start is None or ts >= start) and (end is None or ts < end):
+                            points.append(p)
+            except OSError as e:
+                logger.error(f"Error reading {path}: {e}")
+        with self._lock:
+            pending = self.compressor.pending(vid)
+        if pending is not None and (start is None or pending["timestamp"] >= start) and (
+            end is None or pending["timestamp"] < end
+        ):
+            points.append({"vehicle_id": vid, **pending, "pending": True})
+        points.sort(key=lambda p: p["timestamp"])
+        return points
+
+    @property
+    def stats(self) -> dict:
+        """Raw vs kept point counts since the store was created, and bytes on disk across all segments."""
+        raw = self.compressor.stats["raw_points"]
+        kept = self.compressor.stats["kept_points"]
+        stored_bytes = 0
+        for path in self.segments():
+            try:
+                stored_bytes += path.stat().st_size
+            except FileNotFoundError:
+                continue
+        return {
+            "tolerance_m": self.compressor.tolerance_m,
+            "raw_points": raw,
+            "kept_points": kept,
+            "compression_ratio": round(raw / kept, 2) if kept else None,
+            "stored_bytes": stored_bytes,
+        }
+
+    def to_dict(self) -> dict:
+        """Flush, then snapshot the compressor so a restart resumes open windows."""
+        self.flush()
+        with self._lock:
+            return self.compressor.to_dict()
+
+    def load_dict(self, state: dict) -> None:
+        """Restore from a `to_dict` snapshot."""
+        with self._lock:
+            self.compressor.load_dict(state)
@@ -3,17 +3,36 @@ simulate_pipeline.py
 Writes demo fleet + ETA data to ./tmp/ for the SSE endpoint and
 FleetContext to consume. Run this when Pathway is not available.
 
+With flags it doubles as a load generator and soak harness: N vehicles
+spread over the chosen corridors, reporting every `--interval` seconds from
+`--writers` processes, while synthetic dashboard pollers and SSE subscribers
+hit a running API. A summary of achieved write rate, API latency and error
+rate, and end-to-end staleness (emission → SSE receipt) is printed at the end.
+
 Usage:
-    python simulate_pipeline.py
+    python simulate_pipeline.py                      # demo: 10 trucks every 2 s
+    python simulate_pipeline.py --vehicles 20000 --writers 4 --duration 600 \\
+        --api-url http://localhost:8000 --api-clients 20 --sse-clients 50 --summary-json soak.json
 """
 
+import argparse
 import json
-import time
+import multiprocessing as mp
 import random
 import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
 from pathlib import Path
 
+from rag.file_lock import lock_file, unlock_file
+from rag.retention import SEGMENT_MAX_BYTES, rotate_segment
+from rag.tracing import LatencyHistogram
+
 TMP_DIR = Path(os.environ.get("TMP_DIR", "./tmp"))
+HISTORY_DIR = TMP_DIR / "history"
 
 VEHICLES = [
     {"vehicle_id": "TRK-DL-001", "route_id": "delhi_mumbai", "lat": 27.18, "lng": 78.01, "cargo": "Electronics"},
@@ -28,6 +47,11 @@ VEHICLES = [
     {"vehicle_id": "TRK-KP-010", "route_id": "kolkata_patna", "lat": 25.10, "lng": 85.14, "cargo": "Consumer Goods"},
 ]
 
+CORRIDORS = sorted({v["route_id"] for v in VEHICLES})
+
+API_PATHS = ["/api/fleet", "/api/fleet-intel", "/api/route-summary", "/api/fleet-rankings", "/api/vehicle/{id}"]
+"""Endpoints the dashboard polls; synthetic API clients pick one at random per request."""
+
 
 def generate_record(v: dict) -> dict:
     speed = random.uniform(40, 85)
@@ -45,6 +69,7 @@ def generate_record(v: dict) -> dict:
     record = {
         "vehicle_id": v["vehicle_id"],
         "timestamp": time.time(),
+        "ingested_at": time.time(),
         "latitude": v["lat"] + random.uniform(-0.05, 0.05),
         "longitude": v["lng"] + random.uniform(-0.05, 0.05),
         "fuel_consumed_liters": round(fuel, 2),
@@ -68,52 +93,352 @@ def generate_record(v: dict) -> dict:
     if v["cargo"] == "Pharma":
         record["temperature_c"] = round(random.uniform(-20, 5), 1)
         record["temperature_breach"] = record["temperature_c"] > -12
+        record["is_cold_chain"] = True
 
     return record
 
 
-def main():
-    TMP_DIR.mkdir(parents=True, exist_ok=True)
+def build_fleet(n: int, corridors: list[str] | None = None, seed: int = 7) -> list[dict]:
+    """
+    `n` vehicles on the given corridors (default: all).
+
+    The demo fleet is returned unchanged when it fits; larger fleets cycle the
+    demo trucks' cargo and start points, scattered ~50 km along each corridor.
+    """
+    templates = [v for v in VEHICLES if not corridors or v["route_id"] in corridors]
+    if not templates:
+        raise ValueError(f"no vehicles on corridors {corridors}; choose from {CORRIDORS}")
+    if n <= len(templates) and not corridors:
+        return VEHICLES[:n]
+    rng = random.Random(seed)
+    return [
+        {
+            **templates[i % len(templates)],
+            "vehicle_id": f"TRK-LG-{i:05d}",
+            "lat": templates[i % len(templates)]["lat"] + rng.uniform(-0.5, 0.5),
+            "lng": templates[i % len(templates)]["lng"] + rng.uniform(-0.5, 0.5),
+        }
+        for i in range(n)
+    ]
+
+
+@contextmanager
+def _locked(path: Path):
+    """
+    Exclusive lock shared by every process writing `path`, held on `<path>.lock`.
+
+    The lock lives in a side file so it survives `path` being replaced.
+    """
+    with open(path.with_name(path.name + ".lock"), "a") as lock:
+        lock_file(lock)
+        try:
+            yield
+        finally:
+            unlock_file(lock)
+
+
+def _append(path: Path, data: bytes) -> None:
+    """
+    Append `data` under the file's lock, continuing after short writes.
+
+    Raises:
+        OSError: If the file stops accepting bytes (e.g. disk full).
+    """
+    with _locked(path), open(path, "ab", buffering=0) as f:
+        view = memoryview(data)
+        while view:
+            written = f.write(view)
+            if not written:
+                raise OSError(f"short write to {path}: {len(view)} of {len(data)} bytes not written")
+            view = view[written:]
+
+
+def write_records(fleet_file: Path, eta_file: Path, records: list[dict]) -> None:
+    """
+    Append fleet and ETA lines for `records`.
+
+    Each file gets one append under its lock, so lines from concurrent writer
+    processes never interleave, even when a write comes back short and the
+    rest follows in a second call, and the ETA trim in `housekeep` never
+    overwrites lines appended while it runs.
+    """
+    fleet = "".join(json.dumps(r) + "\n" for r in records)
+    eta = "".join(
+        json.dumps({
+            "vehicle_id": r["vehicle_id"],
+            "eta_hours": r["eta_hours"],
+            "eta_status": r["eta_status"],
+            "remaining_km": r["remaining_km"],
+            "timestamp": r["timestamp"],
+        }) + "\n"
+        for r in records
+    )
+    _append(fleet_file, fleet.encode("utf-8"))
+    _append(eta_file, eta.encode("utf-8"))
+
+
+def housekeep(fleet_file: Path, eta_file: Path, fleet_size: int) -> None:
+    """
+    Seal the fleet log into history/ once it is large; the API compacts old
+    segments into rollups. The ETA file is a latest-only view, so just trim it:
+    under the ETA lock, write the tail to a tmp file and os.replace it in, so
+    readers never see a half-written file and writers are held off meanwhile.
+    """
+    if fleet_file.exists() and fleet_file.stat().st_size >= SEGMENT_MAX_BYTES:
+        with _locked(fleet_file):
+            rotate_segment(fleet_file, HISTORY_DIR)
+    with _locked(eta_file):
+        try:
+            lines = eta_file.read_bytes().splitlines()
+        except FileNotFoundError:
+            return
+        if len(lines) > max(500, 2 * fleet_size):
+            tmp = eta_file.with_suffix(".tmp")
+            tmp.write_bytes(b"\n".join(lines[-max(200, fleet_size):]) + b"\n")
+            os.replace(tmp, eta_file)
+
+
+def _writer(index: int, vehicles: list[dict], interval_sec: float, fleet_size: int, written, stop) -> None:
+    """Writer process: report every vehicle in its share once per interval."""
+    random.seed(index)
     fleet_file = TMP_DIR / "fleet_summary.jsonl"
     eta_file = TMP_DIR / "eta_summary.jsonl"
+    next_tick = time.monotonic()
+    try:
+        while not stop.is_set():
+            write_records(fleet_file, eta_file, [generate_record(v) for v in vehicles])
+            written[index] += len(vehicles)
+            if index == 0:
+                housekeep(fleet_file, eta_file, fleet_size)
+            # Fall behind rather than burst to catch up: the achieved rate shows the shortfall.
+            next_tick = max(next_tick + interval_sec, time.monotonic())
+            stop.wait(max(0.0, next_tick - time.monotonic()))
+    except KeyboardInterrupt:
+        pass  # Ctrl+C reaches every process; the parent prints the summary
+
+
+class ClientStats:
+    """Thread-safe request, error and staleness counters for the synthetic clients."""
 
-    print(f"[SimPipeline] Writing to {fleet_file} and {eta_file}")
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.requests: dict[str, LatencyHistogram] = {}
+        self.errors: dict[str, int] = {}
+        self.shed = 0
+        self.sse = {"connects": 0, "frames": 0, "records": 0, "errors": 0}
+        self.staleness = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def record_request(self, path: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self.requests.setdefault(path, LatencyHistogram()).record(seconds)
+            if status in (429, 503):
+                self.shed += 1
+            if not 200 <= status < 400:
+                self.errors[path] = self.errors.get(path, 0) + 1
+
+    def record_frame(self, records: list[dict]) -> None:
+        """Staleness of this run's records at receipt; replayed older records are skipped."""
+        now = time.time()
+        with self._lock:
+            self.sse["frames"] += 1
+            for record in records:
+                emitted = record.get("timestamp")
+                if isinstance(emitted, (int, float)) and emitted >= self.started_at:
+                    self.sse["records"] += 1
+                    self.staleness.record(now - emitted)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.sse[key] += 1
+
+    @property
+    def total_requests(self) -> int:
+        return sum(h.count for h in self.requests.values())
+
+    def summary(self, elapsed_sec: float) -> dict:
+        total = self.total_requests
+        errors = sum(self.errors.values())
+        return {
+            "api": {
+                "requests": total,
+                "rps": round(total / elapsed_sec, 1) if elapsed_sec else 0.0,
+                "errors": errors,
+                "shed": self.shed,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "endpoints": {
+                    path: {**h.summary(), "errors": self.errors.get(path, 0)}
+                    for path, h in sorted(self.requests.items())
+                },
+            },
+            "sse": {**self.sse, "staleness": self.staleness.summary()},
+        }
+
+
+def _api_client(base_url: str, vehicle_ids: list[str], think_sec: float, stats: ClientStats, stop) -> None:
+    """Poll dashboard endpoints until stopped."""
+    rng = random.Random()
+    while not stop.is_set():
+        path = rng.choice(API_PATHS)
+        url = base_url + path.replace("{id}", rng.choice(vehicle_ids))
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = 0
+        stats.record_request(path, status, time.perf_counter() - started)
+        stop.wait(think_sec)
+
+
+def _sse_client(base_url: str, stats: ClientStats, stop) -> None:
+    """Subscribe to the fleet SSE stream, reconnecting on errors, until stopped."""
+    while not stop.is_set():
+        try:
+            with urllib.request.urlopen(base_url + "/api/stream/fleet", timeout=30) as response:
+                stats.count("connects")
+                for line in response:
+                    if stop.is_set():
+                        return
+                    if line.startswith(b"data: "):
+                        stats.record_frame(json.loads(line[6:]))
+        except (OSError, ValueError):
+            stats.count("errors")
+            stop.wait(1.0)
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Run writers and clients until `--duration` elapses or Ctrl+C; return the summary."""
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    fleet = build_fleet(args.vehicles, args.corridors)
+    writers = max(1, min(args.writers, len(fleet)))
+    target_rate = len(fleet) / args.interval
+
+    print(f"[SimPipeline] Writing to {TMP_DIR / 'fleet_summary.jsonl'} and {TMP_DIR / 'eta_summary.jsonl'}")
+    print(f"[SimPipeline] {len(fleet)} vehicles every {args.interval:g}s "
+          f"({target_rate:,.0f} records/s target) from {writers} writer(s)")
     print("[SimPipeline] Press Ctrl+C to stop\n")
 
-    cycle = 0
-    while True:
-        cycle += 1
-        records = [generate_record(v) for v in VEHICLES]
-
-        # Write fleet records
-        with open(fleet_file, "a", encoding="utf-8") as f:
-            for r in records:
-                f.write(json.dumps(r) + "\n")
-
-        # Write ETA records
-        with open(eta_file, "a", encoding="utf-8") as f:
-            for r in records:
-                eta_record = {
-                    "vehicle_id": r["vehicle_id"],
-                    "eta_hours": r["eta_hours"],
-                    "eta_status": r["eta_status"],
-                    "remaining_km": r["remaining_km"],
-                    "timestamp": r["timestamp"],
-                }
-                f.write(json.dumps(eta_record) + "\n")
-
-        print(f"  [{cycle}] Wrote {len(records)} records  (CO₂ avg: {sum(r['co2_kg'] for r in records) / len(records):.1f} kg)")
-
-        # Truncate files if too large (keep last 500 lines)
-        for fpath in [fleet_file, eta_file]:
-            try:
-                lines = fpath.read_text(encoding="utf-8").strip().split("\n")
-                if len(lines) > 500:
-                    fpath.write_text("\n".join(lines[-200:]) + "\n", encoding="utf-8")
-            except Exception:
-                pass
-
-        time.sleep(2)
+    started_at = time.time()
+    stop_writers = mp.Event()
+    written = mp.Array("q", writers)
+    processes = [
+        mp.Process(
+            target=_writer, args=(i, fleet[i::writers], args.interval, len(fleet), written, stop_writers), daemon=True
+        )
+        for i in range(writers)
+    ]
+    for p in processes:
+        p.start()
+
+    stats = ClientStats(started_at)
+    stop_clients = threading.Event()
+    threads = []
+    if args.api_url:
+        base = args.api_url.rstrip("/")
+        ids = [v["vehicle_id"] for v in fleet]
+        threads += [
+            threading.Thread(target=_api_client, args=(base, ids, args.api_think, stats, stop_clients), daemon=True)
+            for _ in range(args.api_clients)
+        ]
+        threads += [
+            threading.Thread(target=_sse_client, args=(base, stats, stop_clients), daemon=True)
+            for _ in range(args.sse_clients)
+        ]
+    for t in threads:
+        t.start()
+
+    cycle, last = 0, 0
+    try:
+        while args.duration is None or time.time() - started_at < args.duration:
+            remaining = float("inf") if args.duration is None else args.duration - (time.time() - started_at)
+            time.sleep(max(0.0, min(args.interval, remaining)))
+            cycle += 1
+            total = sum(written)
+            line = f"  [{cycle}] Wrote {total - last:,} records  ({total:,} total)"
+            if threads:
+                line += f"  | API {stats.total_requests:,} req, {sum(stats.errors.values())} err"
+                line += f"  | SSE {stats.sse['frames']:,} frames"
+            print(line)
+            last = total
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.time() - started_at
+        stop_writers.set()
+        stop_clients.set()
+        for p in processes:
+            p.join(timeout=5)
+        for t in threads:
+            t.join(timeout=1)
+
+    total = sum(written)
+    return {
+        "duration_sec": round(elapsed, 1),
+        "vehicles": len(fleet),
+        "corridors": sorted({v["route_id"] for v in fleet}),
+        "writers": writers,
+        "records_written": total,
+        "target_rate": round(target_rate, 1),
+        "achieved_rate": round(total / elapsed, 1) if elapsed else 0.0,
+        **(stats.summary(elapsed) if threads else {}),
+    }
+
+
+def format_summary(summary: dict) -> str:
+    lines = [
+        "",
+        "── Soak summary " + "─" * 48,
+        f"Duration        {summary['duration_sec']:g}s, {summary['vehicles']:,} vehicles on "
+        f"{', '.join(summary['corridors'])}, {summary['writers']} writer(s)",
+        f"Writes          {summary['records_written']:,} records, {summary['achieved_rate']:,.1f}/s "
+        f"achieved vs {summary['target_rate']:,.1f}/s target",
+    ]
+    if "api" in summary:
+        api, sse = summary["api"], summary["sse"]
+        lines.append(f"API             {api['requests']:,} requests, {api['rps']:g} req/s, "
+                     f"error rate {100 * api['error_rate']:.2f}% ({api['shed']} shed with 429/503)")
+        for path, s in api["endpoints"].items():
+            lines.append(f"  {path:<22}{s['count']:>8,}  p50 {s['p50_ms']:>8.1f} ms  p95 {s['p95_ms']:>8.1f} ms  "
+                         f"p99 {s['p99_ms']:>8.1f} ms  {s['errors']} err")
+        stale = sse["staleness"]
+        lines.append(f"SSE             {sse['connects']} connects, {sse['frames']:,} frames, {sse['errors']} errors")
+        lines.append(f"Staleness       emission → SSE receipt over {stale['count']:,} records: "
+                     f"p50 {stale['p50_ms']:.0f} ms, p95 {stale['p95_ms']:.0f} ms, p99 {stale['p99_ms']:.0f} ms")
+    return "\n".join(lines)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Demo data writer and load generator for RouteZero.")
+    parser.add_argument("--vehicles", type=int, default=len(VEHICLES), help="fleet size (default: the 10 demo trucks)")
+    parser.add_argument("--corridors", nargs="+", choices=CORRIDORS, help="restrict the fleet to these corridors")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between reports per vehicle")
+    parser.add_argument("--rate", type=float, help="target records/s in total (overrides --interval)")
+    parser.add_argument("--writers", type=int, default=1, help="writer processes sharing the fleet")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds (default: run until Ctrl+C)")
+    parser.add_argument("--api-url", help="running API to load, e.g. http://localhost:8000")
+    parser.add_argument("--api-clients", type=int, default=4, help="dashboard polling clients (with --api-url)")
+    parser.add_argument("--api-think", type=float, default=1.0, help="seconds between one client's polls")
+    parser.add_argument("--sse-clients", type=int, default=2, help="SSE subscribers (with --api-url)")
+    parser.add_argument("--summary-json", type=Path, help="also write the summary here")
+    args = parser.parse_args(argv)
+    if args.rate:
+        args.interval = args.vehicles / args.rate
+    if args.interval <= 0 or args.vehicles < 1:
+        parser.error("--vehicles, --interval and --rate must be positive")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    summary = run(args)
+    print(format_summary(summary))
+    if args.summary_json:
+        args.summary_json.write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+        print(f"\nWrote {args.summary_json}")
 
 
 if __name__ == "__main__":
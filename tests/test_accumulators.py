@@ -0,0 +1,66 @@
+"""
+Unit tests for per-vehicle cumulative accumulators.
+
+Validates distance integration, gap handling, replay de-duplication and
+IPCC-baseline efficiency scoring.
+"""
+
+import pytest
+
+from transforms.accumulators import FleetAccumulators, baseline_co2_kg, efficiency_score
+
+
+def _rec(ts: float, speed: float = 60.0, co2: float = 1.0, **extra) -> dict:
+    return {"vehicle_id": "TRK-DL-001", "route_id": "delhi_mumbai", "timestamp": ts,
+            "speed_kmph": speed, "co2_kg": co2, "fuel_consumed_liters": 0.5, **extra}
+
+
+class TestFleetAccumulators:
+    """Test incremental totals."""
+
+    def test_distance_from_speed_and_time(self) -> None:
+        """60 km/h for one hour of 60 s fixes integrates to 60 km."""
+        acc = FleetAccumulators()
+        for i in range(61):
+            acc.update(_rec(i * 60.0))
+        totals = acc.vehicles["TRK-DL-001"]
+        assert totals["distance_km"] == pytest.approx(60.0)
+        assert totals["active_sec"] == pytest.approx(3600.0)
+        assert totals["co2_kg"] == pytest.approx(61.0)
+        assert acc.routes["delhi_mumbai"]["events"] == 61
+
+    def test_replayed_records_not_double_counted(self) -> None:
+        """Re-reading a truncated log leaves totals unchanged."""
+        acc = FleetAccumulators()
+        records = [_rec(float(ts)) for ts in range(0, 20, 2)]
+        for r in records:
+            acc.update(r)
+        before = dict(acc.vehicles["TRK-DL-001"])
+        for r in records[-5:]:
+            assert acc.update(r) is False
+        assert acc.vehicles["TRK-DL-001"] == before
+
+    def test_long_gap_adds_no_distance(self) -> None:
+        """A fix after an overnight gap adds CO₂ but no distance or active time."""
+        acc = FleetAccumulators()
+        acc.update(_rec(0.0))
+        acc.update(_rec(8 * 3600.0))
+        assert acc.vehicles["TRK-DL-001"]["distance_km"] == 0.0
+
+    def test_reported_distance_preferred(self) -> None:
+        """Pipeline-provided distance_km overrides speed integration."""
+        acc = FleetAccumulators()
+        acc.update(_rec(0.0, distance_km=0.0))
+        acc.update(_rec(2.0, distance_km=1.5))
+        assert acc.vehicles["TRK-DL-001"]["distance_km"] == pytest.approx(1.5)
+
+
+class TestEfficiencyScore:
+    """Test scoring against the IPCC AR6 laden baseline."""
+
+    def test_score_bands(self) -> None:
+        """At-baseline trucks score 3; far better score 5; far worse score 1; no distance is unrated."""
+        assert efficiency_score(baseline_co2_kg(100.0), 100.0) == 3
+        assert efficiency_score(0.5 * baseline_co2_kg(100.0), 100.0) == 5
+        assert efficiency_score(2.0 * baseline_co2_kg(100.0), 100.0) == 1
+        assert efficiency_score(10.0, 0.0) is None
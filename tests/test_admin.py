@@ -0,0 +1,53 @@
+"""
+Tests for the admin endpoint guard.
+
+Validates that /api/admin/* is closed when no ADMIN_TOKEN is configured and
+requires a matching X-Admin-Token header when one is.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("TMP_DIR", tempfile.mkdtemp(prefix="routezero-test-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import rag.api_server as api_server  # noqa: E402
+
+ADMIN_ROUTES = (
+    ("GET", "/api/admin/profiling"),
+    ("POST", "/api/admin/profiling"),
+    ("GET", "/api/admin/profiles/missing.folded"),
+)
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(api_server.app)
+
+
+class TestAdminGuard:
+    """Test ADMIN_TOKEN enforcement on the admin endpoints."""
+
+    @pytest.mark.parametrize("method,url", ADMIN_ROUTES)
+    def test_closed_without_token(self, client: TestClient, monkeypatch: pytest.MonkeyPatch, method: str, url: str) -> None:
+        """With ADMIN_TOKEN unset every admin route is refused."""
+        monkeypatch.setattr(api_server, "ADMIN_TOKEN", "")
+        response = client.request(method, url, json={"sample_rate": 1.0}, headers={"X-Admin-Token": ""})
+        assert response.status_code == 403
+        assert api_server.profiler.sample_rate != 1.0
+
+    @pytest.mark.parametrize("method,url", ADMIN_ROUTES)
+    def test_wrong_token_refused(self, client: TestClient, monkeypatch: pytest.MonkeyPatch, method: str, url: str) -> None:
+        """A configured token must match the header."""
+        monkeypatch.setattr(api_server, "ADMIN_TOKEN", "s3cret")
+        assert client.request(method, url, json={}, headers={"X-Admin-Token": "nope"}).status_code == 403
+
+    def test_matching_token_allowed(self, client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+        """The right header reaches the handler."""
+        monkeypatch.setattr(api_server, "ADMIN_TOKEN", "s3cret")
+        response = client.get("/api/admin/profiling", headers={"X-Admin-Token": "s3cret"})
+        assert response.status_code == 200 and "sample_rate" in response.json()
+        assert client.get("/api/admin/profiles/missing.folded", headers={"X-Admin-Token": "s3cret"}).status_code == 404
@@ -0,0 +1,133 @@
+"""
+Unit tests for admission control.
+
+Validates token buckets, the FIFO concurrency limiter with its queue-time
+budget, and the ASGI middleware's 429/503 shedding and pass-through.
+"""
+
+import asyncio
+
+from rag.admission import AdmissionController, AdmissionMiddleware, AdmissionRule, ConcurrencyLimiter, TokenBucket
+
+
+def _scope(path: str = "/api/chat", method: str = "POST", client: str = "10.0.0.1") -> dict:
+    return {"type": "http", "method": method, "path": path, "client": (client, 5000), "headers": []}
+
+
+async def _call(middleware: AdmissionMiddleware, scope: dict) -> int:
+    """Run one request through the middleware and return its status."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+    return sent[0]["status"]
+
+
+def _slow_app(gate: asyncio.Event):
+    async def app(scope, receive, send):
+        await gate.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+class TestTokenBucket:
+    """Test the token bucket."""
+
+    def test_burst_then_refill(self) -> None:
+        """A full bucket admits `burst` requests, then refills at `rate`."""
+        bucket = TokenBucket(rate=2.0, burst=3, now=0.0)
+        assert [bucket.take(now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.take(now=0.0) == 0.5
+        assert bucket.take(now=0.5) == 0.0
+
+    def test_refill_is_capped_at_burst(self) -> None:
+        """Idle time never accumulates more than `burst` tokens."""
+        bucket = TokenBucket(rate=1.0, burst=2, now=0.0)
+        admitted = sum(bucket.take(now=100.0) == 0.0 for _ in range(5))
+        assert admitted == 2
+
+
+class TestConcurrencyLimiter:
+    """Test the in-flight bound and wait queue."""
+
+    def test_waiter_gets_released_slot(self) -> None:
+        """A queued request is admitted when a slot is released within budget."""
+        async def run() -> tuple:
+            limiter = ConcurrencyLimiter(max_concurrency=1, queue_budget_sec=1.0, max_queue=4)
+            assert await limiter.acquire() is None
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            queued = limiter.queued
+            limiter.release()
+            return queued, await waiter, limiter.in_flight
+        assert asyncio.run(run()) == (1, None, 1)
+
+    def test_queue_timeout_and_full(self) -> None:
+        """Waiters past the budget or beyond max_queue are shed."""
+        async def run() -> list:
+            limiter = ConcurrencyLimiter(max_concurrency=1, queue_budget_sec=0.05, max_queue=1)
+            await limiter.acquire()
+            outcomes = await asyncio.gather(limiter.acquire(), limiter.acquire())
+            return [*outcomes, limiter.queued, limiter.in_flight]
+        assert asyncio.run(run()) == ["queue_timeout", "queue_full", 0, 1]
+
+
+class TestAdmissionMiddleware:
+    """Test shedding through the ASGI middleware."""
+
+    def test_unmatched_requests_pass_through(self) -> None:
+        """Requests that match no rule are never limited."""
+        async def run() -> list:
+            gate = asyncio.Event()
+            gate.set()
+            rule = AdmissionRule("chat", r"/api/chat", frozenset({"POST"}), max_concurrency=1, client_rate=0.001)
+            mw = AdmissionMiddleware(_slow_app(gate), AdmissionController([rule]))
+            return [await _call(mw, _scope("/api/fleet", "GET")) for _ in range(5)]
+        assert asyncio.run(run()) == [200] * 5
+
+    def test_client_rate_limit_returns_429(self) -> None:
+        """A client over its bucket gets 429 while other clients are unaffected."""
+        async def run() -> tuple:
+            gate = asyncio.Event()
+            gate.set()
+            rule = AdmissionRule("chat", r"/api/chat", frozenset({"POST"}), max_concurrency=8,
+                                 client_rate=0.001, client_burst=2)
+            controller = AdmissionController([rule])
+            mw = AdmissionMiddleware(_slow_app(gate), controller)
+            statuses = [await _call(mw, _scope()) for _ in range(3)]
+            other = await _call(mw, _scope(client="10.0.0.2"))
+            return statuses, other, controller.metrics()["rules"]["chat"]["shed_client_rate"]
+        assert asyncio.run(run()) == ([200, 200, 429], 200, 1)
+
+    def test_overload_sheds_with_503(self) -> None:
+        """Beyond max_concurrency + max_queue, requests are shed with 503."""
+        async def run() -> tuple:
+            gate = asyncio.Event()
+            rule = AdmissionRule("report", r"/api/carbon-report", frozenset({"GET"}), max_concurrency=2,
+                                 queue_budget_sec=5.0, max_queue=1)
+            controller = AdmissionController([rule])
+            mw = AdmissionMiddleware(_slow_app(gate), controller)
+            tasks = [asyncio.create_task(_call(mw, _scope("/api/carbon-report", "GET"))) for _ in range(4)]
+            await asyncio.sleep(0.01)
+            busy = controller.metrics()["rules"]["report"]
+            gate.set()
+            statuses = sorted(await asyncio.gather(*tasks))
+            return statuses, busy["in_flight"], busy["queued"], controller.metrics()["rules"]["report"]["in_flight"]
+        assert asyncio.run(run()) == ([200, 200, 200, 503], 2, 1, 0)
+
+    def test_disabled_controller_admits_everything(self) -> None:
+        """enabled=False turns the middleware into a pass-through."""
+        async def run() -> list:
+            gate = asyncio.Event()
+            gate.set()
+            rule = AdmissionRule("chat", r"/api/chat", frozenset({"POST"}), max_concurrency=1,
+                                 client_rate=0.001, client_burst=1)
+            mw = AdmissionMiddleware(_slow_app(gate), AdmissionController([rule], enabled=False))
+            return [await _call(mw, _scope()) for _ in range(3)]
+        assert asyncio.run(run()) == [200] * 3
@@ -0,0 +1,239 @@
+"""
+Unit tests for the append-only alert store.
+
+Validates rising-edge alert generation, indexed time-range and filter
+queries, OPEN/RESOLVED status, rebuilding indexes from the log, and expiry.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from rag.alert_store import EXPIRY_SLACK_SEC, AlertStore, _Indexes
+
+
+def _rec(vid: str, ts: float, **fields) -> dict:
+    return {"vehicle_id": vid, "timestamp": ts, "route_id": "DEL-JAI", "co2_kg": 1.5, **fields}
+
+
+def _emit(store: AlertStore, vid: str, ts: float, high: bool) -> None:
+    store.update(_rec(vid, ts, status="HIGH_EMISSION_ALERT" if high else "NORMAL"))
+
+
+class TestAlertGeneration:
+    """Test rising-edge alert generation."""
+
+    def test_sustained_condition_raises_once(self, tmp_path: Path) -> None:
+        """A condition that stays true for many records produces one alert."""
+        store = AlertStore(tmp_path / "alerts.jsonl")
+        for t in range(10):
+            _emit(store, "TRK-DL-001", 1000.0 + t, high=True)
+        assert len(store) == 1
+        assert store.query()[0]["status"] == "OPEN"
+
+    def test_flapping_raises_separate_alerts(self, tmp_path: Path) -> None:
+        """Each false → true transition is a new alert; earlier ones resolve."""
+        store = AlertStore(tmp_path / "alerts.jsonl")
+        for t, high in enumerate([True, False, True, True, False, True]):
+            _emit(store, "TRK-DL-001", 1000.0 + t, high)
+        alerts = store.query()
+        assert len(alerts) == 3
+        assert [a["status"] for a in alerts] == ["OPEN", "RESOLVED", "RESOLVED"]
+
+    def test_multiple_conditions_on_one_record(self, tmp_path: Path) -> None:
+        """One record can raise alerts of several types."""
+        store = AlertStore(tmp_path / "alerts.jsonl")
+        store.update(_rec("TRK-DL-001", 1000.0, status="HIGH_EMISSION_ALERT",
+                          deviation_status="DEVIATED", temperature_breach=True, temperature_c=-12.0))
+        assert {a["type"] for a in store.query()} == {"HIGH_EMISSION_ALERT", "ROUTE_DEVIATION", "TEMPERATURE_BREACH"}
+
+    def test_pipeline_deviation_status(self, tmp_path: Path) -> None:
+        """The pipeline's `ROUTE_DEVIATION_ALERT|deviation_km=…` status raises a deviation; `OK|…` clears it."""
+        store = AlertStore(tmp_path / "alerts.jsonl")
+        store.update(_rec("TRK-DL-001", 1000.0, deviation_status="OK|deviation_km=0.0|extra_co2_kg=0.0"))
+        store.update(_rec("TRK-DL-001", 1001.0, deviation_status="ROUTE_DEVIATION_ALERT|deviation_km=7.25|extra_co2_kg=1.2"))
+        alerts = store.query(alert_type="ROUTE_DEVIATION")
+        assert len(alerts) == 1 and alerts[0]["detail"] == "7.2 km off DEL-JAI"
+        store.update(_rec("TRK-DL-001", 1002.0, deviation_status="OK|deviation_km=0.0|extra_co2_kg=0.0"))
+        assert store.query(alert_type="ROUTE_DEVIATION")[0]["status"] == "RESOLVED"
+
+    def test_stale_records_are_ignored(self, tmp_path: Path) -> None:
+        """Records at or before a vehicle's last timestamp do not change alert state."""
+        store = AlertStore(tmp_path / "alerts.jsonl")
+        _emit(store, "TRK-DL-001", 1000.0, high=True)
+        _emit(store, "TRK-DL-001", 999.0, high=False)
+        _emit(store, "TRK-DL-001", 1001.0, high=True)
+        assert len(store) == 1
+
+    def test_on_alert_callback(self, tmp_path: Path) -> None:
+        """New alerts are passed to the callback."""
+        raised = []
+        store = AlertStore(tmp_path / "alerts.jsonl", on_alert=raised.append)
+        _emit(store, "TRK-DL-001", 1000.0, high=True)
+        _emit(store, "TRK-DL-001", 1001.0, high=True)
+        assert [a["type"] for a in raised] == ["HIGH_EMISSION_ALERT"]
+
+
+class TestAlertQueries:
+    """Test indexed queries."""
+
+    def _store(self, tmp_path: Path) -> AlertStore:
+        store = AlertStore(tmp_path / "alerts.jsonl")
+        for t in range(0, 100, 2):
+            for vid in ("TRK-DL-001", "TRK-MH-002"):
+                _emit(store, vid, float(t), high=True)
+                store.update(_rec(vid, t + 1.0, deviation_status="DEVIATED", deviation_km=3.2))
+        return store
+
+    def test_time_range_is_half_open_and_newest_first(self, tmp_path: Path) -> None:
+        """start is inclusive, end exclusive, results sorted newest first."""
+        alerts = self._store(tmp_path).query(start=10, end=20, limit=1000)
+        timestamps = [a["timestamp"] for a in alerts]
+        assert min(timestamps) == 10 and max(timestamps) == 19
+        assert timestamps == sorted(timestamps, reverse=True)
+
+    def test_filters_combine(self, tmp_path: Path) -> None:
+        """vehicle_id and alert_type filters apply together with the time range."""
+        alerts = self._store(tmp_path).query(
+            start=10, end=20, vehicle_id="TRK-MH-002", alert_type="ROUTE_DEVIATION", limit=1000
+        )
+        assert len(alerts) == 5
+        assert all(a["vehicle_id"] == "TRK-MH-002" and a["type"] == "ROUTE_DEVIATION" for a in alerts)
+        assert alerts[0]["detail"] == "3.2 km off DEL-JAI"
+
+    def test_limit_keeps_newest(self, tmp_path: Path) -> None:
+        """A limit returns the most recent alerts in range."""
+        alerts = self._store(tmp_path).query(alert_type="HIGH_EMISSION_ALERT", limit=3)
+        assert [a["timestamp"] for a in alerts] == [98.0, 98.0, 96.0]
+
+    def test_last_n_per_vehicle(self, tmp_path: Path) -> None:
+        """last_n returns one vehicle's latest alerts, newest first."""
+        alerts = self._store(tmp_path).last_n("TRK-DL-001", 4)
+        assert [a["timestamp"] for a in alerts] == [99.0, 98.0, 97.0, 96.0]
+        assert alerts[0]["status"] == "OPEN" and alerts[2]["status"] == "RESOLVED"
+
+    def test_unknown_vehicle_is_empty(self, tmp_path: Path) -> None:
+        """Queries for unseen keys return nothing."""
+        assert self._store(tmp_path).last_n("TRK-XX-999") == []
+
+    def test_out_of_order_vehicles_stay_sorted(self, tmp_path: Path) -> None:
+        """An alert older than the newest indexed one is inserted in time order."""
+        store = AlertStore(tmp_path / "alerts.jsonl")
+        _emit(store, "TRK-DL-001", 2000.0, high=True)
+        _emit(store, "TRK-MH-002", 1000.0, high=True)
+        assert [a["timestamp"] for a in store.query()] == [2000.0, 1000.0]
+        assert [a["vehicle_id"] for a in store.query(end=1500)] == ["TRK-MH-002"]
+
+    def test_interleaved_late_arrivals_sort_once(self, tmp_path: Path) -> None:
+        """Many late alerts across vehicles come back in time order, ties in log order."""
+        store = AlertStore(tmp_path / "alerts.jsonl")
+        stamps = [1000.0, 1010.0, 1005.0, 1020.0, 1001.0, 1010.0, 1030.0, 999.0]
+        for i, ts in enumerate(stamps):
+            _emit(store, f"TRK-{i:03d}", ts, high=True)
+        alerts = store.query(limit=100)
+        assert [a["timestamp"] for a in alerts] == sorted(stamps, reverse=True)
+        assert [a["vehicle_id"] for a in alerts if a["timestamp"] == 1010.0] == ["TRK-005", "TRK-001"]
+        assert [a["timestamp"] for a in store.query(start=1001.0, end=1011.0)] == [1010.0, 1010.0, 1005.0, 1001.0]
+
+
+class TestAlertPersistence:
+    """Test reloading the log."""
+
+    def test_reload_rebuilds_indexes_without_reraising(self, tmp_path: Path) -> None:
+        """A new store over the same file serves the history and does not duplicate open alerts."""
+        path = tmp_path / "alerts.jsonl"
+        store = AlertStore(path)
+        _emit(store, "TRK-DL-001", 1000.0, high=True)
+        _emit(store, "TRK-DL-001", 1001.0, high=False)
+        _emit(store, "TRK-DL-001", 1002.0, high=True)
+        store.close()
+
+        reloaded = AlertStore(path)
+        assert len(reloaded) == 2
+        _emit(reloaded, "TRK-DL-001", 1003.0, high=True)
+        assert len(reloaded) == 2
+        assert [a["alert_id"] for a in reloaded.last_n("TRK-DL-001")] == [2, 1]
+
+    def test_checkpoint_resolves_closed_alerts(self, tmp_path: Path) -> None:
+        """Alerts the checkpoint knew were resolved stay resolved after reload."""
+        path = tmp_path / "alerts.jsonl"
+        store = AlertStore(path)
+        _emit(store, "TRK-DL-001", 1000.0, high=True)
+        _emit(store, "TRK-DL-001", 1001.0, high=False)
+        state = store.to_dict()
+        store.close()
+
+        reloaded = AlertStore(path)
+        reloaded.load_dict(state)
+        assert reloaded.query()[0]["status"] == "RESOLVED"
+        _emit(reloaded, "TRK-DL-001", 1002.0, high=True)
+        assert len(reloaded) == 2
+
+    def test_torn_tail_is_overwritten(self, tmp_path: Path) -> None:
+        """A partial last line from a crash is ignored and replaced by the next append."""
+        path = tmp_path / "alerts.jsonl"
+        store = AlertStore(path)
+        _emit(store, "TRK-DL-001", 1000.0, high=True)
+        store.close()
+        with open(path, "ab") as f:
+            f.write(b'{"alert_id": 2, "vehicle_')
+
+        reloaded = AlertStore(path)
+        assert len(reloaded) == 1
+        _emit(reloaded, "TRK-MH-002", 1001.0, high=True)
+        reloaded.close()
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2 and '"TRK-MH-002"' in lines[1]
+
+
+class TestAlertRetention:
+    """Test expiry of old alerts."""
+
+    def test_expire_drops_old_resolved_alerts(self, tmp_path: Path) -> None:
+        """Resolved alerts past the window go; open ones and state survive the rewrite."""
+        path = tmp_path / "alerts.jsonl"
+        store = AlertStore(path, retention_sec=100.0)
+        _emit(store, "TRK-DL-001", 1000.0, high=True)
+        _emit(store, "TRK-DL-001", 1001.0, high=False)
+        store.update(_rec("TRK-DL-002", 1000.0, temperature_breach=True))
+        _emit(store, "TRK-DL-001", 1000.0 + EXPIRY_SLACK_SEC, high=True)
+        now = 1000.0 + EXPIRY_SLACK_SEC + 100.0 + 1
+        assert store.expire(now=now) > 0
+        alerts = store.query()
+        assert [(a["vehicle_id"], a["status"]) for a in alerts] == [("TRK-DL-001", "OPEN"), ("TRK-DL-002", "OPEN")]
+        assert store.stats["expired"] == 1
+        _emit(store, "TRK-DL-001", now, high=True)  # still open: no re-raise after the rebuild
+        assert len(store) == 2 and len(path.read_text().splitlines()) == 2
+        assert AlertStore(path).query()[0]["alert_id"] == 3
+
+    def test_expire_waits_for_slack(self, tmp_path: Path) -> None:
+        """Alerts just past the window do not trigger a rewrite yet."""
+        store = AlertStore(tmp_path / "alerts.jsonl", retention_sec=100.0)
+        _emit(store, "TRK-DL-001", 1000.0, high=True)
+        _emit(store, "TRK-DL-001", 1001.0, high=False)
+        assert store.expire(now=1200.0) == 0
+        assert len(store) == 1
+
+    def test_expire_copies_without_the_lock(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Alerts raised while the log is being copied land in the rewritten log."""
+        path = tmp_path / "alerts.jsonl"
+        store = AlertStore(path, retention_sec=100.0)
+        _emit(store, "TRK-DL-001", 1000.0, high=True)
+        _emit(store, "TRK-DL-001", 1001.0, high=False)
+        _emit(store, "TRK-DL-002", 1000.0 + EXPIRY_SLACK_SEC, high=True)
+        now = 1000.0 + EXPIRY_SLACK_SEC + 100.0 + 1
+
+        add, raised = _Indexes.add, []
+
+        def add_and_raise(indexes, alert, offset):
+            if indexes is not store._idx and not raised:
+                assert not store._lock.locked()
+                raised.append(True)
+                _emit(store, "TRK-DL-003", now, high=True)
+            add(indexes, alert, offset)
+
+        monkeypatch.setattr(_Indexes, "add", add_and_raise)
+        assert store.expire(now=now) > 0
+        assert [a["vehicle_id"] for a in store.query()] == ["TRK-DL-003", "TRK-DL-002"]
+        assert store.stats["expired"] == 1
+        assert [a["vehicle_id"] for a in AlertStore(path).query()] == ["TRK-DL-003", "TRK-DL-002"]
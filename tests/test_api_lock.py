@@ -0,0 +1,64 @@
+"""
+Tests for the single-process API lock.
+
+Validates that a second API process on the same TMP_DIR refuses to start
+instead of running its own copy of the append-only writers.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ.setdefault("TMP_DIR", tempfile.mkdtemp(prefix="routezero-test-"))
+
+import rag.api_server as api_server  # noqa: E402
+from rag.file_lock import lock_file, unlock_file  # noqa: E402
+
+
+@pytest.fixture
+def lock_path(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    path = tmp_path / "api.lock"
+    monkeypatch.setattr(api_server, "API_LOCK_FILE", path)
+    yield path
+    api_server._release_api_lock()
+
+
+class TestApiLock:
+    """Test the TMP_DIR writer lock claimed at startup."""
+
+    def test_first_process_claims_lock(self, lock_path) -> None:
+        """The lock is taken and records this process id."""
+        api_server._claim_api_lock()
+        assert lock_path.read_text().strip() == str(os.getpid())
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="relies on flock conflicts between open files of one process")
+    def test_second_process_refused(self, lock_path) -> None:
+        """With the lock held elsewhere, startup fails instead of sharing the writers."""
+        with open(lock_path, "a+") as holder:
+            assert lock_file(holder, blocking=False)
+            with pytest.raises(RuntimeError, match="single worker"):
+                api_server._claim_api_lock()
+        assert api_server._api_lock is None
+
+    def test_released_on_shutdown(self, lock_path) -> None:
+        """A restart in the same process (or a new one) can claim the lock again."""
+        api_server._claim_api_lock()
+        api_server._release_api_lock()
+        api_server._claim_api_lock()
+        assert api_server._api_lock is not None
+
+
+class TestFileLock:
+    """Test the portable lock helper."""
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="relies on flock conflicts between open files of one process")
+    def test_non_blocking_lock_reports_holder(self, tmp_path) -> None:
+        """A second non-blocking claim fails until the first holder unlocks."""
+        path = tmp_path / "x.lock"
+        with open(path, "a") as first, open(path, "a") as second:
+            assert lock_file(first, blocking=False)
+            assert not lock_file(second, blocking=False)
+            unlock_file(first)
+            assert lock_file(second, blocking=False)
@@ -0,0 +1,41 @@
+"""
+Unit tests for the benchmark harness.
+
+Validates timing summaries, registry keys and baseline regression checks.
+"""
+
+from benchmarks.harness import Benchmark, compare, measure
+
+
+def _result(median_us: float) -> dict:
+    return {"median_us": median_us}
+
+
+class TestHarness:
+    """Test timing and baseline comparison."""
+
+    def test_measure_reports_per_call_stats(self) -> None:
+        """measure autoranges loops and reports consistent per-call figures."""
+        calls = []
+        result = measure(lambda: calls.append(1), min_time=0.01, rounds=3)
+        assert result["rounds"] == 3 and result["loops"] >= 1
+        assert result["min_us"] <= result["median_us"]
+        assert len(calls) >= 1 + 3 * result["loops"]
+
+    def test_keys_include_params(self) -> None:
+        """Parametrised benchmarks get one key per param."""
+        bench = Benchmark("api", "fleet", lambda n: None, (10, 1000))
+        assert [bench.key(p) for p in bench.params] == ["api/fleet[10]", "api/fleet[1000]"]
+        assert Benchmark("transforms", "haversine_km", lambda: None).key(None) == "transforms/haversine_km"
+
+    def test_compare_flags_only_slowdowns_beyond_tolerance(self) -> None:
+        """Only medians slower than baseline × (1 + tolerance) are regressions, worst first."""
+        baseline = {"a": _result(100.0), "b": _result(100.0), "c": _result(100.0)}
+        results = {"a": _result(124.0), "b": _result(200.0), "c": _result(150.0)}
+        regressions = compare(results, baseline, tolerance=0.25)
+        assert [r["key"] for r in regressions] == ["b", "c"]
+        assert regressions[0]["ratio"] == 2.0
+
+    def test_compare_ignores_new_and_removed_benchmarks(self) -> None:
+        """Keys on only one side never fail the check."""
+        assert compare({"new": _result(1e9)}, {"old": _result(1.0)}) == []
@@ -0,0 +1,279 @@
+"""
+Unit tests for booking ids, idempotent creates and the booking log.
+
+Validates id ordering across clock steps and restarts, Idempotency-Key
+replay/mismatch/in-flight handling, body validation, group-committed appends
+with atomic in-place updates, late-commit settlement, and the create endpoint's
+key handling on invalid bodies and slow writes.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("TMP_DIR", tempfile.mkdtemp(prefix="routezero-test-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import rag.api_server as api_server  # noqa: E402
+from rag.bookings import (  # noqa: E402
+    BookingIdGenerator,
+    BookingStore,
+    IdempotencyCache,
+    build_booking,
+    request_fingerprint,
+    validate_booking,
+)
+
+
+class _Clock:
+    def __init__(self, now: float = 1_760_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestBookingIds:
+    """Test time-ordered id generation."""
+
+    def test_same_millisecond_is_sequenced(self) -> None:
+        """Ids issued within one millisecond (or after the clock steps back) keep increasing."""
+        clock = _Clock()
+        ids = BookingIdGenerator(node_id=7, clock=clock)
+        first, second = ids.next(), ids.next()
+        clock.now -= 5
+        third = ids.next()
+        assert first < second < third
+        assert first == "BK-176000000000007000" and second.endswith("07001")
+
+    def test_unique_across_threads(self) -> None:
+        """Concurrent callers never receive the same id, even past the per-ms sequence limit."""
+        ids = BookingIdGenerator(clock=_Clock())
+        issued: list[str] = []
+
+        def worker() -> None:
+            issued.extend(ids.next() for _ in range(1000))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(set(issued)) == 4000
+
+    def test_observe_skips_issued_and_legacy_ids(self) -> None:
+        """A restarted generator continues past ids in the log; legacy and other-node ids are ignored."""
+        clock = _Clock()
+        before = BookingIdGenerator(clock=clock)
+        last = [before.next() for _ in range(3)][-1]
+        after = BookingIdGenerator(clock=clock)
+        for booking_id in (last, "BK-00000001", "BK-999999999999942000"):
+            after.observe(booking_id)
+        assert after.next() > last
+
+    def test_rejects_bad_node(self) -> None:
+        """Node ids must fit the two-digit field."""
+        with pytest.raises(ValueError):
+            BookingIdGenerator(node_id=100)
+
+
+class TestIdempotencyCache:
+    """Test Idempotency-Key bookkeeping."""
+
+    def test_replay_mismatch_and_in_flight(self) -> None:
+        """A completed key replays; a different body or a concurrent retry is refused."""
+        cache = IdempotencyCache()
+        body = request_fingerprint({"origin": "Delhi"})
+        assert cache.begin("k1", body) == ("new", None)
+        assert cache.begin("k1", body) == ("in_flight", None)
+        cache.complete("k1", {"booking_id": "BK-1"})
+        assert cache.begin("k1", body) == ("replay", {"booking_id": "BK-1"})
+        assert cache.begin("k1", request_fingerprint({"origin": "Pune"})) == ("mismatch", None)
+        assert cache.stats == {"replays": 1, "in_flight": 1, "mismatches": 1, "evicted": 0}
+
+    def test_abort_and_expiry(self) -> None:
+        """Aborted keys can be retried; completed keys are forgotten after the TTL."""
+        clock = _Clock()
+        cache = IdempotencyCache(ttl_sec=60, clock=clock)
+        cache.begin("k1", None)
+        cache.abort("k1")
+        assert cache.begin("k1", None) == ("new", None)
+        cache.complete("k1", {"ok": True})
+        clock.now += 61
+        assert cache.begin("k1", None) == ("new", None)
+
+    def test_fingerprint_ignores_key_order(self) -> None:
+        """Equivalent bodies hash identically."""
+        assert request_fingerprint({"a": 1, "b": [1, 2]}) == request_fingerprint({"b": [1, 2], "a": 1})
+
+
+class TestValidation:
+    """Test booking body validation."""
+
+    @pytest.mark.parametrize("body", [
+        {"commodities": [{"weight_kg": "5"}]},
+        {"commodities": [{"weight_kg": -1}]},
+        {"commodities": {"weight_kg": 5}},
+        {"commodities": ["crate"]},
+        {"rate_per_kg": True},
+        {"service_tax_pct": float("nan")},
+    ])
+    def test_invalid_bodies_raise_value_error(self, body: dict) -> None:
+        """Bodies that would break the freight computation are rejected with ValueError."""
+        with pytest.raises(ValueError):
+            validate_booking(body)
+        with pytest.raises(ValueError):
+            build_booking(body, "BK-1")
+
+    def test_defaults_are_valid(self) -> None:
+        """Missing numeric fields fall back to their defaults."""
+        validate_booking({"commodities": [{"name": "Steel"}]})
+        assert build_booking({"commodities": [{"weight_kg": 10}]}, "BK-1")["freight"] == 225.0
+
+
+class TestBookingStore:
+    """Test group-committed appends and updates."""
+
+    def test_submit_commits_in_order(self, tmp_path: Path) -> None:
+        """Every submitted booking reaches the log once, in submission order."""
+        store = BookingStore(tmp_path / "bookings.jsonl", fsync=False)
+        bookings = [build_booking({"origin": "Delhi"}, store.ids.next()) for _ in range(200)]
+        seq = None
+        for i in range(0, 200, 20):
+            seq = store.submit(bookings[i:i + 20])
+        assert store.wait_committed(seq)
+        store.close()
+        lines = (tmp_path / "bookings.jsonl").read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["booking_id"] for line in lines] == [b["booking_id"] for b in bookings]
+        assert store.stats["groups"] <= 10
+
+    def test_backpressure(self, tmp_path: Path) -> None:
+        """Submits beyond max_pending are refused rather than queued."""
+        store = BookingStore(tmp_path / "bookings.jsonl", max_pending=2, fsync=False)
+        assert store.submit([{"booking_id": f"BK-{i}"} for i in range(3)]) is None
+        assert store.stats["rejected_backpressure"] == 3
+
+    def test_update_rewrites_full_log(self, tmp_path: Path) -> None:
+        """Updates see just-submitted bookings and keep every other record."""
+        store = BookingStore(tmp_path / "bookings.jsonl", fsync=False)
+        bookings = [build_booking({}, store.ids.next()) for _ in range(1500)]
+        store.submit(bookings)
+        updated = store.update(bookings[-1]["booking_id"], {"status": "dispatched", "vehicle_id": "TRK-DL-001"})
+        assert updated["status"] == "dispatched"
+        assert store.update("BK-404", {"status": "dispatched"}) is None
+        lines = (tmp_path / "bookings.jsonl").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1500 and json.loads(lines[-1])["vehicle_id"] == "TRK-DL-001"
+
+    def test_restart_restores_ids_and_keys(self, tmp_path: Path) -> None:
+        """A new store continues the id sequence and replays keys persisted on bookings."""
+        path = tmp_path / "bookings.jsonl"
+        store = BookingStore(path, fsync=False)
+        single = build_booking({"origin": "Delhi"}, store.ids.next(), idempotency_key="mobile-1")
+        batch = [build_booking({}, store.ids.next(), import_key="erp-7") for _ in range(3)]
+        assert store.wait_committed(store.submit([single, *batch]))
+        store.close()
+
+        restarted = BookingStore(path, fsync=False)
+        assert restarted.ids.next() > batch[-1]["booking_id"]
+        state, receipt = restarted.idempotency.begin("mobile-1", request_fingerprint({"origin": "Delhi"}))
+        assert state == "replay" and receipt["booking_id"] == single["booking_id"]
+        state, result = restarted.idempotency.begin("erp-7", None)
+        assert state == "replay" and [r["booking_id"] for r in result["bookings"]] == [b["booking_id"] for b in batch]
+
+    def test_when_committed_settles_late_writes(self, tmp_path: Path) -> None:
+        """A waiter registered after a timed-out wait is called once the group lands."""
+        store = BookingStore(tmp_path / "bookings.jsonl", fsync=False)
+        outcomes = []
+        with store._file_lock:  # hold the writer mid-commit
+            seq = store.submit([build_booking({}, store.ids.next())])
+            assert not store.wait_committed(seq, timeout=0.05)
+            store.when_committed(seq, outcomes.append)
+            assert outcomes == []
+        assert store.wait_committed(seq)
+        assert outcomes == [True]
+        store.when_committed(seq, outcomes.append)  # already committed: called at once
+        assert outcomes == [True, True]
+        store.close()
+
+    def test_when_committed_reports_failure(self, tmp_path: Path) -> None:
+        """A failed group settles its waiters with False and is not counted as committed."""
+        store = BookingStore(tmp_path / "bookings.jsonl", fsync=False)
+        store.path.mkdir()  # appends now fail with IsADirectoryError
+        outcomes = []
+        seq = store.submit([build_booking({}, store.ids.next())])
+        assert not store.wait_committed(seq)
+        store.when_committed(seq, outcomes.append)
+        assert outcomes == [False]
+        assert store.stats["committed"] == 0 and store.stats["write_errors"] == 1
+        store.close()
+
+
+class TestCreateEndpoint:
+    """Test Idempotency-Key handling in POST /api/booking."""
+
+    @pytest.fixture
+    def store(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> BookingStore:
+        store = BookingStore(tmp_path / "bookings.jsonl", fsync=False)
+        monkeypatch.setattr(api_server, "booking_store", store)
+        yield store
+        store.close()
+
+    def test_invalid_body_does_not_claim_key(self, store: BookingStore) -> None:
+        """A malformed body gets 422 and leaves the key free for the corrected request."""
+        client = TestClient(api_server.app)
+        headers = {"Idempotency-Key": "mobile-9"}
+        bad = client.post("/api/booking", json={"commodities": [{"weight_kg": "5"}]}, headers=headers)
+        assert bad.status_code == 422 and "weight_kg" in bad.json()["error"]
+        assert len(store.idempotency) == 0
+        fixed = {"commodities": [{"weight_kg": 5}]}
+        assert client.post("/api/booking", json=fixed, headers=headers).status_code == 200
+
+    def test_import_validates_every_item(self, store: BookingStore) -> None:
+        """One bad item rejects the whole import before anything is queued."""
+        client = TestClient(api_server.app)
+        response = client.post("/api/bookings/import", json=[{}, {"rate_per_kg": "cheap"}])
+        assert response.status_code == 422 and response.json()["error"].startswith("bookings[1]")
+        assert store.stats["accepted"] == 0
+
+    def test_late_commit_completes_key(self, store: BookingStore, monkeypatch: pytest.MonkeyPatch) -> None:
+        """After a 503 on a slow write, retries see 409 and then the original booking, never a duplicate."""
+        client = TestClient(api_server.app)
+        headers, body = {"Idempotency-Key": "mobile-10"}, {"origin": "Delhi"}
+        wait = store.wait_committed
+        with store._file_lock:
+            monkeypatch.setattr(store, "wait_committed", lambda seq, timeout=5.0: wait(seq, timeout=0.05))
+            assert client.post("/api/booking", json=body, headers=headers).status_code == 503
+            assert client.post("/api/booking", json=body, headers=headers).status_code == 409
+        monkeypatch.setattr(store, "wait_committed", wait)
+        assert wait(store._submitted)
+        replay = client.post("/api/booking", json=body, headers=headers)
+        assert replay.status_code == 200 and replay.headers["Idempotent-Replayed"] == "true"
+        lines = store.path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1 and json.loads(lines[0])["booking_id"] == replay.json()["booking_id"]
+
+
+class TestRecommendEndpoint:
+    """Test which bookings POST /api/dispatch/recommend considers."""
+
+    def test_all_pending_considered(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Pending bookings beyond the last 1000 log lines are included; an invalid weight is unassigned, not a 422."""
+        path = tmp_path / "bookings.jsonl"
+        rows = [{"booking_id": f"BK-{i:05d}", "status": "pending", "origin": "Delhi", "destination": "Mumbai",
+                 "total_weight": 100} for i in range(1200)]
+        rows[0]["total_weight"] = "heavy"
+        path.write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+        store = BookingStore(path, fsync=False)
+        monkeypatch.setattr(api_server, "booking_store", store)
+        try:
+            response = TestClient(api_server.app).post("/api/dispatch/recommend", json={})
+        finally:
+            store.close()
+        assert response.status_code == 200
+        result = response.json()
+        assert len(result["assignments"]) + len(result["unassigned"]) == 1200
+        assert {"booking_id": "BK-00000", "reason": "invalid total_weight"} in result["unassigned"]
@@ -0,0 +1,79 @@
+"""
+Unit tests for streaming carbon MRV exports.
+
+Validates per-event and per-day rows, time-range filtering, and that the
+single-pass summary matches the rows it was computed alongside.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from rag.carbon_export import CarbonExport, iter_history, parse_time
+
+DAY_SEC = 86400.0
+T0 = 1_772_323_200.0  # 2026-03-01 00:00 UTC
+
+
+@pytest.fixture
+def history(tmp_path):
+    path = tmp_path / "fleet_summary.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for day in range(3):
+            for minute in range(0, 60, 10):
+                for vid in ("TRK-DL-001", "TRK-CB-005"):
+                    f.write(json.dumps({
+                        "vehicle_id": vid, "route_id": "delhi_mumbai", "timestamp": T0 + day * DAY_SEC + 3600 * 12 + minute * 60,
+                        "speed_kmph": 60.0, "co2_kg": 2.0, "fuel_consumed_liters": 0.8,
+                    }) + "\n")
+    return path
+
+
+class TestCarbonExport:
+    """Test streaming exports and their summaries."""
+
+    def test_event_rows_and_summary(self, history) -> None:
+        """Every event becomes one CSV row; summary totals match the rows."""
+        export = CarbonExport(iter_history([history]), "event")
+        rows = list(csv.DictReader(io.StringIO("".join(export.iter_csv()))))
+        assert len(rows) == 36
+        assert export.summary["total_co2_kg"] == pytest.approx(sum(float(r["co2_kg"]) for r in rows))
+
+    def test_day_rows_group_per_vehicle(self, history) -> None:
+        """Per-day export yields one row per vehicle per day."""
+        export = CarbonExport(iter_history([history]), "day")
+        rows = list(export.rows())
+        assert len(rows) == 6
+        assert all(r[3] == 6 for r in rows)
+        assert sum(r[6] for r in rows) == pytest.approx(72.0)
+
+    def test_time_range_filter(self, history) -> None:
+        """start is inclusive and end exclusive."""
+        records = list(iter_history([history], start=T0 + DAY_SEC, end=T0 + 2 * DAY_SEC))
+        assert len(records) == 12
+
+    def test_parquet_summary_metadata(self, history, tmp_path) -> None:
+        """Parquet output carries the summary in its key-value metadata."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        out = tmp_path / "export.parquet"
+        summary = CarbonExport(iter_history([history]), "day").write_parquet(out)
+        parquet = pq.ParquetFile(out)
+        assert parquet.metadata.num_rows == 6
+        assert json.loads(parquet.metadata.metadata[b"routezero.carbon_report"]) == summary
+        assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+    def test_out_of_order_records_are_counted(self) -> None:
+        """Records not newer than the vehicle's last one are reported, not silently lost."""
+        records = [{"vehicle_id": "TRK-DL-001", "timestamp": T0 + s, "co2_kg": 1.0} for s in (0, 60, 30, 120)]
+        export = CarbonExport(iter(records + [{"timestamp": T0}]), "event")
+        assert len(list(export.rows())) == 3
+        assert export.summary["export"] == {"rows": 3, "dropped": {"out_of_order": 1, "invalid": 1}}
+
+    def test_days_and_times_are_utc(self) -> None:
+        """Day rows split at UTC midnight, and naive ISO bounds are read as UTC."""
+        records = [{"vehicle_id": "TRK-DL-001", "timestamp": T0 - 1800 + 3600 * i} for i in range(2)]
+        rows = list(CarbonExport(iter(records), "day").rows())
+        assert [r[0] for r in rows] == ["2026-02-28", "2026-03-01"]
+        assert parse_time("2026-03-01") == parse_time("2026-03-01T00:00:00+00:00") == T0
@@ -0,0 +1,63 @@
+"""
+Tests for the streaming chat endpoint.
+
+Validates the SSE event order for empty, structured and free-form queries,
+and that token chunks from the model are forwarded as they arrive.
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("TMP_DIR", tempfile.mkdtemp(prefix="routezero-test-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import rag.api_server as api_server  # noqa: E402
+
+
+def _events(text: str) -> list[tuple[str, dict]]:
+    """Parse an SSE body into (event, data) pairs."""
+    events = []
+    for frame in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(api_server.app)
+
+
+class TestChatStream:
+    """Test SSE framing and event order of /api/chat/stream."""
+
+    def test_empty_query_still_sends_sources(self, client: TestClient) -> None:
+        """An empty query gets an empty sources event before the answer, then done."""
+        events = _events(client.post("/api/chat/stream", json={"query": ""}).text)
+        assert [name for name, _ in events] == ["sources", "answer", "done"]
+        assert events[0][1] == {"sources": [], "live_data_used": False}
+
+    def test_structured_answer_order(self, client: TestClient) -> None:
+        """Structured queries send sources, one answer event and done."""
+        events = _events(client.post("/api/chat/stream", json={"query": "temperature compliance"}).text)
+        assert [name for name, _ in events] == ["sources", "answer", "done"]
+        assert "Temperature Compliance Report" in events[1][1]["text"]
+
+    def test_tokens_forwarded_in_order(self, client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Model chunks arrive as token events between sources and done."""
+        monkeypatch.setattr(api_server, "stream_fleet_answer", lambda query, fleet: iter(["Hel", "lo"]))
+        events = _events(client.post("/api/chat/stream", json={"query": "hello"}).text)
+        assert [name for name, _ in events] == ["sources", "token", "token", "done"]
+        assert "".join(data["text"] for name, data in events if name == "token") == "Hello"
+        assert events[-1][1]["first_token_ms"] <= events[-1][1]["total_ms"]
+
+    def test_fallback_without_model(self, client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+        """When the model yields nothing, the canned summary is sent as one answer."""
+        monkeypatch.setattr(api_server, "stream_fleet_answer", lambda query, fleet: iter(()))
+        events = _events(client.post("/api/chat/stream", json={"query": "hello"}).text)
+        assert [name for name, _ in events] == ["sources", "answer", "done"]
+        assert "RouteZero AI Analysis" in events[1][1]["text"]
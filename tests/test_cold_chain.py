@@ -0,0 +1,65 @@
+"""
+Unit tests for cold-chain excursion state machines.
+
+Validates breach open/close with hysteresis, time above SLA,
+degree-minute integration and replay safety.
+"""
+
+import pytest
+
+from transforms.cold_chain import ColdChainMonitor
+
+
+def _reading(ts: float, temp: float) -> dict:
+    return {"vehicle_id": "TRK-CB-007", "timestamp": ts, "temperature_c": temp}
+
+
+class TestColdChainMonitor:
+    """Test the per-vehicle breach state machine."""
+
+    def test_excursion_duration_and_degree_minutes(self) -> None:
+        """Two minutes at −16 °C against a −18 °C SLA is 120 s and 4 degree-minutes."""
+        monitor = ColdChainMonitor(sla_c=-18.0)
+        for ts, temp in [(0, -19.0), (60, -16.0), (120, -16.0), (180, -19.0)]:
+            monitor.update(_reading(ts, temp))
+        status = monitor.status("TRK-CB-007")
+        assert status["state"] == "IN_SLA"
+        assert status["seconds_above_sla"] == pytest.approx(120.0)
+        assert status["degree_minutes"] == pytest.approx(4.0)
+        assert status["excursions"] == [
+            {"start": 60, "end": 180, "duration_sec": 120.0, "seconds_above_sla": 120.0, "peak_c": -16.0,
+             "degree_minutes": 4.0}
+        ]
+
+    def test_hysteresis_keeps_breach_open(self) -> None:
+        """Dipping just under the SLA does not close the excursion."""
+        monitor = ColdChainMonitor(sla_c=-18.0)
+        for ts, temp in [(0, -15.0), (60, -18.2), (120, -15.0)]:
+            monitor.update(_reading(ts, temp))
+        status = monitor.status("TRK-CB-007")
+        assert status["state"] == "BREACH"
+        assert status["excursion_count"] == 1
+        assert status["current_excursion"]["duration_sec"] == pytest.approx(120.0)
+
+    def test_time_above_sla_agrees_during_hysteresis(self) -> None:
+        """Time in the hysteresis band extends the breach but not its time above SLA, in both figures."""
+        monitor = ColdChainMonitor(sla_c=-18.0)
+        for ts, temp in [(0, -15.0), (60, -18.2), (120, -15.0), (180, -16.0)]:
+            monitor.update(_reading(ts, temp))
+        status = monitor.status("TRK-CB-007")
+        assert status["current_excursion"]["duration_sec"] == pytest.approx(180.0)
+        assert status["current_excursion"]["seconds_above_sla"] == status["seconds_above_sla"] == pytest.approx(120.0)
+
+    def test_replay_and_gaps_ignored(self) -> None:
+        """Old readings are skipped and offline gaps are not integrated."""
+        monitor = ColdChainMonitor(sla_c=-18.0)
+        monitor.update(_reading(0, -10.0))
+        monitor.update(_reading(3600, -10.0))
+        assert monitor.update(_reading(0, -10.0)) is False
+        assert monitor.status("TRK-CB-007")["seconds_above_sla"] == 0.0
+
+    def test_non_reefer_records_ignored(self) -> None:
+        """Records without temperature_c do not create a state machine."""
+        monitor = ColdChainMonitor()
+        assert monitor.update({"vehicle_id": "TRK-DL-001", "timestamp": 1.0}) is False
+        assert monitor.status("TRK-DL-001") is None
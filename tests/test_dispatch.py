@@ -0,0 +1,71 @@
+"""
+Unit tests for the vehicle–booking dispatch optimizer.
+
+Validates that assignments respect capacity and cold-chain constraints
+and prefer nearby, efficient trucks.
+"""
+
+import numpy as np
+
+from transforms.dispatch import haversine_matrix, haversine_rows, recommend_dispatch
+
+
+def _truck(vid: str, lat: float, lon: float, **extra) -> dict:
+    return {"vehicle_id": vid, "latitude": lat, "longitude": lon, "co2_kg": 8.0, **extra}
+
+
+class TestDispatchOptimizer:
+    """Test min-cost assignment with emissions as a cost term."""
+
+    def test_prefers_nearest_truck(self) -> None:
+        """Each booking goes to the truck closest to its origin."""
+        bookings = [
+            {"booking_id": "BK-1", "origin": "Delhi", "destination": "Mumbai", "total_weight": 500},
+            {"booking_id": "BK-2", "origin": "Chennai", "destination": "Bangalore", "total_weight": 500},
+        ]
+        fleet = [_truck("TRK-CB-005", 13.0, 80.1), _truck("TRK-DL-001", 28.5, 77.3)]
+        result = recommend_dispatch(bookings, fleet)
+        pairs = {a["booking_id"]: a["vehicle_id"] for a in result["assignments"]}
+        assert pairs == {"BK-1": "TRK-DL-001", "BK-2": "TRK-CB-005"}
+
+    def test_cold_chain_and_capacity_are_hard_constraints(self) -> None:
+        """Perishables need a reefer; overweight bookings are never assigned."""
+        bookings = [
+            {"booking_id": "BK-1", "origin": "Kolkata", "destination": "Patna", "total_weight": 100,
+             "commodities": [{"name": "Pharma", "weight_kg": 100}]},
+            {"booking_id": "BK-2", "origin": "Kolkata", "destination": "Patna", "total_weight": 90000},
+        ]
+        fleet = [_truck("TRK-KP-008", 22.6, 88.3), _truck("TRK-KP-010", 25.1, 85.1, temperature_c=-19.0)]
+        result = recommend_dispatch(bookings, fleet)
+        assert [(a["booking_id"], a["vehicle_id"]) for a in result["assignments"]] == [("BK-1", "TRK-KP-010")]
+        assert [u["booking_id"] for u in result["unassigned"]] == ["BK-2"]
+
+    def test_unknown_city_is_reported(self) -> None:
+        """Bookings with unmapped cities are returned as unassigned, not dropped."""
+        result = recommend_dispatch([{"booking_id": "BK-9", "origin": "Atlantis", "destination": "Delhi"}], [])
+        assert result["unassigned"][0]["booking_id"] == "BK-9"
+
+    def test_cumulative_intensity_breaks_ties(self) -> None:
+        """Between equidistant trucks, the one with the lower cumulative CO₂ per km wins."""
+        bookings = [{"booking_id": "BK-1", "origin": "Delhi", "destination": "Mumbai", "total_weight": 500}]
+        fleet = [_truck("TRK-DL-001", 28.6, 77.2), _truck("TRK-DL-002", 28.6, 77.2)]
+        result = recommend_dispatch(bookings, fleet, intensity_kg_per_km={"TRK-DL-001": 1.6, "TRK-DL-002": 0.9})
+        assert result["assignments"][0]["vehicle_id"] == "TRK-DL-002"
+
+    def test_invalid_weight_is_unassigned(self) -> None:
+        """A string or negative total_weight is reported unassigned, not priced as weightless or fatal."""
+        for weight in ("5", -1, True):
+            result = recommend_dispatch(
+                [{"booking_id": "BK-1", "origin": "Delhi", "destination": "Mumbai", "total_weight": weight},
+                 {"booking_id": "BK-2", "origin": "Delhi", "destination": "Mumbai", "total_weight": 500}],
+                [_truck("TRK-DL-001", 28.6, 77.2)],
+            )
+            assert result["unassigned"] == [{"booking_id": "BK-1", "reason": "invalid total_weight"}]
+            assert [a["booking_id"] for a in result["assignments"]] == ["BK-2"]
+
+    def test_row_distances_match_matrix_diagonal(self) -> None:
+        """Element-wise trip distances equal the diagonal of the full matrix."""
+        rng = np.random.default_rng(0)
+        a = rng.uniform([8, 68], [35, 97], size=(20, 2))
+        b = rng.uniform([8, 68], [35, 97], size=(20, 2))
+        assert np.allclose(haversine_rows(a, b), np.diagonal(haversine_matrix(a, b)))
@@ -0,0 +1,103 @@
+"""
+Unit tests for the filtered WebSocket fleet feed.
+
+Validates filter parsing, indexed candidate lookup, per-tick coalescing and
+slow-subscriber isolation.
+"""
+
+import pytest
+
+from rag.fleet_feed import FleetFeed, Subscription, matches, parse_filters
+
+
+def _record(vid: str, route: str = "delhi_mumbai", status: str = "NORMAL",
+            lat: float = 27.18, lon: float = 78.01, ts: float = 1.0) -> dict:
+    return {"vehicle_id": vid, "route_id": route, "status": status, "latitude": lat, "longitude": lon, "timestamp": ts}
+
+
+def _subscribe(feed: FleetFeed, **filters) -> Subscription:
+    sub = Subscription()
+    feed.subscribe(sub, parse_filters(filters))
+    return sub
+
+
+def _drain(sub: Subscription) -> list[str]:
+    ids = []
+    while not sub.queue.empty():
+        ids += [v["vehicle_id"] for v in sub.queue.get_nowait()["vehicles"]]
+    return ids
+
+
+class TestFilters:
+    """Test subscription filter parsing and evaluation."""
+
+    def test_parse_rejects_malformed(self) -> None:
+        """Unknown keys, non-list values and inverted boxes are rejected."""
+        with pytest.raises(ValueError):
+            parse_filters({"region": "north"})
+        with pytest.raises(ValueError):
+            parse_filters({"routes": "delhi_mumbai"})
+        with pytest.raises(ValueError):
+            parse_filters({"bbox": [30, 70, 20, 80]})
+
+    def test_and_across_dimensions(self) -> None:
+        """Route and status must both match; any listed value within a key matches."""
+        filters = parse_filters({"routes": ["delhi_mumbai", "kolkata_patna"], "statuses": ["WARNING"]})
+        assert matches(filters, _record("A", status="WARNING"))
+        assert not matches(filters, _record("A", status="NORMAL"))
+        assert not matches(filters, _record("A", route="chennai_bangalore", status="WARNING"))
+
+
+class TestFleetFeed:
+    """Test indexed fan-out."""
+
+    def test_routes_only_matching_subscribers(self) -> None:
+        """Each subscription receives only its vehicles; others are never evaluated."""
+        feed = FleetFeed()
+        north = _subscribe(feed, routes=["delhi_mumbai"])
+        south = _subscribe(feed, routes=["chennai_bangalore"])
+        one = _subscribe(feed, vehicle_ids=["TRK-CB-007"])
+        box = _subscribe(feed, bbox=[12.0, 77.0, 13.5, 80.5])
+        feed.update(_record("TRK-DL-001"))
+        feed.update(_record("TRK-CB-007", route="chennai_bangalore", lat=12.84, lon=78.11))
+        feed.tick()
+        assert _drain(north) == ["TRK-DL-001"]
+        assert _drain(south) == ["TRK-CB-007"]
+        assert _drain(one) == ["TRK-CB-007"]
+        assert _drain(box) == ["TRK-CB-007"]
+        assert feed.stats["candidates_checked"] == 4
+
+    def test_updates_coalesce_per_vehicle(self) -> None:
+        """Several updates for a vehicle between ticks deliver only the newest."""
+        feed = FleetFeed()
+        sub = _subscribe(feed)
+        for ts in (1.0, 2.0, 3.0):
+            feed.update(_record("TRK-DL-001", ts=ts))
+        feed.tick()
+        batch = sub.queue.get_nowait()["vehicles"]
+        assert [v["timestamp"] for v in batch] == [3.0]
+
+    def test_no_buffering_without_subscribers(self) -> None:
+        """Updates are ignored until someone subscribes."""
+        feed = FleetFeed()
+        assert feed.update(_record("TRK-DL-001")) is False
+
+    def test_slow_subscriber_drops_own_batches(self, monkeypatch) -> None:
+        """A full queue drops batches for that client only."""
+        monkeypatch.setattr("rag.fleet_feed.SUBSCRIBER_QUEUE_BATCHES", 1)
+        feed = FleetFeed()
+        slow = _subscribe(feed)
+        monkeypatch.undo()
+        fast = _subscribe(feed)
+        for ts in (1.0, 2.0):
+            feed.update(_record("TRK-DL-001", ts=ts))
+            feed.tick()
+        assert slow.dropped == 1 and fast.dropped == 0
+        assert feed.stats["dropped_slow"] == 1
+
+    def test_unsubscribe_clears_index(self) -> None:
+        """Removing the last subscription leaves no index entries behind."""
+        feed = FleetFeed()
+        sub = _subscribe(feed, bbox=[12.0, 77.0, 13.5, 80.5])
+        feed.unsubscribe(sub)
+        assert not feed.index.by_cell and not feed.index.subs
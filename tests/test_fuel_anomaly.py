@@ -0,0 +1,185 @@
+"""
+Unit tests for fuel anomaly detection.
+
+Validates the expected-fuel model, the streaming median/MAD check, its
+checkpoint round-trip, agreement between the streaming check and the
+vectorized batch scan, and the scan endpoint's range limits.
+"""
+
+import json
+import os
+import random
+import tempfile
+
+import pytest
+
+os.environ.setdefault("TMP_DIR", tempfile.mkdtemp(prefix="routezero-test-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import rag.api_server as api_server  # noqa: E402
+from transforms.co2_model import calculate_co2_kg  # noqa: E402
+from transforms.fuel_anomaly import (  # noqa: E402
+    DIESEL_KG_CO2_PER_LITER,
+    IDLE_FUEL_LPH,
+    FuelAnomalyDetector,
+    expected_fuel_liters,
+    is_cold_chain,
+    load_fraction,
+    scan_fuel_anomalies,
+)
+
+T0 = 1_760_000_000.0
+
+
+def _trip(vehicle_id: str, n: int, theft_at: tuple[int, ...] = (), seed: int = 1, dt: float = 5.0) -> list[dict]:
+    """Steady driving whose fuel tracks the model, plus a noise term and optional +3 L jumps."""
+    rng = random.Random(seed)
+    records, ts = [], T0
+    for i in range(n):
+        ts += dt
+        speed = rng.uniform(50, 90)
+        fuel = expected_fuel_liters(speed * dt / 3600, dt, speed, 1.0, False) * 1.1 + rng.gauss(0, 0.003)
+        if i in theft_at:
+            fuel += 3.0
+        records.append({"vehicle_id": vehicle_id, "timestamp": ts, "speed_kmph": speed,
+                        "distance_km": speed * dt / 3600, "fuel_consumed_liters": fuel, "load_status": "LADEN"})
+    return records
+
+
+class TestExpectedFuel:
+    """Test the fuel model derived from the CO₂ factors."""
+
+    def test_matches_co2_model(self) -> None:
+        """Moving fuel is the CO₂ model's estimate in litres, plus idle burn for the interval."""
+        co2 = calculate_co2_kg(1.5, 24000.0, 25000.0, 92.0, True)
+        expected = expected_fuel_liters(1.5, 60.0, 92.0, 24000.0 / 25000.0, True)
+        assert expected == pytest.approx(co2 / DIESEL_KG_CO2_PER_LITER + IDLE_FUEL_LPH / 60, abs=1e-3)
+
+    def test_load_fraction(self) -> None:
+        """Reported weights win over load_status; unknown status counts as laden."""
+        assert load_fraction({"load_kg": 5000, "capacity_kg": 25000, "load_status": "EMPTY"}) == 0.2
+        assert load_fraction({"load_status": "empty"}) == 0.0
+        assert load_fraction({}) == 1.0
+
+    def test_cold_chain_needs_explicit_flag(self) -> None:
+        """A temperature reading alone does not charge the refrigeration factor."""
+        assert not is_cold_chain({"temperature_c": -18.0})
+        assert is_cold_chain({"is_cold_chain": True, "temperature_c": -18.0})
+
+
+class TestStreamingDetector:
+    """Test the incremental per-vehicle check."""
+
+    def test_flags_sudden_jump_only(self) -> None:
+        """A fuel jump unexplained by movement is flagged; normal noise is not."""
+        detector = FuelAnomalyDetector()
+        flagged = [r["timestamp"] for r in _trip("TRK-DL-001", 200, theft_at=(120,)) if detector.update(r)]
+        status = detector.status("TRK-DL-001")
+        assert flagged == [T0 + 5.0 * 121]
+        assert status["anomaly_count"] == 1 and status["anomalies"][0]["excess_liters"] > 2.9
+
+    def test_warmup_gaps_and_stale_records(self) -> None:
+        """Nothing is scored before min_samples; gaps and stale records are not scored."""
+        detector = FuelAnomalyDetector(min_samples=10)
+        records = _trip("TRK-DL-001", 12, theft_at=(5,))
+        assert not any(detector.update(r) for r in records)
+        assert detector.status("TRK-DL-001")["scored"] == 1
+        late = dict(records[-1], fuel_consumed_liters=50.0, timestamp=records[-1]["timestamp"] + 3600)
+        assert not detector.update(late)
+        assert not detector.update(dict(records[0], fuel_consumed_liters=50.0))
+
+    def test_checkpoint_round_trip(self) -> None:
+        """A restored detector continues with the same baseline and counts."""
+        records = _trip("TRK-DL-001", 150, theft_at=(100,))
+        original = FuelAnomalyDetector()
+        for r in records[:90]:
+            original.update(r)
+        restored = FuelAnomalyDetector()
+        restored.load_dict(json.loads(json.dumps(original.to_dict())))
+        assert [original.update(r) for r in records[90:]] == [restored.update(r) for r in records[90:]]
+        assert restored.status("TRK-DL-001") == original.status("TRK-DL-001")
+
+    def test_rejects_bad_parameters(self) -> None:
+        """min_samples must fit the window and the threshold must be positive."""
+        with pytest.raises(ValueError):
+            FuelAnomalyDetector(window=5, min_samples=10)
+        with pytest.raises(ValueError):
+            FuelAnomalyDetector(z_threshold=0.0)
+
+
+class TestBatchScan:
+    """Test the vectorized backfill."""
+
+    def test_agrees_with_streaming(self) -> None:
+        """On time-ordered history the batch scan flags exactly what the streaming check flags."""
+        records = []
+        for v in range(6):
+            records += _trip(f"TRK-DL-{v:03d}", 300, theft_at=(40 + v, 150, 280 - v), seed=v)
+        records.sort(key=lambda r: r["timestamp"])
+        detector = FuelAnomalyDetector()
+        streamed = sorted((r["vehicle_id"], r["timestamp"]) for r in records if detector.update(r))
+        result = scan_fuel_anomalies(records)
+        assert sorted((a["vehicle_id"], a["timestamp"]) for a in result["anomalies"]) == streamed
+        assert result["scored"] == sum(st["scored"] for st in detector.vehicles.values())
+        assert result["vehicles"] == {f"TRK-DL-{v:03d}": 3 for v in range(6)}
+
+    def test_expected_fuel_matches_streaming(self) -> None:
+        """Overspeed, mixed loads and reefers get the same expected litres in both paths."""
+        rng = random.Random(5)
+        records = []
+        for v in range(4):
+            ts = T0
+            for i in range(150):
+                ts += 5.0
+                speed = rng.uniform(60, 115)
+                record = {"vehicle_id": f"TRK-DL-{v:03d}", "timestamp": ts, "speed_kmph": speed,
+                          "load_kg": rng.uniform(0, 30000), "capacity_kg": 25000.0, "temperature_c": -18.0}
+                if v % 2:
+                    record["is_cold_chain"] = True
+                expected = expected_fuel_liters(speed * 5.0 / 3600, 5.0, speed, load_fraction(record), v % 2 == 1)
+                record["fuel_consumed_liters"] = expected + rng.gauss(0, 0.003) + (3.0 if i in (60, 120) else 0.0)
+                records.append(record)
+        records.sort(key=lambda r: r["timestamp"])
+        detector = FuelAnomalyDetector()
+        for r in records:
+            detector.update(r)
+        streamed = sorted((a for st in detector.vehicles.values() for a in st["anomalies"]),
+                          key=lambda a: (a["vehicle_id"], a["timestamp"]))
+        batch = sorted(scan_fuel_anomalies(records)["anomalies"], key=lambda a: (a["vehicle_id"], a["timestamp"]))
+        assert len(streamed) == 8
+        assert batch == streamed
+
+    def test_sorts_and_dedupes_input(self) -> None:
+        """Shuffled input is scanned in time order and duplicate timestamps count as one event."""
+        records = _trip("TRK-DL-001", 120, theft_at=(90,))
+        shuffled = list(records)
+        random.Random(3).shuffle(shuffled)
+        result = scan_fuel_anomalies(shuffled)
+        assert [a["timestamp"] for a in result["anomalies"]] == [records[90]["timestamp"]]
+        assert scan_fuel_anomalies(records + [dict(records[50])])["events"] == result["events"] == 120
+
+    def test_record_limit(self) -> None:
+        """Reading stops at max_records and the result says so."""
+        records = _trip("TRK-DL-001", 120)
+        result = scan_fuel_anomalies(records, max_records=100)
+        assert result["events"] == 100 and result["truncated"]
+        assert not scan_fuel_anomalies(records, max_records=120)["truncated"]
+
+    def test_empty_history(self) -> None:
+        """No usable records yields an empty result."""
+        assert scan_fuel_anomalies([{"vehicle_id": "TRK-DL-001"}]) == {
+            "events": 0, "scored": 0, "anomalies": [], "vehicles": {}, "truncated": False
+        }
+
+
+class TestScanEndpoint:
+    """Test the range limits of /api/fuel-anomalies/scan."""
+
+    def test_range_is_bounded(self) -> None:
+        """Without start the scan covers the default window; longer ranges than the cap are refused."""
+        client = TestClient(api_server.app)
+        assert client.get("/api/fuel-anomalies/scan").status_code == 200
+        span = api_server.FUEL_SCAN_MAX_HOURS * 3600
+        too_long = client.get("/api/fuel-anomalies/scan", params={"start": str(T0), "end": str(T0 + span + 1)})
+        assert too_long.status_code == 400 and "at most" in too_long.json()["error"]
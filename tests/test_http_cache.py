@@ -0,0 +1,86 @@
+"""
+Unit tests for conditional dashboard responses.
+
+Validates ETag matching, 304 short-circuiting without rendering, one render
+per data version, gzip negotiation and the fleet reader's data version.
+"""
+
+import gzip
+import json
+from pathlib import Path
+
+from starlette.requests import Request
+
+from rag.fleet_reader import FleetStateReader
+from rag.http_cache import ResponseCache, etag_matches
+
+
+def _request(**headers: str) -> Request:
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class TestEtagMatching:
+    """Test If-None-Match comparison."""
+
+    def test_weak_comparison_and_lists(self) -> None:
+        """Weak and strong forms match, as do lists and `*`; other versions do not."""
+        assert etag_matches('W/"v1"', 'W/"v1"')
+        assert etag_matches('"v0", "v1"', 'W/"v1"')
+        assert etag_matches("*", 'W/"v1"')
+        assert not etag_matches('W/"v0"', 'W/"v1"')
+        assert not etag_matches(None, 'W/"v1"')
+
+
+class TestResponseCache:
+    """Test rendering and negotiation."""
+
+    def test_not_modified_skips_render(self) -> None:
+        """A matching If-None-Match gets an empty 304 and never renders."""
+        cache, calls = ResponseCache(), []
+        first = cache.respond(_request(), "fleet", "v1", lambda: calls.append(1) or {"n": 1})
+        second = cache.respond(_request(if_none_match=first.headers["etag"]), "fleet", "v1", lambda: calls.append(1))
+        assert first.status_code == 200 and json.loads(first.body) == {"n": 1}
+        assert second.status_code == 304 and second.body == b""
+        assert calls == [1] and cache.stats["not_modified"] == 1
+
+    def test_one_render_per_version(self) -> None:
+        """Polls at the same version reuse the body; a new version re-renders."""
+        cache, calls = ResponseCache(), []
+
+        def render() -> list[int]:
+            calls.append(1)
+            return [len(calls)]
+
+        assert json.loads(cache.respond(_request(), "k", "v1", render).body) == [1]
+        assert json.loads(cache.respond(_request(), "k", "v1", render).body) == [1]
+        assert json.loads(cache.respond(_request(), "k", "v2", render).body) == [2]
+        assert cache.stats == {"not_modified": 0, "hits": 1, "renders": 2}
+
+    def test_gzip_only_for_large_bodies(self) -> None:
+        """gzip is applied when accepted and the body is worth compressing."""
+        cache = ResponseCache()
+        big = cache.respond(_request(accept_encoding="gzip, br"), "big", "v1", lambda: ["x" * 50] * 100)
+        small = cache.respond(_request(accept_encoding="gzip"), "small", "v1", lambda: {"ok": True})
+        assert big.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(big.body)) == ["x" * 50] * 100
+        assert "content-encoding" not in small.headers
+        assert big.headers["vary"] == "Accept, Accept-Encoding"
+
+
+class TestFleetVersion:
+    """Test the fleet reader's data version."""
+
+    def test_version_tracks_applied_records(self, tmp_path: Path) -> None:
+        """The version changes with new records and is identical across readers of one file."""
+        path = tmp_path / "fleet.jsonl"
+        path.write_text('{"vehicle_id": "TRK-DL-001"}\n', encoding="utf-8")
+        a, b = FleetStateReader(path), FleetStateReader(path)
+        a.refresh()
+        b.refresh()
+        before = a.version
+        assert before == b.version
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"vehicle_id": "TRK-DL-002"}\n')
+        a.refresh()
+        assert a.version != before
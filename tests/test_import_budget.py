@@ -0,0 +1,65 @@
+"""
+Import-time budget tests.
+
+Each module is imported in a fresh interpreter under `python -X importtime`.
+The pure transform cores must stay stdlib-only, and the API and Pathway
+binding modules must not load Pathway or SciPy at import. The API's
+cumulative import time must also stay within IMPORT_BUDGET_SEC (override
+with the env var of the same name on slow runners).
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+IMPORT_BUDGET_SEC = float(os.environ.get("IMPORT_BUDGET_SEC", "2.0"))
+HEAVY = {"pathway", "scipy", "pandas"}
+
+
+def _import_times(module: str | None, tmp_path: Path) -> dict[str, int]:
+    """Module name → cumulative import time (µs) for everything `module` pulls in (None: startup only)."""
+    env = {**os.environ, "TMP_DIR": str(tmp_path)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def _top_level(times: dict[str, int]) -> set[str]:
+    return {name.split(".")[0] for name in times}
+
+
+class TestImportBudget:
+    """Test that cold starts stay light."""
+
+    @pytest.mark.parametrize("module", ["transforms.co2_model", "transforms.route_geometry", "transforms.timing"])
+    def test_pure_cores_are_stdlib_only(self, module: str, tmp_path: Path) -> None:
+        """The computational cores import nothing outside the stdlib and this repo."""
+        startup = _top_level(_import_times(None, tmp_path))
+        imported = _top_level(_import_times(module, tmp_path)) - startup
+        third_party = imported - set(sys.stdlib_module_names) - {"transforms"}
+        assert not third_party, f"{module} imports {sorted(third_party)}"
+
+    @pytest.mark.parametrize("module", ["transforms.co2_engine", "transforms.route_checker", "connectors"])
+    def test_bindings_defer_pathway(self, module: str, tmp_path: Path) -> None:
+        """Pathway binding modules load Pathway only when a UDF is first used."""
+        assert "pathway" not in _top_level(_import_times(module, tmp_path))
+
+    def test_api_import_budget(self, tmp_path: Path) -> None:
+        """The API imports without heavy runtimes and within the time budget."""
+        times = _import_times("rag.api_server", tmp_path)
+        heavy = _top_level(times) & HEAVY
+        assert not heavy, f"rag.api_server imports {sorted(heavy)}"
+        slowest = sorted(times.items(), key=lambda kv: -kv[1])[1:6]
+        assert times["rag.api_server"] / 1e6 < IMPORT_BUDGET_SEC, f"slowest imports: {slowest}"
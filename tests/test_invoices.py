@@ -0,0 +1,105 @@
+"""
+Unit tests for invoice rendering and bulk invoice runs.
+
+Validates the rendered layout, version-keyed caching, booking selection
+filters, and the streamed text and ZIP outputs.
+"""
+
+import io
+import zipfile
+from pathlib import Path
+
+from rag.bookings import BookingStore, build_booking
+from rag.carbon_export import parse_time
+from rag.invoices import PAGE_BREAK, InvoiceCache, iter_invoice_text, iter_invoice_zip, render_invoice, select_bookings
+
+
+def _booking(booking_id: str, **overrides) -> dict:
+    booking = build_booking(
+        {"customer_name": "Tata Motors", "origin": "Delhi", "destination": "Mumbai",
+         "commodities": [{"name": "Auto Parts", "weight_kg": 45}]},
+        booking_id,
+    )
+    booking.update(overrides)
+    return booking
+
+
+def _ids(selected: list[tuple[dict, str]]) -> list[str]:
+    return [b["booking_id"] for b, _ in selected]
+
+
+class TestRendering:
+    """Test the invoice template and render cache."""
+
+    def test_layout(self) -> None:
+        """The invoice carries the booking fields, commodities and a two-decimal total."""
+        text = render_invoice(_booking("BK-1", status="dispatched", vehicle_id="TRK-DL-001"))
+        assert text.startswith("╔") and text.endswith("╝")
+        assert "Invoice ID:    INV-BK-1" in text and "  Auto Parts: 45 KG" in text
+        assert "FREIGHT TOTAL: ₹1012.50" in text and "Status:        DISPATCHED" in text
+
+    def test_cache_keyed_on_version(self) -> None:
+        """An unchanged version is served from cache; a new version re-renders."""
+        cache = InvoiceCache()
+        booking = _booking("BK-1")
+        first = cache.render(booking, "v1")
+        assert cache.render(booking, "v1") is first
+        booking["status"] = "dispatched"
+        assert "DISPATCHED" in cache.render(booking, "v2")
+        assert cache.stats == {"hits": 1, "renders": 2, "evicted": 0}
+
+    def test_store_version_changes_on_update(self, tmp_path: Path) -> None:
+        """Updating a booking changes its version, so its cached invoice is re-rendered."""
+        store = BookingStore(tmp_path / "bookings.jsonl", fsync=False)
+        booking = _booking(store.ids.next())
+        assert store.wait_committed(store.submit([booking]))
+        _, before = store.get_versioned(booking["booking_id"])
+        store.update(booking["booking_id"], {"status": "dispatched"})
+        updated, after = store.get_versioned(booking["booking_id"])
+        assert after != before and updated["status"] == "dispatched"
+
+
+class TestSelection:
+    """Test bulk selection filters."""
+
+    def test_filters(self) -> None:
+        """Status, vehicle, id and date filters combine; bookings lacking the date field drop out."""
+        bookings = [
+            (_booking("BK-1", status="dispatched", vehicle_id="TRK-DL-001",
+                      dispatched_at="2026-03-01T09:00:00"), "v"),
+            (_booking("BK-2", status="dispatched", vehicle_id="TRK-MH-002",
+                      dispatched_at="2026-03-02T09:00:00"), "v"),
+            (_booking("BK-3"), "v"),
+        ]
+        assert _ids(select_bookings(bookings, status="dispatched")) == ["BK-1", "BK-2"]
+        assert _ids(select_bookings(bookings, vehicle_id="TRK-MH-002")) == ["BK-2"]
+        assert _ids(select_bookings(bookings, booking_ids={"BK-3", "BK-9"})) == ["BK-3"]
+        day = select_bookings(
+            bookings, start=parse_time("2026-03-01"), end=parse_time("2026-03-02"), date_field="dispatched_at"
+        )
+        assert _ids(day) == ["BK-1"]
+
+
+class TestBulkOutput:
+    """Test streamed text and ZIP runs."""
+
+    def test_text_pages(self) -> None:
+        """Every invoice appears once, separated by page breaks, across chunk boundaries."""
+        selected = [(_booking(f"BK-{i}"), "v") for i in range(50)]
+        body = b"".join(iter_invoice_text(selected, InvoiceCache(), batch_bytes=4096)).decode("utf-8")
+        pages = body.rstrip("\n").split(PAGE_BREAK)
+        assert [p.split("INV-")[1].split()[0] for p in pages] == [f"BK-{i}" for i in range(50)]
+
+    def test_zip_archive(self) -> None:
+        """The streamed ZIP is valid and holds one file per booking with the rendered text."""
+        cache = InvoiceCache()
+        selected = [(_booking(f"BK-{i}"), "v") for i in range(30)]
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(iter_invoice_zip(selected, cache, batch_bytes=4096))))
+        assert archive.testzip() is None
+        assert archive.namelist() == [f"INV-BK-{i}.txt" for i in range(30)]
+        assert archive.read("INV-BK-7.txt").decode("utf-8") == render_invoice(selected[7][0])
+
+    def test_empty_selection(self) -> None:
+        """No matches stream an empty document or an empty but valid archive."""
+        assert b"".join(iter_invoice_text([], InvoiceCache())) == b""
+        assert zipfile.ZipFile(io.BytesIO(b"".join(iter_invoice_zip([], InvoiceCache())))).namelist() == []
@@ -0,0 +1,93 @@
+"""
+Unit tests for the Prometheus metrics registry and middleware.
+
+Validates text exposition, cumulative histogram buckets, route-template
+labelling and the fleet reader's parse/lag counters.
+"""
+
+import asyncio
+from pathlib import Path
+
+from rag.fleet_reader import FleetStateReader
+from rag.metrics import MetricsMiddleware, Registry
+
+
+class TestRegistry:
+    """Test exposition format."""
+
+    def test_counter_and_collector_render(self) -> None:
+        """Counters and collector families render with HELP/TYPE and escaped labels."""
+        registry = Registry()
+        requests = registry.counter("demo_requests_total", "Requests.", ("route",))
+        requests.inc('/a"b')
+        requests.inc('/a"b', amount=2)
+        registry.collector(lambda: [("demo_depth", "gauge", "Depth.", [({}, 7)])])
+        text = registry.render()
+        assert "# TYPE demo_requests_total counter" in text
+        assert 'demo_requests_total{route="/a\\"b"} 3' in text
+        assert "demo_depth 7" in text.splitlines()
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        """Histogram buckets count observations at or below each bound, plus +Inf, sum and count."""
+        registry = Registry()
+        latency = registry.histogram("demo_seconds", "Latency.", ("route",))
+        for seconds in (0.002, 0.02, 0.2, 20.0):
+            latency.observe(seconds, "/x")
+        lines = registry.render().splitlines()
+        assert 'demo_seconds_bucket{route="/x",le="0.005"} 1' in lines
+        assert 'demo_seconds_bucket{route="/x",le="0.25"} 3' in lines
+        assert 'demo_seconds_bucket{route="/x",le="10"} 3' in lines
+        assert 'demo_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+        assert 'demo_seconds_count{route="/x"} 4' in lines
+
+
+class _Route:
+    path = "/api/vehicle/{vehicle_id}"
+
+
+class TestMetricsMiddleware:
+    """Test request counting and timing."""
+
+    def _run(self, content_type: bytes, route: object | None) -> Registry:
+        registry = Registry()
+        requests = registry.counter("req_total", "Requests.", ("method", "route", "status"))
+        latency = registry.histogram("req_seconds", "Latency.", ("method", "route"))
+
+        async def app(scope, receive, send):
+            if route is not None:
+                scope["route"] = route
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            pass
+
+        scope = {"type": "http", "method": "GET", "path": "/api/vehicle/TRK-DL-001"}
+        asyncio.run(MetricsMiddleware(app, requests, latency)(scope, None, send))
+        return registry
+
+    def test_labels_use_route_template(self) -> None:
+        """Requests are labelled by route template, not the raw path."""
+        text = self._run(b"application/json", _Route()).render()
+        assert 'req_total{method="GET",route="/api/vehicle/{vehicle_id}",status="200"} 1' in text
+        assert 'req_seconds_count{method="GET",route="/api/vehicle/{vehicle_id}"} 1' in text
+
+    def test_unmatched_and_streams(self) -> None:
+        """Unrouted requests share one label; event streams are counted but not timed."""
+        text = self._run(b"text/event-stream", None).render()
+        assert 'req_total{method="GET",route="<unmatched>",status="200"} 1' in text
+        assert "req_seconds_count" not in text
+
+
+class TestReaderCounters:
+    """Test the fleet reader's parse and lag counters."""
+
+    def test_parse_errors_and_lag(self, tmp_path: Path) -> None:
+        """Bad lines are counted; lag is the unread byte count."""
+        path = tmp_path / "fleet.jsonl"
+        path.write_text('{"vehicle_id": "TRK-DL-001"}\n{bad\n{"speed_kmph": 1}\n', encoding="utf-8")
+        reader = FleetStateReader(path)
+        assert reader.lag_bytes == path.stat().st_size
+        reader.refresh()
+        assert reader.lag_bytes == 0
+        assert reader.stats == {"parse_errors": 1, "dropped_no_vehicle": 1}
@@ -0,0 +1,179 @@
+"""
+Unit tests for the coalescing notification queue.
+
+Validates leading-edge delivery, trailing summaries per window, batching
+across sinks, backpressure, write amplification, sink retries, and that
+manual driver messages are never merged.
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("TMP_DIR", tempfile.mkdtemp(prefix="routezero-test-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import rag.api_server as api_server  # noqa: E402
+from rag.notifications import (  # noqa: E402
+    MAX_ATTEMPTS,
+    RETRY_BASE_SEC,
+    FileSink,
+    LocalWebhookSink,
+    NotificationQueue,
+)
+
+
+def _alert(vid: str = "TRK-DL-001", alert_type: str = "HIGH_EMISSION_ALERT", message: str = "") -> dict:
+    return {"vehicle_id": vid, "alert_type": alert_type, "message": message}
+
+
+class _FlakySink(LocalWebhookSink):
+    """Fails the first `failures` deliveries."""
+
+    name = "flaky"
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def deliver(self, batch: list[dict]) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("webhook unavailable")
+        super().deliver(batch)
+
+
+class TestNotificationQueue:
+    """Test coalescing and batched delivery (flushes driven manually)."""
+
+    def test_flapping_alert_coalesces(self) -> None:
+        """Thirty repeats in a window deliver one leading and one trailing notification."""
+        sink = LocalWebhookSink()
+        queue = NotificationQueue([sink], window_sec=60, start_worker=False)
+        assert queue.notify(_alert(message="tick 0"), now=0.0) == "queued"
+        for i in range(1, 30):
+            assert queue.notify(_alert(message=f"tick {i}"), now=2.0 * i) == "coalesced"
+        assert queue.flush(now=59.0) == 1
+        assert queue.flush(now=60.0) == 1
+        trailing = sink.received[-1]
+        assert trailing["coalesced"] == 29 and trailing["message"] == "tick 29"
+        assert queue.pending == 0
+
+    def test_keys_are_independent(self) -> None:
+        """Different vehicles or alert types do not coalesce with each other."""
+        queue = NotificationQueue([LocalWebhookSink()], window_sec=60, start_worker=False)
+        outcomes = {
+            queue.notify(_alert("TRK-DL-001"), now=0.0),
+            queue.notify(_alert("TRK-DL-002"), now=0.0),
+            queue.notify(_alert("TRK-DL-001", "ROUTE_DEVIATION"), now=0.0),
+        }
+        assert outcomes == {"queued"}
+        assert queue.flush(now=0.0) == 3
+
+    def test_late_repeat_after_window_keeps_summary(self) -> None:
+        """A repeat after the window closes but before a flush still delivers the old summary first."""
+        sink = LocalWebhookSink()
+        queue = NotificationQueue([sink], window_sec=10, start_worker=False)
+        queue.notify(_alert(message="a"), now=0.0)
+        queue.notify(_alert(message="b"), now=5.0)
+        assert queue.notify(_alert(message="c"), now=11.0) == "queued"
+        queue.flush(now=11.0)
+        assert [n["message"] for n in sink.received] == ["a", "b", "c"]
+
+    def test_uncoalesced_messages_all_delivered(self) -> None:
+        """With coalesce=False every message is queued and delivered as sent, inside an open window too."""
+        sink = LocalWebhookSink()
+        queue = NotificationQueue([sink], window_sec=60, start_worker=False)
+        queue.notify(_alert(alert_type="manual", message="first"), now=0.0)
+        for i, text in enumerate(("second", "third")):
+            assert queue.notify(_alert(alert_type="manual", message=text), now=1.0 + i, coalesce=False) == "queued"
+        queue.flush(now=2.0)
+        assert [n["message"] for n in sink.received] == ["first", "second", "third"]
+        assert queue.stats["coalesced"] == 0
+
+    def test_batches_to_every_sink(self, tmp_path) -> None:
+        """One flush is one write per sink; write amplification falls with batch size."""
+        path = tmp_path / "notifications.jsonl"
+        webhook = LocalWebhookSink()
+        queue = NotificationQueue([FileSink(path), webhook], window_sec=60, start_worker=False)
+        for i in range(100):
+            queue.notify(_alert(f"TRK-{i:03d}"), now=0.0)
+        assert queue.flush(now=0.0) == 100
+        assert webhook.requests == 1
+        assert len(path.read_text(encoding="utf-8").splitlines()) == 100
+        assert json.loads(path.read_text(encoding="utf-8").splitlines()[0])["vehicle_id"] == "TRK-000"
+        assert queue.metrics()["write_amplification"] == 0.02
+
+    def test_backpressure(self) -> None:
+        """Submissions beyond max_pending are refused, not buffered."""
+        queue = NotificationQueue([LocalWebhookSink()], max_pending=2, start_worker=False)
+        assert queue.notify(_alert("A"), now=0.0) == "queued"
+        assert queue.notify(_alert("B"), now=0.0) == "queued"
+        assert queue.notify(_alert("C"), now=0.0) is None
+        assert queue.stats["rejected_full"] == 1
+
+    def test_close_drains_trailing(self) -> None:
+        """Shutdown delivers open trailing notifications instead of dropping them."""
+        sink = LocalWebhookSink()
+        queue = NotificationQueue([sink], window_sec=3600)
+        queue.notify(_alert(message="first"))
+        queue.notify(_alert(message="repeat"))
+        queue.close()
+        assert [n["message"] for n in sink.received] == ["first", "repeat"]
+
+    def test_failed_sink_retries_with_backoff(self) -> None:
+        """A failed POST is retried after the backoff and only then counted as delivered."""
+        sink = _FlakySink(failures=2)
+        queue = NotificationQueue([sink], start_worker=False)
+        queue.notify(_alert(), now=0.0)
+        queue.flush(now=0.0)
+        assert queue.stats["delivered"] == 0 and queue.stats["sink_errors"] == 1
+        assert queue.metrics()["retrying"] == 1
+        queue.flush(now=RETRY_BASE_SEC / 2)
+        assert queue.stats["retries"] == 0  # backoff not elapsed
+        queue.flush(now=RETRY_BASE_SEC)
+        queue.flush(now=RETRY_BASE_SEC * 3)
+        assert queue.stats["delivered"] == 1 and queue.stats["failed"] == 0
+        assert len(sink.received) == 1 and queue.retrying == 0
+
+    def test_sink_gives_up_and_counts_failed(self) -> None:
+        """After MAX_ATTEMPTS the batch is dropped and counted as failed, not delivered."""
+        healthy, broken = LocalWebhookSink(), _FlakySink(failures=MAX_ATTEMPTS)
+        queue = NotificationQueue([healthy, broken], start_worker=False)
+        queue.notify(_alert(), now=0.0)
+        now = 0.0
+        for _ in range(MAX_ATTEMPTS):
+            queue.flush(now=now)
+            now += 3600
+        assert queue.stats["failed"] == 1 and queue.stats["delivered"] == 0
+        assert queue.stats["sink_errors"] == MAX_ATTEMPTS
+        assert len(healthy.received) == 1 and queue.retrying == 0
+
+    def test_close_gives_retries_a_last_attempt(self) -> None:
+        """Shutdown retries held batches once instead of waiting out the backoff."""
+        sink = _FlakySink(failures=1)
+        queue = NotificationQueue([sink], start_worker=False)
+        queue.notify(_alert(), now=0.0)
+        queue.flush(now=0.0)
+        queue.close()
+        assert queue.stats["delivered"] == 1 and len(sink.received) == 1
+
+
+class TestNotifyDriverEndpoint:
+    """Test /api/notify-driver's use of the queue."""
+
+    def test_manual_messages_are_not_coalesced(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Successive dispatcher messages to one driver are each queued; typed alerts still coalesce."""
+        queue = NotificationQueue([LocalWebhookSink()], window_sec=60, start_worker=False)
+        monkeypatch.setattr(api_server, "notification_queue", queue)
+        client = TestClient(api_server.app)
+        for text in ("Take exit 12", "Fuel at Kota", "Call depot"):
+            response = client.post("/api/notify-driver", json={"vehicle_id": "TRK-DL-001", "message": text})
+            assert response.json()["delivery"] == "queued"
+        body = {"vehicle_id": "TRK-DL-001", "alert_type": "HIGH_EMISSION_ALERT", "message": "x"}
+        assert [client.post("/api/notify-driver", json=body).json()["delivery"] for _ in range(2)] == [
+            "queued", "coalesced"
+        ]
@@ -0,0 +1,193 @@
+"""
+Unit tests for opt-in profiling.
+
+Validates UDF timing aggregation and its control file, the stack sampler's
+collapsed output, and the profiler's sampling, storage and validation.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from rag.profiling import Profiler, ProfilingMiddleware, StackSampler
+from transforms import timing
+
+
+@pytest.fixture(autouse=True)
+def _reset_timing():
+    yield
+    timing.set_enabled(False)
+    timing.reset()
+
+
+class TestUdfTiming:
+    """Test the timing decorator."""
+
+    def test_disabled_records_nothing(self) -> None:
+        """While disabled the wrapped function runs and nothing is aggregated."""
+        double = timing.timed("double")(lambda x: 2 * x)
+        assert double(4) == 8
+        assert timing.snapshot() == {}
+
+    def test_enabled_aggregates_calls(self) -> None:
+        """Enabled calls are counted with total and max time."""
+        double = timing.timed("double")(lambda x: 2 * x)
+        timing.set_enabled(True)
+        for i in range(3):
+            double(i)
+        stats = timing.snapshot()["double"]
+        assert stats["calls"] == 3 and stats["max_us"] >= stats["mean_us"] > 0
+
+    def test_merge_across_processes(self) -> None:
+        """Snapshots from several processes add up and keep the largest max."""
+        a = {"f": {"calls": 2, "total_ms": 1.0, "mean_us": 500.0, "max_us": 600.0}}
+        b = {"f": {"calls": 2, "total_ms": 3.0, "mean_us": 1500.0, "max_us": 2000.0}}
+        assert timing.merge([a, b])["f"] == {"calls": 4, "total_ms": 4.0, "mean_us": 1000.0, "max_us": 2000.0}
+
+    def test_control_file(self, tmp_path: Path) -> None:
+        """The profiler's switch is visible to a pipeline process reading the control file."""
+        profiler = Profiler(tmp_path)
+        assert timing.read_control(profiler.control_path) is False
+        profiler.configure(udf_timing=True)
+        assert timing.read_control(profiler.control_path) is True
+        assert timing.is_enabled()
+
+
+class TestStackSampler:
+    """Test stack sampling."""
+
+    def test_captures_busy_thread(self) -> None:
+        """A thread spinning in a known function shows up in the collapsed stacks."""
+        stop = threading.Event()
+
+        def spin_here() -> None:
+            while not stop.is_set():
+                sum(range(1000))
+
+        worker = threading.Thread(target=spin_here)
+        worker.start()
+        sampler = StackSampler(interval_sec=0.001).start()
+        time.sleep(0.05)
+        sampler.stop()
+        stop.set()
+        worker.join()
+        lines = sampler.collapsed().splitlines()
+        assert sampler.samples > 0
+        assert any("spin_here (tests/test_profiling.py" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+class _Route:
+    path = "/api/fleet-intel"
+
+
+class TestProfiler:
+    """Test sampling policy and storage."""
+
+    def _request(self, profiler: Profiler) -> None:
+        async def app(scope, receive, send):
+            scope["route"] = _Route()
+            time.sleep(0.01)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        async def send(message):
+            pass
+
+        scope = {"type": "http", "method": "GET", "path": "/api/fleet-intel"}
+        asyncio.run(ProfilingMiddleware(app, profiler)(scope, None, send))
+
+    def test_rate_zero_profiles_nothing(self, tmp_path: Path) -> None:
+        """The default rate leaves requests untouched."""
+        profiler = Profiler(tmp_path)
+        self._request(profiler)
+        assert not profiler.recent and not list(tmp_path.glob("*.folded"))
+
+    def test_sampled_request_is_stored(self, tmp_path: Path) -> None:
+        """A sampled request leaves a readable profile named after its route."""
+        profiler = Profiler(tmp_path, sample_rate=1.0, interval_sec=0.001)
+        self._request(profiler)
+        meta = profiler.state()["profiles"][0]
+        assert meta["route"] == "/api/fleet-intel" and meta["status"] == 200
+        assert "api_fleet-intel" in meta["name"]
+        assert profiler.read(meta["name"]) is not None
+
+    def test_one_profile_at_a_time(self, tmp_path: Path) -> None:
+        """Overlapping picks are skipped rather than starting a second sampler."""
+        profiler = Profiler(tmp_path, sample_rate=1.0)
+        first = profiler.begin()
+        assert profiler.begin() is None
+        profiler.finish(first, "GET", "/x", 200, 0.0)
+        assert profiler.stats["skipped_busy"] == 1 and profiler.stats["profiled"] == 1
+
+    def test_streaming_response_is_discarded(self, tmp_path: Path) -> None:
+        """An SSE response drops its sample at response start and frees the slot for other requests."""
+        profiler = Profiler(tmp_path, sample_rate=1.0, interval_sec=0.001)
+        seen = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/event-stream; charset=utf-8")]})
+            seen.append(profiler.state()["active"])
+            await send({"type": "http.response.body", "body": b"event: done\n\n"})
+
+        async def send(message):
+            pass
+
+        asyncio.run(ProfilingMiddleware(app, profiler)({"type": "http", "method": "POST", "path": "/api/chat/stream"}, None, send))
+        assert seen == [False]
+        assert profiler.stats["skipped_streaming"] == 1 and profiler.stats["profiled"] == 0
+        assert not list(tmp_path.glob("*.folded"))
+
+    def test_slot_frees_after_max_duration(self, tmp_path: Path) -> None:
+        """A long request stops sampling at max_duration_sec and no longer blocks other profiles."""
+        profiler = Profiler(tmp_path, sample_rate=1.0, interval_sec=0.001, max_duration_sec=0.02)
+        first = profiler.begin()
+        deadline = time.monotonic() + 2.0
+        while profiler.state()["active"] and time.monotonic() < deadline:
+            time.sleep(0.005)
+        second = profiler.begin()
+        assert second is not None
+        profiler.finish(first, "GET", "/slow", 200, 1.0)
+        profiler.finish(second, "GET", "/x", 200, 0.0)
+        assert profiler.stats["profiled"] == 2
+
+    def test_old_profiles_are_pruned(self, tmp_path: Path) -> None:
+        """Only the newest max_profiles files are kept."""
+        profiler = Profiler(tmp_path, sample_rate=1.0, max_profiles=2)
+        for i in range(4):
+            (tmp_path / f"{i}-GET-x-200.folded").write_text("a 1\n", encoding="utf-8")
+        profiler.finish(profiler.begin(), "GET", "/x", 200, 0.0)
+        assert len(list(tmp_path.glob("*.folded"))) == 2
+
+    def test_stale_udf_dumps_dropped(self, tmp_path: Path) -> None:
+        """Dumps of a pipeline process that stopped refreshing them are deleted, not merged."""
+        profiler = Profiler(tmp_path, stale_dump_sec=10.0)
+        udfs = {"f": {"calls": 2, "total_ms": 1.0, "mean_us": 500.0, "max_us": 600.0}}
+        (tmp_path / "udf_timings.1.json").write_text(json.dumps({"updated": 1000.0, "udfs": udfs}), encoding="utf-8")
+        (tmp_path / "udf_timings.2.json").write_text(json.dumps({"updated": 990.0, "udfs": udfs}), encoding="utf-8")
+        assert profiler.udf_stats(now=1005.0)["f"]["calls"] == 2
+        assert not (tmp_path / "udf_timings.2.json").exists()
+        assert (tmp_path / "udf_timings.1.json").exists()
+
+    def test_read_rejects_paths(self, tmp_path: Path) -> None:
+        """Profile names cannot escape the profile directory."""
+        (tmp_path / "udf_control.json").write_text(json.dumps({"udf_timing": False}), encoding="utf-8")
+        profiler = Profiler(tmp_path)
+        assert profiler.read("../udf_control.json") is None
+        assert profiler.read("missing.folded") is None
+
+    def test_configure_validates(self, tmp_path: Path) -> None:
+        """Out-of-range settings are rejected and leave the profiler unchanged."""
+        profiler = Profiler(tmp_path)
+        with pytest.raises(ValueError):
+            profiler.configure(sample_rate=1.5)
+        with pytest.raises(ValueError):
+            profiler.configure(interval_sec=0.0)
+        profiler.configure(sample_rate=0.25, interval_sec=0.01)
+        state = profiler.state()
+        assert state["sample_rate"] == 0.25 and state["interval_ms"] == 10.0
+
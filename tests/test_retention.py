@@ -0,0 +1,239 @@
+"""
+Unit tests for log rotation and background compaction.
+
+Validates minute/hour rollups, idempotent segment compaction with bytes
+reclaimed, retention measured from the newest record, rollup expiry, that
+readers survive rotation and concurrent compaction, and that raw-history
+endpoints refuse ranges that were already compacted.
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("TMP_DIR", tempfile.mkdtemp(prefix="routezero-test-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import rag.api_server as api_server  # noqa: E402
+from rag.carbon_export import iter_history  # noqa: E402
+from rag.fleet_reader import FleetStateReader  # noqa: E402
+from rag.retention import (  # noqa: E402
+    Compactor,
+    iter_rollups,
+    newest_record_at,
+    rollup_records,
+    rotate_segment,
+    sealed_at,
+    sealed_segments,
+)
+
+
+def _records(n: int, vid: str = "TRK-DL-001", t0: float = 1_700_000_000.0) -> list[dict]:
+    return [
+        {"vehicle_id": vid, "timestamp": t0 + 2 * i, "speed_kmph": 72.0, "co2_kg": 0.5,
+         "fuel_consumed_liters": 0.2, "latitude": 28.6, "longitude": 77.2, "route_id": "delhi_mumbai"}
+        for i in range(n)
+    ]
+
+
+def _write(path, records: list[dict]) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in records))
+
+
+class TestRollups:
+    """Test bucketing of raw records."""
+
+    def test_minute_and_hour_buckets(self) -> None:
+        """Two hours of 2 s fixes fold into 120 minute rows and 2 hour rows with matching sums."""
+        records = _records(3600, t0=1_699_999_200.0)  # aligned to an hour boundary
+        rollups = rollup_records(iter(records))
+        assert len(rollups["minute"]) == 120
+        assert len(rollups["hour"]) == 2
+        assert sum(r["events"] for r in rollups["hour"]) == 3600
+        assert sum(r["co2_kg"] for r in rollups["hour"]) == pytest.approx(1800.0)
+        assert sum(r["distance_km"] for r in rollups["minute"]) == pytest.approx(
+            sum(r["distance_km"] for r in rollups["hour"])
+        )
+
+
+class TestCompactor:
+    """Test segment sealing and compaction."""
+
+    def test_rotate_and_compact(self, tmp_path) -> None:
+        """Expired segments become rollups, are deleted, and bytes reclaimed are reported."""
+        log, history = tmp_path / "fleet_summary.jsonl", tmp_path / "history"
+        _write(log, _records(600))
+        segment = rotate_segment(log, history)
+        assert segment is not None and not log.exists()
+        assert rotate_segment(log, history) is None
+
+        compactor = Compactor(history, tmp_path / "rollups", raw_retention_sec=3600)
+        assert compactor.run_once(now=0.0)["segments"] == 0  # still inside the raw window
+        report = compactor.run_once(now=sealed_at(segment) + 7200)
+        assert report["segments"] == 1 and report["records"] == 600
+        assert report["bytes_reclaimed"] > 0
+        assert sealed_segments(history) == []
+        rows = list(iter_rollups(tmp_path / "rollups", "minute", vehicle_id="TRK-DL-001"))
+        assert sum(r["events"] for r in rows) == 600
+
+    def test_compaction_is_idempotent(self, tmp_path) -> None:
+        """Redoing a segment (crash before unlink) replaces, not duplicates, its rollups."""
+        history = tmp_path / "history"
+        history.mkdir()
+        segment = history / "telemetry.1700000000000.jsonl"
+        _write(segment, _records(100))
+        compactor = Compactor(history, tmp_path / "rollups")
+        compactor.compact_segment(segment)
+        _write(segment, _records(100))
+        compactor.compact_segment(segment)
+        assert sum(r["events"] for r in iter_rollups(tmp_path / "rollups", "hour")) == 100
+
+    def test_minute_rollups_expire(self, tmp_path) -> None:
+        """Minute rollups past their window are deleted; hour rollups stay."""
+        history = tmp_path / "history"
+        history.mkdir()
+        _write(history / "telemetry.1000.jsonl", _records(10, t0=0.0))
+        compactor = Compactor(history, tmp_path / "rollups", raw_retention_sec=0, minute_retention_sec=60)
+        compactor.run_once(now=100.0)
+        assert compactor.stats["rollups_expired"] == 1
+        assert list(iter_rollups(tmp_path / "rollups", "minute")) == []
+        assert len(list(iter_rollups(tmp_path / "rollups", "hour"))) == 1
+
+    def test_retention_follows_newest_record(self, tmp_path) -> None:
+        """A segment sealed long after its data expires by record time, not seal time."""
+        history = tmp_path / "history"
+        history.mkdir()
+        old = history / "telemetry.1700090000000.jsonl"  # sealed a day after its records
+        _write(old, _records(50))
+        fresh = history / "telemetry.1700000500000.jsonl"
+        _write(fresh, _records(50, t0=1_700_086_000.0))
+        compactor = Compactor(history, tmp_path / "rollups", raw_retention_sec=3600)
+        report = compactor.run_once(now=1_700_080_000.0)
+        assert report["segments"] == 1
+        assert sealed_segments(history) == [fresh]
+
+    def test_retention_falls_back_to_seal_time(self, tmp_path) -> None:
+        """Segments without timestamped records use the seal time."""
+        history = tmp_path / "history"
+        history.mkdir()
+        segment = history / "telemetry.1700000000000.jsonl"
+        _write(segment, [{"vehicle_id": "TRK-DL-001"}])
+        assert newest_record_at(segment) is None
+        compactor = Compactor(history, tmp_path / "rollups", raw_retention_sec=3600)
+        assert compactor.run_once(now=1_700_000_000.0 + 1800)["segments"] == 0
+        assert compactor.run_once(now=1_700_000_000.0 + 7200)["segments"] == 1
+
+    def test_bytes_reclaimed_never_negative(self, tmp_path) -> None:
+        """A tiny segment whose rollups outweigh it reclaims zero, not a negative count."""
+        history = tmp_path / "history"
+        history.mkdir()
+        segment = history / "telemetry.1700000000000.jsonl"
+        _write(segment, _records(1))
+        _, _, reclaimed = Compactor(history, tmp_path / "rollups").compact_segment(segment)
+        assert reclaimed == 0
+
+    def test_split_segments_match_one_segment(self, tmp_path) -> None:
+        """Buckets and distance split over two segments come back as the rows of one unsplit segment."""
+        records = _records(1000, t0=1_699_999_200.0)
+        history = tmp_path / "history"
+        history.mkdir()
+        _write(history / "fleet_summary.1700000100000.jsonl", records[:455])
+        _write(history / "fleet_summary.1700001200000.jsonl", records[455:])
+        compactor = Compactor(history, tmp_path / "rollups", raw_retention_sec=0)
+        assert compactor.run_once(now=1_700_002_000.0)["segments"] == 2
+        whole = rollup_records(iter(records))
+        for level in ("minute", "hour"):
+            rows = sorted(iter_rollups(tmp_path / "rollups", level), key=lambda r: r["bucket_start"])
+            assert [(r["bucket_start"], r["events"]) for r in rows] == [
+                (r["bucket_start"], r["events"]) for r in whole[level]
+            ]
+            assert sum(r["distance_km"] for r in rows) == pytest.approx(sum(r["distance_km"] for r in whole[level]))
+        assert compactor.compacted_through == records[-1]["timestamp"]
+
+    def test_only_stem_is_rolled_up(self, tmp_path) -> None:
+        """Other logs' segments are deleted past the window without adding rollup rows."""
+        history = tmp_path / "history"
+        history.mkdir()
+        _write(history / "fleet_summary.1000.jsonl", _records(10, t0=0.0))
+        _write(history / "telemetry.1000.jsonl", _records(10, t0=0.0))
+        compactor = Compactor(history, tmp_path / "rollups", raw_retention_sec=0, stem="fleet_summary")
+        report = compactor.run_once(now=100.0)
+        assert report["segments"] == 1 and sealed_segments(history) == []
+        assert compactor.stats["segments_expired"] == 1
+        assert sum(r["events"] for r in iter_rollups(tmp_path / "rollups", "hour", stem="fleet_summary")) == 10
+
+    def test_redo_after_state_saved_only_unlinks(self, tmp_path) -> None:
+        """A segment whose state was recorded before a crash is not rolled up twice or fed into last_fix again."""
+        history = tmp_path / "history"
+        history.mkdir()
+        segment = history / "fleet_summary.1000.jsonl"
+        _write(segment, _records(10))
+        Compactor(history, tmp_path / "rollups").compact_segment(segment)
+        _write(segment, _records(10))
+        records, rows, _ = Compactor(history, tmp_path / "rollups").compact_segment(segment)
+        assert (records, rows) == (0, 0) and not segment.exists()
+
+    def test_pass_runs_expirers(self, tmp_path) -> None:
+        """Other logs' expiry runs on every pass and adds to the bytes reclaimed."""
+        calls = []
+        compactor = Compactor(tmp_path / "history", tmp_path / "rollups", expirers=[lambda now: calls.append(now) or 42])
+        assert compactor.run_once(now=5.0)["bytes_reclaimed"] == 42
+        assert calls == [5.0]
+
+    def test_history_skips_compacted_segment(self, tmp_path) -> None:
+        """A segment unlinked after the list was taken is skipped, not an error."""
+        history = tmp_path / "history"
+        history.mkdir()
+        gone, kept = history / "telemetry.1.jsonl", history / "telemetry.2.jsonl"
+        _write(gone, _records(5))
+        _write(kept, _records(5, t0=1_700_000_100.0))
+        paths = sealed_segments(history)
+        gone.unlink()
+        assert len(list(iter_history(paths))) == 5
+
+
+class TestReaderRotation:
+    """Test that the fleet tail loses nothing across rotation."""
+
+    def test_rotated_tail_is_drained(self, tmp_path) -> None:
+        """Lines appended just before a rotation are still applied."""
+        log = tmp_path / "fleet_summary.jsonl"
+        _write(log, _records(5))
+        reader = FleetStateReader(log)
+        assert reader.refresh() == 5
+        _write(log, _records(3, t0=1_700_000_100.0))
+        rotate_segment(log, tmp_path / "history")
+        _write(log, _records(2, t0=1_700_000_200.0))
+        assert reader.refresh() == 5
+        assert reader.records_read == 10
+
+
+class TestCompactedRanges:
+    """Test that raw-history endpoints do not silently truncate compacted ranges."""
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch: pytest.MonkeyPatch) -> TestClient:
+        history = tmp_path / "history"
+        history.mkdir()
+        segment = history / "fleet_summary.1700000000000.jsonl"
+        _write(segment, _records(10))
+        compactor = Compactor(history, tmp_path / "rollups")
+        compactor.compact_segment(segment)
+        monkeypatch.setattr(api_server, "compactor", compactor)
+        return TestClient(api_server.app)
+
+    @pytest.mark.parametrize("path", ["/api/carbon-report/export", "/api/fuel-anomalies/scan"])
+    def test_compacted_start_rejected(self, client: TestClient, path: str) -> None:
+        """A start inside compacted history is a 400 naming where raw history resumes."""
+        response = client.get(path, params={"start": "1700000000", "end": "1700000100"})
+        assert response.status_code == 400
+        assert response.json()["raw_history_after"] == 1_700_000_018.0
+        assert client.get(path, params={"start": "1700000019", "end": "1700000100"}).status_code == 200
+
+    def test_export_without_start_rejected(self, client: TestClient) -> None:
+        """An export of "all history" is refused once part of it exists only as rollups."""
+        assert client.get("/api/carbon-report/export").status_code == 400
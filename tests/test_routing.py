@@ -0,0 +1,71 @@
+"""
+Unit tests for emission-weighted corridor routing.
+
+Validates A* with landmark heuristics against plain Dijkstra, corridor
+tree lookups, and that CO₂-heavier profiles never get cheaper.
+"""
+
+import threading
+
+from transforms.routing import LRUCache, RoadGraph, make_profile, suggest_corridor_reroutes
+
+
+class TestRoadGraph:
+    """Test shortest paths over the bundled road graph."""
+
+    graph = RoadGraph.load()
+
+    def test_astar_matches_dijkstra(self) -> None:
+        """ALT-guided A* finds the same optimal cost as an exhaustive Dijkstra."""
+        profile = make_profile(1.0, False)
+        weights = self.graph.edge_weights(profile)
+        for origin in ("delhi", "kolkata", "chennai"):
+            dist, _ = self.graph._dijkstra(self.graph.node_index[origin], weights)
+            for destination in self.graph.names:
+                path = self.graph.shortest_path(origin, destination, profile)
+                assert path["cost"] == round(dist[self.graph.node_index[destination]], 2)
+                assert path["nodes"][0] == origin and path["nodes"][-1] == destination
+
+    def test_results_are_cached(self) -> None:
+        """A repeated origin–destination query is served from the LRU cache."""
+        first = self.graph.shortest_path("delhi", "mumbai")
+        hits = self.graph.path_cache.hits
+        assert self.graph.shortest_path("delhi", "mumbai") is first
+        assert self.graph.path_cache.hits == hits + 1
+
+    def test_cold_chain_costs_more_co2(self) -> None:
+        """Refrigerated loads emit more CO₂ on the same route (ASHRAE 1.25×)."""
+        ambient = self.graph.shortest_path("chennai", "bangalore", make_profile(1.0, False))
+        reefer = self.graph.shortest_path("chennai", "bangalore", make_profile(1.0, True))
+        assert reefer["co2_kg"] > ambient["co2_kg"]
+
+    def test_corridor_reroutes_share_tree(self) -> None:
+        """Every truck on a corridor is routed to the corridor destination."""
+        trucks = [
+            {"vehicle_id": "TRK-KP-008", "latitude": 23.68, "longitude": 86.97},
+            {"vehicle_id": "TRK-KP-009", "latitude": 24.79, "longitude": 85.00},
+        ]
+        suggestions = suggest_corridor_reroutes(self.graph, "kolkata_patna", trucks)
+        assert [s["nodes"][-1] for s in suggestions] == ["patna", "patna"]
+        assert suggestions[1]["nodes"] == ["gaya", "patna"]
+
+
+class TestLRUCache:
+    """Test the shared path cache."""
+
+    def test_concurrent_access_keeps_bound(self) -> None:
+        """Threads hitting one cache never exceed maxsize or lose counter updates."""
+        cache = LRUCache(maxsize=64)
+
+        def worker(offset: int) -> None:
+            for i in range(2000):
+                if cache.get((offset + i) % 100) is None:
+                    cache.put((offset + i) % 100, i)
+
+        threads = [threading.Thread(target=worker, args=(n * 7,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(cache) <= 64
+        assert cache.hits + cache.misses == 8 * 2000
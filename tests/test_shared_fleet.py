@@ -0,0 +1,106 @@
+"""
+Unit tests for the shared-memory fleet table.
+
+Validates publish/attach round trips, stable slots per vehicle, oversized
+records, capacity limits and reads from a separate process.
+"""
+
+import multiprocessing
+import uuid
+
+import pytest
+
+from rag.shared_fleet import PAYLOAD_BYTES, SharedFleetTable
+
+
+def _record(vid: str, ts: float, **extra) -> dict:
+    return {"vehicle_id": vid, "timestamp": ts, "latitude": 28.6, "longitude": 77.2,
+            "route_id": "delhi_mumbai", "co2_kg": 9.4, **extra}
+
+
+@pytest.fixture
+def table():
+    writer = SharedFleetTable.create(f"rz_test_{uuid.uuid4().hex[:8]}", capacity=4)
+    yield writer
+    writer.close()
+
+
+def _snapshot_in_child(name: str, queue) -> None:
+    reader = SharedFleetTable.attach(name)
+    queue.put(reader.snapshot())
+    reader.close()
+
+
+class TestSharedFleetTable:
+    """Test the seqlocked slot array."""
+
+    def test_publish_and_attach(self, table) -> None:
+        """A reader sees the latest record per vehicle; updates reuse the slot."""
+        table.update(_record("TRK-DL-001", 1.0))
+        table.update(_record("TRK-DL-002", 1.0))
+        table.update(_record("TRK-DL-001", 2.0, status="WARNING"))
+        reader = SharedFleetTable.attach(table.shm_name)
+        snapshot = reader.snapshot()
+        assert [r["vehicle_id"] for r in snapshot] == ["TRK-DL-001", "TRK-DL-002"]
+        assert snapshot[0]["timestamp"] == 2.0 and snapshot[0]["status"] == "WARNING"
+        assert reader.get("TRK-DL-002")["timestamp"] == 1.0
+        assert reader.generation == 3
+        reader.close()
+
+    def test_oversized_record_keeps_core_fields(self, table) -> None:
+        """Records too large for a slot are stored with core fields only."""
+        table.update(_record("TRK-DL-001", 1.0, notes="x" * (PAYLOAD_BYTES * 2)))
+        record = table.get("TRK-DL-001")
+        assert "notes" not in record and record["co2_kg"] == 9.4
+
+    def test_record_too_large_for_core_is_rejected(self, table) -> None:
+        """When even the core fields overflow, the record is not published and the slot keeps its last value."""
+        table.update(_record("TRK-DL-001", 1.0))
+        assert not table.update(_record("TRK-DL-001", 2.0, route_id="r" * PAYLOAD_BYTES))
+        assert not table.update(_record("TRK-DL-002", 2.0, route_id="r" * PAYLOAD_BYTES))
+        assert table.stats["dropped_oversized"] == 2
+        assert table.count == 1
+        reader = SharedFleetTable.attach(table.shm_name)
+        assert reader.get("TRK-DL-001")["timestamp"] == 1.0
+        reader.close()
+
+    def test_capacity_limit(self, table) -> None:
+        """Vehicles beyond capacity are dropped and counted."""
+        for i in range(6):
+            table.update(_record(f"TRK-{i}", 1.0))
+        assert table.count == 4
+        assert table.stats["dropped_full"] == 2
+
+    def test_writer_resumes_existing_region(self, table) -> None:
+        """A restarted writer keeps vehicles in their slots."""
+        table.update(_record("TRK-DL-001", 1.0))
+        resumed = SharedFleetTable.create(table.shm_name, capacity=4)
+        resumed.update(_record("TRK-DL-001", 5.0))
+        assert table.count == 1 and table.get("TRK-DL-001")["timestamp"] == 5.0
+
+    def test_read_from_other_process(self, table) -> None:
+        """A separate worker process reads the published state."""
+        table.update(_record("TRK-CB-007", 3.0, temperature_c=-19.5))
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_snapshot_in_child, args=(table.shm_name, queue))
+        proc.start()
+        snapshot = queue.get(timeout=30)
+        proc.join(timeout=30)
+        assert snapshot == [_record("TRK-CB-007", 3.0, temperature_c=-19.5)]
+
+    def test_reader_follows_restarted_writer(self) -> None:
+        """After a clean writer exit and restart, an attached reader serves the new region."""
+        name = f"rz_test_{uuid.uuid4().hex[:8]}"
+        writer = SharedFleetTable.create(name, capacity=4)
+        writer.update(_record("TRK-DL-001", 1.0))
+        reader = SharedFleetTable.attach(name)
+        assert reader.get("TRK-DL-001")["timestamp"] == 1.0
+        writer.close()
+        assert reader.closed and reader.snapshot()[0]["timestamp"] == 1.0
+        restarted = SharedFleetTable.create(name, capacity=4)
+        restarted.update(_record("TRK-DL-001", 2.0))
+        assert reader.get("TRK-DL-001")["timestamp"] == 2.0
+        assert reader.generation == 1 and reader.stats["reattached"] == 1
+        reader.close()
+        restarted.close()
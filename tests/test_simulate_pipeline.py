@@ -0,0 +1,110 @@
+"""
+Unit tests for the simulator's load-generation mode.
+
+Validates fleet synthesis, multi-writer appends, the ETA trim, and the
+synthetic clients' error, shedding and staleness accounting.
+"""
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+import simulate_pipeline
+from simulate_pipeline import VEHICLES, ClientStats, build_fleet, parse_args
+
+
+class TestFleet:
+    """Test fleet synthesis."""
+
+    def test_demo_fleet_unchanged(self) -> None:
+        """The default size returns the ten demo trucks as-is."""
+        assert build_fleet(len(VEHICLES)) == VEHICLES
+
+    def test_large_fleet_on_corridors(self) -> None:
+        """Larger fleets get unique ids and stay on the requested corridors."""
+        fleet = build_fleet(500, ["chennai_bangalore"])
+        assert len({v["vehicle_id"] for v in fleet}) == 500
+        assert {v["route_id"] for v in fleet} == {"chennai_bangalore"}
+
+    def test_rate_sets_interval(self) -> None:
+        """--rate is converted to a per-vehicle reporting interval."""
+        assert parse_args(["--vehicles", "20000", "--rate", "10000"]).interval == 2.0
+
+
+class TestWriters:
+    """Test multi-process writing."""
+
+    def test_writers_append_whole_lines(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Concurrent writers produce only complete JSON lines and the summary matches the file."""
+        monkeypatch.setattr(simulate_pipeline, "TMP_DIR", tmp_path)
+        monkeypatch.setattr(simulate_pipeline, "HISTORY_DIR", tmp_path / "history")
+        args = parse_args(["--vehicles", "200", "--writers", "2", "--interval", "0.1", "--duration", "0.5"])
+        summary = simulate_pipeline.run(args)
+        lines = (tmp_path / "fleet_summary.jsonl").read_text(encoding="utf-8").splitlines()
+        assert summary["writers"] == 2 and summary["records_written"] == len(lines) >= 200
+        assert {json.loads(line)["vehicle_id"] for line in lines} == {v["vehicle_id"] for v in build_fleet(200)}
+
+    def test_eta_trim_keeps_latest_whole_lines(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Trimming replaces the ETA file with its newest lines and leaves no tmp or partial line behind."""
+        monkeypatch.setattr(simulate_pipeline, "HISTORY_DIR", tmp_path / "history")
+        fleet_file, eta_file = tmp_path / "fleet_summary.jsonl", tmp_path / "eta_summary.jsonl"
+        records = [simulate_pipeline.generate_record(v) for v in build_fleet(10)]
+        for _ in range(60):
+            simulate_pipeline.write_records(fleet_file, eta_file, records)
+        simulate_pipeline.housekeep(fleet_file, eta_file, fleet_size=10)
+        lines = eta_file.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 200
+        assert all(json.loads(line)["vehicle_id"] for line in lines)
+        assert not eta_file.with_suffix(".tmp").exists()
+
+    def test_short_write_is_completed(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """A write that returns short is continued with the remaining bytes."""
+        real_open = open
+
+        class ShortWrites:
+            def __init__(self, f):
+                self.f = f
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.f.close()
+
+            def write(self, data):
+                return self.f.write(data[:7])
+
+        def fake_open(path, mode="r", *args, **kwargs):
+            f = real_open(path, mode, *args, **kwargs)
+            return ShortWrites(f) if "a" in mode and "b" in mode else f
+
+        monkeypatch.setattr("builtins.open", fake_open)
+        target = tmp_path / "out.jsonl"
+        simulate_pipeline._append(target, b'{"vehicle_id": "TRK-DL-001"}\n' * 3)
+        monkeypatch.undo()
+        assert target.read_text(encoding="utf-8").splitlines() == ['{"vehicle_id": "TRK-DL-001"}'] * 3
+
+
+class TestClientStats:
+    """Test synthetic client accounting."""
+
+    def test_errors_and_shedding(self) -> None:
+        """Non-2xx/3xx responses are errors; 429/503 are also counted as shed."""
+        stats = ClientStats(time.time())
+        stats.record_request("/api/fleet", 200, 0.01)
+        stats.record_request("/api/fleet", 429, 0.001)
+        stats.record_request("/api/fleet-intel", 0, 1.0)
+        api = stats.summary(1.0)["api"]
+        assert api["requests"] == 3 and api["errors"] == 2 and api["shed"] == 1
+        assert api["endpoints"]["/api/fleet"]["errors"] == 1
+
+    def test_staleness_skips_replayed_records(self) -> None:
+        """Only records emitted during the run count toward staleness."""
+        started = time.time() - 10
+        stats = ClientStats(started)
+        stats.record_frame([{"timestamp": started - 3600}, {"timestamp": time.time() - 0.5}])
+        sse = stats.summary(1.0)["sse"]
+        assert sse["frames"] == 1 and sse["records"] == 1
+        assert sse["staleness"]["p50_ms"] == pytest.approx(500, rel=0.1)
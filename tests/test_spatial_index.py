@@ -0,0 +1,50 @@
+"""
+Unit tests for the live fleet grid index.
+
+Validates bounding-box, radius and nearest-k queries against a brute-force
+Haversine scan, and O(1) moves between grid cells.
+"""
+
+import random
+
+from rag.spatial_index import GridIndex
+from transforms.route_geometry import haversine_km
+
+
+def _random_fleet(n: int, seed: int = 7) -> dict[str, tuple[float, float]]:
+    rng = random.Random(seed)
+    return {f"TRK-{i:05d}": (rng.uniform(8.0, 32.0), rng.uniform(68.0, 95.0)) for i in range(n)}
+
+
+class TestGridIndex:
+    """Test grid index queries against brute force."""
+
+    def test_bbox_matches_brute_force(self) -> None:
+        """Bounding-box query returns exactly the points inside the box."""
+        fleet = _random_fleet(2000)
+        index = GridIndex()
+        for vid, (lat, lon) in fleet.items():
+            index.upsert(vid, lat, lon)
+        expected = {v for v, (lat, lon) in fleet.items() if 18 <= lat <= 22 and 75 <= lon <= 80}
+        assert set(index.query_bbox(18, 75, 22, 80)) == expected
+
+    def test_radius_and_nearest_match_brute_force(self) -> None:
+        """Radius and nearest-k agree with a full Haversine scan."""
+        fleet = _random_fleet(2000)
+        index = GridIndex()
+        for vid, (lat, lon) in fleet.items():
+            index.upsert(vid, lat, lon)
+        dists = sorted((haversine_km(22.0, 78.0, lat, lon), v) for v, (lat, lon) in fleet.items())
+        assert [v for v, _ in index.query_radius(22.0, 78.0, 120.0)] == [v for d, v in dists if d <= 120.0]
+        assert [v for v, _ in index.nearest(22.0, 78.0, 5)] == [v for _, v in dists[:5]]
+
+    def test_upsert_moves_between_cells(self) -> None:
+        """Moving a vehicle leaves no stale entry in its previous cell."""
+        index = GridIndex(cell_deg=1.0)
+        index.upsert("TRK-DL-001", 28.6, 77.2)
+        index.upsert("TRK-DL-001", 19.1, 72.9)
+        assert len(index) == 1
+        assert index.query_bbox(28, 77, 29, 78) == []
+        assert index.query_bbox(19, 72, 20, 73) == ["TRK-DL-001"]
+        index.remove("TRK-DL-001")
+        assert index.nearest(19.1, 72.9, 3) == []
@@ -0,0 +1,83 @@
+"""
+Unit tests for telemetry ingestion validation and group commit.
+
+Covers schema validation of raw records and the bounded-queue writer
+that backs POST /api/ingest/telemetry.
+"""
+
+import json
+
+from connectors.telemetry_schema import validate_telemetry_record
+from rag.telemetry_ingest import TelemetryIngestor, validate_batch
+
+
+def _record(**overrides) -> dict:
+    record = {
+        "vehicle_id": "TRK-DL-001",
+        "timestamp": 1_700_000_000.0,
+        "latitude": 28.6139,
+        "longitude": 77.2090,
+        "fuel_consumed_liters": 4.5,
+        "speed_kmph": 65.4,
+        "route_id": "delhi_mumbai",
+    }
+    record.update(overrides)
+    return record
+
+
+class TestTelemetryValidation:
+    """Test the fast schema validator."""
+
+    def test_valid_record(self) -> None:
+        """A record matching the Pathway schema passes unchanged."""
+        assert validate_telemetry_record(_record()) is None
+
+    def test_int_coerced_to_float(self) -> None:
+        """Integer readings are coerced so the log matches float columns."""
+        record = _record(speed_kmph=70)
+        assert validate_telemetry_record(record) is None
+        assert isinstance(record["speed_kmph"], float)
+
+    def test_rejects_bad_types_and_ranges(self) -> None:
+        """Missing ids, booleans, non-finite numbers and out-of-range coordinates are rejected."""
+        assert validate_telemetry_record(_record(vehicle_id="")) is not None
+        assert validate_telemetry_record(_record(speed_kmph=True)) is not None
+        assert validate_telemetry_record(_record(fuel_consumed_liters=float("nan"))) is not None
+        assert validate_telemetry_record(_record(speed_kmph=float("inf"))) is not None
+        assert validate_telemetry_record(_record(temperature_c=float("-inf"))) is not None
+        assert validate_telemetry_record(_record(latitude=91.0)) is not None
+        assert validate_telemetry_record([1, 2]) is not None
+
+    def test_batch_reports_indexes(self) -> None:
+        """Invalid records are reported by their position in the batch."""
+        valid, errors = validate_batch([_record(), {"vehicle_id": "x"}, _record()])
+        assert len(valid) == 2
+        assert [e["index"] for e in errors] == [1]
+
+
+class TestGroupCommit:
+    """Test the bounded queue and single-writer group commit."""
+
+    def test_records_committed_in_order(self, tmp_path) -> None:
+        """Every accepted record reaches the log once, in submission order."""
+        log = tmp_path / "telemetry.jsonl"
+        ingestor = TelemetryIngestor(log)
+        for i in range(5):
+            seq = ingestor.submit([_record(timestamp=float(i * 10 + j)) for j in range(10)])
+        assert ingestor.wait_committed(seq)
+        ingestor.close()
+        timestamps = [json.loads(line)["timestamp"] for line in log.read_text().splitlines()]
+        assert timestamps == [float(i) for i in range(50)]
+
+    def test_backpressure_when_full(self, tmp_path) -> None:
+        """Submits beyond max_pending are refused rather than buffered."""
+        ingestor = TelemetryIngestor(tmp_path / "telemetry.jsonl", max_pending=5)
+        assert ingestor.submit([_record() for _ in range(6)]) is None
+        assert ingestor.stats["rejected_backpressure"] == 6
+
+    def test_failed_write_is_reported(self, tmp_path) -> None:
+        """A group that cannot be written makes wait_committed fail instead of confirming it."""
+        ingestor = TelemetryIngestor(tmp_path / "missing" / "telemetry.jsonl")
+        (tmp_path / "missing").write_text("not a directory")
+        assert not ingestor.wait_committed(ingestor.submit([_record()]))
+        assert ingestor.stats["write_errors"] == 1 and ingestor.stats["committed"] == 0
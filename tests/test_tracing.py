@@ -0,0 +1,106 @@
+"""
+Unit tests for end-to-end latency tracing.
+
+Validates the log-linear histogram's percentile accuracy and the tracer's
+per-stage attribution, replay filtering and ingest stamping.
+"""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from rag.telemetry_ingest import TelemetryIngestor
+from rag.tracing import LatencyHistogram, LatencyTracer
+
+
+class TestLatencyHistogram:
+    """Test the HDR-style histogram."""
+
+    def test_percentiles_within_precision(self) -> None:
+        """p50/p99 of 1..1000 ms land within ~2% of the exact values."""
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        assert histogram.percentile(50) == pytest.approx(0.5, rel=0.02)
+        assert histogram.percentile(99) == pytest.approx(0.99, rel=0.02)
+        assert histogram.percentile(100) == pytest.approx(1.0)
+
+    def test_small_values_are_exact(self) -> None:
+        """Sub-128 µs values have their own buckets."""
+        histogram = LatencyHistogram()
+        histogram.record(42e-6)
+        assert histogram.percentile(50) == pytest.approx(42e-6)
+
+    def test_negative_values_clamped_and_counted(self) -> None:
+        """Clock skew shows up as a counter, not a negative latency."""
+        histogram = LatencyHistogram()
+        histogram.record(-0.5)
+        summary = histogram.summary()
+        assert summary["clamped_negative"] == 1 and summary["p99_ms"] == 0.0
+
+    def test_count_le_is_cumulative(self) -> None:
+        """count_le counts observations at or below a bound."""
+        histogram = LatencyHistogram()
+        for seconds in (0.001, 0.01, 0.1, 1.0):
+            histogram.record(seconds)
+        assert histogram.count_le(0.05) == 2
+        assert histogram.count_le(10.0) == 4
+
+    def test_empty_summary(self) -> None:
+        """An empty histogram reports zeros."""
+        assert LatencyHistogram().summary()["count"] == 0
+
+
+class TestLatencyTracer:
+    """Test stage attribution."""
+
+    def test_read_stages(self) -> None:
+        """A read record yields emit→ingest, ingest→read and emit→read."""
+        now = time.time()
+        tracer = LatencyTracer(started_at=now - 60)
+        tracer.update({"vehicle_id": "TRK-DL-001", "timestamp": now - 3.0, "ingested_at": now - 1.0})
+        stages = tracer.summary()["stages"]
+        assert stages["emit_to_ingest"]["p50_ms"] == pytest.approx(2000, rel=0.02)
+        assert stages["ingest_to_read"]["p50_ms"] == pytest.approx(1000, rel=0.05)
+        assert stages["emit_to_read"]["p50_ms"] == pytest.approx(3000, rel=0.05)
+
+    def test_send_stages_per_channel(self) -> None:
+        """Sends are split by channel and measured from the tracer's read time by default."""
+        now = time.time()
+        tracer = LatencyTracer(started_at=now - 60)
+        record = {"vehicle_id": "TRK-DL-001", "timestamp": now - 5.0, "ingested_at": now - 4.0}
+        tracer.update(record)
+        tracer.observe_send([record], "ws")
+        tracer.observe_send([record], "sse", read_at=now - 2.0)
+        stages = tracer.summary()["stages"]
+        assert stages["read_to_send.ws"]["p50_ms"] < 100
+        assert stages["read_to_send.sse"]["p50_ms"] == pytest.approx(2000, rel=0.05)
+        assert stages["end_to_end.sse"]["count"] == 1
+
+    def test_replays_are_skipped(self) -> None:
+        """Records ingested before the tracer started are counted, not measured."""
+        tracer = LatencyTracer()
+        tracer.update({"vehicle_id": "TRK-DL-001", "timestamp": 1.0, "ingested_at": 2.0})
+        summary = tracer.summary()
+        assert summary["replayed"] == 1 and summary["stages"] == {}
+
+    def test_records_without_ingest_time(self) -> None:
+        """Without ingested_at only the emission-based stage is recorded."""
+        now = time.time()
+        tracer = LatencyTracer(started_at=now - 60)
+        tracer.update({"vehicle_id": "TRK-DL-001", "timestamp": now - 1.0})
+        assert set(tracer.summary()["stages"]) == {"emit_to_read"}
+
+
+class TestIngestStamping:
+    """Test that the ingestion path stamps ingest time."""
+
+    def test_submit_stamps_ingested_at(self, tmp_path: Path) -> None:
+        """Every submitted record carries the server's ingest time."""
+        ingestor = TelemetryIngestor(tmp_path / "telemetry.jsonl")
+        records = [{"vehicle_id": "TRK-DL-001", "timestamp": 1.0}]
+        before = time.time()
+        ingestor.submit(records)
+        ingestor.close()
+        assert before <= records[0]["ingested_at"] <= time.time()
@@ -0,0 +1,112 @@
+"""
+Unit tests for online trajectory compression and the track store.
+
+Validates the reconstruction error bound, compression ratio on highway-like
+tracks, pinned status changes and gaps, and track queries by time range.
+"""
+
+import math
+import random
+
+from rag.track_store import TrackStore
+from transforms.route_geometry import haversine_km
+from transforms.trajectory import TrajectoryCompressor, interpolate, track_point
+
+
+def _highway_track(n: int = 3600, seed: int = 3) -> list[dict]:
+    """Two-second fixes at ~70 km/h along a gently curving road with ±3 m GPS noise."""
+    rng = random.Random(seed)
+    lat, lon, heading = 28.6139, 77.2090, math.radians(160)
+    points = []
+    for i in range(n):
+        heading += math.radians(0.02) * math.sin(i / 400)
+        step_km = 70 * 2 / 3600
+        lat += step_km * math.cos(heading) / 111.32
+        lon += step_km * math.sin(heading) / (111.32 * math.cos(math.radians(lat)))
+        points.append({
+            "vehicle_id": "TRK-DL-001",
+            "timestamp": 1_700_000_000 + 2 * i,
+            "latitude": lat + rng.gauss(0, 3) / 111_320,
+            "longitude": lon + rng.gauss(0, 3) / 111_320,
+            "speed_kmph": 70.0,
+            "route_id": "delhi_mumbai",
+            "deviation_status": "OK",
+        })
+    return points
+
+
+def _compress(records: list[dict], tolerance_m: float = 25.0) -> tuple[TrajectoryCompressor, list[dict]]:
+    compressor = TrajectoryCompressor(tolerance_m)
+    kept = []
+    for r in records:
+        kept += compressor.update(r["vehicle_id"], track_point(r))
+    pending = compressor.pending("TRK-DL-001")
+    return compressor, kept + ([pending] if pending else [])
+
+
+class TestTrajectoryCompressor:
+    """Test the opening-window SED simplifier."""
+
+    def test_error_bound_and_ratio(self) -> None:
+        """Every raw fix is reconstructed within tolerance and storage drops at least 10×."""
+        raw = _highway_track()
+        _, kept = _compress(raw)
+        assert len(raw) / len(kept) >= 10
+        worst_m = max(
+            haversine_km(r["latitude"], r["longitude"], *interpolate(kept, r["timestamp"])) * 1000 for r in raw
+        )
+        assert worst_m <= 25.0 * 1.01
+
+    def test_status_change_is_pinned(self) -> None:
+        """The first DEVIATED fix is kept with its exact timestamp."""
+        raw = _highway_track(600)
+        for r in raw[300:]:
+            r["deviation_status"] = "DEVIATED"
+        _, kept = _compress(raw)
+        assert raw[300]["timestamp"] in {p["timestamp"] for p in kept}
+        assert raw[299]["timestamp"] in {p["timestamp"] for p in kept}
+
+    def test_gap_is_pinned(self) -> None:
+        """Both sides of an outage longer than MAX_GAP_SEC are kept."""
+        raw = _highway_track(600)
+        for r in raw[300:]:
+            r["timestamp"] += 3600
+        _, kept = _compress(raw)
+        stamps = {p["timestamp"] for p in kept}
+        assert raw[299]["timestamp"] in stamps and raw[300]["timestamp"] in stamps
+
+    def test_replayed_fix_ignored(self) -> None:
+        """Fixes at or before the newest timestamp do not change state."""
+        raw = _highway_track(50)
+        compressor, _ = _compress(raw)
+        before = dict(compressor.stats)
+        assert compressor.update("TRK-DL-001", track_point(raw[10])) == []
+        assert compressor.stats == before
+
+
+class TestTrackStore:
+    """Test persisted track segments and range queries."""
+
+    def test_query_range_round_trip(self, tmp_path) -> None:
+        """Points come back for the requested vehicle and time range only."""
+        store = TrackStore(tmp_path / "tracks")
+        raw = _highway_track(1200)
+        other = [{**r, "vehicle_id": "TRK-DL-002"} for r in raw[:100]]
+        for r in raw + other:
+            store.update(r)
+        start, end = raw[200]["timestamp"], raw[800]["timestamp"]
+        points = store.query("TRK-DL-001", start, end)
+        assert points
+        assert all(p["vehicle_id"] == "TRK-DL-001" and start <= p["timestamp"] < end for p in points)
+        full = store.query("TRK-DL-001")
+        assert full[-1]["timestamp"] == raw[-1]["timestamp"] and full[-1]["pending"]
+        assert store.stats["raw_points"] == len(raw) + len(other)
+
+    def test_stats_report_stored_bytes(self, tmp_path) -> None:
+        """Stored bytes reflect what was flushed to the track segments."""
+        store = TrackStore(tmp_path / "tracks")
+        assert store.stats["stored_bytes"] == 0
+        for r in _highway_track(1200):
+            store.update(r)
+        store.flush()
+        assert store.stats["stored_bytes"] == sum(p.stat().st_size for p in store.segments()) > 0
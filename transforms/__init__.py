@@ -5,18 +5,27 @@ Houses all Pathway UDFs and computation graph components for real-time
 CO₂ calculation, ETA prediction, anomaly detection, and window aggregations.
 
 Modules:
-    co2_engine: IPCC AR6 WGIII emission factor computation per vehicle.
+    co2_model: IPCC AR6 WGIII emission factor computation (pure Python).
+    co2_engine: Pathway UDF binding for the CO₂ model.
     eta_engine: ETA prediction with ghost path projections.
     window_aggregations: 5-min tumbling + 30-min sliding window logic.
     alert_logic: HIGH_EMISSION_ALERT threshold detection.
-    route_checker: Haversine-based route deviation detection UDF.
+    route_geometry: Corridors, hub coordinates, Haversine and deviation rule (pure Python).
+    route_checker: Pathway UDF binding for route deviation detection.
+    timing: Opt-in per-call timing for the UDFs.
+
+Pure modules import nothing beyond the stdlib; the Pathway bindings load
+Pathway only when a UDF is first used.
 """
 
 __version__ = "2.0.0"
 __all__ = [
+    "co2_model",
     "co2_engine",
     "eta_engine",
     "window_aggregations",
     "alert_logic",
+    "route_geometry",
     "route_checker",
+    "timing",
 ]
@@ -0,0 +1,132 @@
+"""
+Per-Vehicle and Per-Route Cumulative Accumulators.
+
+Folds each telemetry record into running totals (CO₂, fuel, distance travelled,
+active time) so rankings and carbon credits come from true cumulative figures
+at O(fleet size) cost instead of rescanning history.
+
+Distance per event uses the record's `distance_km` when the pipeline provides it,
+otherwise mean speed × elapsed time since the vehicle's previous fix. Gaps longer
+than MAX_GAP_SEC (connectivity loss, parked overnight) add no distance or active time.
+Records at or before a vehicle's last seen timestamp are ignored, so re-reading a
+truncated or replayed log never double counts.
+
+Author: S-Eshwar-fut-dev
+"""
+
+import logging
+
+from transforms.co2_model import BASE_FACTOR_KG_PER_KM, COLD_CHAIN_REFRIGERATION_FACTOR, FULL_LOAD_UPLIFT
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+MAX_GAP_SEC: float = 300.0
+
+SCORE_BANDS: tuple[tuple[float, int], ...] = ((0.80, 5), (0.95, 4), (1.10, 3), (1.30, 2))
+"""(max ratio to IPCC laden baseline, score) — anything above the last band scores 1."""
+
+_TOTAL_FIELDS: tuple[str, ...] = ("co2_kg", "fuel_liters", "distance_km", "active_sec", "events")
+
+
+def baseline_co2_kg(distance_km: float, is_cold_chain: bool = False) -> float:
+    """IPCC AR6 laden-truck baseline CO₂ for a distance, the reference for credits and scores."""
+    factor = BASE_FACTOR_KG_PER_KM * (1.0 + FULL_LOAD_UPLIFT)
+    if is_cold_chain:
+        factor *= COLD_CHAIN_REFRIGERATION_FACTOR
+    return distance_km * factor
+
+
+def efficiency_score(co2_kg: float, distance_km: float, is_cold_chain: bool = False) -> int | None:
+    """
+    1–5 star score from cumulative CO₂ intensity relative to the IPCC baseline.
+
+    Returns None when the vehicle has no distance on record yet (unrated).
+    """
+    if distance_km <= 0:
+        return None
+    ratio = co2_kg / baseline_co2_kg(distance_km, is_cold_chain)
+    for max_ratio, score in SCORE_BANDS:
+        if ratio <= max_ratio:
+            return score
+    return 1
+
+
+def _empty_totals() -> dict:
+    return {field: 0.0 for field in _TOTAL_FIELDS}
+
+
+class FleetAccumulators:
+    """
+    Running totals keyed by vehicle_id and by route_id.
+
+    Attributes:
+        vehicles (dict[str, dict]): vehicle_id → totals plus `route_id`,
+            `first_ts`, `last_ts`, `last_speed_kmph`, `is_cold_chain`.
+        routes (dict[str, dict]): route_id → totals.
+    """
+
+    name = "accumulators"
+
+    def __init__(self):
+        self.vehicles: dict[str, dict] = {}
+        self.routes: dict[str, dict] = {}
+
+    def update(self, record: dict) -> bool:
+        """
+        Fold one telemetry record into the totals.
+
+        Returns:
+            bool: False if the record was skipped (no id/timestamp, or not newer).
+        """
+        vid = record.get("vehicle_id")
+        ts = record.get("timestamp")
+        if not vid or not isinstance(ts, (int, float)):
+            return False
+        speed = float(record.get("speed_kmph") or 0.0)
+
+        acc = self.vehicles.get(vid)
+        if acc is None:
+            acc = self.vehicles[vid] = {**_empty_totals(), "first_ts": ts, "last_ts": None, "last_speed_kmph": speed}
+        elif ts <= acc["last_ts"]:
+            return False
+
+        distance = record.get("distance_km")
+        active = 0.0
+        if acc["last_ts"] is not None:
+            dt = ts - acc["last_ts"]
+            if dt <= MAX_GAP_SEC:
+                if not isinstance(distance, (int, float)):
+                    distance = (speed + acc["last_speed_kmph"]) / 2 * dt / 3600
+                if speed > 0:
+                    active = dt
+        if not isinstance(distance, (int, float)):
+            distance = 0.0
+
+        delta = {
+            "co2_kg": float(record.get("co2_kg") or 0.0),
+            "fuel_liters": float(record.get("fuel_consumed_liters") or 0.0),
+            "distance_km": float(distance),
+            "active_sec": active,
+            "events": 1,
+        }
+        route_id = record.get("route_id") or acc.get("route_id") or "unknown"
+        route = self.routes.setdefault(route_id, _empty_totals())
+        for field, value in delta.items():
+            acc[field] += value
+            route[field] += value
+
+        acc["route_id"] = route_id
+        acc["last_ts"] = ts
+        acc["last_speed_kmph"] = speed
+        acc["is_cold_chain"] = acc.get("is_cold_chain", False) or record.get("temperature_c") is not None
+        return True
+
+    def to_dict(self) -> dict:
+        """Serializable snapshot for checkpointing."""
+        return {"vehicles": self.vehicles, "routes": self.routes}
+
+    def load_dict(self, state: dict) -> None:
+        """Restore from a `to_dict` snapshot."""
+        self.vehicles = state.get("vehicles", {})
+        self.routes = state.get("routes", {})
@@ -0,0 +1,177 @@
+"""
+Cold-Chain Excursion Tracking.
+
+Runs a two-state machine (IN_SLA ↔ BREACH) per refrigerated vehicle, fed one
+temperature reading at a time. Each update is O(1) and maintains:
+
+    - breach start/end and the excursion currently open
+    - cumulative seconds above COLD_CHAIN_TEMP_SLA_C
+    - peak excursion temperature
+    - degree-minutes above the SLA (∫ (temp − SLA) dt, sample-and-hold)
+
+A reading holds until the next one arrives; gaps longer than MAX_GAP_SEC are not
+integrated (the truck was offline, so nothing is known about that interval).
+Breaches close only once the cargo is back below SLA − BREACH_HYSTERESIS_C, so
+a sensor hovering at the limit does not open dozens of one-sample excursions.
+An excursion's `duration_sec` is wall-clock time from breach to close, so it
+includes time in the hysteresis band and offline gaps; its `seconds_above_sla`
+counts only integrated time above the SLA, and the excursions' figures sum to
+the vehicle's `seconds_above_sla`.
+
+The SLA defaults to the COLD_CHAIN_TEMP_SLA_C environment variable (−18 °C).
+
+References:
+    - ASHRAE Standard for frozen cargo: −18 °C
+    - WHO TRS 961 Annex 9: temperature excursion reporting for pharmaceuticals
+
+Author: S-Eshwar-fut-dev
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+COLD_CHAIN_TEMP_SLA_C: float = float(os.environ.get("COLD_CHAIN_TEMP_SLA_C", "-18.0"))
+BREACH_HYSTERESIS_C: float = 0.5
+MAX_GAP_SEC: float = 300.0
+MAX_EXCURSIONS_KEPT: int = 20
+
+
+def _new_state(ts: float) -> dict:
+    return {
+        "in_breach": False,
+        "breach_start": None,
+        "current_peak_c": None,
+        "current_degree_minutes": 0.0,
+        "current_seconds_above": 0.0,
+        "seconds_above_sla": 0.0,
+        "degree_minutes": 0.0,
+        "peak_c": None,
+        "excursion_count": 0,
+        "excursions": [],
+        "first_ts": ts,
+        "last_ts": None,
+        "last_temp_c": None,
+    }
+
+
+class ColdChainMonitor:
+    """
+    Per-vehicle cold-chain breach state machines.
+
+    Attributes:
+        sla_c (float): Temperature limit; readings strictly above it are excursions.
+        vehicles (dict[str, dict]): vehicle_id → machine state.
+    """
+
+    name = "cold_chain"
+
+    def __init__(self, sla_c: float = COLD_CHAIN_TEMP_SLA_C):
+        self.sla_c = sla_c
+        self.vehicles: dict[str, dict] = {}
+
+    def update(self, record: dict) -> bool:
+        """
+        Apply one reading. Records without `temperature_c` are ignored.
+
+        Returns:
+            bool: True if the reading advanced a state machine.
+        """
+        temp = record.get("temperature_c")
+        ts = record.get("timestamp")
+        vid = record.get("vehicle_id")
+        if not vid or not isinstance(temp, (int, float)) or not isinstance(ts, (int, float)):
+            return False
+
+        state = self.vehicles.get(vid)
+        if state is None:
+            state = self.vehicles[vid] = _new_state(ts)
+        elif ts <= state["last_ts"]:
+            return False
+
+        # Integrate the interval since the previous reading at the previous temperature.
+        prev_temp = state["last_temp_c"]
+        if prev_temp is not None:
+            dt = ts - state["last_ts"]
+            if dt <= MAX_GAP_SEC and prev_temp > self.sla_c:
+                state["seconds_above_sla"] += dt
+                excess_dm = (prev_temp - self.sla_c) * dt / 60
+                state["degree_minutes"] += excess_dm
+                # prev_temp above SLA means that reading opened or extended the open excursion.
+                state["current_seconds_above"] += dt
+                state["current_degree_minutes"] += excess_dm
+
+        if temp > self.sla_c:
+            if not state["in_breach"]:
+                state["in_breach"] = True
+                state["breach_start"] = ts
+                state["current_peak_c"] = temp
+                state["current_degree_minutes"] = 0.0
+                state["current_seconds_above"] = 0.0
+                state["excursion_count"] += 1
+            else:
+                state["current_peak_c"] = max(state["current_peak_c"], temp)
+            state["peak_c"] = temp if state["peak_c"] is None else max(state["peak_c"], temp)
+        elif state["in_breach"] and temp <= self.sla_c - BREACH_HYSTERESIS_C:
+            self._close_excursion(state, ts)
+
+        state["last_ts"] = ts
+        state["last_temp_c"] = temp
+        return True
+
+    def _close_excursion(self, state: dict, end_ts: float) -> None:
+        state["excursions"].append({
+            "start": state["breach_start"],
+            "end": end_ts,
+            "duration_sec": round(end_ts - state["breach_start"], 1),
+            "seconds_above_sla": round(state["current_seconds_above"], 1),
+            "peak_c": state["current_peak_c"],
+            "degree_minutes": round(state["current_degree_minutes"], 2),
+        })
+        del state["excursions"][:-MAX_EXCURSIONS_KEPT]
+        state["in_breach"] = False
+        state["breach_start"] = None
+        state["current_peak_c"] = None
+        state["current_degree_minutes"] = 0.0
+        state["current_seconds_above"] = 0.0
+
+    def status(self, vid: str, now: float | None = None) -> dict | None:
+        """Public view of one vehicle's machine, including the open excursion if any."""
+        state = self.vehicles.get(vid)
+        if state is None:
+            return None
+        current = None
+        if state["in_breach"]:
+            end = now if now is not None else state["last_ts"]
+            current = {
+                "start": state["breach_start"],
+                "duration_sec": round(max(end - state["breach_start"], 0.0), 1),
+                "seconds_above_sla": round(state["current_seconds_above"], 1),
+                "peak_c": state["current_peak_c"],
+                "degree_minutes": round(state["current_degree_minutes"], 2),
+            }
+        return {
+            "vehicle_id": vid,
+            "sla_c": self.sla_c,
+            "state": "BREACH" if state["in_breach"] else "IN_SLA",
+            "temperature_c": state["last_temp_c"],
+            "last_reading": state["last_ts"],
+            "current_excursion": current,
+            "seconds_above_sla": round(state["seconds_above_sla"], 1),
+            "degree_minutes": round(state["degree_minutes"], 2),
+            "peak_c": state["peak_c"],
+            "excursion_count": state["excursion_count"],
+            "excursions": list(state["excursions"]),
+        }
+
+    def to_dict(self) -> dict:
+        """Serializable snapshot for checkpointing."""
+        return {"sla_c": self.sla_c, "vehicles": self.vehicles}
+
+    def load_dict(self, state: dict) -> None:
+        """Restore from a `to_dict` snapshot."""
+        self.vehicles = state.get("vehicles", {})
+        for machine in self.vehicles.values():
+            machine.setdefault("current_seconds_above", 0.0)
@@ -0,0 +1,245 @@
+"""
+Vehicle–Booking Dispatch Optimizer.
+
+Builds a bookings × trucks cost matrix with numpy and solves the minimum-cost
+one-to-one assignment with the Hungarian algorithm (`scipy.optimize.linear_sum_assignment`).
+
+Cost Model:
+    co2_kg = (deadhead_km × load_mult(current) + trip_km × load_mult(with booking))
+             × BASE_FACTOR_KG_PER_KM × cold_factor × efficiency
+    cost   = deadhead_km × DEADHEAD_COST_PER_KM + co2_kg × CO2_COST_PER_KG
+
+    deadhead_km is the great-circle distance from the truck's live position to
+    the booking origin; trip_km is origin → destination scaled by ROAD_DETOUR_FACTOR.
+    efficiency is the truck's cumulative CO₂ per km relative to the fleet median
+    (1.0 for trucks with no distance on record yet).
+
+Pairs that violate remaining capacity or cold-chain requirements are infeasible
+and never assigned. A booking whose `total_weight` is not a non-negative number
+is reported unassigned with the reason rather than priced as weightless, so
+one bad booking does not block recommendations for the rest.
+
+Author: S-Eshwar-fut-dev
+"""
+
+import logging
+import math
+
+import numpy as np
+
+from transforms.co2_model import BASE_FACTOR_KG_PER_KM, COLD_CHAIN_REFRIGERATION_FACTOR, FULL_LOAD_UPLIFT
+from transforms.route_geometry import city_coordinates
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+EARTH_RADIUS_KM: float = 6371.0
+DEFAULT_CAPACITY_KG: float = 26500.0
+"""Rated payload assumed when telemetry carries no `vehicle_capacity_kg` (14-wheel truck)."""
+
+ROAD_DETOUR_FACTOR: float = 1.25
+"""Road distance ≈ 1.25 × great-circle distance on Indian national highways."""
+
+DEADHEAD_COST_PER_KM: float = 1.0
+CO2_COST_PER_KG: float = 1.0
+INFEASIBLE_COST: float = 1e12
+
+COLD_CHAIN_KEYWORDS: tuple[str, ...] = ("pharma", "vaccine", "dairy", "frozen", "fresh", "meat", "seafood")
+
+
+def booking_requires_cold_chain(booking: dict) -> bool:
+    """True if the booking is flagged cold-chain or lists a perishable commodity."""
+    if booking.get("requires_cold_chain"):
+        return True
+    names = " ".join(str(c.get("name", "")) for c in booking.get("commodities", [])).lower()
+    return any(word in names for word in COLD_CHAIN_KEYWORDS)
+
+
+def vehicle_is_cold_chain(vehicle: dict) -> bool:
+    """True if the vehicle reports a reefer temperature or is flagged cold-chain."""
+    return bool(vehicle.get("is_cold_chain")) or vehicle.get("temperature_c") is not None
+
+
+def booking_weight_kg(booking: dict) -> float:
+    """
+    Booking payload in kg (missing or empty counts as 0).
+
+    Raises:
+        ValueError: If `total_weight` is not a finite, non-negative number.
+    """
+    value = booking.get("total_weight") or 0
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError(f"booking {booking.get('booking_id')}: total_weight must be a non-negative number")
+    return float(value)
+
+
+def _haversine_km(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distance (km) between broadcastable arrays of coordinates in radians."""
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def haversine_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise great-circle distances (km) between two sets of (lat, lon) points.
+
+    Args:
+        a: Array of shape (n, 2) in degrees.
+        b: Array of shape (m, 2) in degrees.
+
+    Returns:
+        np.ndarray: Distance matrix of shape (n, m).
+    """
+    a_rad = np.radians(a)
+    b_rad = np.radians(b)
+    return _haversine_km(a_rad[:, None, 0], a_rad[:, None, 1], b_rad[None, :, 0], b_rad[None, :, 1])
+
+
+def haversine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance (km) between matching rows of two (n, 2) arrays of (lat, lon) degrees.
+
+    Returns:
+        np.ndarray: Shape (n,), the diagonal of `haversine_matrix(a, b)` without building it.
+    """
+    a_rad = np.radians(a)
+    b_rad = np.radians(b)
+    return _haversine_km(a_rad[:, 0], a_rad[:, 1], b_rad[:, 0], b_rad[:, 1])
+
+
+def build_cost_matrix(
+    origins: np.ndarray,
+    trip_km: np.ndarray,
+    weight_kg: np.ndarray,
+    needs_cold: np.ndarray,
+    positions: np.ndarray,
+    load_kg: np.ndarray,
+    capacity_kg: np.ndarray,
+    is_cold: np.ndarray,
+    efficiency: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized bookings × trucks cost matrix.
+
+    Args:
+        origins: (B, 2) booking origin coordinates.
+        trip_km: (B,) loaded trip distance per booking.
+        weight_kg: (B,) booking payload.
+        needs_cold: (B,) bool, booking requires refrigeration.
+        positions: (T, 2) live truck coordinates.
+        load_kg: (T,) payload already committed to each truck.
+        capacity_kg: (T,) rated capacity per truck.
+        is_cold: (T,) bool, truck is a reefer.
+        efficiency: (T,) CO₂ intensity relative to fleet median (1.0 = median).
+
+    Returns:
+        tuple: (cost, deadhead_km, co2_kg), each of shape (B, T).
+    """
+    deadhead_km = haversine_matrix(origins, positions)
+    frac_now = load_kg / capacity_kg
+    frac_new = (load_kg[None, :] + weight_kg[:, None]) / capacity_kg[None, :]
+    cold_factor = np.where(is_cold, COLD_CHAIN_REFRIGERATION_FACTOR, 1.0)
+
+    co2_kg = (
+        deadhead_km * (1.0 + FULL_LOAD_UPLIFT * frac_now)[None, :]
+        + trip_km[:, None] * (1.0 + FULL_LOAD_UPLIFT * frac_new)
+    ) * (BASE_FACTOR_KG_PER_KM * cold_factor * efficiency)[None, :]
+
+    cost = deadhead_km * DEADHEAD_COST_PER_KM + co2_kg * CO2_COST_PER_KG
+    infeasible = (frac_new > 1.0) | (needs_cold[:, None] & ~is_cold[None, :])
+    cost[infeasible] = INFEASIBLE_COST
+    return cost, deadhead_km, co2_kg
+
+
+def recommend_dispatch(
+    bookings: list[dict],
+    fleet: list[dict],
+    committed_kg: dict[str, float] | None = None,
+    intensity_kg_per_km: dict[str, float] | None = None,
+) -> dict:
+    """
+    Recommend a minimum-cost truck for each pending booking.
+
+    Args:
+        bookings: Pending bookings (`origin`, `destination`, `total_weight`, `commodities`).
+        fleet: Latest telemetry record per vehicle.
+        committed_kg: Payload already dispatched to each vehicle_id.
+        intensity_kg_per_km: Cumulative CO₂ per km travelled for each vehicle_id
+            (e.g. from `FleetAccumulators`); vehicles without one count as the median.
+
+    Returns:
+        dict: `assignments` (booking_id, vehicle_id, deadhead_km, trip_km, est_co2_kg, cost)
+        and `unassigned` (booking_id, reason).
+    """
+    committed_kg = committed_kg or {}
+    intensity_kg_per_km = intensity_kg_per_km or {}
+    unassigned: list[dict] = []
+
+    rows = []
+    for b in bookings:
+        try:
+            weight = booking_weight_kg(b)
+        except ValueError:
+            unassigned.append({"booking_id": b.get("booking_id"), "reason": "invalid total_weight"})
+            continue
+        origin = city_coordinates(b.get("origin", ""))
+        destination = city_coordinates(b.get("destination", ""))
+        if origin is None or destination is None:
+            unassigned.append({"booking_id": b.get("booking_id"), "reason": "unknown origin or destination"})
+            continue
+        rows.append((b, origin, destination, weight))
+
+    trucks = [
+        v for v in fleet
+        if isinstance(v.get("latitude"), (int, float)) and isinstance(v.get("longitude"), (int, float))
+    ]
+    if not rows or not trucks:
+        unassigned += [{"booking_id": b.get("booking_id"), "reason": "no vehicles available"} for b, _, _, _ in rows]
+        return {"assignments": [], "unassigned": unassigned}
+
+    origins = np.array([o for _, o, _, _ in rows], dtype=float)
+    destinations = np.array([d for _, _, d, _ in rows], dtype=float)
+    trip_km = haversine_rows(origins, destinations) * ROAD_DETOUR_FACTOR
+    weight_kg = np.array([w for _, _, _, w in rows])
+    needs_cold = np.array([booking_requires_cold_chain(b) for b, _, _, _ in rows], dtype=bool)
+
+    positions = np.array([(v["latitude"], v["longitude"]) for v in trucks], dtype=float)
+    capacity_kg = np.array([float(v.get("vehicle_capacity_kg") or DEFAULT_CAPACITY_KG) for v in trucks])
+    load_kg = np.array([float(v.get("load_kg", 0) or 0) + committed_kg.get(v["vehicle_id"], 0.0) for v in trucks])
+    is_cold = np.array([vehicle_is_cold_chain(v) for v in trucks], dtype=bool)
+    intensity = np.array([intensity_kg_per_km.get(v["vehicle_id"], np.nan) for v in trucks], dtype=float)
+    rated = intensity[intensity > 0]
+    median = float(np.median(rated)) if rated.size else 0.0
+    efficiency = np.ones(len(trucks))
+    if median > 0:
+        efficiency = np.where(intensity > 0, np.clip(intensity / median, 0.5, 2.0), 1.0)
+
+    cost, deadhead_km, co2_kg = build_cost_matrix(
+        origins, trip_km, weight_kg, needs_cold, positions, load_kg, capacity_kg, is_cold, efficiency
+    )
+    from scipy.optimize import linear_sum_assignment  # ~0.4 s to import; only dispatch needs it
+
+    row_idx, col_idx = linear_sum_assignment(cost)
+
+    assignments = []
+    matched = set()
+    for i, j in zip(row_idx, col_idx):
+        booking = rows[i][0]
+        if cost[i, j] >= INFEASIBLE_COST:
+            continue
+        matched.add(i)
+        assignments.append({
+            "booking_id": booking.get("booking_id"),
+            "vehicle_id": trucks[j]["vehicle_id"],
+            "deadhead_km": round(float(deadhead_km[i, j]), 1),
+            "trip_km": round(float(trip_km[i]), 1),
+            "est_co2_kg": round(float(co2_kg[i, j]), 2),
+            "cost": round(float(cost[i, j]), 2),
+        })
+    for i, (b, _, _, _) in enumerate(rows):
+        if i not in matched:
+            reason = "no feasible vehicle (capacity or cold chain)" if (cost[i] >= INFEASIBLE_COST).all() else "outbid by other bookings"
+            unassigned.append({"booking_id": b.get("booking_id"), "reason": reason})
+
+    logger.info(f"Dispatch: {len(assignments)} assigned, {len(unassigned)} unassigned across {len(trucks)} vehicles")
+    return {"assignments": assignments, "unassigned": unassigned}
@@ -0,0 +1,363 @@
+"""
+Fuel Anomaly Detection.
+
+Compares each telemetry event's reported `fuel_consumed_liters` with the fuel
+the CO₂ model implies for the same movement, and flags events whose excess is
+an outlier against that vehicle's own recent history:
+
+    distance   distance_km if reported, else the speed trapezoid over dt
+    multiplier load multiplier × speed factor (× cold-chain factor if `is_cold_chain`)
+    expected   distance × BASE_FACTOR_KG_PER_KM × multiplier / DIESEL_KG_CO2_PER_LITER
+               + IDLE_FUEL_LPH × dt
+    residual   fuel_consumed_liters − expected
+    robust z   (residual − median) / max(MAD_TO_SIGMA × MAD, MIN_SCALE_LITERS)
+
+Median and MAD are taken over the vehicle's previous WINDOW residuals, so a
+steady per-vehicle bias (engine, terrain, sensor calibration) is absorbed and
+only sudden jumps stand out, and the outliers being hunted do not drag the
+baseline the way a mean/stddev would. Events scoring ≥ Z_THRESHOLD once
+MIN_SAMPLES residuals are known are flagged. Only excess fuel is flagged:
+theft, siphoning and leaks all read as consumption that movement does not
+explain. The first event and events after a gap longer than MAX_GAP_SEC cover
+an unknown interval and are not scored.
+
+Two implementations share these rules:
+
+    FuelAnomalyDetector   incremental, O(WINDOW) per record; a FleetStateReader consumer
+    scan_fuel_anomalies   vectorized (numpy) backfill over telemetry history
+
+Both take the per-record multiplier from `co2_multiplier` (the co2_model
+helpers, which stay stdlib-only) and the litres from `_fuel_liters`, which
+works on floats and numpy arrays alike. On time-ordered input both flag the
+same events; the batch scan sorts its input first, so it also scores late
+records the streaming check had to skip.
+
+References:
+    - Iglewicz & Hoaglin (1993): modified z-score, 3.5 outlier cut-off
+    - IPCC AR6 WGIII Table 10.1 (via transforms.co2_model)
+"""
+
+import bisect
+import logging
+from array import array
+from collections import deque
+from collections.abc import Iterable
+
+import numpy as np
+
+from transforms.accumulators import MAX_GAP_SEC
+from transforms.co2_model import (
+    BASE_FACTOR_KG_PER_KM,
+    COLD_CHAIN_REFRIGERATION_FACTOR,
+    compute_load_multiplier,
+    compute_speed_efficiency_factor,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+DIESEL_KG_CO2_PER_LITER: float = 2.62
+"""CO₂ per litre of diesel burnt; converts the CO₂ model back into litres (same factor as the simulator)."""
+
+IDLE_FUEL_LPH: float = 2.5
+"""Idle burn of a heavy truck (L/h), charged for every second of the interval."""
+
+LOAD_STATUS_FRACTION: dict[str, float] = {"LADEN": 1.0, "PARTIAL": 0.5, "EMPTY": 0.0, "UNLADEN": 0.0}
+"""Load fraction by `load_status` when `load_kg`/`capacity_kg` are not reported; unknown → laden."""
+
+WINDOW: int = 50
+MIN_SAMPLES: int = 10
+Z_THRESHOLD: float = 3.5
+MAD_TO_SIGMA: float = 1.4826
+MIN_SCALE_LITERS: float = 0.05
+MAX_ANOMALIES_KEPT: int = 20
+MAX_SCAN_RECORDS: int = 5_000_000
+"""Records a batch scan reads before stopping (≈ 40 B each in column arrays, plus numpy temporaries)."""
+
+
+def load_fraction(record: dict) -> float:
+    """Payload fraction from `load_kg`/`capacity_kg`, else from `load_status`."""
+    load_kg, capacity_kg = record.get("load_kg"), record.get("capacity_kg")
+    if isinstance(load_kg, (int, float)) and isinstance(capacity_kg, (int, float)):
+        return min(max(load_kg, 0.0) / max(capacity_kg, 1.0), 2.0)
+    return LOAD_STATUS_FRACTION.get(str(record.get("load_status", "")).upper(), 1.0)
+
+
+def is_cold_chain(record: dict) -> bool:
+    """Explicit `is_cold_chain` flag; a temperature reading alone does not make a reefer."""
+    return bool(record.get("is_cold_chain"))
+
+
+def co2_multiplier(speed_kmph: float, load: float, cold: bool) -> float:
+    """CO₂ model multiplier on the per-km base factor for one record."""
+    multiplier = compute_load_multiplier(load) * compute_speed_efficiency_factor(speed_kmph)
+    return multiplier * COLD_CHAIN_REFRIGERATION_FACTOR if cold else multiplier
+
+
+def _fuel_liters(distance_km, dt_sec, multiplier):
+    """Litres for `distance_km` at `multiplier`, plus idle burn; floats or numpy arrays."""
+    return distance_km * BASE_FACTOR_KG_PER_KM * multiplier / DIESEL_KG_CO2_PER_LITER + IDLE_FUEL_LPH * dt_sec / 3600
+
+
+def expected_fuel_liters(distance_km: float, dt_sec: float, speed_kmph: float, load: float, cold: bool) -> float:
+    """Fuel the CO₂ model implies for `distance_km` over `dt_sec`, plus idle burn."""
+    return _fuel_liters(distance_km, dt_sec, co2_multiplier(speed_kmph, load, cold))
+
+
+def _median(sorted_values: list[float]) -> float:
+    n = len(sorted_values)
+    mid = n // 2
+    return sorted_values[mid] if n % 2 else (sorted_values[mid - 1] + sorted_values[mid]) / 2
+
+
+def _anomaly(vid: str, ts: float, fuel: float, expected: float, distance: float, z: float) -> dict:
+    return {
+        "vehicle_id": vid,
+        "timestamp": ts,
+        "fuel_liters": round(fuel, 3),
+        "expected_liters": round(expected, 3),
+        "excess_liters": round(fuel - expected, 3),
+        "distance_km": round(distance, 3),
+        "robust_z": round(z, 2),
+    }
+
+
+def _new_state(window: int) -> dict:
+    return {
+        "last_ts": None,
+        "last_speed_kmph": 0.0,
+        "window": deque(maxlen=window),
+        "sorted": [],
+        "events": 0,
+        "scored": 0,
+        "anomaly_count": 0,
+        "anomalies": [],
+    }
+
+
+class FuelAnomalyDetector:
+    """
+    Per-vehicle streaming fuel residual check.
+
+    Attributes:
+        window (int): Residuals kept per vehicle for the median/MAD baseline.
+        min_samples (int): Residuals required before events are scored.
+        z_threshold (float): Robust z-score at or above which an event is flagged.
+        vehicles (dict[str, dict]): vehicle_id → detector state.
+    """
+
+    name = "fuel_anomaly"
+
+    def __init__(self, window: int = WINDOW, min_samples: int = MIN_SAMPLES, z_threshold: float = Z_THRESHOLD):
+        if not 2 <= min_samples <= window:
+            raise ValueError(f"min_samples must be in 2..window, got {min_samples}")
+        if z_threshold <= 0:
+            raise ValueError(f"z_threshold must be positive, got {z_threshold}")
+        self.window = window
+        self.min_samples = min_samples
+        self.z_threshold = z_threshold
+        self.vehicles: dict[str, dict] = {}
+
+    def update(self, record: dict) -> bool:
+        """
+        Apply one telemetry record.
+
+        Returns:
+            bool: True if the record was flagged as a fuel anomaly.
+        """
+        vid = record.get("vehicle_id")
+        ts = record.get("timestamp")
+        fuel = record.get("fuel_consumed_liters")
+        if not vid or not isinstance(ts, (int, float)) or not isinstance(fuel, (int, float)):
+            return False
+        speed = float(record.get("speed_kmph") or 0.0)
+
+        state = self.vehicles.get(vid)
+        if state is None:
+            state = self.vehicles[vid] = _new_state(self.window)
+        elif ts <= state["last_ts"]:
+            return False
+        last_ts, last_speed = state["last_ts"], state["last_speed_kmph"]
+        state["last_ts"] = ts
+        state["last_speed_kmph"] = speed
+        state["events"] += 1
+        if last_ts is None or ts - last_ts > MAX_GAP_SEC:
+            return False
+
+        dt = ts - last_ts
+        distance = record.get("distance_km")
+        if not isinstance(distance, (int, float)):
+            distance = (speed + last_speed) / 2 * dt / 3600
+        expected = expected_fuel_liters(distance, dt, speed, load_fraction(record), is_cold_chain(record))
+        residual = fuel - expected
+
+        flagged = False
+        window, ordered = state["window"], state["sorted"]
+        if len(window) >= self.min_samples:
+            state["scored"] += 1
+            median = _median(ordered)
+            # The scale is at least MIN_SCALE_LITERS, so smaller excesses cannot score; skip the MAD for them.
+            if residual - median >= self.z_threshold * MIN_SCALE_LITERS:
+                mad = _median(sorted(abs(r - median) for r in ordered))
+                z = (residual - median) / max(MAD_TO_SIGMA * mad, MIN_SCALE_LITERS)
+                if z >= self.z_threshold:
+                    flagged = True
+                    state["anomaly_count"] += 1
+                    state["anomalies"].append(_anomaly(vid, ts, fuel, expected, distance, z))
+                    del state["anomalies"][:-MAX_ANOMALIES_KEPT]
+
+        if len(window) == window.maxlen:
+            del ordered[bisect.bisect_left(ordered, window[0])]
+        window.append(residual)
+        bisect.insort(ordered, residual)
+        return flagged
+
+    def status(self, vid: str) -> dict | None:
+        """Public view of one vehicle's detector, including recent anomalies."""
+        state = self.vehicles.get(vid)
+        if state is None:
+            return None
+        ordered = state["sorted"]
+        median = _median(ordered) if ordered else None
+        return {
+            "vehicle_id": vid,
+            "last_reading": state["last_ts"],
+            "events": state["events"],
+            "scored": state["scored"],
+            "baseline_residual_liters": round(median, 3) if median is not None else None,
+            "anomaly_count": state["anomaly_count"],
+            "anomalies": list(state["anomalies"]),
+        }
+
+    def to_dict(self) -> dict:
+        """Serializable snapshot for checkpointing."""
+        return {
+            "window": self.window,
+            "vehicles": {
+                vid: {**{k: v for k, v in st.items() if k != "sorted"}, "window": list(st["window"])}
+                for vid, st in self.vehicles.items()
+            },
+        }
+
+    def load_dict(self, state: dict) -> None:
+        """Restore from a `to_dict` snapshot."""
+        self.vehicles = {}
+        for vid, st in state.get("vehicles", {}).items():
+            window = deque(st.get("window", []), maxlen=self.window)
+            self.vehicles[vid] = {**_new_state(self.window), **st, "window": window, "sorted": sorted(window)}
+
+
+def _columns(records: Iterable[dict], max_records: int) -> tuple[np.ndarray, ...]:
+    """Usable records as columns: names, codes, ts, fuel, speed, distance, multiplier, then a truncation flag."""
+    codes_by_vid: dict[str, int] = {}
+    codes = array("q")
+    cols = tuple(array("d") for _ in range(5))
+    ts_col, fuel_col, speed_col, distance_col, multiplier_col = cols
+    truncated = False
+    for r in records:
+        vid, ts, fuel = r.get("vehicle_id"), r.get("timestamp"), r.get("fuel_consumed_liters")
+        if not vid or not isinstance(ts, (int, float)) or not isinstance(fuel, (int, float)):
+            continue
+        if len(codes) >= max_records:
+            truncated = True
+            break
+        distance = r.get("distance_km")
+        speed = float(r.get("speed_kmph") or 0.0)
+        codes.append(codes_by_vid.setdefault(vid, len(codes_by_vid)))
+        ts_col.append(ts)
+        fuel_col.append(fuel)
+        speed_col.append(speed)
+        distance_col.append(distance if isinstance(distance, (int, float)) else np.nan)
+        multiplier_col.append(co2_multiplier(speed, load_fraction(r), is_cold_chain(r)))
+    names = np.array(list(codes_by_vid), dtype=object)
+    return names, np.frombuffer(codes, dtype=np.int64), *(np.frombuffer(c, dtype=float) for c in cols), truncated
+
+
+def _robust_z(values: np.ndarray, prior: np.ndarray) -> np.ndarray:
+    """Robust z-score of each value against its row of prior residuals."""
+    median = np.median(prior, axis=1)
+    mad = np.median(np.abs(prior - median[:, None]), axis=1)
+    return (values - median) / np.maximum(MAD_TO_SIGMA * mad, MIN_SCALE_LITERS)
+
+
+def scan_fuel_anomalies(
+    records: Iterable[dict],
+    window: int = WINDOW,
+    min_samples: int = MIN_SAMPLES,
+    z_threshold: float = Z_THRESHOLD,
+    chunk: int = 65536,
+    max_records: int = MAX_SCAN_RECORDS,
+) -> dict:
+    """
+    Batch fuel anomaly scan over telemetry history (backfills).
+
+    Expected fuel, residuals and robust z-scores are computed on numpy arrays
+    for every vehicle at once, so memory grows with the records scanned:
+    records are held as compact column arrays and reading stops after
+    `max_records` (`truncated` in the result). Rolling medians are taken over
+    `chunk` rows of strided windows at a time. Callers should bound the time
+    range (the API caps it) rather than rely on the record limit.
+
+    Args:
+        records: Telemetry records in any order (e.g. `rag.carbon_export.iter_history`).
+
+    Returns:
+        dict: `events`, `scored`, `anomalies` (oldest first), per-vehicle anomaly
+        counts and `truncated`.
+    """
+    if not 2 <= min_samples <= window:
+        raise ValueError(f"min_samples must be in 2..window, got {min_samples}")
+    names, codes, ts, fuel, speed, distance, multiplier, truncated = _columns(records, max_records)
+    result = {"events": int(len(ts)), "scored": 0, "anomalies": [], "vehicles": {}, "truncated": truncated}
+    if not len(ts):
+        return result
+
+    order = np.lexsort((ts, codes))
+    codes, ts, fuel, speed, distance, multiplier = (a[order] for a in (codes, ts, fuel, speed, distance, multiplier))
+    # Duplicate timestamps: the streaming check keeps the first and skips the rest.
+    keep = np.ones(len(ts), dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (ts[1:] != ts[:-1])
+    codes, ts, fuel, speed, distance, multiplier = (a[keep] for a in (codes, ts, fuel, speed, distance, multiplier))
+    result["events"] = int(len(ts))
+
+    same = np.zeros(len(ts), dtype=bool)
+    same[1:] = codes[1:] == codes[:-1]
+    dt = np.zeros(len(ts))
+    dt[1:] = ts[1:] - ts[:-1]
+    prev_speed = np.zeros(len(ts))
+    prev_speed[1:] = speed[:-1]
+    valid = same & (dt <= MAX_GAP_SEC)
+
+    distance = np.where(np.isnan(distance), (speed + prev_speed) / 2 * dt / 3600, distance)
+    expected = _fuel_liters(distance, dt, multiplier)
+
+    idx = np.flatnonzero(valid)
+    residual = fuel[idx] - expected[idx]
+    n = len(idx)
+    first = np.ones(n, dtype=bool)
+    first[1:] = codes[idx][1:] != codes[idx][:-1]
+    pos = np.arange(n) - np.maximum.accumulate(np.where(first, np.arange(n), 0))  # index within the vehicle
+
+    z = np.full(n, -np.inf)
+    # Short baselines: position p of every vehicle against its first p residuals, one p at a time.
+    for p in range(min_samples, window):
+        rows = np.flatnonzero(pos == p)
+        if len(rows):
+            z[rows] = _robust_z(residual[rows], residual[(rows - p)[:, None] + np.arange(p)])
+    # Full baselines: the `window` residuals before each position, as strided views (chunked copies).
+    rows = np.flatnonzero(pos >= window)
+    views = np.lib.stride_tricks.sliding_window_view(residual, window)
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        z[block] = _robust_z(residual[block], views[block - window])
+
+    result["scored"] = int(np.isfinite(z).sum())
+    hits = np.flatnonzero(z >= z_threshold)
+    for i in hits[np.argsort(ts[idx[hits]], kind="stable")]:
+        row = idx[i]
+        vid = str(names[codes[row]])
+        result["anomalies"].append(
+            _anomaly(vid, float(ts[row]), float(fuel[row]), float(expected[row]), float(distance[row]), float(z[i]))
+        )
+        result["vehicles"][vid] = result["vehicles"].get(vid, 0) + 1
+    return result
@@ -0,0 +1,129 @@
+"""
+Route Geometry for RouteZero.
+
+Corridor waypoints, hub coordinates and Haversine distances, plus the
+deviation check that estimates CO2 penalties for freight vehicles moving
+outside their designated corridors using IPCC AR6 baselines. Pure Python;
+`transforms.route_checker` binds `check_deviation` as a Pathway UDF.
+
+Author: S-Eshwar-fut-dev
+License: MIT
+"""
+
+import logging
+import math
+
+from transforms.timing import timed
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+DEVIATION_THRESHOLD_KM: float = 2.0
+CO2_PENALTY_PER_KM_KG: float = 0.4
+
+ROUTE_CORRIDORS: dict[str, list[tuple[float, float]]] = {
+    "delhi_mumbai": [
+        (28.6139, 77.2090),
+        (27.1767, 78.0081),
+        (19.0760, 72.8777),
+    ],
+    "chennai_bangalore": [
+        (13.0827, 80.2707),
+        (12.9716, 77.5946),
+    ],
+}
+
+CITY_COORDINATES: dict[str, tuple[float, float]] = {
+    "delhi": (28.6139, 77.2090),
+    "agra": (27.1767, 78.0081),
+    "gwalior": (26.2183, 78.1828),
+    "jhansi": (25.4484, 78.5685),
+    "bhopal": (23.2599, 77.4126),
+    "jabalpur": (23.1815, 79.9864),
+    "indore": (22.7196, 75.8577),
+    "jaipur": (26.9124, 75.7873),
+    "ahmedabad": (23.0225, 72.5714),
+    "vadodara": (22.3072, 73.1812),
+    "surat": (21.1702, 72.8311),
+    "mumbai": (19.0760, 72.8777),
+    "pune": (18.5204, 73.8567),
+    "nagpur": (21.1458, 79.0882),
+    "hyderabad": (17.3850, 78.4867),
+    "chennai": (13.0827, 80.2707),
+    "vellore": (12.9165, 79.1325),
+    "krishnagiri": (12.5186, 78.2137),
+    "bangalore": (12.9716, 77.5946),
+    "kolkata": (22.5726, 88.3639),
+    "asansol": (23.6739, 86.9524),
+    "dhanbad": (23.7957, 86.4304),
+    "gaya": (24.7914, 85.0002),
+    "patna": (25.5941, 85.1376),
+    "varanasi": (25.3176, 82.9739),
+    "kanpur": (26.4499, 80.3319),
+    "lucknow": (26.8467, 80.9462),
+}
+"""Freight hub coordinates, keyed by lower-case city name as used in bookings."""
+
+
+def city_coordinates(name: str) -> tuple[float, float] | None:
+    """Look up a hub's (lat, lon) by city name, case-insensitively."""
+    return CITY_COORDINATES.get(name.strip().lower()) if name else None
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Compute the great-circle distance in kilometers between two points on a sphere.
+
+    Args:
+        lat1 (float): Latitude of origin.
+        lon1 (float): Longitude of origin.
+        lat2 (float): Latitude of destination.
+        lon2 (float): Longitude of destination.
+
+    Returns:
+        float: Distance in kilometers.
+    """
+    earth_radius_km = 6371.0  # Radius of earth in km
+    try:
+        d_lat = math.radians(lat2 - lat1)
+        d_lon = math.radians(lon2 - lon1)
+        a = (
+            math.sin(d_lat / 2) ** 2
+            + math.cos(math.radians(lat1))
+            * math.cos(math.radians(lat2))
+            * math.sin(d_lon / 2) ** 2
+        )
+        return earth_radius_km * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    except Exception as e:
+        logger.error(f"Error calculating Haversine distance: {e}")
+        return 0.0
+
+@timed()
+def check_deviation(lat: float, lon: float, route_id: str) -> str:
+    """
+    Evaluate if a vehicle has deviated beyond the allowed threshold.
+
+    Args:
+        lat (float): Current live latitude.
+        lon (float): Current live longitude.
+        route_id (str): The actively assigned transport corridor ID.
+
+    Returns:
+        str: Stringified status payload containing the alert type and CO2 penalty.
+    """
+    try:
+        waypoints = ROUTE_CORRIDORS.get(route_id, [])
+        if not waypoints:
+            return "OK|deviation_km=0.0|extra_co2_kg=0.0"
+
+        dist_km = min(haversine_km(lat, lon, wp_lat, wp_lon) for wp_lat, wp_lon in waypoints)
+
+        if dist_km > DEVIATION_THRESHOLD_KM:
+            extra_co2 = round(dist_km * CO2_PENALTY_PER_KM_KG, 2)
+            logger.warning(f"Route deviation detected on {route_id}. Penalty: {extra_co2}kg CO2")
+            return f"ROUTE_DEVIATION_ALERT|deviation_km={dist_km:.2f}|extra_co2_kg={extra_co2}"
+
+        return "OK"
+    except Exception as e:
+        logger.error(f"Failed to check deviation: {e}")
+        return "ERROR_CALCULATING_DEVIATION"
@@ -0,0 +1,385 @@
+"""
+Emission-Weighted Corridor Routing.
+
+Loads a local road graph (data/road_graph.json) into compact CSR arrays and
+answers shortest-path queries where each edge costs
+
+    weight = km × (DISTANCE_WEIGHT + CO2_WEIGHT × BASE_FACTOR_KG_PER_KM
+                   × load_multiplier × speed_efficiency_factor(edge speed) × cold_factor)
+
+i.e. distance plus the IPCC AR6 CO₂ model from `co2_model`. Point-to-point
+queries use A* with ALT (landmark + triangle inequality) heuristics and an LRU
+cache; corridor-wide reroutes run one reverse Dijkstra per destination and
+read every truck's path off the resulting shortest-path tree.
+
+Author: S-Eshwar-fut-dev
+"""
+
+import functools
+import heapq
+import json
+import logging
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+from transforms.co2_model import (
+    BASE_FACTOR_KG_PER_KM,
+    COLD_CHAIN_REFRIGERATION_FACTOR,
+    FULL_LOAD_UPLIFT,
+    compute_speed_efficiency_factor,
+)
+from transforms.route_geometry import haversine_km
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+ROAD_GRAPH_PATH: Path = Path(__file__).resolve().parent.parent / "data" / "road_graph.json"
+DISTANCE_WEIGHT: float = 1.0
+CO2_WEIGHT: float = 1.0
+NUM_LANDMARKS: int = 4
+CACHE_SIZE: int = 4096
+
+CORRIDOR_ENDPOINTS: dict[str, tuple[str, str]] = {
+    "delhi_mumbai": ("delhi", "mumbai"),
+    "chennai_bangalore": ("chennai", "bangalore"),
+    "kolkata_patna": ("kolkata", "patna"),
+}
+"""Corridor id → (origin hub, destination hub)."""
+
+Profile = tuple[float, bool]
+"""(load_fraction rounded to 0.1, is_cold_chain) — edge weights depend only on this."""
+
+
+def make_profile(load_fraction: float = 1.0, is_cold_chain: bool = False) -> Profile:
+    """Bucket a vehicle's load and reefer state into a cacheable weight profile."""
+    return (round(min(max(load_fraction, 0.0), 2.0), 1), bool(is_cold_chain))
+
+
+class LRUCache:
+    """
+    Small ordered-dict LRU with hit/miss counters.
+
+    Locked, since the sync API endpoints query one shared graph from the threadpool.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RoadGraph:
+    """
+    Undirected road graph in CSR form.
+
+    Attributes:
+        names (list[str]): Node id per index.
+        lat, lon (array): Node coordinates.
+        indptr (array): CSR row pointers; edges of node u are indptr[u]:indptr[u+1].
+        sources (array): Source node per CSR edge slot (COO row, for path reconstruction).
+        indices (array): Neighbour node per CSR edge slot.
+        km (array): Road distance per CSR edge slot.
+        speed (array): Typical truck speed per CSR edge slot (km/h).
+        highway (list[str]): Highway label per CSR edge slot.
+    """
+
+    def __init__(self, nodes: list[dict], edges: list[dict]):
+        self.names = [n["id"] for n in nodes]
+        self.node_index = {name: i for i, name in enumerate(self.names)}
+        self.lat = array("d", (n["lat"] for n in nodes))
+        self.lon = array("d", (n["lon"] for n in nodes))
+
+        adjacency: list[list[tuple[int, float, float, str]]] = [[] for _ in nodes]
+        for e in edges:
+            u, v = self.node_index[e["from"]], self.node_index[e["to"]]
+            adjacency[u].append((v, e["km"], e["speed_kmph"], e["highway"]))
+            adjacency[v].append((u, e["km"], e["speed_kmph"], e["highway"]))
+
+        self.indptr = array("l", [0])
+        self.sources = array("l")
+        self.indices = array("l")
+        self.km = array("d")
+        self.speed = array("d")
+        self.highway: list[str] = []
+        for u, row in enumerate(adjacency):
+            for v, km, speed, highway in row:
+                self.sources.append(u)
+                self.indices.append(v)
+                self.km.append(km)
+                self.speed.append(speed)
+                self.highway.append(highway)
+            self.indptr.append(len(self.indices))
+
+        self._weights: dict[Profile, array] = {}
+        self._co2: dict[Profile, array] = {}
+        self._landmarks: dict[Profile, list[list[float]]] = {}
+        self.path_cache = LRUCache()
+        self.tree_cache = LRUCache(maxsize=256)
+
+    @classmethod
+    def load(cls, path: Path = ROAD_GRAPH_PATH) -> "RoadGraph":
+        """Load a graph from a `{"nodes": [...], "edges": [...]}` JSON file."""
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        graph = cls(doc["nodes"], doc["edges"])
+        logger.info(f"Road graph loaded: {len(graph.names)} nodes, {len(graph.indices) // 2} edges")
+        return graph
+
+    # ── Weights ──────────────────────────────────────────────────────────────
+
+    def edge_co2(self, profile: Profile) -> array:
+        """Per-edge CO₂ (kg) under the IPCC AR6 model for this load/reefer profile."""
+        if profile not in self._co2:
+            load_fraction, is_cold = profile
+            factor = BASE_FACTOR_KG_PER_KM * (1.0 + FULL_LOAD_UPLIFT * load_fraction)
+            if is_cold:
+                factor *= COLD_CHAIN_REFRIGERATION_FACTOR
+            self._co2[profile] = array(
+                "d", (km * factor * compute_speed_efficiency_factor(sp) for km, sp in zip(self.km, self.speed))
+            )
+        return self._co2[profile]
+
+    def edge_weights(self, profile: Profile) -> array:
+        """Per-edge routing cost combining distance and CO₂."""
+        if profile not in self._weights:
+            co2 = self.edge_co2(profile)
+            self._weights[profile] = array(
+                "d", (DISTANCE_WEIGHT * km + CO2_WEIGHT * c for km, c in zip(self.km, co2))
+            )
+        return self._weights[profile]
+
+    # ── Search ───────────────────────────────────────────────────────────────
+
+    def _dijkstra(self, source: int, weights: array) -> tuple[list[float], list[int]]:
+        """Single-source shortest paths; returns (dist, parent edge slot)."""
+        n = len(self.names)
+        dist = [math.inf] * n
+        parent = [-1] * n
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        indptr, indices = self.indptr, self.indices
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for slot in range(indptr[u], indptr[u + 1]):
+                v = indices[slot]
+                nd = d + weights[slot]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    parent[v] = slot
+                    heapq.heappush(heap, (nd, v))
+        return dist, parent
+
+    def landmarks(self, profile: Profile) -> list[list[float]]:
+        """
+        Landmark distance tables for ALT, chosen by farthest-point selection.
+
+        Computed once per profile: NUM_LANDMARKS Dijkstra runs.
+        """
+        if profile not in self._landmarks:
+            weights = self.edge_weights(profile)
+            tables: list[list[float]] = []
+            current = 0
+            for _ in range(min(NUM_LANDMARKS, len(self.names))):
+                dist, _ = self._dijkstra(current, weights)
+                tables.append(dist)
+                reachable = [
+                    (min(t[i] for t in tables), i) for i in range(len(self.names)) if dist[i] < math.inf
+                ]
+                current = max(reachable)[1]
+            self._landmarks[profile] = tables
+        return self._landmarks[profile]
+
+    def shortest_path(self, origin: str, destination: str, profile: Profile | None = None) -> dict | None:
+        """
+        Lowest-cost path between two hubs using A* with landmark heuristics.
+
+        Args:
+            origin: Origin node id (e.g. "delhi").
+            destination: Destination node id.
+            profile: Weight profile from `make_profile`; defaults to laden, ambient.
+
+        Returns:
+            dict | None: Path summary (see `_summarize`), or None if unreachable/unknown.
+        """
+        profile = profile or make_profile()
+        key = (origin, destination, profile)
+        cached = self.path_cache.get(key)
+        if cached is not None:
+            return cached
+        src, dst = self.node_index.get(origin), self.node_index.get(destination)
+        if src is None or dst is None:
+            return None
+
+        weights = self.edge_weights(profile)
+        tables = self.landmarks(profile)
+        to_dst = [t[dst] for t in tables]
+
+        def heuristic(v: int) -> float:
+            return max(
+                (abs(td - t[v]) for td, t in zip(to_dst, tables) if td < math.inf and t[v] < math.inf),
+                default=0.0,
+            )
+
+        n = len(self.names)
+        g = [math.inf] * n
+        parent = [-1] * n
+        g[src] = 0.0
+        heap = [(heuristic(src), src)]
+        closed = [False] * n
+        while heap:
+            _, u = heapq.heappop(heap)
+            if closed[u]:
+                continue
+            if u == dst:
+                break
+            closed[u] = True
+            for slot in range(self.indptr[u], self.indptr[u + 1]):
+                v = self.indices[slot]
+                ng = g[u] + weights[slot]
+                if ng < g[v]:
+                    g[v] = ng
+                    parent[v] = slot
+                    heapq.heappush(heap, (ng + heuristic(v), v))
+        if g[dst] == math.inf:
+            return None
+
+        nodes, slots = [dst], []
+        v = dst
+        while v != src:
+            slot = parent[v]
+            slots.append(slot)
+            v = self.sources[slot]
+            nodes.append(v)
+        nodes.reverse()
+        slots.reverse()
+        result = self._summarize(nodes, slots, profile)
+        self.path_cache.put(key, result)
+        return result
+
+    def tree_to(self, destination: str, profile: Profile) -> tuple[list[float], list[int]] | None:
+        """Reverse shortest-path tree toward `destination` (undirected graph: one Dijkstra)."""
+        key = (destination, profile)
+        cached = self.tree_cache.get(key)
+        if cached is not None:
+            return cached
+        dst = self.node_index.get(destination)
+        if dst is None:
+            return None
+        tree = self._dijkstra(dst, self.edge_weights(profile))
+        self.tree_cache.put(key, tree)
+        return tree
+
+    def path_from_tree(self, origin: str, tree: tuple[list[float], list[int]], profile: Profile) -> dict | None:
+        """Read the path origin → tree root by following parent edges, O(path length)."""
+        dist, parent = tree
+        src = self.node_index.get(origin)
+        if src is None or dist[src] == math.inf:
+            return None
+        # parent[v] is the tree edge u→v pointing away from the destination; edges are
+        # undirected, so walking it backwards gives the next hop toward the destination.
+        nodes, slots = [src], []
+        v = src
+        while parent[v] != -1:
+            slot = parent[v]
+            slots.append(slot)
+            v = self.sources[slot]
+            nodes.append(v)
+        return self._summarize(nodes, slots, profile)
+
+    def nearest_node(self, lat: float, lon: float) -> str:
+        """Closest hub to a GPS fix (linear scan; hub graphs are small)."""
+        best = min(range(len(self.names)), key=lambda i: haversine_km(lat, lon, self.lat[i], self.lon[i]))
+        return self.names[best]
+
+    # ── Helpers ──────────────────────────────────────────────────────────────
+
+    def _summarize(self, nodes: list[int], slots: list[int], profile: Profile) -> dict:
+        co2 = self.edge_co2(profile)
+        weights = self.edge_weights(profile)
+        via: list[str] = []
+        for s in slots:
+            if not via or via[-1] != self.highway[s]:
+                via.append(self.highway[s])
+        return {
+            "nodes": [self.names[n] for n in nodes],
+            "via": via,
+            "distance_km": round(sum(self.km[s] for s in slots), 1),
+            "co2_kg": round(sum(co2[s] for s in slots), 2),
+            "cost": round(sum(weights[s] for s in slots), 2),
+        }
+
+
+@functools.lru_cache(maxsize=1)
+def get_road_graph() -> RoadGraph:
+    """Process-wide road graph, loaded from ROAD_GRAPH_PATH on first use."""
+    return RoadGraph.load()
+
+
+def vehicle_profile(vehicle: dict) -> Profile:
+    """Derive a weight profile from a telemetry record."""
+    if "load_fraction" in vehicle:
+        load_fraction = float(vehicle["load_fraction"])
+    else:
+        load_fraction = 0.0 if vehicle.get("load_status") == "EMPTY" else 1.0
+    return make_profile(load_fraction, vehicle.get("temperature_c") is not None)
+
+
+def suggest_corridor_reroutes(graph: RoadGraph, route_id: str, vehicles: list[dict]) -> list[dict]:
+    """
+    Lowest-emission path to the corridor destination for every truck on a corridor.
+
+    Trucks sharing a weight profile share one reverse Dijkstra tree, so a whole
+    corridor costs at most one search per profile plus a walk per truck.
+
+    Args:
+        graph: Loaded road graph.
+        route_id: Corridor id (key of CORRIDOR_ENDPOINTS).
+        vehicles: Latest telemetry records for trucks on that corridor.
+
+    Returns:
+        list[dict]: One suggestion per truck with `vehicle_id`, `from_node`, `destination`
+        and the path summary, or an `error` when no path exists.
+    """
+    endpoints = CORRIDOR_ENDPOINTS.get(route_id)
+    if endpoints is None:
+        return []
+    destination = endpoints[1]
+    suggestions = []
+    for v in vehicles:
+        lat, lon = v.get("latitude"), v.get("longitude")
+        if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+            continue
+        profile = vehicle_profile(v)
+        from_node = graph.nearest_node(lat, lon)
+        tree = graph.tree_to(destination, profile)
+        path = graph.path_from_tree(from_node, tree, profile) if tree else None
+        entry = {"vehicle_id": v.get("vehicle_id"), "from_node": from_node, "destination": destination}
+        suggestions.append({**entry, **path} if path else {**entry, "error": "no path"})
+    return suggestions
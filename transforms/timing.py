@@ -0,0 +1,134 @@
+"""
+Per-call timing for pipeline UDFs, off by default.
+
+`@timed()` wraps a function so that, while timing is enabled, each call adds
+its wall time to an in-process aggregate (calls, total, max). While disabled
+the wrapper costs one global flag check. Pathway runs the UDFs in its own
+process, so timing there is switched through a small JSON control file that
+`watch` polls; `watch` also dumps the aggregate next to it for the API's
+admin endpoint to read:
+
+    {"udf_timing": true}   → <dump_dir>/udf_timings.<pid>.json every interval
+
+Counts are approximate if the same UDF runs on several threads at once.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DUMP_INTERVAL_SEC: float = 2.0
+"""Default interval at which `watch` polls the control file and rewrites its dump."""
+
+_enabled: bool = False
+_stats: dict[str, list[int]] = {}
+"""name → [calls, total_ns, max_ns]."""
+
+
+def timed(name: str | None = None) -> Callable[[Callable], Callable]:
+    """Decorator recording per-call wall time under `name` (default: the function name) when enabled."""
+    def decorate(fn: Callable) -> Callable:
+        key = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - started
+                entry = _stats.get(key)
+                if entry is None:
+                    entry = _stats.setdefault(key, [0, 0, 0])
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+
+        return wrapper
+    return decorate
+
+
+def set_enabled(enabled: bool) -> None:
+    """Turn timing on or off for this process."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Drop all aggregates."""
+    _stats.clear()
+
+
+def snapshot() -> dict[str, dict]:
+    """Aggregates per function: calls, total_ms, mean_us, max_us."""
+    out = {}
+    for key, (calls, total_ns, max_ns) in list(_stats.items()):
+        out[key] = {
+            "calls": calls,
+            "total_ms": round(total_ns / 1e6, 3),
+            "mean_us": round(total_ns / calls / 1e3, 3) if calls else 0.0,
+            "max_us": round(max_ns / 1e3, 3),
+        }
+    return out
+
+
+def merge(snapshots: list[dict[str, dict]]) -> dict[str, dict]:
+    """Combine snapshots from several processes."""
+    merged: dict[str, dict] = {}
+    for snap in snapshots:
+        for key, s in snap.items():
+            m = merged.setdefault(key, {"calls": 0, "total_ms": 0.0, "max_us": 0.0})
+            m["calls"] += s["calls"]
+            m["total_ms"] = round(m["total_ms"] + s["total_ms"], 3)
+            m["max_us"] = max(m["max_us"], s["max_us"])
+    for m in merged.values():
+        m["mean_us"] = round(1000 * m["total_ms"] / m["calls"], 3) if m["calls"] else 0.0
+    return merged
+
+
+def read_control(control_path: Path) -> bool:
+    """Whether the control file asks for UDF timing (missing or unreadable → off)."""
+    try:
+        return bool(json.loads(control_path.read_text(encoding="utf-8")).get("udf_timing"))
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def watch(control_path: Path, dump_dir: Path, interval_sec: float = DUMP_INTERVAL_SEC) -> threading.Thread:
+    """
+    Follow the control file and dump this process's aggregates while enabled.
+
+    Call once from the pipeline entry point; runs on a daemon thread.
+    """
+    dump_path = dump_dir / f"udf_timings.{os.getpid()}.json"
+
+    def loop() -> None:
+        while True:
+            set_enabled(read_control(control_path))
+            if _stats:
+                try:
+                    dump_dir.mkdir(parents=True, exist_ok=True)
+                    tmp = dump_path.with_suffix(".tmp")
+                    tmp.write_text(json.dumps({"updated": time.time(), "udfs": snapshot()}), encoding="utf-8")
+                    os.replace(tmp, dump_path)
+                except OSError as e:
+                    logger.error(f"UDF timing dump failed: {e}")
+            time.sleep(interval_sec)
+
+    thread = threading.Thread(target=loop, name="udf-timing-watch", daemon=True)
+    thread.start()
+    return thread
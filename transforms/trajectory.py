@@ -0,0 +1,156 @@
+"""
+Online Trajectory Compression.
+
+Simplifies each vehicle's GPS stream as it arrives using an opening-window
+variant of Douglas–Peucker with synchronized Euclidean distance (SED): a window
+grows from the last kept fix (the anchor) while every buffered fix stays within
+`tolerance_m` of where linear interpolation between the anchor and the newest
+fix places the truck *at that fix's timestamp*. When a fix breaks the bound, the
+previous one is kept and becomes the new anchor.
+
+Because the bound is on time-synchronized position, replaying the kept points
+with linear interpolation reconstructs any raw fix within `tolerance_m`, so
+ghost-path playback and corridor deviation (2 km threshold) stay accurate.
+Fixes are also kept whenever `deviation_status` changes and around gaps longer
+than MAX_GAP_SEC, so alerts and outages keep exact timestamps.
+
+Work per fix is O(window), with the window capped at MAX_WINDOW_POINTS.
+
+Author: S-Eshwar-fut-dev
+"""
+
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+DEFAULT_TOLERANCE_M: float = 25.0
+MAX_WINDOW_POINTS: int = 200
+MAX_GAP_SEC: float = 300.0
+METRES_PER_DEG_LAT: float = 111_320.0
+
+TRACK_FIELDS: tuple[str, ...] = (
+    "timestamp", "latitude", "longitude", "speed_kmph", "route_id", "deviation_status",
+)
+"""Fields retained on stored track points; everything else stays in the raw telemetry log."""
+
+
+def track_point(record: dict) -> dict | None:
+    """Reduce a telemetry record to a track point, or None if it has no usable fix."""
+    ts, lat, lon = record.get("timestamp"), record.get("latitude"), record.get("longitude")
+    if not all(isinstance(x, (int, float)) for x in (ts, lat, lon)):
+        return None
+    point = {field: record[field] for field in TRACK_FIELDS if record.get(field) is not None}
+    point["latitude"] = round(lat, 6)
+    point["longitude"] = round(lon, 6)
+    return point
+
+
+def sed_m(anchor: dict, end: dict, point: dict) -> float:
+    """
+    Synchronized Euclidean distance in metres.
+
+    Distance between `point` and the position linear interpolation from
+    `anchor` to `end` predicts at `point`'s timestamp (local equirectangular projection).
+    """
+    span = end["timestamp"] - anchor["timestamp"]
+    frac = (point["timestamp"] - anchor["timestamp"]) / span if span > 0 else 0.0
+    lat = anchor["latitude"] + (end["latitude"] - anchor["latitude"]) * frac
+    lon = anchor["longitude"] + (end["longitude"] - anchor["longitude"]) * frac
+    dy = (point["latitude"] - lat) * METRES_PER_DEG_LAT
+    dx = (point["longitude"] - lon) * METRES_PER_DEG_LAT * math.cos(math.radians(lat))
+    return math.hypot(dx, dy)
+
+
+def interpolate(points: list[dict], ts: float) -> tuple[float, float] | None:
+    """Position at `ts` by linear interpolation over time-ordered track points."""
+    if not points or ts < points[0]["timestamp"] or ts > points[-1]["timestamp"]:
+        return None
+    lo, hi = 0, len(points) - 1
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if points[mid]["timestamp"] <= ts:
+            lo = mid
+        else:
+            hi = mid
+    a, b = points[lo], points[hi]
+    span = b["timestamp"] - a["timestamp"]
+    frac = (ts - a["timestamp"]) / span if span > 0 else 0.0
+    return (
+        a["latitude"] + (b["latitude"] - a["latitude"]) * frac,
+        a["longitude"] + (b["longitude"] - a["longitude"]) * frac,
+    )
+
+
+class TrajectoryCompressor:
+    """
+    Per-vehicle opening-window simplifier.
+
+    `update` returns the points that became final; the newest fix is always
+    pending (it may still be dropped) and is exposed through `pending`.
+
+    Attributes:
+        tolerance_m (float): Maximum reconstruction error in metres.
+        windows (dict[str, dict]): vehicle_id → {"anchor", "buffer"}.
+    """
+
+    def __init__(self, tolerance_m: float = DEFAULT_TOLERANCE_M):
+        self.tolerance_m = tolerance_m
+        self.windows: dict[str, dict] = {}
+        self.stats = {"raw_points": 0, "kept_points": 0}
+
+    def update(self, vid: str, point: dict) -> list[dict]:
+        """
+        Feed one track point (see `track_point`) for a vehicle.
+
+        Returns:
+            list[dict]: Points to persist, oldest first (possibly empty).
+        """
+        window = self.windows.get(vid)
+        if window is None:
+            self.windows[vid] = {"anchor": point, "buffer": []}
+            self.stats["raw_points"] += 1
+            return self._keep([point])
+
+        anchor, buffer = window["anchor"], window["buffer"]
+        last = buffer[-1] if buffer else anchor
+        if point["timestamp"] <= last["timestamp"]:
+            return []
+        self.stats["raw_points"] += 1
+
+        if (
+            point["timestamp"] - last["timestamp"] > MAX_GAP_SEC
+            or point.get("deviation_status") != last.get("deviation_status")
+        ):
+            # Pin both sides of a gap or status change, then restart from the new fix.
+            kept = [last] if buffer else []
+            window["anchor"], window["buffer"] = point, []
+            return self._keep(kept + [point])
+
+        if len(buffer) < MAX_WINDOW_POINTS and all(
+            sed_m(anchor, point, p) <= self.tolerance_m for p in buffer
+        ):
+            buffer.append(point)
+            return []
+
+        window["anchor"], window["buffer"] = last, [point]
+        return self._keep([last])
+
+    def pending(self, vid: str) -> dict | None:
+        """Newest fix not yet kept, if any."""
+        window = self.windows.get(vid)
+        return window["buffer"][-1] if window and window["buffer"] else None
+
+    def _keep(self, points: list[dict]) -> list[dict]:
+        self.stats["kept_points"] += len(points)
+        return points
+
+    def to_dict(self) -> dict:
+        """Serializable snapshot of open windows."""
+        return {"windows": self.windows, "stats": self.stats}
+
+    def load_dict(self, state: dict) -> None:
+        """Restore from a `to_dict` snapshot."""
+        self.windows = state.get("windows", {})
+        self.stats.update(state.get("stats", {}))